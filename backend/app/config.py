@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     APP_ENV: str = "dev"
@@ -8,6 +8,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "dev-secret-change-me"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 120  # 2 hours - mediation sessions can be long
+    AUTH_CACHE_TTL_SECONDS: int = 30  # How long a decoded token -> user snapshot is reused (per worker)
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
 
     # API Keys
     ANTHROPIC_API_KEY: str = ""
@@ -16,9 +18,73 @@ class Settings(BaseSettings):
     STRIPE_PUBLISHABLE_KEY: str = ""
     STRIPE_WEBHOOK_SECRET: str = ""
 
+    # Anthropic gateway (shared async client - see app/services/llm_gateway.py)
+    LLM_MAX_CONNECTIONS: int = 200
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_DEFAULT_CONCURRENCY: int = 100  # Max in-flight requests per model
+    # comma-separated model=limit overrides, e.g. "claude-sonnet-4-5-20250929=50"
+    LLM_MODEL_CONCURRENCY: str = ""
+
+    # Conversation context window (see app/services/context_window.py)
+    CONTEXT_TOKEN_BUDGET: int = 8000  # History tokens sent verbatim before older turns are summarized
+    # comma-separated model=tokens overrides, e.g. "claude-sonnet-4-5-20250929=12000"
+    CONTEXT_MODEL_TOKEN_BUDGETS: str = ""
+    CONTEXT_RECENT_MESSAGES: int = 12  # Most recent messages always kept verbatim
+    CONTEXT_SUMMARY_MODEL: str = "claude-sonnet-4-20250514"
+
+    # Admin cost dashboards read rollups refreshed this often (see services/cost_rollups.py)
+    COST_ROLLUP_INTERVAL_MINUTES: int = 5
+    # ...and read today's analytics bucket refreshed this often (see services/analytics_snapshots.py)
+    ANALYTICS_TODAY_INTERVAL_MINUTES: int = 1
+
+    # Scheduled jobs (see app/services/scheduler.py)
+    # "lease": every instance schedules jobs but only the one holding a job's DB lease runs it
+    # "local": run every job in this process with no coordination (single instance)
+    # "off": don't start the scheduler in this process
+    SCHEDULER_MODE: str = "lease"
+    SCHEDULER_LEASE_SECONDS: int = 1800  # A job's lease is released after this long even if its instance died
+    SCHEDULER_RUN_RETENTION_DAYS: int = 14  # scheduler_job_runs history kept (pruned daily)
+
+    # Nightly streak/penalty jobs (see app/services/gamification_jobs.py)
+    GAMIFICATION_JOB_BATCH_SIZE: int = 5000  # user_progress rows per batch/transaction
+
+    # Background job queue (see app/services/job_queue.py)
+    JOB_WORKERS_IN_PROCESS: int = 0  # Opt-in worker loops inside each API process (single-process/dev setups only)
+    JOB_WORKER_CONCURRENCY: int = 4  # Worker loops per dedicated worker process
+    JOB_LEASE_SECONDS: int = 120  # A running job not heartbeating for this long is retried by another worker
+    JOB_RETRY_BASE_SECONDS: int = 10
+    JOB_RETRY_MAX_SECONDS: int = 600
+
+    # Thread pools for blocking calls from async handlers (see app/services/blocking.py)
+    EXECUTOR_LLM_THREADS: int = 32  # Whisper / sync Anthropic calls (mostly waiting on the network)
+    EXECUTOR_S3_THREADS: int = 16
+
+    # Password hashing (see app/services/password_hashing.py) - changing these rehashes passwords on next login
+    # Hashing worker processes per API worker. Each concurrent hash holds ARGON2_MEMORY_COST, so peak
+    # hashing memory is roughly processes x API workers x ARGON2_MEMORY_COST - raise it only with headroom
+    PASSWORD_HASH_PROCESSES: int = 2
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+
+    # Event loop lag monitor (see app/services/loop_monitor.py)
+    LOOP_MONITOR_INTERVAL_MS: int = 100  # How often the loop is pinged
+    LOOP_BLOCKED_THRESHOLD_MS: int = 100  # Stalls longer than this are attributed to an endpoint; 0 = off
+
+    # Redis (optional) - fans room events out across workers; empty = in-process only
+    REDIS_URL: str = ""
+
     # OAuth
     TELEGRAM_BOT_TOKEN: str = ""
 
+    # Pooled Telegram client connections (see app/services/telegram_clients.py)
+    TELEGRAM_CLIENT_IDLE_SECONDS: int = 300  # Disconnect clients unused for this long
+    TELEGRAM_MAX_CLIENTS: int = 50  # Max connected clients per worker
+    TELEGRAM_DOWNLOAD_BATCH_SIZE: int = 1000  # Messages bulk-inserted per transaction
+
     # Cloudflare Turnstile
     TURNSTILE_SECRET_KEY: str = ""
 
@@ -31,8 +97,17 @@ class Settings(BaseSettings):
     RAILWAY_ENVIRONMENT_ID: str = ""
     RAILWAY_SERVICE_ID: str = ""
 
+    # Cached Telegram analyses (Gemini history analysis, Telegram import jobs) expire after this long; 0 = never
+    TELEGRAM_ANALYSIS_CACHE_TTL_HOURS: int = 0
+    # Telegram import jobs send histories up to this many (estimated) tokens to Claude whole; larger ones are
+    # summarized in chunks of ~this size first (see routes/rooms.py _telegram_conversation_text)
+    TELEGRAM_IMPORT_CHUNK_TOKEN_BUDGET: int = 20000
+    TELEGRAM_IMPORT_CHUNK_CONCURRENCY: int = 4  # Chunks summarized in parallel
+
     # Gemini
     GEMINI_API_KEY: str = ""
+    GEMINI_CHUNK_TOKEN_BUDGET: int = 150000  # Larger Telegram histories are analyzed in chunks of ~this many tokens
+    GEMINI_CHUNK_CONCURRENCY: int = 4  # Chunks analyzed in parallel
 
     # SendGrid
     SENDGRID_API_KEY: str = ""
@@ -41,6 +116,10 @@ class Settings(BaseSettings):
     AWS_ACCESS_KEY_ID: str = ""
     AWS_SECRET_ACCESS_KEY: str = ""
     AWS_S3_BUCKET: str = ""
+    S3_MAX_POOL_CONNECTIONS: int = 32  # Connections kept by the shared S3 client (see app/services/s3_service.py)
+    S3_MULTIPART_THRESHOLD_MB: int = 8  # Streamed uploads above this size use multipart
+    S3_MULTIPART_CHUNK_MB: int = 8
+    S3_MULTIPART_CONCURRENCY: int = 4  # Parts uploaded in parallel per file
 
     # Stripe Price IDs (Test Mode)
     STRIPE_PRICE_PLUS_MONTHLY: str = "price_1ST4GSIFSfYvttlAuK48AVkK"
@@ -85,4 +164,22 @@ class Settings(BaseSettings):
     def cors_list(self) -> List[str]:
         return [o.strip() for o in self.CORS_ORIGINS.split(",") if o.strip()]
 
+    @property
+    def llm_model_concurrency(self) -> Dict[str, int]:
+        limits = {}
+        for item in self.LLM_MODEL_CONCURRENCY.split(","):
+            if "=" in item:
+                model, limit = item.split("=", 1)
+                limits[model.strip()] = int(limit)
+        return limits
+
+    @property
+    def context_model_token_budgets(self) -> Dict[str, int]:
+        budgets = {}
+        for item in self.CONTEXT_MODEL_TOKEN_BUDGETS.split(","):
+            if "=" in item:
+                model, budget = item.split("=", 1)
+                budgets[model.strip()] = int(budget)
+        return budgets
+
 settings = Settings()
@@ -1,7 +1,13 @@
-from typing import Optional
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
 from fastapi import Depends, HTTPException, status, Request
 from jose import jwt, JWTError, ExpiredSignatureError
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 
 from app.config import settings
 from app.db import get_db
@@ -9,41 +15,233 @@ from app.models.user import User
 from app.models.subscription import Subscription
 from app.services.subscription_service import get_or_create_subscription, is_admin as check_is_admin
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    import logging
-    logger = logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+# ========================================
+# AUTH CACHE
+# ========================================
+# Per-worker: invalidate_user() only clears this process's cache, so other
+# workers can keep serving a changed or deleted user's snapshot for up to
+# AUTH_CACHE_TTL_SECONDS.
+# ORM updates/deletes of a User drop its entries when the session commits.
+# Bulk writes (query(User).update()/.delete(), raw SQL) bypass the ORM events -
+# call invalidate_user() after committing them.
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of the user fields most endpoints need (see get_current_user_snapshot)."""
+    id: int
+    email: str
+    name: Optional[str]
+    is_admin: int
+    is_guest: bool
+    profile_picture_url: Optional[str]
+    has_completed_screening: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            is_admin=user.is_admin,
+            is_guest=user.is_guest,
+            profile_picture_url=user.profile_picture_url,
+            has_completed_screening=user.has_completed_screening
+        )
+
+
+# token -> (expires_at, snapshot), least recently used first
+_token_cache: "OrderedDict[str, Tuple[float, UserSnapshot]]" = OrderedDict()
+_tokens_by_user: Dict[int, Set[str]] = {}
+# Bumped by every invalidate_user, so a lookup that overlapped one isn't cached
+_invalidations = 0
+_cache_lock = threading.Lock()
+
+# Session.info key for users whose cached auth is dropped when the session commits
+_PENDING_INVALIDATIONS = "auth_cache_users"
+
+
+def _cache_get(token: str) -> Optional[UserSnapshot]:
+    with _cache_lock:
+        entry = _token_cache.get(token)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at <= time.time():
+            _cache_drop(token)
+            return None
+        _token_cache.move_to_end(token)
+        return snapshot
+
+
+def _cache_put(token: str, token_exp: Optional[float], snapshot: UserSnapshot, invalidations: int):
+    expires_at = time.time() + settings.AUTH_CACHE_TTL_SECONDS
+    if token_exp:
+        # Never outlive the token itself
+        expires_at = min(expires_at, token_exp)
+    with _cache_lock:
+        if invalidations != _invalidations:
+            # The user was loaded before an invalidation finished - it may be stale
+            return
+        _token_cache[token] = (expires_at, snapshot)
+        _token_cache.move_to_end(token)
+        _tokens_by_user.setdefault(snapshot.id, set()).add(token)
+        while len(_token_cache) > settings.AUTH_CACHE_MAX_ENTRIES:
+            _cache_drop(next(iter(_token_cache)))
 
-    auth = request.headers.get("Authorization")
-    logger.info(f"🔐 Auth header present: {bool(auth)}, Path: {request.url.path}")
 
+def _cache_drop(token: str):
+    """Remove a token from the cache (caller holds _cache_lock)."""
+    entry = _token_cache.pop(token, None)
+    if entry is not None:
+        user_tokens = _tokens_by_user.get(entry[1].id)
+        if user_tokens is not None:
+            user_tokens.discard(token)
+            if not user_tokens:
+                _tokens_by_user.pop(entry[1].id, None)
+
+
+def invalidate_user(user_id: Optional[int] = None):
+    """
+    Drop cached auth for a user (or everyone when user_id is None) in this worker.
+    Called automatically when a session that updated or deleted a User through the ORM
+    commits; call it directly after committing bulk query().update()/.delete() or raw
+    SQL writes to the users table, which skip the ORM events.
+    """
+    global _invalidations
+    with _cache_lock:
+        _invalidations += 1
+        if user_id is None:
+            _token_cache.clear()
+            _tokens_by_user.clear()
+            return
+        for token in list(_tokens_by_user.get(user_id, ())):
+            _cache_drop(token)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_user_change(mapper, connection, target):
+    # Covers profile edits, password resets/changes and account deletion. These fire at
+    # flush, before commit - invalidating now would let a concurrent request re-cache the
+    # old row, so wait for the commit
+    session = object_session(target)
+    if session is None:
+        invalidate_user(target.id)
+        return
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_rolled_back_users(session, transaction):
+    # Changes rolled back with the outermost transaction never happened (a commit already popped them)
+    if transaction.parent is None:
+        session.info.pop(_PENDING_INVALIDATIONS, None)
+
+
+def _bearer_token(request: Request) -> Optional[str]:
+    auth = request.headers.get("Authorization")
     if not auth or not auth.lower().startswith("bearer "):
-        logger.warning(f"❌ No valid auth header on {request.url.path}")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+        return None
+    return auth.split(" ", 1)[1].strip()
 
-    token = auth.split(" ", 1)[1].strip()
-    logger.info(f"🎫 Token (first 20 chars): {token[:20]}...")
 
+def _decode_token(token: str) -> Tuple[int, Optional[float]]:
+    """(user_id, exp) for a valid token. Raises 401 HTTPException otherwise."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id = int(payload.get("sub"))
-        logger.info(f"✅ Token decoded successfully, user_id: {user_id}")
-    except ExpiredSignatureError as e:
+        return int(payload.get("sub")), payload.get("exp")
+    except ExpiredSignatureError:
         # Handle expired tokens explicitly
-        logger.error(f"❌ Token expired on {request.url.path}: {str(e)}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired. Please log in again.")
     except (JWTError, ValueError, TypeError) as e:
-        logger.error(f"❌ Token decode failed on {request.url.path}: {type(e).__name__}: {str(e)}")
+        logger.warning(f"❌ Token decode failed: {type(e).__name__}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+
+def _authenticate(token: str, db: Session) -> Tuple[UserSnapshot, Optional[User]]:
+    """
+    Resolve a token via the cache, falling back to decode + user lookup.
+    Returns (snapshot, user) - user is only loaded on a cache miss.
+    """
+    snapshot = _cache_get(token)
+    if snapshot is not None:
+        return snapshot, None
+
+    user_id, token_exp = _decode_token(token)
+    with _cache_lock:
+        invalidations = _invalidations
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
-        logger.error(f"❌ User {user_id} not found in database")
+        logger.warning(f"❌ User {user_id} not found in database")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
-    logger.info(f"✅ User authenticated: {user.email}")
+    snapshot = UserSnapshot.from_user(user)
+    _cache_put(token, token_exp, snapshot, invalidations)
+    return snapshot, user
+
+
+# ========================================
+# DEPENDENCIES
+# ========================================
+
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+    """
+    The session-bound User for the request's bearer token.
+    A cache hit only skips the JWT decode - the user is still loaded by primary key
+    (one SELECT per request), so it is never stale. Read-only endpoints that don't
+    need the ORM object should use get_current_user_snapshot.
+    """
+    token = _bearer_token(request)
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    snapshot, user = _authenticate(token, db)
+    if user is None:
+        # Cache hit skips the JWT decode; loading the session-bound User is still a SELECT
+        user = db.get(User, snapshot.id)
+        if not user:
+            invalidate_user(snapshot.id)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
+def get_current_user_snapshot(request: Request, db: Session = Depends(get_db)) -> UserSnapshot:
+    """
+    Cheap auth for read-only endpoints: returns a cached UserSnapshot without touching
+    the database on a cache hit. The snapshot is not bound to the session - compare by
+    id (e.g. `user.id in {p.id for p in room.participants}`) and never modify it.
+    It can lag a profile change or deletion made through another worker by up to
+    AUTH_CACHE_TTL_SECONDS.
+    """
+    token = _bearer_token(request)
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    snapshot, _ = _authenticate(token, db)
+    return snapshot
+
+
+def get_user_from_token(token: str, db: Session) -> Optional[User]:
+    """
+    Resolve a bearer token to its user, or None if invalid/expired.
+    For connections that can't send an Authorization header (WebSockets).
+    """
+    try:
+        snapshot, user = _authenticate(token, db)
+    except HTTPException:
+        return None
+    return user or db.get(User, snapshot.id)
+
+
 def get_current_subscription(
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -57,30 +255,15 @@ def get_current_user_optional(request: Request, db: Session = Depends(get_db)) -
     Optional authentication - returns User if authenticated, None if not.
     Use this for endpoints that support both authenticated and guest access.
     """
-    import logging
-    logger = logging.getLogger(__name__)
-
-    auth = request.headers.get("Authorization")
-
-    if not auth or not auth.lower().startswith("bearer "):
-        logger.info(f"👤 No auth header, treating as guest on {request.url.path}")
+    token = _bearer_token(request)
+    if not token:
         return None
 
-    token = auth.split(" ", 1)[1].strip()
-
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id = int(payload.get("sub"))
-        user = db.query(User).filter(User.id == user_id).first()
-        if user:
-            logger.info(f"✅ Authenticated user: {user.email}")
-            return user
-        else:
-            logger.warning(f"❌ Token valid but user {user_id} not found")
-            return None
-    except Exception as e:
-        logger.warning(f"⚠️ Token decode failed, treating as guest: {type(e).__name__}")
+        snapshot, user = _authenticate(token, db)
+    except HTTPException:
         return None
+    return user or db.get(User, snapshot.id)
 
 
 def require_admin(
@@ -222,7 +222,7 @@ async def error_logging_middleware(request: Request, call_next):
         )
 
 
-from app.routes import auth, users, rooms, admin, subscriptions, screening, telegram, gamification
+from app.routes import auth, users, rooms, admin, subscriptions, screening, telegram, gamification, jobs
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(rooms.router)
@@ -231,21 +231,34 @@ app.include_router(subscriptions.router)
 app.include_router(screening.router)
 app.include_router(telegram.router, prefix="/telegram", tags=["telegram"])
 app.include_router(gamification.router)
+app.include_router(jobs.router)
 
 # Start background scheduler for gamification jobs
 from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services import blocking, job_queue, llm_gateway, loop_monitor, password_hashing, room_events, telegram_clients
 
 @app.on_event("startup")
 async def startup_event():
     """Start background scheduler on app startup."""
+    loop_monitor.start()
     start_scheduler()
     logger.info("🎮 Gamification scheduler started")
+    await room_events.start()
+    await telegram_clients.start()
+    await job_queue.start(settings.JOB_WORKERS_IN_PROCESS)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Stop background scheduler on app shutdown."""
     stop_scheduler()
     logger.info("🎮 Gamification scheduler stopped")
+    await job_queue.stop()
+    await llm_gateway.close()
+    await room_events.stop()
+    await telegram_clients.stop()
+    loop_monitor.stop()
+    blocking.shutdown()
+    password_hashing.shutdown()
 
 @app.get("/health")
 def health():
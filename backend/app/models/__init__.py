@@ -1,11 +1,16 @@
 from .user import User
 from .room import Room, Turn, room_participants
-from .subscription import Subscription, SubscriptionTier, SubscriptionStatus, ApiCost
+from .subscription import Subscription, SubscriptionTier, SubscriptionStatus, ApiCost, CostRollup
 from .health_screening import UserHealthProfile, SessionScreening
 from .telegram import TelegramSession, TelegramDownload, TelegramMessage
 from .announcement import Announcement
+from .analytics import DailyMetric
+from .job import Job
+from .analysis_cache import AnalysisCacheEntry
+from .scheduler import SchedulerLock, SchedulerJobRun
 from .gamification import (
     UserProgress,
+    UserCounter,
     ScoreEvent,
     GratitudeEntry,
     BreathingSession,
@@ -26,14 +31,21 @@ __all__ = [
     'SubscriptionTier',
     'SubscriptionStatus',
     'ApiCost',
+    'CostRollup',
     'UserHealthProfile',
     'SessionScreening',
     'TelegramSession',
     'TelegramDownload',
     'TelegramMessage',
     'Announcement',
+    'DailyMetric',
+    'Job',
+    'AnalysisCacheEntry',
+    'SchedulerLock',
+    'SchedulerJobRun',
     # Gamification
     'UserProgress',
+    'UserCounter',
     'ScoreEvent',
     'GratitudeEntry',
     'BreathingSession',
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, func
+from ..db import Base
+
+class AnalysisCacheEntry(Base):
+    """
+    Content-addressed cache of AI analysis results (see services/analysis_cache.py).
+
+    cache_key is a SHA-256 of everything that determines the result (normalized
+    input, names, prompt version, model), so identical inputs share one entry.
+    """
+    __tablename__ = "analysis_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True)
+    kind = Column(String(50), nullable=False)  # e.g. "telegram_history"
+    result = Column(JSON, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)  # None = never expires
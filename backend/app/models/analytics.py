@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, UniqueConstraint, func
+from ..db import Base
+
+class DailyMetric(Base):
+    """
+    Precomputed daily analytics for /admin/analytics (maintained by services/analytics_snapshots.py).
+
+    metric is e.g. "signups", "completions", "turns"; dimension splits a metric
+    (tier name, room phase, user id for "active_user") and is "" when unused.
+    """
+    __tablename__ = "daily_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False, index=True)
+    metric = Column(String(50), nullable=False)
+    dimension = Column(String(100), nullable=False, default="")
+    value = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("date", "metric", "dimension", name="uq_daily_metrics_date_metric_dimension"),
+    )
@@ -34,6 +34,17 @@ class UserProgress(Base):
     user = relationship('User', backref='gamification_progress')
 
 
+class UserCounter(Base):
+    """Running per-user totals that count achievements depend on (see services/achievement_checker.py)."""
+    __tablename__ = 'user_counters'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    counter = Column(String(50), primary_key=True)  # 'messages', 'resolutions', 'gratitude_entries', ...
+    value = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
 class ScoreEvent(Base):
     """History of score changes for transparency and debugging."""
     __tablename__ = 'score_events'
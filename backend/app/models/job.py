@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Index, func
+from ..db import Base
+
+class Job(Base):
+    """
+    Durable background job (see services/job_queue.py).
+
+    status: queued -> running -> succeeded | failed (retries go back to queued
+    with run_after pushed out). Higher priority runs first.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="queued")
+    priority = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, server_default=func.now())
+    idempotency_key = Column(String(255), nullable=True, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_priority_run_after", "status", "priority", "run_after"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Date, Numeric, Column, Integer, String, DateTime, Text, ForeignKey, Table, ARRAY, JSON, Boolean
+from sqlalchemy import Date, Numeric, Column, Integer, String, DateTime, Text, ForeignKey, Table, ARRAY, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -77,6 +77,10 @@ class Room(Base):
     user1_last_seen_main_room = Column(DateTime(timezone=True), nullable=True)
     user2_last_seen_main_room = Column(DateTime(timezone=True), nullable=True)
 
+    # Rolling summaries of turns folded out of the context window (see services/context_window.py)
+    # {"main": {"summary": str, "through_turn_id": int}, "coaching:<user_id>": {...}}
+    context_summaries = Column(JSON, nullable=True)
+
     # Relationships
     participants = relationship('User', secondary=room_participants, back_populates='rooms')
     turns = relationship('Turn', back_populates='room', cascade='all, delete-orphan')
@@ -91,7 +95,7 @@ class Turn(Base):
     kind = Column(String, nullable=False)  # intake, ai_question, user_response, resolution
     summary = Column(Text, nullable=True)
     tags = Column(JSON, default=list)  # Changed from ARRAY to JSON for SQLite compatibility
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Context tracks pre-mediation vs main room
     context = Column(String, nullable=False, default='main')  # pre_mediation, main
@@ -115,3 +119,8 @@ class Turn(Base):
     room = relationship('Room', back_populates='turns')
     user = relationship('User', foreign_keys=[user_id])
     addressed_user = relationship('User', foreign_keys=[addressed_user_id])
+
+    __table_args__ = (
+        # One turn per uploaded file, so a retried upload confirmation can't post it twice
+        Index('uq_turns_room_attachment_url', 'room_id', 'attachment_url', unique=True),
+    )
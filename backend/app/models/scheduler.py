@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from ..db import Base
+
+class SchedulerLock(Base):
+    """
+    Per-job lease so only one app instance runs each scheduled job
+    (see services/scheduler.py). An instance runs a job only if it can take
+    the lease and the job hasn't already started within its min gap.
+    """
+    __tablename__ = "scheduler_locks"
+
+    job_id = Column(String(100), primary_key=True)
+    locked_by = Column(String(100), nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    last_started_at = Column(DateTime, nullable=True)
+
+
+class SchedulerJobRun(Base):
+    """History of scheduled job runs. status: running -> succeeded | failed"""
+    __tablename__ = "scheduler_job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(100), nullable=False)
+    instance = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default="running")
+    rows_affected = Column(Integer, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_scheduler_job_runs_job_id_started_at", "job_id", "started_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -65,6 +65,8 @@ class ApiCost(Base):
     # Token/usage tracking
     input_tokens = Column(Integer, default=0)
     output_tokens = Column(Integer, default=0)
+    cache_read_tokens = Column(Integer, default=0)  # Anthropic prompt-cache hits
+    cache_write_tokens = Column(Integer, default=0)  # Anthropic prompt-cache writes
     audio_seconds = Column(Numeric(10, 2), default=0.0)  # For Whisper/TTS
 
     # Cost
@@ -78,3 +80,37 @@ class ApiCost(Base):
     user = relationship('User')
     room = relationship('Room')
     turn = relationship('Turn')
+
+
+class CostRollup(Base):
+    """
+    Pre-aggregated AI costs for the admin dashboards (maintained by services/cost_rollups.py).
+
+    One row per bucket and (service_type, context, model, user, room). source is
+    'api_costs' (every tracked API call) or 'turns' (per-turn costs used by /rooms/admin/costs).
+    No foreign keys - rollups keep historical spend after users/rooms are deleted.
+    """
+    __tablename__ = 'cost_rollups'
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(20), nullable=False)  # 'api_costs' or 'turns'
+    granularity = Column(String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = Column(DateTime, nullable=False)  # UTC, start of the hour/day
+
+    service_type = Column(String(50), nullable=True)
+    context = Column(String(50), nullable=True)  # Turn context (pre_mediation, main, solo) for 'turns'
+    model = Column(String(100), nullable=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    room_id = Column(Integer, nullable=True, index=True)
+
+    call_count = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    cache_read_tokens = Column(Integer, nullable=False, default=0)
+    cache_write_tokens = Column(Integer, nullable=False, default=0)
+    audio_seconds = Column(Numeric(12, 2), nullable=False, default=0)
+    cost_usd = Column(Numeric(14, 6), nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_cost_rollups_bucket', 'source', 'granularity', 'bucket_start'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, Text, Numeric, ForeignKey, func, Index
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger, Text, Numeric, ForeignKey, func, Index, JSON
 from sqlalchemy.orm import relationship
 from ..db import Base
 
@@ -15,6 +15,7 @@ class TelegramSession(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     last_used_at = Column(DateTime(timezone=True), nullable=True)
+    entity_cache = Column(JSON, nullable=True)  # [[peer_id, access_hash], ...] restored into pooled clients
 
     # Relationships
     user = relationship("User", back_populates="telegram_session")
@@ -35,10 +36,13 @@ class TelegramDownload(Base):
     end_date = Column(DateTime(timezone=True), nullable=False)  # Filter messages until this date
     message_count = Column(Integer, server_default="0")  # Total messages downloaded
     media_count = Column(Integer, server_default="0")  # Total media files found
-    status = Column(String(50), server_default="pending")  # pending, processing, completed, failed
+    status = Column(String(50), server_default="pending")  # pending, processing, retrying, completed, failed
     error_message = Column(Text, nullable=True)  # Error details if failed
     transcript_url = Column(Text, nullable=True)  # S3 URL to formatted transcript
     gemini_corpus_id = Column(String(500), nullable=True)  # Gemini File Search corpus ID for persistent storage
+    analysis_status = Column(String(50), nullable=True)  # analyzing, completed, failed (None = not analyzed)
+    analysis_chunks_total = Column(Integer, server_default="0")  # Chunks the history was split into for analysis
+    analysis_chunks_done = Column(Integer, server_default="0")  # Chunks analyzed so far
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     api_cost_usd = Column(Numeric(10, 6), server_default="0.00")  # Track API costs if AI analysis applied
@@ -18,11 +18,13 @@ import json
 
 from ..models.user import User
 from ..models.room import Room, Turn
-from ..models.subscription import Subscription, SubscriptionTier, SubscriptionStatus, ApiCost
-from ..security import hash_password, verify_password, create_access_token
+from ..models.subscription import Subscription, SubscriptionTier, SubscriptionStatus, ApiCost, CostRollup
+from ..models.scheduler import SchedulerLock, SchedulerJobRun
+from ..security import hash_password, create_access_token
 from ..db import get_db
 from ..config import settings
 from ..deps import get_current_user
+from ..services import analytics_snapshots, conversation_cache, password_hashing
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -126,12 +128,20 @@ def admin_login(payload: AdminLoginIn, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not user.hashed_password or not verify_password(payload.password, user.hashed_password):
+    if not user.hashed_password:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = password_hashing.verify_password_sync(payload.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     if not getattr(user, 'is_admin', False):
         raise HTTPException(status_code=403, detail="Admin access required")
 
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+
     token = create_access_token({"sub": str(user.id)}, settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return AdminTokenOut(access_token=token, is_admin=True)
 
@@ -218,6 +228,11 @@ def update_user(
     return {"status": "success", "user_id": user_id}
 
 
+def _turn_room_ids(db: Session, user_ids: List[int]) -> List[int]:
+    """Rooms containing turns by these users."""
+    return [row[0] for row in db.query(Turn.room_id).filter(Turn.user_id.in_(user_ids)).distinct().all()]
+
+
 @router.delete("/users/{user_id}")
 def delete_user(
     user_id: int,
@@ -237,12 +252,28 @@ def delete_user(
 
     user_email = user.email
 
+    # The user's recordings, attachments and profile picture, removed from S3 after the commit
+    from app.services.s3_service import delete_objects_from_s3
+    file_urls = [
+        url
+        for row in db.query(Turn.audio_url, Turn.attachment_url).filter(Turn.user_id == user_id).all()
+        for url in row if url
+    ]
+    if user.profile_picture_url:
+        file_urls.append(user.profile_picture_url)
+
+    # Rooms whose cached conversation included this user's turns
+    room_ids = _turn_room_ids(db, [user_id])
+
     from sqlalchemy import text
     db.execute(text(f"DELETE FROM turns WHERE user_id = {user_id}"))
     db.execute(text(f"DELETE FROM room_participants WHERE user_id = {user_id}"))
     db.execute(text(f"DELETE FROM subscriptions WHERE user_id = {user_id}"))
     db.delete(user)
     db.commit()
+    for room_id in room_ids:
+        conversation_cache.invalidate(room_id)
+    delete_objects_from_s3(file_urls)
 
     log_audit(
         admin_email=current_user.email,
@@ -514,6 +545,13 @@ def delete_room(
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
+    from app.services.s3_service import delete_objects_from_s3
+    file_urls = [
+        url
+        for row in db.query(Turn.audio_url, Turn.attachment_url).filter(Turn.room_id == room_id).all()
+        for url in row if url
+    ]
+
     # Delete turns first
     db.query(Turn).filter(Turn.room_id == room_id).delete()
     # Clear participants
@@ -521,6 +559,9 @@ def delete_room(
     # Delete room
     db.delete(room)
     db.commit()
+    delete_objects_from_s3(file_urls)
+
+    conversation_cache.invalidate(room_id)
 
     return {"status": "success", "deleted_room_id": room_id}
 
@@ -732,59 +773,29 @@ def get_analytics(
         end_dt = datetime.utcnow()
         start_dt = end_dt - timedelta(days=days)
 
-    cutoff = start_dt
-
-    # User signups over time
-    signups = db.execute(text("""
-        SELECT DATE(created_at) as date, COUNT(*) as count
-        FROM users
-        WHERE created_at >= :start_dt AND created_at <= :end_dt
-        GROUP BY DATE(created_at)
-        ORDER BY date
-    """), {"start_dt": start_dt, "end_dt": end_dt}).fetchall()
-
-    # Room completions over time
-    completions = db.execute(text("""
-        SELECT DATE(resolved_at) as date, COUNT(*) as count
-        FROM rooms
-        WHERE resolved_at >= :start_dt AND resolved_at <= :end_dt AND phase = 'resolved'
-        GROUP BY DATE(resolved_at)
-        ORDER BY date
-    """), {"start_dt": start_dt, "end_dt": end_dt}).fetchall()
+    # Served from the precomputed daily buckets - the scheduler keeps today's current
+    start_day, end_day = start_dt.date(), end_dt.date()
+    today = datetime.utcnow().date()
+
+    signups = analytics_snapshots.metric_by_day(db, "signups", start_day, end_day)
+    completions = analytics_snapshots.metric_by_day(db, "completions", start_day, end_day)
 
     # Subscription breakdown
-    tier_breakdown = db.execute(text("""
-        SELECT tier, COUNT(*) as count
-        FROM subscriptions
-        GROUP BY tier
-    """)).fetchall()
-
-    # Active users (users with activity in last 7 days)
-    active_users = db.execute(text("""
-        SELECT COUNT(DISTINCT user_id)
-        FROM turns
-        WHERE created_at >= :cutoff
-    """), {"cutoff": datetime.utcnow() - timedelta(days=7)}).scalar()
+    tier_breakdown = analytics_snapshots.latest_breakdown(db, "tier")
+
+    # Active users (users with activity in the last 7 days, today included)
+    active_users = analytics_snapshots.distinct_dimensions(db, "active_user", today - timedelta(days=6), today)
 
     # Rooms by phase
-    rooms_by_phase = db.execute(text("""
-        SELECT phase, COUNT(*) as count
-        FROM rooms
-        GROUP BY phase
-    """)).fetchall()
+    rooms_by_phase = analytics_snapshots.latest_breakdown(db, "room_phase")
 
     # Average turns per room
-    avg_turns = db.execute(text("""
-        SELECT AVG(turn_count) FROM (
-            SELECT room_id, COUNT(*) as turn_count
-            FROM turns
-            GROUP BY room_id
-        ) t
-    """)).scalar() or 0
+    rooms_with_turns = analytics_snapshots.metric_total(db, "first_turn_rooms")
+    avg_turns = analytics_snapshots.metric_total(db, "turns") / rooms_with_turns if rooms_with_turns else 0
 
     return {
-        "signups_over_time": [{"date": str(r[0]), "count": r[1]} for r in signups],
-        "completions_over_time": [{"date": str(r[0]), "count": r[1]} for r in completions],
+        "signups_over_time": signups,
+        "completions_over_time": completions,
         "tier_breakdown": [{"tier": r[0], "count": r[1]} for r in tier_breakdown],
         "active_users_7d": active_users,
         "rooms_by_phase": [{"phase": r[0], "count": r[1]} for r in rooms_by_phase],
@@ -800,92 +811,94 @@ def get_analytics(
 # AI COST TRACKING
 # ========================================
 
+def _api_cost_rollups(db: Session, granularity: str = "day", since: Optional[datetime] = None):
+    """Query over the api_costs rollups (see services/cost_rollups.py)."""
+    query = db.query(CostRollup).filter(
+        CostRollup.source == "api_costs",
+        CostRollup.granularity == granularity
+    )
+    if since is not None:
+        query = query.filter(CostRollup.bucket_start >= since)
+    return query
+
+
 @router.get("/ai-costs")
 def get_ai_costs(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
-    days: int = 30
+    days: int = 30,
+    granularity: str = "day"
 ):
-    """Get AI API cost analytics"""
+    """
+    Get AI API cost analytics (read from the cost rollups, refreshed every few minutes).
+    granularity=hour returns the time series per hour instead of per day.
+    """
     check_admin(current_user)
 
-    cutoff = datetime.utcnow() - timedelta(days=days)
+    if granularity not in ("day", "hour"):
+        raise HTTPException(status_code=400, detail="granularity must be 'day' or 'hour'")
+
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    # Whole days - daily buckets start at midnight UTC
+    cutoff = today_start - timedelta(days=days)
+    rollups = _api_cost_rollups(db, since=cutoff).subquery()
 
     # Total costs by service type
-    costs_by_service = db.execute(text("""
-        SELECT service_type,
-               SUM(cost_usd) as total_cost,
-               SUM(input_tokens) as total_input_tokens,
-               SUM(output_tokens) as total_output_tokens,
-               COUNT(*) as call_count
-        FROM api_costs
-        WHERE created_at >= :cutoff
-        GROUP BY service_type
-        ORDER BY total_cost DESC
-    """), {"cutoff": cutoff}).fetchall()
-
-    # Daily costs over time
-    daily_costs = db.execute(text("""
-        SELECT DATE(created_at) as date,
-               service_type,
-               SUM(cost_usd) as total_cost
-        FROM api_costs
-        WHERE created_at >= :cutoff
-        GROUP BY DATE(created_at), service_type
-        ORDER BY date
-    """), {"cutoff": cutoff}).fetchall()
+    costs_by_service = db.query(
+        rollups.c.service_type,
+        func.sum(rollups.c.cost_usd),
+        func.sum(rollups.c.input_tokens),
+        func.sum(rollups.c.output_tokens),
+        func.sum(rollups.c.call_count)
+    ).group_by(rollups.c.service_type).order_by(func.sum(rollups.c.cost_usd).desc()).all()
+
+    # Costs over time
+    series = _api_cost_rollups(db, granularity, since=cutoff).subquery()
+    daily_costs = db.query(
+        series.c.bucket_start,
+        series.c.service_type,
+        func.sum(series.c.cost_usd)
+    ).group_by(series.c.bucket_start, series.c.service_type).order_by(series.c.bucket_start).all()
 
     # Top users by cost
-    top_users = db.execute(text("""
-        SELECT ac.user_id, u.email, u.name,
-               SUM(ac.cost_usd) as total_cost,
-               COUNT(*) as call_count
-        FROM api_costs ac
-        JOIN users u ON ac.user_id = u.id
-        WHERE ac.created_at >= :cutoff
-        GROUP BY ac.user_id, u.email, u.name
-        ORDER BY total_cost DESC
-        LIMIT 10
-    """), {"cutoff": cutoff}).fetchall()
+    top_users = db.query(
+        rollups.c.user_id,
+        User.email,
+        User.name,
+        func.sum(rollups.c.cost_usd),
+        func.sum(rollups.c.call_count)
+    ).join(User, User.id == rollups.c.user_id).group_by(
+        rollups.c.user_id, User.email, User.name
+    ).order_by(func.sum(rollups.c.cost_usd).desc()).limit(10).all()
 
     # Costs by model
-    costs_by_model = db.execute(text("""
-        SELECT model,
-               SUM(cost_usd) as total_cost,
-               COUNT(*) as call_count
-        FROM api_costs
-        WHERE created_at >= :cutoff AND model IS NOT NULL
-        GROUP BY model
-        ORDER BY total_cost DESC
-    """), {"cutoff": cutoff}).fetchall()
+    costs_by_model = db.query(
+        rollups.c.model,
+        func.sum(rollups.c.cost_usd),
+        func.sum(rollups.c.call_count)
+    ).filter(rollups.c.model.isnot(None)).group_by(rollups.c.model).order_by(
+        func.sum(rollups.c.cost_usd).desc()
+    ).all()
 
     # Total cost
-    total_cost = db.execute(text("""
-        SELECT SUM(cost_usd) as total
-        FROM api_costs
-        WHERE created_at >= :cutoff
-    """), {"cutoff": cutoff}).scalar() or 0
+    total_cost = sum(float(row[1] or 0) for row in costs_by_service)
 
     # Today's cost
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_cost = db.execute(text("""
-        SELECT SUM(cost_usd) as total
-        FROM api_costs
-        WHERE created_at >= :today
-    """), {"today": today_start}).scalar() or 0
+    today_cost = _api_cost_rollups(db, since=today_start).with_entities(
+        func.sum(CostRollup.cost_usd)
+    ).scalar() or 0
 
     # This month's cost
-    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    month_cost = db.execute(text("""
-        SELECT SUM(cost_usd) as total
-        FROM api_costs
-        WHERE created_at >= :month_start
-    """), {"month_start": month_start}).scalar() or 0
-
-    # Format daily costs for charts
+    month_start = today_start.replace(day=1)
+    month_cost = _api_cost_rollups(db, since=month_start).with_entities(
+        func.sum(CostRollup.cost_usd)
+    ).scalar() or 0
+
+    # Format costs over time for charts
     daily_costs_formatted = {}
     for row in daily_costs:
-        date_str = str(row[0])
+        date_str = str(row[0].date()) if granularity == "day" else row[0].isoformat()
         if date_str not in daily_costs_formatted:
             daily_costs_formatted[date_str] = {}
         daily_costs_formatted[date_str][row[1]] = float(row[2])
@@ -941,23 +954,26 @@ def get_ai_cost_details(
     """Get detailed AI cost records"""
     check_admin(current_user)
 
-    query = db.query(ApiCost)
+    query = db.query(ApiCost, User.email).outerjoin(User, User.id == ApiCost.user_id)
+    # Total comes from the rollups instead of COUNT(*) over api_costs
+    total_query = _api_cost_rollups(db)
 
     if service_type:
         query = query.filter(ApiCost.service_type == service_type)
+        total_query = total_query.filter(CostRollup.service_type == service_type)
     if user_id:
         query = query.filter(ApiCost.user_id == user_id)
+        total_query = total_query.filter(CostRollup.user_id == user_id)
 
-    total = query.count()
+    total = total_query.with_entities(func.sum(CostRollup.call_count)).scalar() or 0
     costs = query.order_by(ApiCost.created_at.desc()).offset(skip).limit(limit).all()
 
     result = []
-    for cost in costs:
-        user = db.query(User).filter(User.id == cost.user_id).first()
+    for cost, user_email in costs:
         result.append({
             "id": cost.id,
             "user_id": cost.user_id,
-            "user_email": user.email if user else "Unknown",
+            "user_email": user_email or "Unknown",
             "room_id": cost.room_id,
             "service_type": cost.service_type,
             "model": cost.model,
@@ -968,50 +984,91 @@ def get_ai_cost_details(
             "created_at": str(cost.created_at) if cost.created_at else None,
         })
 
-    return {"costs": result, "total": total, "skip": skip, "limit": limit}
+    return {"costs": result, "total": int(total), "skip": skip, "limit": limit}
+
+
+def _csv_row(values: list) -> str:
+    output = io.StringIO()
+    csv.writer(output).writerow(values)
+    return output.getvalue()
 
 
 @router.get("/ai-costs/export")
 def export_ai_costs_csv(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
-    days: int = 30
+    days: int = 30,
+    granularity: Optional[str] = None
 ):
-    """Export AI costs to CSV"""
+    """
+    Export AI costs to CSV.
+    Default is one row per API call (streamed); granularity=day|hour exports the rollups instead.
+    """
     check_admin(current_user)
 
     cutoff = datetime.utcnow() - timedelta(days=days)
-    costs = db.query(ApiCost).filter(ApiCost.created_at >= cutoff).order_by(ApiCost.created_at.desc()).all()
 
-    output = io.StringIO()
-    writer = csv.writer(output)
+    if granularity:
+        if granularity not in ("day", "hour"):
+            raise HTTPException(status_code=400, detail="granularity must be 'day' or 'hour'")
+
+        rollups = _api_cost_rollups(db, granularity, since=cutoff).order_by(CostRollup.bucket_start.desc())
+
+        def rollup_rows():
+            yield _csv_row([
+                "Bucket Start", "User ID", "Room ID", "Service Type", "Model", "Calls",
+                "Input Tokens", "Output Tokens", "Cache Read Tokens", "Cache Write Tokens",
+                "Audio Seconds", "Cost USD"
+            ])
+            for rollup in rollups.yield_per(1000):
+                yield _csv_row([
+                    rollup.bucket_start.isoformat(),
+                    rollup.user_id or "",
+                    rollup.room_id or "",
+                    rollup.service_type,
+                    rollup.model or "",
+                    rollup.call_count,
+                    rollup.input_tokens,
+                    rollup.output_tokens,
+                    rollup.cache_read_tokens,
+                    rollup.cache_write_tokens,
+                    float(rollup.audio_seconds or 0),
+                    round(float(rollup.cost_usd), 6),
+                ])
+
+        return StreamingResponse(
+            rollup_rows(),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=ai_costs_{granularity}_{days}d.csv"}
+        )
 
-    # Header
-    writer.writerow([
-        "ID", "User ID", "User Email", "Room ID", "Service Type", "Model",
-        "Input Tokens", "Output Tokens", "Audio Seconds", "Cost USD", "Created At"
-    ])
+    costs = db.query(ApiCost, User.email).outerjoin(User, User.id == ApiCost.user_id).filter(
+        ApiCost.created_at >= cutoff
+    ).order_by(ApiCost.created_at.desc())
 
-    for cost in costs:
-        user = db.query(User).filter(User.id == cost.user_id).first()
-        writer.writerow([
-            cost.id,
-            cost.user_id,
-            user.email if user else "",
-            cost.room_id or "",
-            cost.service_type,
-            cost.model or "",
-            cost.input_tokens,
-            cost.output_tokens,
-            float(cost.audio_seconds) if cost.audio_seconds else 0,
-            round(float(cost.cost_usd), 6),
-            str(cost.created_at) if cost.created_at else "",
+    def cost_rows():
+        # Header
+        yield _csv_row([
+            "ID", "User ID", "User Email", "Room ID", "Service Type", "Model",
+            "Input Tokens", "Output Tokens", "Audio Seconds", "Cost USD", "Created At"
         ])
-
-    output.seek(0)
+        for cost, user_email in costs.yield_per(1000):
+            yield _csv_row([
+                cost.id,
+                cost.user_id,
+                user_email or "",
+                cost.room_id or "",
+                cost.service_type,
+                cost.model or "",
+                cost.input_tokens,
+                cost.output_tokens,
+                float(cost.audio_seconds) if cost.audio_seconds else 0,
+                round(float(cost.cost_usd), 6),
+                str(cost.created_at) if cost.created_at else "",
+            ])
 
     return StreamingResponse(
-        iter([output.getvalue()]),
+        cost_rows(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=ai_costs_export_{days}d.csv"}
     )
@@ -1090,6 +1147,7 @@ def bulk_delete_users(
 
     deleted = 0
     deleted_emails = []
+    room_ids = _turn_room_ids(db, user_ids)
     for user_id in user_ids:
         user = db.query(User).filter(User.id == user_id).first()
         if user:
@@ -1101,6 +1159,8 @@ def bulk_delete_users(
             deleted += 1
 
     db.commit()
+    for room_id in room_ids:
+        conversation_cache.invalidate(room_id)
 
     log_audit(
         admin_email=current_user.email,
@@ -1146,6 +1206,78 @@ def get_activity_logs(
     return {"logs": result}
 
 
+# ========================================
+# SCHEDULED JOBS
+# ========================================
+
+@router.get("/scheduler/runs")
+def get_scheduler_runs(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    job_id: Optional[str] = None,
+    limit: int = 100
+):
+    """Recent scheduled job runs (newest first) and which instance holds each job's lease"""
+    check_admin(current_user)
+
+    query = db.query(SchedulerJobRun)
+    if job_id:
+        query = query.filter(SchedulerJobRun.job_id == job_id)
+    runs = query.order_by(SchedulerJobRun.started_at.desc()).limit(min(limit, 1000)).all()
+
+    now = datetime.utcnow()
+    locks = db.query(SchedulerLock).all()
+
+    return {
+        "mode": settings.SCHEDULER_MODE,
+        "runs": [
+            {
+                "id": run.id,
+                "job_id": run.job_id,
+                "instance": run.instance,
+                "status": run.status,
+                "rows_affected": run.rows_affected,
+                "duration_ms": run.duration_ms,
+                "error": run.error,
+                "started_at": run.started_at.isoformat() if run.started_at else None,
+                "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+            }
+            for run in runs
+        ],
+        "leases": [
+            {
+                "job_id": lock.job_id,
+                "locked_by": lock.locked_by if lock.locked_until and lock.locked_until > now else None,
+                "last_started_at": lock.last_started_at.isoformat() if lock.last_started_at else None,
+            }
+            for lock in locks
+        ]
+    }
+
+
+@router.get("/event-loop")
+def get_event_loop_stats(current_user: User = Depends(get_current_user), reset: bool = False):
+    """Event loop stalls per endpoint and blocking-call pool usage for this worker"""
+    check_admin(current_user)
+
+    from app.services import blocking, loop_monitor
+
+    stats = loop_monitor.stats()
+    if reset:
+        loop_monitor.reset()
+    return {**stats, "pools": blocking.stats()}
+
+
+@router.get("/voice-timings")
+def get_voice_timings(current_user: User = Depends(get_current_user)):
+    """Per-stage latency (p50/p95) of recent voice turns on this worker"""
+    check_admin(current_user)
+
+    from app.services import voice_pipeline
+
+    return voice_pipeline.stats()
+
+
 # ========================================
 # REVENUE REPORTING (Stripe)
 # ========================================
@@ -1,14 +1,17 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 import httpx
 
 from ..models.user import User
-from ..security import hash_password, verify_password, create_access_token
+from ..security import hash_password, create_access_token
 from ..db import get_db
 from ..config import settings
 from ..deps import get_current_user
+from ..services import blocking, password_hashing
+from ..schemas.upload import DirectUploadRequest, DirectUploadResponse, DirectUploadComplete
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -104,7 +107,8 @@ async def register(payload: RegisterIn, db: Session = Depends(get_db)):
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing:
         raise HTTPException(status_code=409, detail="Email already registered")
-    user = User(email=payload.email, name=payload.name, hashed_password=hash_password(payload.password))
+    hashed_password = await password_hashing.hash_password(payload.password)
+    user = User(email=payload.email, name=payload.name, hashed_password=hashed_password)
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -219,6 +223,12 @@ def reset_database(secret: str, db: Session = Depends(get_db)):
     db.execute(text("DELETE FROM users"))
     db.commit()
 
+    # Raw SQL bypasses the ORM events that normally clear cached auth
+    from app.deps import invalidate_user
+    invalidate_user()
+    from app.services import conversation_cache
+    conversation_cache.invalidate()
+
     return {
         "status": "success",
         "deleted": {
@@ -239,8 +249,15 @@ async def login(payload: LoginIn, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="CAPTCHA token required")
 
     user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not user.hashed_password or not verify_password(payload.password, user.hashed_password):
+    if not user or not user.hashed_password:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await password_hashing.verify_password(payload.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # Hashing parameters changed since this password was stored
+        user.hashed_password = new_hash
+        db.commit()
     token = create_access_token({"sub": str(user.id)}, settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return TokenOut(access_token=token)
 
@@ -946,6 +963,9 @@ def get_my_usage(
     from app.middleware.rate_limit import get_usage_info
     return get_usage_info(current_user)
 
+PROFILE_PICTURE_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp"]
+PROFILE_PICTURE_MAX_BYTES = 5 * 1024 * 1024
+
 @router.post("/me/profile-picture", response_model=UserOut)
 async def upload_profile_picture(
     file: UploadFile = File(...),
@@ -953,37 +973,40 @@ async def upload_profile_picture(
     db: Session = Depends(get_db)
 ):
     """Upload a profile picture for the current user"""
-    from app.services.s3_service import upload_profile_picture_to_s3
 
     # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-    if file.content_type not in allowed_types:
+    if file.content_type not in PROFILE_PICTURE_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Allowed types: {', '.join(allowed_types)}"
+            detail=f"Invalid file type. Allowed types: {', '.join(PROFILE_PICTURE_TYPES)}"
         )
 
+    from app.services.s3_service import fileobj_size, profile_picture_key, upload_fileobj_to_s3
+
     # Validate file size (max 5MB)
-    contents = await file.read()
-    if len(contents) > 5 * 1024 * 1024:
+    if fileobj_size(file.file) > PROFILE_PICTURE_MAX_BYTES:
         raise HTTPException(
             status_code=400,
             detail="File too large. Maximum size is 5MB"
         )
 
     try:
-        # Upload to S3
-        url = upload_profile_picture_to_s3(
-            image_bytes=contents,
-            user_id=current_user.id,
-            filename=file.filename or "profile.jpg",
-            content_type=file.content_type
+        # Stream to S3
+        url = await blocking.run(
+            blocking.S3,
+            upload_fileobj_to_s3,
+            file.file,
+            profile_picture_key(current_user.id, file.filename or "profile.jpg"),
+            file.content_type
         )
 
         # Update user's profile picture URL
-        current_user.profile_picture_url = url
-        db.commit()
-        db.refresh(current_user)
+        def save():
+            current_user.profile_picture_url = url
+            db.commit()
+            db.refresh(current_user)
+
+        await run_in_threadpool(save)
 
         return UserOut(
             id=current_user.id,
@@ -999,6 +1022,69 @@ async def upload_profile_picture(
             detail=f"Failed to upload profile picture: {str(e)}"
         )
 
+@router.post("/me/profile-picture/upload-url", response_model=DirectUploadResponse)
+def profile_picture_upload_url(
+    payload: DirectUploadRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Presigned form for uploading a profile picture straight to S3 (confirm with profile-picture/complete)"""
+    from app.services.s3_service import create_presigned_upload, profile_picture_key
+
+    if payload.content_type not in PROFILE_PICTURE_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed types: {', '.join(PROFILE_PICTURE_TYPES)}"
+        )
+    if payload.size > PROFILE_PICTURE_MAX_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail="File too large. Maximum size is 5MB"
+        )
+
+    try:
+        return create_presigned_upload(
+            profile_picture_key(current_user.id, payload.filename),
+            payload.content_type,
+            PROFILE_PICTURE_MAX_BYTES
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to prepare upload: {str(e)}")
+
+@router.post("/me/profile-picture/complete", response_model=UserOut)
+async def complete_profile_picture_upload(
+    payload: DirectUploadComplete,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Confirm a direct profile picture upload and set it on the current user"""
+    from app.services.s3_service import get_uploaded_object, profile_picture_prefix
+
+    if not payload.key.startswith(profile_picture_prefix(current_user.id)) or ".." in payload.key:
+        raise HTTPException(status_code=400, detail="Invalid upload key")
+
+    try:
+        uploaded = await blocking.run(blocking.S3, get_uploaded_object, payload.key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to confirm upload: {str(e)}")
+    if not uploaded:
+        raise HTTPException(status_code=404, detail="Upload not found - it may have been rejected or expired")
+
+    def save():
+        current_user.profile_picture_url = uploaded["url"]
+        db.commit()
+        db.refresh(current_user)
+
+    await run_in_threadpool(save)
+
+    return UserOut(
+        id=current_user.id,
+        email=current_user.email,
+        name=current_user.name,
+        profile_picture_url=current_user.profile_picture_url,
+        has_completed_screening=current_user.has_completed_screening,
+        is_guest=current_user.is_guest
+    )
+
 @router.post("/create-guest", response_model=TokenOut, status_code=201)
 def create_guest(db: Session = Depends(get_db)):
     """Create a temporary guest account for users to try the platform"""
@@ -18,12 +18,12 @@ from app.models.gamification import (
     BreathingSession,
     EmotionalCheckin,
     Achievement,
-    UserAchievement,
     DailyChallenge,
     UserDailyChallenge,
 )
 from app.routes.auth import get_current_user
-from app.services.achievement_checker import check_and_award_achievements
+from app.services.achievement_checker import record_event
+from app.services import achievement_catalog, daily_challenges, gamification_jobs
 
 router = APIRouter(prefix="/gamification", tags=["gamification"])
 
@@ -261,46 +261,7 @@ def update_score(
 
 def update_challenge_progress_internal(db: Session, user_id: int, action: str) -> list:
     """Internal function to update challenge progress. Returns list of updated challenges."""
-    now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    tomorrow_start = today_start + timedelta(days=1)
-
-    # Get today's incomplete challenges
-    user_challenges = db.query(UserDailyChallenge).filter(
-        UserDailyChallenge.user_id == user_id,
-        UserDailyChallenge.assigned_at >= today_start,
-        UserDailyChallenge.expires_at <= tomorrow_start + timedelta(hours=6),
-        UserDailyChallenge.completed_at == None
-    ).all()
-
-    updated = []
-
-    for uc in user_challenges:
-        challenge = db.query(DailyChallenge).filter(
-            DailyChallenge.id == uc.challenge_id
-        ).first()
-
-        if not challenge:
-            continue
-
-        if challenge.requirements.get("action") == action:
-            target = challenge.requirements.get("count", 1)
-            uc.progress += 1
-
-            if uc.progress >= target:
-                uc.completed_at = now
-
-            updated.append({
-                "challenge_id": challenge.id,
-                "code": challenge.code,
-                "title": challenge.title,
-                "progress": uc.progress,
-                "target": target,
-                "completed": uc.completed_at is not None,
-                "score_reward": challenge.score_reward
-            })
-
-    return updated
+    return daily_challenges.record_action(db, user_id, action)
 
 
 def extend_streak(db: Session, progress: UserProgress) -> int:
@@ -514,12 +475,12 @@ def create_journal_entry(
             description=f"{progress.current_streak}-day streak bonus!"
         )
 
+    # Check for newly earned achievements
+    new_achievements = record_event(db, current_user.id, "gratitude_entry", progress=progress)
+
     db.commit()
     db.refresh(new_entry)
 
-    # Check for newly earned achievements
-    new_achievements = check_and_award_achievements(db, current_user.id)
-
     # Update challenge progress
     updated_challenges = update_challenge_progress_internal(db, current_user.id, "gratitude")
 
@@ -611,12 +572,12 @@ def complete_breathing_session(
             description=f"{progress.current_streak}-day streak bonus!"
         )
 
+    # Check for newly earned achievements
+    new_achievements = record_event(db, current_user.id, "breathing_session", progress=progress)
+
     db.commit()
     db.refresh(breathing_session)
 
-    # Check for newly earned achievements
-    new_achievements = check_and_award_achievements(db, current_user.id)
-
     # Update challenge progress
     updated_challenges = update_challenge_progress_internal(db, current_user.id, "breathing")
 
@@ -703,12 +664,12 @@ def create_mood_checkin(
             description=f"{progress.current_streak}-day streak bonus!"
         )
 
+    # Check for newly earned achievements
+    new_achievements = record_event(db, current_user.id, "mood_checkin", progress=progress)
+
     db.commit()
     db.refresh(new_checkin)
 
-    # Check for newly earned achievements
-    new_achievements = check_and_award_achievements(db, current_user.id)
-
     # Update challenge progress
     updated_challenges = update_challenge_progress_internal(db, current_user.id, "mood")
 
@@ -800,12 +761,12 @@ def perform_daily_checkin(
             description=f"{progress.current_streak}-day streak bonus!"
         )
 
+    # Check for newly earned achievements
+    new_achievements = record_event(db, current_user.id, "daily_checkin", progress=progress)
+
     db.commit()
     db.refresh(progress)
 
-    # Check for newly earned achievements
-    new_achievements = check_and_award_achievements(db, current_user.id)
-
     return {
         "message": "Check-in complete!",
         "already_checked_in": False,
@@ -826,33 +787,25 @@ def get_achievements(
     current_user: User = Depends(get_current_user)
 ):
     """Get all achievements with user's progress using hybrid visibility."""
-    # Get all achievements
-    all_achievements = db.query(Achievement).order_by(
-        Achievement.category,
-        Achievement.sort_order
-    ).all()
+    catalog = achievement_catalog.get_catalog(db)
+    cached = achievement_catalog.user_achievements(db, current_user.id, catalog)
+    if cached.view is not None:
+        return cached.view
 
-    # Get user's earned achievements
-    user_achievements = db.query(UserAchievement).filter(
-        UserAchievement.user_id == current_user.id
-    ).all()
-
-    # Create lookup dict for earned achievements
-    earned_lookup = {ua.achievement_id: ua for ua in user_achievements}
+    earned_lookup = cached.earned
 
     # Build response with hybrid visibility
     achievements = []
     total_earned = 0
 
-    for achievement in all_achievements:
-        user_ach = earned_lookup.get(achievement.id)
-        is_earned = user_ach is not None
+    for achievement in catalog.achievements:
+        unlocked_at = earned_lookup.get(achievement.id)
+        is_earned = achievement.id in earned_lookup
 
         if is_earned:
             total_earned += 1
 
-        # Get visibility tier (default to visible if not set)
-        visibility = getattr(achievement, 'visibility_tier', 'visible') or 'visible'
+        visibility = achievement.visibility_tier
 
         # Handle visibility tiers:
         # - visible: Show full details
@@ -893,14 +846,15 @@ def get_achievements(
                 visibility_tier=visibility,
                 hint=achievement.hint,
                 earned=is_earned,
-                unlocked_at=user_ach.unlocked_at if user_ach else None
+                unlocked_at=unlocked_at
             ))
 
-    return AchievementsListResponse(
+    cached.view = AchievementsListResponse(
         achievements=achievements,
         total_earned=total_earned,
-        total_available=len(all_achievements)
+        total_available=len(catalog.achievements)
     )
+    return cached.view
 
 
 @router.post("/achievements/seed")
@@ -958,6 +912,7 @@ def seed_achievements_endpoint(
             created += 1
 
     db.commit()
+    achievement_catalog.invalidate_catalog()
 
     return {
         "message": f"Seeded achievements: {created} created, {updated} updated",
@@ -999,33 +954,18 @@ def get_daily_challenges(
     current_user: User = Depends(get_current_user)
 ):
     """Get user's daily challenges. Assigns new ones if needed."""
-    now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    tomorrow_start = today_start + timedelta(days=1)
-
-    # Get today's assigned challenges
-    user_challenges = db.query(UserDailyChallenge).filter(
-        UserDailyChallenge.user_id == current_user.id,
-        UserDailyChallenge.assigned_at >= today_start,
-        UserDailyChallenge.expires_at <= tomorrow_start + timedelta(hours=6)  # Buffer for timezone
-    ).all()
+    # Today's assignments joined to their definitions
+    user_challenges = daily_challenges.todays_challenges(db, current_user.id)
 
     # If no challenges today, assign new ones
     if not user_challenges:
-        user_challenges = assign_daily_challenges(db, current_user.id)
+        user_challenges = daily_challenges.assign(db, current_user.id)
 
     # Build response
     challenges = []
     completed_count = 0
 
-    for uc in user_challenges:
-        challenge = db.query(DailyChallenge).filter(
-            DailyChallenge.id == uc.challenge_id
-        ).first()
-
-        if not challenge:
-            continue
-
+    for uc, challenge in user_challenges:
         # Get target value from requirements
         target = challenge.requirements.get("count", 1)
         is_completed = uc.completed_at is not None
@@ -1055,47 +995,6 @@ def get_daily_challenges(
     )
 
 
-def assign_daily_challenges(db: Session, user_id: int) -> List[UserDailyChallenge]:
-    """Assign 3 random challenges to user for today."""
-    import random
-
-    now = datetime.now(timezone.utc)
-    tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-
-    # Get all active challenges
-    all_challenges = db.query(DailyChallenge).filter(
-        DailyChallenge.is_active == True
-    ).all()
-
-    if not all_challenges:
-        return []
-
-    # Select 3 random challenges (or fewer if not enough available)
-    num_to_assign = min(3, len(all_challenges))
-    selected = random.sample(all_challenges, num_to_assign)
-
-    # Create user challenge assignments
-    user_challenges = []
-    for challenge in selected:
-        uc = UserDailyChallenge(
-            user_id=user_id,
-            challenge_id=challenge.id,
-            assigned_at=now,
-            expires_at=tomorrow,
-            progress=0
-        )
-        db.add(uc)
-        user_challenges.append(uc)
-
-    db.commit()
-
-    # Refresh to get IDs
-    for uc in user_challenges:
-        db.refresh(uc)
-
-    return user_challenges
-
-
 @router.post("/challenges/{user_challenge_id}/claim")
 def claim_challenge_reward(
     user_challenge_id: int,
@@ -1139,12 +1038,12 @@ def claim_challenge_reward(
     # Mark as claimed
     user_challenge.claimed_at = datetime.now(timezone.utc)
 
+    # Check for achievements
+    new_achievements = record_event(db, current_user.id, "challenge_claimed", progress=progress)
+
     db.commit()
     db.refresh(progress)
 
-    # Check for achievements
-    new_achievements = check_and_award_achievements(db, current_user.id)
-
     return {
         "message": "Reward claimed!",
         "score_earned": score_change,
@@ -1167,44 +1066,7 @@ def update_challenge_progress(
     - mood: Logged mood
     - voice_message: Sent a voice message
     """
-    now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    tomorrow_start = today_start + timedelta(days=1)
-
-    # Get today's challenges
-    user_challenges = db.query(UserDailyChallenge).filter(
-        UserDailyChallenge.user_id == current_user.id,
-        UserDailyChallenge.assigned_at >= today_start,
-        UserDailyChallenge.expires_at <= tomorrow_start + timedelta(hours=6),
-        UserDailyChallenge.completed_at == None  # Only incomplete challenges
-    ).all()
-
-    updated = []
-
-    for uc in user_challenges:
-        challenge = db.query(DailyChallenge).filter(
-            DailyChallenge.id == uc.challenge_id
-        ).first()
-
-        if not challenge:
-            continue
-
-        # Check if this action matches the challenge requirement
-        if challenge.requirements.get("action") == action:
-            target = challenge.requirements.get("count", 1)
-            uc.progress += 1
-
-            # Check if completed
-            if uc.progress >= target:
-                uc.completed_at = now
-
-            updated.append({
-                "challenge_id": challenge.id,
-                "code": challenge.code,
-                "progress": uc.progress,
-                "target": target,
-                "completed": uc.completed_at is not None
-            })
+    updated = daily_challenges.record_action(db, current_user.id, action)
 
     db.commit()
 
@@ -1242,6 +1104,7 @@ def seed_challenges_endpoint(
             created += 1
 
     db.commit()
+    daily_challenges.invalidate_challenges()
 
     return {
         "message": f"Seeded challenges: {created} created, {updated} updated",
@@ -1260,10 +1123,10 @@ def apply_inactivity_penalties(
 ):
     """
     Apply score penalties for inactive users.
-    Should be run daily by a scheduled job.
+    Runs daily from the scheduler; this triggers the same job on demand.
     Admin only endpoint.
 
-    Penalty schedule:
+    Penalty schedule (highest tier reached, at most once per day):
     - 7 days inactive: -5 points
     - 14 days inactive: -10 points
     - 30 days inactive: -15 points
@@ -1271,87 +1134,11 @@ def apply_inactivity_penalties(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    now = datetime.now(timezone.utc)
-    penalties_applied = 0
-    users_penalized = []
-
-    # Get all users with progress records
-    all_progress = db.query(UserProgress).filter(
-        UserProgress.streak_last_activity.isnot(None),
-        UserProgress.health_score > 0  # Only penalize users with scores
-    ).all()
-
-    for progress in all_progress:
-        if not progress.streak_last_activity:
-            continue
-
-        days_inactive = (now - progress.streak_last_activity).days
-
-        # Determine penalty based on inactivity duration
-        penalty = 0
-        penalty_type = None
-
-        if days_inactive >= 30:
-            penalty = 15
-            penalty_type = "30_day_inactivity"
-        elif days_inactive >= 14:
-            penalty = 10
-            penalty_type = "14_day_inactivity"
-        elif days_inactive >= 7:
-            penalty = 5
-            penalty_type = "7_day_inactivity"
-
-        if penalty > 0:
-            # Check if we already penalized today for this level
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            existing_penalty = db.query(ScoreEvent).filter(
-                ScoreEvent.user_id == progress.user_id,
-                ScoreEvent.event_type == penalty_type,
-                ScoreEvent.created_at >= today_start
-            ).first()
-
-            if existing_penalty:
-                continue  # Already penalized today
-
-            # Apply the penalty
-            old_score = progress.health_score
-            new_score = max(0, old_score - penalty)
-            progress.health_score = new_score
-
-            # Update tier
-            if new_score >= 90:
-                progress.health_tier = "platinum"
-            elif new_score >= 70:
-                progress.health_tier = "gold"
-            elif new_score >= 40:
-                progress.health_tier = "silver"
-            else:
-                progress.health_tier = "bronze"
-
-            # Log the event
-            event = ScoreEvent(
-                user_id=progress.user_id,
-                event_type=penalty_type,
-                score_change=-penalty,
-                score_before=old_score,
-                score_after=new_score,
-                description=f"Inactivity penalty: {days_inactive} days without activity"
-            )
-            db.add(event)
-
-            penalties_applied += 1
-            users_penalized.append({
-                "user_id": progress.user_id,
-                "days_inactive": days_inactive,
-                "penalty": penalty,
-                "new_score": new_score
-            })
-
-    db.commit()
+    metrics = gamification_jobs.apply_inactivity_penalties(db)
 
     return {
-        "message": f"Applied {penalties_applied} inactivity penalties",
-        "penalties": users_penalized
+        "message": f"Applied {metrics['rows']} inactivity penalties",
+        "metrics": metrics
     }
 
 
@@ -1362,46 +1149,15 @@ def break_expired_streaks(
 ):
     """
     Break streaks for users who haven't been active in 24+ hours.
-    Should be run daily by a scheduled job.
+    Runs daily from the scheduler; this triggers the same job on demand.
     Admin only endpoint.
     """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    now = datetime.now(timezone.utc)
-    streaks_broken = 0
-    users_affected = []
-
-    # Get all users with active streaks
-    active_streaks = db.query(UserProgress).filter(
-        UserProgress.current_streak > 0,
-        UserProgress.streak_last_activity.isnot(None)
-    ).all()
-
-    for progress in active_streaks:
-        time_since_last = now - progress.streak_last_activity
-
-        # Check if protected
-        is_protected = (
-            progress.streak_protected_until and
-            progress.streak_protected_until > now
-        )
-
-        # Break streak if 24+ hours inactive and not protected
-        if time_since_last.total_seconds() > 86400 and not is_protected:  # 24 hours
-            old_streak = progress.current_streak
-            progress.current_streak = 0
-
-            streaks_broken += 1
-            users_affected.append({
-                "user_id": progress.user_id,
-                "old_streak": old_streak,
-                "hours_inactive": round(time_since_last.total_seconds() / 3600, 1)
-            })
-
-    db.commit()
+    metrics = gamification_jobs.break_expired_streaks(db)
 
     return {
-        "message": f"Broke {streaks_broken} expired streaks",
-        "affected_users": users_affected
+        "message": f"Broke {metrics['rows']} expired streaks",
+        "metrics": metrics
     }
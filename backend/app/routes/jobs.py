@@ -0,0 +1,39 @@
+"""
+Background Job Status
+Endpoints that queue long-running work return {job_id, status, status_url};
+clients poll GET /jobs/{job_id} until status is "succeeded" (result holds the
+endpoint's response) or "failed" (error holds the reason).
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app.deps import get_current_user_snapshot, UserSnapshot
+from app.models.job import Job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+def get_job_status(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
+):
+    """Status of a background job queued by the current user."""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job or (job.user_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": job.result if job.status == "succeeded" else None,
+        "error": job.error,  # Last failure, also set while a retry is pending
+        "created_at": str(job.created_at) if job.created_at else None,
+        "started_at": str(job.started_at) if job.started_at else None,
+        "finished_at": str(job.finished_at) if job.finished_at else None
+    }
@@ -1,19 +1,27 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from typing import List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, WebSocket, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, String
+from sqlalchemy import func, cast, String, or_
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
+import asyncio
+import hashlib
 import io
+import json
 import os
+from datetime import timedelta
 
-from app.db import get_db
-from app.deps import get_current_user, get_current_subscription
+from app.db import get_db, SessionLocal
+from app.deps import get_current_user, get_current_subscription, get_current_user_snapshot, get_user_from_token, UserSnapshot
 from app.models.user import User
 from app.models.subscription import Subscription
 from app.services.llm_service import is_unsafe
-from app.services.pre_mediation_coach import start_coaching_session, process_coaching_response, generate_invite_token
-from app.services.main_room_mediator import start_main_room, process_main_room_response
+from app.services.pre_mediation_coach import start_coaching_session, process_coaching_response, generate_invite_token, COACH_MODEL
+from app.services.main_room_mediator import start_main_room, process_main_room_response, stream_main_room_response, format_session_context, MAIN_ROOM_MODEL
+from app.services.context_window import fit_history
 # SOLO MODE
 from app.services.solo_coach import start_solo_session, process_solo_response
 # from app.services.therapy_report import generate_professional_report  # Not needed yet
@@ -21,10 +29,13 @@ from app.services.whisper_service import transcribe_audio
 from app.services.subscription_service import require_feature_access, increment_voice_usage, check_room_creation_limit, increment_room_counter, check_file_upload_allowed
 from app.services.cost_tracker import calculate_whisper_cost, track_api_cost
 from app.services.email_service import send_turn_notification, send_break_notification
+from app.services.llm_gateway import get_sync_client
+from app.services import analysis_cache, blocking, conversation_cache, job_queue, room_events, voice_pipeline
 from app.routes.gamification import get_or_create_progress, update_score, extend_streak, update_challenge_progress_internal, SCORE_VALUES
-from app.services.achievement_checker import check_and_award_achievements
+from app.services.achievement_checker import record_event
 from app.schemas.room import StartCoachingRequest, StartCoachingResponse, CoachingResponseRequest, CoachingResponseOut, FinalizeCoachingResponse, LobbyInfoResponse, MainRoomSummariesResponse, MainRoomStartResponse, MainRoomRespondRequest, MainRoomRespondResponse
 from app.models.room import Room, Turn
+from app.schemas.upload import DirectUploadRequest, DirectUploadResponse, DirectUploadComplete
 from app.schemas.room import RoomCreate, RoomResponse, IntakeRequest, IntakeResponse, TurnResponse, TurnFeedItem, AIQuestionOut, MediateOut, RespondRequest, RespondOut, SignalRequest
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
@@ -73,6 +84,51 @@ def clean_user_name(user) -> str:
 
     return name
 
+def _turns_etag(db: Session, filters: list, *state) -> str:
+    """
+    Strong ETag for a turn list endpoint, computed from the newest turn id and turn count
+    (plus any room state the response includes) without loading the turns.
+    """
+    max_id, count = db.query(func.max(Turn.id), func.count(Turn.id)).filter(*filters).one()
+    digest = hashlib.sha1(repr((max_id, count) + state).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if the client's If-None-Match already has this ETag (-> 304 Not Modified)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def _set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Clients must revalidate every time - the ETag makes that a cheap 304
+    response.headers["Cache-Control"] = "no-cache"
+
+# Turn ids are handed out at INSERT but only become visible at COMMIT, so a turn can
+# show up after one with a higher id. Delta fetches re-send this much history before
+# the cursor turn to pick those up; it must outlast the longest turn-writing transaction.
+SINCE_OVERLAP = timedelta(minutes=2)
+
+def _since_filter(db: Session, since: int):
+    """
+    Filter for a since=<last_turn_id> delta fetch: turns with a newer id, plus turns created
+    within SINCE_OVERLAP of the cursor turn (a lower id that committed late). Turns the
+    client already has are repeated - clients dedupe by turn id.
+    """
+    cursor_at = db.query(Turn.created_at).filter(Turn.id == since).scalar()
+    if cursor_at is None:
+        return Turn.id > since
+    return or_(Turn.id > since, Turn.created_at >= cursor_at - SINCE_OVERLAP)
+
+def _next_cursor(turns: list, since: Optional[int]) -> Optional[int]:
+    """last_turn_id for a delta response - never moves backwards when only repeats came back."""
+    newest = max((turn.id for turn in turns), default=0)
+    return max(newest, since or 0) or since
+
 @router.post("/", response_model=RoomResponse, status_code=status.HTTP_201_CREATED)
 def create_room(
     room_data: RoomCreate,
@@ -263,7 +319,7 @@ def get_room_feed(
             text=turn.summary or "",
             tags=turn.tags or [],
             created_at=turn.created_at,
-            desired_outcome=turn.desired_outcome or "",
+            desired_outcome=getattr(turn, "desired_outcome", None) or "",
         )
         for turn, user in rows
     ]
@@ -276,7 +332,7 @@ from app.deps import get_current_user
 from app.models.room import Turn, Room
 from app.models.user import User
 from app.services.llm_service import build_initial_questions, generate_next_step, is_unsafe
-from app.services.pre_mediation_coach import start_coaching_session, process_coaching_response, generate_invite_token
+from app.services.pre_mediation_coach import start_coaching_session, process_coaching_response, generate_invite_token, COACH_MODEL
 from app.schemas.room import StartCoachingRequest, StartCoachingResponse, CoachingResponseRequest, CoachingResponseOut, FinalizeCoachingResponse, LobbyInfoResponse, MainRoomSummariesResponse, MainRoomStartResponse, MainRoomRespondRequest, MainRoomRespondResponse
 
 def _room_participant_ids(db: Session, room_id: int) -> List[int]:
@@ -296,45 +352,52 @@ def _latest_intake_by_user(db: Session, room_id: int) -> Dict[int, Turn]:
     return latest
 
 @router.post("/{room_id}/mediate", response_model=MediateOut, status_code=status.HTTP_201_CREATED)
-def start_mediation(room_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # must be a participant
-    participant_ids = _room_participant_ids(db, room_id)
-    if current_user.id not in participant_ids:
-        raise HTTPException(status_code=403, detail="You are not a participant in this room")
+async def start_mediation(room_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Queries and commits run in the threadpool; only the Claude call is awaited on the loop
+    def load() -> List[Dict]:
+        # must be a participant
+        participant_ids = _room_participant_ids(db, room_id)
+        if current_user.id not in participant_ids:
+            raise HTTPException(status_code=403, detail="You are not a participant in this room")
+
+        # need intake from at least two distinct users
+        latest = _latest_intake_by_user(db, room_id)
+        if len(latest) < 2:
+            raise HTTPException(status_code=400, detail="Waiting for both perspectives")
+
+        # build participant payload for LLM
+        participants = []
+        for uid, t in latest.items():
+            user = db.query(User).filter(User.id == uid).first()
+            participants.append({
+                "user_id": uid,
+                "name": (user.name or user.email),
+                "summary": t.summary
+            })
+        return participants
 
-    # need intake from at least two distinct users
-    latest = _latest_intake_by_user(db, room_id)
-    if len(latest) < 2:
-        raise HTTPException(status_code=400, detail="Waiting for both perspectives")
-
-    # build participant payload for LLM
-    participants = []
-    for uid, t in latest.items():
-        user = db.query(User).filter(User.id == uid).first()
-        participants.append({
-            "user_id": uid,
-            "name": (user.name or user.email),
-            "summary": t.summary
-        })
+    participants = await run_in_threadpool(load)
+    questions = await build_initial_questions(participants, context={})
 
-    questions = build_initial_questions(participants, context={})
+    def save() -> MediateOut:
+        # store as AI questions
+        items: List[AIQuestionOut] = []
+        for q in questions:
+            text = q["question"]
+            turn = Turn(
+                room_id=room_id,
+                user_id=current_user.id,  # stored under current user; tagged as AI
+                kind="ai_question",
+                summary=text,
+                tags=["ai"]
+            )
+            db.add(turn)
+            db.flush()
+            items.append(AIQuestionOut(user_id=q["user_id"], question=text))
+        db.commit()
+        return MediateOut(items=items)
 
-    # store as AI questions
-    items: List[AIQuestionOut] = []
-    for q in questions:
-        text = q["question"]
-        turn = Turn(
-            room_id=room_id,
-            user_id=current_user.id,  # stored under current user; tagged as AI
-            kind="ai_question",
-            summary=text,
-            tags=["ai"]
-        )
-        db.add(turn)
-        db.flush()
-        items.append(AIQuestionOut(user_id=q["user_id"], question=text))
-    db.commit()
-    return MediateOut(items=items)
+    return await run_in_threadpool(save)
 
 def _room_history(db: Session, room_id: int) -> List[Dict]:
     rows = (
@@ -393,6 +456,7 @@ def respond_mediation(
     # Save user response
     t = Turn(room_id=room_id, user_id=current_user.id, kind="user_response", summary=text, tags=["response"])
     db.add(t)
+    record_event(db, current_user.id, "message")
     db.commit()
     db.refresh(t)
 
@@ -428,43 +492,44 @@ def respond_mediation(
     return out
 
 @router.post("/{room_id}/signal", response_model=RespondOut)
-def send_signal(
+async def send_signal(
     room_id: int,
     payload: SignalRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Must be a participant
-    participant_ids = _room_participant_ids(db, room_id)
-    if current_user.id not in participant_ids:
-        raise HTTPException(status_code=403, detail="You are not a participant in this room")
-
-    st = (payload.signal_type or "").strip().lower()
-    if st not in ALLOWED_SIGNALS:
-        raise HTTPException(status_code=422, detail="Invalid signal_type")
-
-    text = (payload.text or "").strip()
-
-    # Safety check only on optional text
-    if text:
-        unsafe, reason = is_unsafe(text)
-        if unsafe:
-            raise HTTPException(status_code=422, detail=f"Safety triggered ({reason}). Session paused.")
-
-    # Persist the signal turn (encode signal_type in tags)
-    t = Turn(
-        room_id=room_id,
-        user_id=current_user.id,
-        kind="signal",
-        summary=text,
-        tags=["signal", st]
-    )
-    db.add(t)
-    db.commit()
-    db.refresh(t)
+    def save_signal() -> List[Dict]:
+        # Must be a participant
+        participant_ids = _room_participant_ids(db, room_id)
+        if current_user.id not in participant_ids:
+            raise HTTPException(status_code=403, detail="You are not a participant in this room")
+
+        st = (payload.signal_type or "").strip().lower()
+        if st not in ALLOWED_SIGNALS:
+            raise HTTPException(status_code=422, detail="Invalid signal_type")
+
+        text = (payload.text or "").strip()
+
+        # Safety check only on optional text
+        if text:
+            unsafe, reason = is_unsafe(text)
+            if unsafe:
+                raise HTTPException(status_code=422, detail=f"Safety triggered ({reason}). Session paused.")
+
+        # Persist the signal turn (encode signal_type in tags)
+        t = Turn(
+            room_id=room_id,
+            user_id=current_user.id,
+            kind="signal",
+            summary=text,
+            tags=["signal", st]
+        )
+        db.add(t)
+        db.commit()
+        return _room_history(db, room_id)
 
     # Build history and normalize signal_type for signal turns (from tags)
-    history = _room_history(db, room_id)
+    history = await run_in_threadpool(save_signal)
     for h in history:
         if h.get("kind") == "signal":
             sig = None
@@ -474,24 +539,26 @@ def send_signal(
                     break
             h["signal_type"] = sig
 
-    result = generate_next_step(history, {"last_signal_type": payload.signal_type})
+    result = await generate_next_step(history, {"last_signal_type": payload.signal_type})
 
     # Halted (e.g., Need a Break)
     if result.get("halted"):
         return RespondOut(halted=True, reason=result.get("reason") or "Session paused")
 
+    def save_ai_turn(kind: str, summary: str, tags: List[str]):
+        db.add(Turn(room_id=room_id, user_id=current_user.id, kind=kind, summary=summary, tags=tags))
+        db.commit()
+
     # Resolution
     if result.get("resolution"):
         res_text = result["resolution"]
-        db.add(Turn(room_id=room_id, user_id=current_user.id, kind="resolution", summary=res_text, tags=["ai","resolution"]))
-        db.commit()
+        await run_in_threadpool(save_ai_turn, "resolution", res_text, ["ai","resolution"])
         return RespondOut(resolution=res_text, halted=False)
 
     # Next question
     if result.get("next_question"):
         q_text = result["next_question"]
-        db.add(Turn(room_id=room_id, user_id=current_user.id, kind="ai_question", summary=q_text, tags=["ai"]))
-        db.commit()
+        await run_in_threadpool(save_ai_turn, "ai_question", q_text, ["ai"])
         return RespondOut(next_question=q_text, halted=False)
 
     # Fallback
@@ -500,23 +567,39 @@ def send_signal(
 @router.get("/{room_id}/conversation", response_model=List[TurnFeedItem])
 def get_conversation(
     room_id: int,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: UserSnapshot = Depends(get_current_user_snapshot),
     db: Session = Depends(get_db),
 ):
-    """Get ALL messages in the conversation (not just intake)"""
-    participant = db.query(RoomParticipant).filter(
-        RoomParticipant.room_id == room_id,
-        RoomParticipant.user_id == current_user.id,
-    ).first()
-    if not participant:
+    """
+    Get ALL messages in the conversation (not just intake).
+    Pass since=<last turn id> to get only newer turns (recent ones may repeat - dedupe by id); send If-None-Match to get a 304 when nothing changed.
+    """
+    room = db.query(Room).filter(Room.id == room_id).first()
+    if not room or current_user.id not in {p.id for p in room.participants}:
         raise HTTPException(status_code=403, detail="Not a participant")
 
     # Get ALL turn types: user_response, ai_question, resolution
-    rows = db.query(Turn, User).join(User, User.id == Turn.user_id).filter(
+    filters = [
         Turn.room_id == room_id,
         Turn.user_id == current_user.id,
         Turn.kind.in_(["user_response", "ai_question", "resolution"])
-    ).order_by(Turn.created_at.asc()).all()
+    ]
+    # Turns are the current user's, so their name (or email) is every author_name
+    author = next(p for p in room.participants if p.id == current_user.id)
+    etag = _turns_etag(db, filters, since, author.name, author.email)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    _set_etag(response, etag)
+
+    if since:
+        filters.append(_since_filter(db, since))
+
+    rows = db.query(Turn, User).join(User, User.id == Turn.user_id).filter(
+        *filters
+    ).order_by(Turn.id.asc()).all()
 
     return [
         TurnFeedItem(
@@ -527,7 +610,7 @@ def get_conversation(
             text=turn.summary or "",
             tags=turn.tags or [],
             created_at=turn.created_at,
-            desired_outcome=turn.desired_outcome or "",
+            desired_outcome=getattr(turn, "desired_outcome", None) or "",
         )
         for turn, user in rows
     ]
@@ -570,30 +653,49 @@ def save_ai_message(
 @router.get("/{room_id}/coach/turns")
 def get_coaching_turns(
     room_id: int,
+    response: Response,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
-    """Get all coaching conversation turns for a room"""
+    """
+    Get all coaching conversation turns for a room.
+    Pass since=<last_turn_id> to get only newer turns (recent ones may repeat - dedupe by id); send If-None-Match to get a 304 when nothing changed.
+    """
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
     # Determine if current user is User 1 or User 2
     is_user1 = len(room.participants) > 0 and room.participants[0].id == current_user.id
+    user1 = room.participants[0] if room.participants else None
 
-    # Get all pre-mediation turns for this room
-    turns = db.query(Turn).filter(
+    filters = [
         Turn.room_id == room_id,
         Turn.user_id == current_user.id,
         Turn.context == 'pre_mediation'
-    ).order_by(Turn.id).all()  # Use id for guaranteed sequential ordering
+    ]
+    # User 1's name and picture are part of User 2's intro message
+    etag = _turns_etag(
+        db, filters, since, is_user1, room.user1_summary,
+        user1.name if user1 else None, user1.profile_picture_url if user1 else None
+    )
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    _set_etag(response, etag)
+
+    if since:
+        filters.append(_since_filter(db, since))
+
+    # Get all pre-mediation turns for this room
+    turns = db.query(Turn).filter(*filters).order_by(Turn.id).all()  # Use id for guaranteed sequential ordering
 
     # Format as conversation messages
     messages = []
 
-    # For User 2, prepend intro message with User 1's summary
-    if not is_user1 and room.user1_summary:
-        user1 = room.participants[0] if room.participants else None
+    # For User 2, prepend intro message with User 1's summary (already sent if this is a delta)
+    if not is_user1 and room.user1_summary and not since:
         user1_name = user1.name if user1 else "Other person"
         user1_profile_picture = user1.profile_picture_url if user1 else None
         messages.append({
@@ -605,16 +707,16 @@ def get_coaching_turns(
 
     for turn in turns:
         if turn.kind == 'user_response':
-            messages.append({"role": "user", "content": turn.summary or ""})
+            messages.append({"id": turn.id, "role": "user", "content": turn.summary or ""})
         elif turn.kind == 'ai_question':
-            messages.append({"role": "assistant", "content": turn.summary or ""})
+            messages.append({"id": turn.id, "role": "assistant", "content": turn.summary or ""})
         elif turn.kind == 'telegram_import':
-            messages.append({"role": "assistant", "content": turn.summary or ""})
+            messages.append({"id": turn.id, "role": "assistant", "content": turn.summary or ""})
 
-    return {"messages": messages}
+    return {"messages": messages, "last_turn_id": _next_cursor(turns, since)}
 
 @router.post("/{room_id}/coach/start", response_model=StartCoachingResponse)
-def start_coaching(
+async def start_coaching(
     room_id: int,
     payload: StartCoachingRequest,
     db: Session = Depends(get_db),
@@ -623,173 +725,172 @@ def start_coaching(
     """Start AI coaching session for user before main mediation."""
     from app.models.health_screening import UserHealthProfile
 
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
+    # Queries and commits run in the threadpool; only the Claude call is awaited on the loop
+    def load():
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
 
-    # Check if user is participant
-    participant_ids = [p.id for p in room.participants]
-    if current_user.id not in participant_ids:
-        raise HTTPException(status_code=403, detail="Not a participant")
+        # Check if user is participant
+        participant_ids = [p.id for p in room.participants]
+        if current_user.id not in participant_ids:
+            raise HTTPException(status_code=403, detail="Not a participant")
 
-    # Determine if this is User 1 or User 2
-    is_user1 = (room.participants[0].id == current_user.id)
+        # Determine if this is User 1 or User 2
+        is_user1 = (room.participants[0].id == current_user.id)
 
-    # Fetch user's health profile for context
-    health_profile_data = None
-    health_profile = db.query(UserHealthProfile).filter(
-        UserHealthProfile.user_id == current_user.id
-    ).first()
-    if health_profile:
-        health_profile_data = {
-            'has_mental_health_condition': health_profile.has_mental_health_condition,
-            'mental_health_conditions': health_profile.mental_health_conditions or [],
-            'currently_in_treatment': health_profile.currently_in_treatment,
-            'verbal_aggression_history': health_profile.verbal_aggression_history,
-            'physical_aggression_history': health_profile.physical_aggression_history,
-            'substances_affect_behavior': health_profile.substances_affect_behavior,
-            'feels_generally_safe': health_profile.feels_generally_safe,
-            'safety_concerns': health_profile.safety_concerns,
-            'baseline_risk_level': health_profile.baseline_risk_level,
-        }
+        # Fetch user's health profile for context
+        health_profile_data = None
+        health_profile = db.query(UserHealthProfile).filter(
+            UserHealthProfile.user_id == current_user.id
+        ).first()
+        if health_profile:
+            health_profile_data = {
+                'has_mental_health_condition': health_profile.has_mental_health_condition,
+                'mental_health_conditions': health_profile.mental_health_conditions or [],
+                'currently_in_treatment': health_profile.currently_in_treatment,
+                'verbal_aggression_history': health_profile.verbal_aggression_history,
+                'physical_aggression_history': health_profile.physical_aggression_history,
+                'substances_affect_behavior': health_profile.substances_affect_behavior,
+                'feels_generally_safe': health_profile.feels_generally_safe,
+                'safety_concerns': health_profile.safety_concerns,
+                'baseline_risk_level': health_profile.baseline_risk_level,
+            }
+        return room, is_user1, health_profile_data
+
+    room, is_user1, health_profile_data = await run_in_threadpool(load)
 
     # Start coaching (User 2 gets User 1's summary as context)
     user1_summary = room.user1_summary if not is_user1 else None
-    result = start_coaching_session(payload.initial_message, is_user1, user1_summary, health_profile_data)
-    
-    # Save initial turn
-    turn = Turn(
-        room_id=room_id,
-        user_id=current_user.id,
-        kind="user_response",
-        summary=payload.initial_message,
-        context="pre_mediation",
-        tags=["coaching_start"]
-    )
-    db.add(turn)
-    
-    # Save AI question with cost tracking
-    ai_turn = Turn(
-        room_id=room_id,
-        user_id=current_user.id,
-        kind="ai_question",
-        summary=result["ai_question"],
-        context="pre_mediation",
-        tags=["coaching"],
-        input_tokens=result.get("input_tokens", 0),
-        output_tokens=result.get("output_tokens", 0),
-        cost_usd=result.get("cost_usd", 0.0),
-        model=result.get("model")
-    )
-    db.add(ai_turn)
-    
-    # Update room phase
-    if is_user1 and room.phase == "user1_intake":
-        room.phase = "user1_coaching"
-    elif not is_user1 and room.phase == "user2_lobby":
-        room.phase = "user2_coaching"
-    
-    db.commit()
+    result = await start_coaching_session(payload.initial_message, is_user1, user1_summary, health_profile_data)
 
-    # For User 2, include User 1's name and summary so frontend can display it properly
-    other_user_name = None
-    other_user_summary = None
-    other_user_profile_picture = None
-    if not is_user1:
-        user1 = room.participants[0]
-        other_user_name = user1.name
-        other_user_summary = room.user1_summary
-        other_user_profile_picture = user1.profile_picture_url
-
-    return StartCoachingResponse(
-        ai_question=result["ai_question"],
-        exchange_count=result["exchange_count"],
-        room_phase=room.phase,
-        other_user_name=other_user_name,
-        other_user_summary=other_user_summary,
-        other_user_profile_picture=other_user_profile_picture
-    )
+    def save() -> StartCoachingResponse:
+        # Save initial turn
+        turn = Turn(
+            room_id=room_id,
+            user_id=current_user.id,
+            kind="user_response",
+            summary=payload.initial_message,
+            context="pre_mediation",
+            tags=["coaching_start"]
+        )
+        db.add(turn)
+        record_event(db, current_user.id, "message")
+
+        # Save AI question with cost tracking
+        ai_turn = Turn(
+            room_id=room_id,
+            user_id=current_user.id,
+            kind="ai_question",
+            summary=result["ai_question"],
+            context="pre_mediation",
+            tags=["coaching"],
+            input_tokens=result.get("input_tokens", 0),
+            output_tokens=result.get("output_tokens", 0),
+            cost_usd=result.get("cost_usd", 0.0),
+            model=result.get("model")
+        )
+        db.add(ai_turn)
+
+        # Update room phase
+        if is_user1 and room.phase == "user1_intake":
+            room.phase = "user1_coaching"
+        elif not is_user1 and room.phase == "user2_lobby":
+            room.phase = "user2_coaching"
+
+        db.commit()
+
+        # For User 2, include User 1's name and summary so frontend can display it properly
+        other_user_name = None
+        other_user_summary = None
+        other_user_profile_picture = None
+        if not is_user1:
+            user1 = room.participants[0]
+            other_user_name = user1.name
+            other_user_summary = room.user1_summary
+            other_user_profile_picture = user1.profile_picture_url
+
+        return StartCoachingResponse(
+            ai_question=result["ai_question"],
+            exchange_count=result["exchange_count"],
+            room_phase=room.phase,
+            other_user_name=other_user_name,
+            other_user_summary=other_user_summary,
+            other_user_profile_picture=other_user_profile_picture
+        )
+
+    return await run_in_threadpool(save)
 
 
 @router.post("/{room_id}/coach/respond", response_model=CoachingResponseOut)
-def respond_to_coaching(
+async def respond_to_coaching(
     room_id: int,
     payload: CoachingResponseRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """User responds during coaching session."""
-    room = db.query(Room).filter(Room.id == room_id).first()
+    room = await run_in_threadpool(lambda: db.query(Room).filter(Room.id == room_id).first())
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
     # Get coaching conversation history
-    turns = db.query(Turn).filter(
-        Turn.room_id == room_id,
-        Turn.user_id == current_user.id,
-        Turn.user_id == current_user.id,
-        Turn.context == "pre_mediation"
-    ).order_by(Turn.created_at.asc()).all()
-    
-    # Build conversation for Claude
-    conversation_history = []
-    for turn in turns:
-        if turn.kind == "ai_question":
-            conversation_history.append({"role": "assistant", "content": turn.summary})
-        else:
-            conversation_history.append({"role": "user", "content": turn.summary})
-    
-    exchange_count = len([t for t in turns if t.kind == "user_response"])
+    conversation_history, exchange_count, earlier_summary = await _coaching_context(db, room, current_user)
     
     # Process response
-    result = process_coaching_response(
+    result = await process_coaching_response(
         conversation_history,
         payload.user_message,
-        exchange_count
-    )
-    
-    # Save user response
-    user_turn = Turn(
-        room_id=room_id,
-        user_id=current_user.id,
-        kind="user_response",
-        summary=payload.user_message,
-        context="pre_mediation",
-        tags=["coaching"]
+        exchange_count,
+        earlier_summary=earlier_summary
     )
-    db.add(user_turn)
-    
-    if result.get("ready_to_finalize"):
-        # Save polished summary
-        # Determine User 1 vs User 2 based on who started coaching first (earliest turn)
-        first_turn = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "pre_mediation"
-        ).order_by(Turn.created_at.asc()).first()
 
-        is_user1 = (first_turn and first_turn.user_id == current_user.id)
-        if is_user1:
-            room.user1_summary = result["polished_summary"]
-        else:
-            room.user2_summary = result["polished_summary"]
-    else:
-        # Save next AI question with cost tracking
-        ai_turn = Turn(
+    def save():
+        # Save user response
+        user_turn = Turn(
             room_id=room_id,
             user_id=current_user.id,
-            kind="ai_question",
-            summary=result["ai_question"],
+            kind="user_response",
+            summary=payload.user_message,
             context="pre_mediation",
-            tags=["coaching"],
-            input_tokens=result.get("input_tokens", 0),
-            output_tokens=result.get("output_tokens", 0),
-            cost_usd=result.get("cost_usd", 0.0),
-            model=result.get("model")
+            tags=["coaching"]
         )
-        db.add(ai_turn)
-    
-    db.commit()
-    
+        db.add(user_turn)
+        record_event(db, current_user.id, "message")
+
+        if result.get("ready_to_finalize"):
+            # Save polished summary
+            # Determine User 1 vs User 2 based on who started coaching first (earliest turn)
+            first_turn = db.query(Turn).filter(
+                Turn.room_id == room_id,
+                Turn.context == "pre_mediation"
+            ).order_by(Turn.created_at.asc()).first()
+
+            is_user1 = (first_turn and first_turn.user_id == current_user.id)
+            if is_user1:
+                room.user1_summary = result["polished_summary"]
+            else:
+                room.user2_summary = result["polished_summary"]
+        else:
+            # Save next AI question with cost tracking
+            ai_turn = Turn(
+                room_id=room_id,
+                user_id=current_user.id,
+                kind="ai_question",
+                summary=result["ai_question"],
+                context="pre_mediation",
+                tags=["coaching"],
+                input_tokens=result.get("input_tokens", 0),
+                output_tokens=result.get("output_tokens", 0),
+                cost_usd=result.get("cost_usd", 0.0),
+                model=result.get("model")
+            )
+            db.add(ai_turn)
+
+        db.commit()
+
+    await run_in_threadpool(save)
+
     return CoachingResponseOut(
         ai_question=result.get("ai_question"),
         ready_to_finalize=result.get("ready_to_finalize", False),
@@ -859,6 +960,7 @@ def finalize_coaching(
         
         # Update phase
         room.phase = "user2_lobby"
+        record_event(db, current_user.id, "coaching_complete")
         db.commit()
 
         # Return invite link (frontend URL)
@@ -885,6 +987,7 @@ def finalize_coaching(
             )
 
         room.phase = "main_room"
+        record_event(db, current_user.id, "coaching_complete")
         db.commit()
 
         return FinalizeCoachingResponse(
@@ -1004,88 +1107,97 @@ def get_main_room_summaries(
 
 
 @router.post("/{room_id}/main-room/start", response_model=MainRoomStartResponse)
-def start_main_room_session(
+async def start_main_room_session(
     room_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Start the main room mediation session (idempotent - safe to call multiple times)."""
-    try:
-        # Lock the room row to prevent race condition when both users enter simultaneously
-        room = db.query(Room).filter(Room.id == room_id).with_for_update().first()
-        if not room:
-            raise HTTPException(status_code=404, detail="Room not found")
+    # Queries and commits run in the threadpool; only the Claude call is awaited on the loop
+    def load():
+        """(existing_response, room, user1, user2) - existing_response is set when the session already started."""
+        try:
+            # Lock the room row to prevent race condition when both users enter simultaneously
+            room = db.query(Room).filter(Room.id == room_id).with_for_update().first()
+            if not room:
+                raise HTTPException(status_code=404, detail="Room not found")
 
-        if room.phase not in ["main_room", "resolved"]:
-            raise HTTPException(status_code=400, detail="Not ready for main room")
-    except HTTPException:
-        raise
-    except Exception as e:
-        import traceback
-        error_detail = f"Database query failed in start_main_room: {str(e)}\n{traceback.format_exc()}"
-        print(error_detail)
-        raise HTTPException(status_code=500, detail=error_detail)
+            if room.phase not in ["main_room", "resolved"]:
+                raise HTTPException(status_code=400, detail="Not ready for main room")
+        except HTTPException:
+            raise
+        except Exception as e:
+            import traceback
+            error_detail = f"Database query failed in start_main_room: {str(e)}\n{traceback.format_exc()}"
+            print(error_detail)
+            raise HTTPException(status_code=500, detail=error_detail)
 
-    try:
-        participants = room.participants
+        try:
+            participants = room.participants
 
-        # CRITICAL: Determine user1/user2 by who initiated (has pre_mediation turns first)
-        # Find the earliest pre_mediation turn to determine who started coaching first
-        first_turn = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "pre_mediation"
-        ).order_by(Turn.created_at.asc()).first()
+            # CRITICAL: Determine user1/user2 by who initiated (has pre_mediation turns first)
+            # Find the earliest pre_mediation turn to determine who started coaching first
+            first_turn = db.query(Turn).filter(
+                Turn.room_id == room_id,
+                Turn.context == "pre_mediation"
+            ).order_by(Turn.created_at.asc()).first()
 
-        if not first_turn:
-            # Fallback if no coaching history
-            user1 = participants[0]
-            user2 = participants[1]
-        else:
-            # User who created the first turn is User 1
-            user1_id = first_turn.user_id
-            user1 = next((p for p in participants if p.id == user1_id), participants[0])
-            user2 = next((p for p in participants if p.id != user1_id), participants[1])
-    except Exception as e:
-        import traceback
-        error_detail = f"Failed to determine user1/user2: {str(e)}\n{traceback.format_exc()}"
-        print(error_detail)
-        raise HTTPException(status_code=500, detail=error_detail)
+            if not first_turn:
+                # Fallback if no coaching history
+                user1 = participants[0]
+                user2 = participants[1]
+            else:
+                # User who created the first turn is User 1
+                user1_id = first_turn.user_id
+                user1 = next((p for p in participants if p.id == user1_id), participants[0])
+                user2 = next((p for p in participants if p.id != user1_id), participants[1])
+        except Exception as e:
+            import traceback
+            error_detail = f"Failed to determine user1/user2: {str(e)}\n{traceback.format_exc()}"
+            print(error_detail)
+            raise HTTPException(status_code=500, detail=error_detail)
 
-    try:
-        # Check if conversation already started (CRITICAL: prevents duplicates when both users enter)
-        # Query inside the locked transaction to prevent race condition
-        existing_turns = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "main",
-            Turn.kind == "ai_question",
-            cast(Turn.tags, String).like('%main_room_start%')  # PostgreSQL-compatible JSON query
-        ).order_by(Turn.created_at.asc()).all()
-    except Exception as e:
-        import traceback
-        error_detail = f"Failed to query existing turns: {str(e)}\n{traceback.format_exc()}"
-        print(error_detail)
-        raise HTTPException(status_code=500, detail=error_detail)
+        try:
+            # Check if conversation already started (CRITICAL: prevents duplicates when both users enter)
+            # Query inside the locked transaction to prevent race condition
+            existing_turns = db.query(Turn).filter(
+                Turn.room_id == room_id,
+                Turn.context == "main",
+                Turn.kind == "ai_question",
+                cast(Turn.tags, String).like('%main_room_start%')  # PostgreSQL-compatible JSON query
+            ).order_by(Turn.created_at.asc()).all()
+        except Exception as e:
+            import traceback
+            error_detail = f"Failed to query existing turns: {str(e)}\n{traceback.format_exc()}"
+            print(error_detail)
+            raise HTTPException(status_code=500, detail=error_detail)
+
+        if existing_turns:
+            # Already started - return existing state
+            opening = next((t for t in existing_turns if t.kind == "ai_question"), None)
+            if opening:
+                # Determine current speaker based on conversation history
+                user_responses = [t for t in existing_turns if t.kind == "user_response"]
+                if not user_responses:
+                    # No responses yet, user1 should start
+                    current_speaker = user1.id
+                else:
+                    # Alternate: last responder was user X, so now it's the other user's turn
+                    last_responder = user_responses[-1].user_id
+                    current_speaker = user2.id if last_responder == user1.id else user1.id
+
+                return MainRoomStartResponse(
+                    opening_message=opening.summary,
+                    current_speaker_id=current_speaker,
+                    next_turn="user1" if current_speaker == user1.id else "user2"
+                ), room, user1, user2
+
+        return None, room, user1, user2
+
+    existing_response, room, user1, user2 = await run_in_threadpool(load)
+    if existing_response is not None:
+        return existing_response
 
-    if existing_turns:
-        # Already started - return existing state
-        opening = next((t for t in existing_turns if t.kind == "ai_question"), None)
-        if opening:
-            # Determine current speaker based on conversation history
-            user_responses = [t for t in existing_turns if t.kind == "user_response"]
-            if not user_responses:
-                # No responses yet, user1 should start
-                current_speaker = user1.id
-            else:
-                # Alternate: last responder was user X, so now it's the other user's turn
-                last_responder = user_responses[-1].user_id
-                current_speaker = user2.id if last_responder == user1.id else user1.id
-            
-            return MainRoomStartResponse(
-                opening_message=opening.summary,
-                current_speaker_id=current_speaker,
-                next_turn="user1" if current_speaker == user1.id else "user2"
-            )
-    
     # Generate opening for first time
     # Clean names in summaries (replace "dave dave" -> "dave", etc.)
     try:
@@ -1106,7 +1218,7 @@ def start_main_room_session(
 
     # Pass summaries directly to AI - no placeholder replacement needed
     try:
-        result = start_main_room(
+        result = await start_main_room(
             room.user1_summary,
             room.user2_summary,
             user1_clean_name,
@@ -1118,156 +1230,342 @@ def start_main_room_session(
         error_detail = f"AI service (start_main_room) failed - check ANTHROPIC_API_KEY: {str(e)}\n{traceback.format_exc()}"
         print(error_detail)
         raise HTTPException(status_code=500, detail=error_detail)
-    
-    # Save opening message (only once)
-    # Double-check one more time before creating to handle race condition
-    try:
-        final_check = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "main",
-            Turn.kind == "ai_question"
-        ).first()
-
-        if final_check:
-            # Another request beat us to it - return that opening message
-            return MainRoomStartResponse(
-                opening_message=final_check.summary,
-                current_speaker_id=user1.id,
-                next_turn="user1"
-            )
-
-        opening_turn = Turn(
-            room_id=room_id,
-            user_id=user1.id,  # Use user1.id not current_user (for consistency)
-            kind="ai_question",
-            summary=result["opening_message"],
-            context="main",
-            tags=["main_room_start"]
-        )
-        db.add(opening_turn)
-        db.commit()
-    except Exception as e:
-        import traceback
-        db.rollback()
-        error_detail = f"Failed to save opening turn (check if attachment/solo columns exist): {str(e)}\n{traceback.format_exc()}"
-        print(error_detail)
-        raise HTTPException(status_code=500, detail=error_detail)
 
     # ALWAYS user1 (who initiated) speaks first
     first_speaker_id = user1.id
 
-    return MainRoomStartResponse(
-        opening_message=result["opening_message"],
-        current_speaker_id=first_speaker_id,
-        next_turn="user1" if result["first_speaker"] == "user1" else "user2"
-    )
+    def save() -> MainRoomStartResponse:
+        # Save opening message (only once)
+        # Double-check one more time before creating to handle race condition
+        try:
+            final_check = db.query(Turn).filter(
+                Turn.room_id == room_id,
+                Turn.context == "main",
+                Turn.kind == "ai_question"
+            ).first()
+
+            if final_check:
+                # Another request beat us to it - return that opening message
+                return MainRoomStartResponse(
+                    opening_message=final_check.summary,
+                    current_speaker_id=first_speaker_id,
+                    next_turn="user1"
+                )
+
+            opening_turn = Turn(
+                room_id=room_id,
+                user_id=first_speaker_id,  # Use user1.id not current_user (for consistency)
+                kind="ai_question",
+                summary=result["opening_message"],
+                context="main",
+                tags=["main_room_start"]
+            )
+            db.add(opening_turn)
+            db.commit()
+        except Exception as e:
+            import traceback
+            db.rollback()
+            error_detail = f"Failed to save opening turn (check if attachment/solo columns exist): {str(e)}\n{traceback.format_exc()}"
+            print(error_detail)
+            raise HTTPException(status_code=500, detail=error_detail)
+
+        _publish_exchange(room, [opening_turn], first_speaker_id, user1_clean_name)
+
+        return MainRoomStartResponse(
+            opening_message=result["opening_message"],
+            current_speaker_id=first_speaker_id,
+            next_turn="user1" if result["first_speaker"] == "user1" else "user2"
+        )
 
+    return await run_in_threadpool(save)
 
-@router.post("/{room_id}/main-room/respond", response_model=MainRoomRespondResponse)
-def respond_main_room(
-    room_id: int,
-    payload: MainRoomRespondRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """User responds in main room, AI guides conversation."""
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
 
-    # Get conversation history from main room
-    turns = db.query(Turn).filter(
-        Turn.room_id == room_id,
-        Turn.context == "main"
-    ).order_by(Turn.created_at.asc()).all()
+def _clean_duplicate_names(text: str, users: List[User]) -> str:
+    """Replace duplicated full names (e.g. "dave dave") with the clean first name."""
+    for user in users:
+        if user.name and ' ' in user.name:
+            words = user.name.split()
+            if len(words) >= 2 and words[0].lower() == words[1].lower():
+                clean = clean_user_name(user)
+                text = text.replace(user.name, clean)
+                text = text.replace(user.name.lower(), clean.lower())
+                text = text.replace(user.name.title(), clean.title())
+    return text
 
-    # Get user names FIRST (need them for building history)
-    participants = room.participants
-    user1 = participants[0]
-    user2 = participants[1]
 
-    current_user_name = clean_user_name(current_user)
-    other_user = user2 if current_user.id == user1.id else user1
-    other_user_name = clean_user_name(other_user)
+def _main_room_history(db: Session, room_id: int, user1: User, user2: User):
+    """
+    Build the Claude conversation history for the main room.
+
+    Already-cleaned messages are cached per room (see conversation_cache), so
+    only turns created since the last call are loaded and sanitized. The first
+    name of whoever wrote each user message is kept alongside it (speakers).
+
+    Turn ids aren't committed in order: a lower id can commit after a higher one
+    was cached, and "id > last_turn_id" would then skip it for good. So the cached
+    entry is first checked against the number of turns the database now has up to
+    last_turn_id, and rebuilt when they differ (also catches deleted turns).
+
+    Returns:
+        RoomHistory snapshot (messages, turn_ids, exchange_count)
+    """
+    history = conversation_cache.get(room_id)
+
+    rebuilt = False
+    if history.last_turn_id:
+        covered = db.query(func.count(Turn.id)).filter(
+            Turn.room_id == room_id,
+            Turn.context == "main",
+            Turn.id <= history.last_turn_id
+        ).scalar()
+        if covered != len(history.turn_ids):
+            print(f"[ConversationCache] Room {room_id}: cached {len(history.turn_ids)} turns, database has {covered} - rebuilding")
+            history = conversation_cache.RoomHistory()
+            rebuilt = True
+
+    new_turns = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.context == "main",
+        Turn.id > history.last_turn_id
+    ).order_by(Turn.id.asc()).all()
 
     # Build conversation for Claude with speaker names for ALL messages
     # IMPORTANT: Clean ALL instances of duplicate names (like "dave dave" -> "dave")
-    user1_clean = clean_user_name(user1)
-    user2_clean = clean_user_name(user2)
+    for turn in new_turns:
+        if turn.kind == "ai_question":
+            # Clean AI responses too (they might contain "dave dave" from previous turns)
+            ai_content = _clean_duplicate_names(turn.summary, [user1, user2])
+            history.messages.append({"role": "assistant", "content": ai_content})
+            history.speakers.append(None)
+        else:
+            # Include user response without any placeholder
+            history.messages.append({"role": "user", "content": turn.summary})
+            speaker = user1 if turn.user_id == user1.id else user2
+            history.speakers.append(clean_user_name(speaker))
+            if turn.kind == "user_response":
+                history.exchange_count += 1
+        history.turn_ids.append(turn.id)
+        history.last_turn_id = turn.id
+
+    if new_turns or rebuilt:
+        conversation_cache.store(room_id, history, replace=rebuilt)
+
+    return history
+
+
+async def _fit_context_window(
+    db: Session,
+    room: Room,
+    scope: str,
+    messages: List[dict],
+    turn_ids: List[int],
+    model: str,
+    user_id: int,
+    speakers: Optional[List[Optional[str]]] = None
+):
+    """
+    Trim a conversation to the model's token budget (see context_window).
+    Older turns are folded into a rolling summary persisted on room.context_summaries[scope].
+    The summary is saved in the threadpool; the commit expires loaded instances.
+
+    Returns:
+        (conversation_history, earlier_summary)
+    """
+    room_id = room.id
+    state = (room.context_summaries or {}).get(scope)
+    history, new_state, usage = await fit_history(messages, turn_ids, state, model, speakers)
+
+    if new_state and new_state != state:
+        def save():
+            # Reassign so SQLAlchemy notices the JSON change
+            room.context_summaries = {**(room.context_summaries or {}), scope: new_state}
+            db.commit()
+
+            if usage:
+                track_api_cost(
+                    db=db,
+                    user_id=user_id,
+                    service_type="anthropic",
+                    cost_usd=usage.get("cost_usd", 0.0),
+                    room_id=room_id,
+                    input_tokens=usage.get("input_tokens", 0),
+                    output_tokens=usage.get("output_tokens", 0),
+                    model=usage.get("model"),
+                    cache_read_tokens=usage.get("cache_read_tokens", 0),
+                    cache_write_tokens=usage.get("cache_write_tokens", 0)
+                )
+
+        await run_in_threadpool(save)
+
+    return history, (new_state or {}).get("summary")
+
+
+async def _main_room_context(
+    db: Session,
+    room: Room,
+    user1: User,
+    user2: User,
+    current_user: User,
+    speaker_prefix: bool = False
+):
+    """
+    Main room history trimmed to the token budget.
+    With speaker_prefix, user messages read "Name: message" so Claude knows who's talking.
+
+    Returns:
+        (conversation_history, exchange_count, earlier_summary)
+    """
+    history = await run_in_threadpool(_main_room_history, db, room.id, user1, user2)
+    messages = history.messages
+    if speaker_prefix:
+        messages = [
+            {**message, "content": f"{speaker}: {message['content']}"} if speaker else message
+            for message, speaker in zip(history.messages, history.speakers)
+        ]
+    conversation_history, earlier_summary = await _fit_context_window(
+        db, room, "main", messages, history.turn_ids, MAIN_ROOM_MODEL, current_user.id, history.speakers
+    )
+    return conversation_history, history.exchange_count, earlier_summary
+
+
+async def _coaching_context(db: Session, room: Room, current_user: User):
+    """
+    Current user's pre-mediation coaching history trimmed to the token budget.
+
+    Returns:
+        (conversation_history, exchange_count, earlier_summary)
+    """
+    turns = await run_in_threadpool(
+        lambda: db.query(Turn).filter(
+            Turn.room_id == room.id,
+            Turn.user_id == current_user.id,
+            Turn.context == "pre_mediation"
+        ).order_by(Turn.created_at.asc()).all()
+    )
 
+    # Build conversation for Claude
     conversation_history = []
     for turn in turns:
         if turn.kind == "ai_question":
-            # Clean AI responses too (they might contain "dave dave" from previous turns)
-            ai_content = turn.summary
-
-            # Replace any instances of full duplicate names with clean first name
-            if user1.name and ' ' in user1.name:
-                words = user1.name.split()
-                if len(words) >= 2 and words[0].lower() == words[1].lower():
-                    ai_content = ai_content.replace(user1.name, user1_clean)
-                    ai_content = ai_content.replace(user1.name.lower(), user1_clean.lower())
-                    ai_content = ai_content.replace(user1.name.title(), user1_clean.title())
-
-            if user2.name and ' ' in user2.name:
-                words = user2.name.split()
-                if len(words) >= 2 and words[0].lower() == words[1].lower():
-                    ai_content = ai_content.replace(user2.name, user2_clean)
-                    ai_content = ai_content.replace(user2.name.lower(), user2_clean.lower())
-                    ai_content = ai_content.replace(user2.name.title(), user2_clean.title())
-
-            conversation_history.append({"role": "assistant", "content": ai_content})
+            conversation_history.append({"role": "assistant", "content": turn.summary})
         else:
-            # Include user response without any placeholder
             conversation_history.append({"role": "user", "content": turn.summary})
-    
+
     exchange_count = len([t for t in turns if t.kind == "user_response"])
+    user_name = clean_user_name(current_user)
 
-    # Get breathing break count
-    breathing_break_count = room.breathing_break_count or 0
+    conversation_history, earlier_summary = await _fit_context_window(
+        db, room, f"coaching:{current_user.id}", conversation_history,
+        [t.id for t in turns], COACH_MODEL, current_user.id,
+        [None if t.kind == "ai_question" else user_name for t in turns]
+    )
+    return conversation_history, exchange_count, earlier_summary
 
-    # Process response with strict turn-by-turn and breathing break support
-    result = process_main_room_response(
-        conversation_history,
-        payload.message,
-        current_user_name,  # Pass actual first name
-        other_user_name,    # Pass actual first name
-        exchange_count,
-        0,  # consecutive_count not used anymore
-        breathing_break_count
+
+def _main_room_users(db: Session, room: Room):
+    """
+    (user1, user2) for a mediation room - User 1 is whoever started coaching first,
+    not participants[0] (participants are ordered by id).
+    """
+    participants = room.participants
+    first_turn = db.query(Turn).filter(
+        Turn.room_id == room.id,
+        Turn.context == "pre_mediation"
+    ).order_by(Turn.created_at.asc()).first()
+
+    user1_id = first_turn.user_id if first_turn else participants[0].id
+    user1 = next((p for p in participants if p.id == user1_id), participants[0])
+    user2 = next((p for p in participants if p.id != user1.id), participants[1])
+    return user1, user2
+
+
+def _main_room_session_context(db: Session, room: Room) -> Optional[str]:
+    """Both NVC summaries for the cached system block (User 1 = whoever started coaching first)."""
+    if not room.user1_summary or not room.user2_summary:
+        return None
+
+    user1, user2 = _main_room_users(db, room)
+    return format_session_context(
+        clean_user_name(user1), room.user1_summary,
+        clean_user_name(user2), room.user2_summary
     )
 
-    # SAFETY NET: Clean AI response in case it still generated duplicate names
-    if result.get("ai_response"):
-        ai_response_cleaned = result["ai_response"]
 
-        # Replace any duplicate name patterns
-        if user1.name and ' ' in user1.name:
-            words = user1.name.split()
-            if len(words) >= 2 and words[0].lower() == words[1].lower():
-                ai_response_cleaned = ai_response_cleaned.replace(user1.name, user1_clean)
-                ai_response_cleaned = ai_response_cleaned.replace(user1.name.lower(), user1_clean.lower())
-                ai_response_cleaned = ai_response_cleaned.replace(user1.name.title(), user1_clean.title())
+def _publish_exchange(
+    room: Room,
+    turns: List[Optional[Turn]],
+    next_speaker_id: Optional[int],
+    addressed_user_name: Optional[str] = None
+):
+    """Push a saved main room exchange (new turns + speaker change or resolution) to the room's sockets."""
+    for turn in turns:
+        if turn is not None:
+            room_events.publish(room.id, "turn", turn_id=turn.id, message=_main_room_message(turn))
 
-        if user2.name and ' ' in user2.name:
-            words = user2.name.split()
-            if len(words) >= 2 and words[0].lower() == words[1].lower():
-                ai_response_cleaned = ai_response_cleaned.replace(user2.name, user2_clean)
-                ai_response_cleaned = ai_response_cleaned.replace(user2.name.lower(), user2_clean.lower())
-                ai_response_cleaned = ai_response_cleaned.replace(user2.name.title(), user2_clean.title())
+    if room.phase == "resolved":
+        room_events.publish(room.id, "resolved", resolution=room.resolution_text)
+    else:
+        room_events.publish(
+            room.id, "speaker",
+            current_speaker_id=next_speaker_id,
+            addressed_user_name=addressed_user_name
+        )
 
-        result["ai_response"] = ai_response_cleaned
 
-    # Save user message
+def _save_main_room_user_turn(db: Session, room_id: int, current_user: User, message: str) -> Turn:
+    """Save and publish the user's main room message (the streaming endpoint does this before calling Claude)."""
     user_turn = Turn(
         room_id=room_id,
         user_id=current_user.id,
         kind="user_response",
-        summary=payload.message,
+        summary=message,
         context="main",
         tags=["main_room"]
     )
     db.add(user_turn)
+    record_event(db, current_user.id, "message")
+    db.commit()
+
+    room_events.publish(room_id, "turn", turn_id=user_turn.id, message=_main_room_message(user_turn))
+    return user_turn
+
+
+def _save_main_room_result(
+    db: Session,
+    room: Room,
+    current_user: User,
+    user1: User,
+    user2: User,
+    message: str,
+    result: dict,
+    user_turn_saved: bool = False
+) -> MainRoomRespondResponse:
+    """
+    Persist a main room exchange (user turn, AI turn/resolution, cost) and build the API response.
+    With user_turn_saved, the user's message was already saved by _save_main_room_user_turn.
+    """
+    room_id = room.id
+    current_user_name = clean_user_name(current_user)
+    other_user = user2 if current_user.id == user1.id else user1
+    other_user_name = clean_user_name(other_user)
+
+    # SAFETY NET: Clean AI response in case it still generated duplicate names
+    if result.get("ai_response"):
+        result["ai_response"] = _clean_duplicate_names(result["ai_response"], [user1, user2])
+
+    # Save user message
+    user_turn = None
+    if not user_turn_saved:
+        user_turn = Turn(
+            room_id=room_id,
+            user_id=current_user.id,
+            kind="user_response",
+            summary=message,
+            context="main",
+            tags=["main_room"]
+        )
+        db.add(user_turn)
+        record_event(db, current_user.id, "message")
 
     # Handle breathing break
     if result.get("breathing_break"):
@@ -1276,6 +1574,10 @@ def respond_main_room(
         room.last_breathing_break_at = func.now()
         db.commit()
 
+        if user_turn is not None:
+            room_events.publish(room_id, "turn", turn_id=user_turn.id, message=_main_room_message(user_turn))
+        room_events.publish(room_id, "breathing_break", count=room.breathing_break_count)
+
         # Return breathing break response (don't save as turn - only show in modal)
         return MainRoomRespondResponse(
             ai_response=result["ai_response"],
@@ -1288,8 +1590,9 @@ def respond_main_room(
         )
 
     # Save AI response or resolution
+    ai_turn = None
     if result.get("resolution"):
-        resolution_turn = Turn(
+        ai_turn = Turn(
             room_id=room_id,
             user_id=current_user.id,
             kind="resolution",
@@ -1301,7 +1604,7 @@ def respond_main_room(
             cost_usd=result.get("cost_usd", 0.0),
             model=result.get("model")
         )
-        db.add(resolution_turn)
+        db.add(ai_turn)
         room.phase = "resolved"
         room.resolution_text = result["resolution"]
         room.resolved_at = func.now()
@@ -1333,7 +1636,7 @@ def respond_main_room(
                     # Update challenge progress
                     update_challenge_progress_internal(db, user.id, "resolution")
                     # Check for achievements
-                    check_and_award_achievements(db, user.id)
+                    record_event(db, user.id, "resolution", progress=progress, room=room)
                 except Exception as e:
                     print(f"Error awarding gamification points to user {user.id}: {e}")
     elif result.get("ai_response"):
@@ -1353,6 +1656,22 @@ def respond_main_room(
 
     db.commit()
 
+    # Track Anthropic cost against the AI turn
+    if ai_turn is not None and result.get("cost_usd"):
+        track_api_cost(
+            db=db,
+            user_id=current_user.id,
+            service_type="anthropic",
+            cost_usd=result.get("cost_usd", 0.0),
+            room_id=room_id,
+            turn_id=ai_turn.id,
+            input_tokens=result.get("input_tokens", 0),
+            output_tokens=result.get("output_tokens", 0),
+            model=result.get("model"),
+            cache_read_tokens=result.get("cache_read_tokens", 0),
+            cache_write_tokens=result.get("cache_write_tokens", 0)
+        )
+
     # Respect AI's next_speaker decision (SAME or OTHER)
     if result.get("next_speaker") == "SAME":
         # AI wants to ask current speaker a follow-up question
@@ -1379,6 +1698,8 @@ def respond_main_room(
         next_speaker_id = None
         addressed_user_name = None
 
+    _publish_exchange(room, [user_turn, ai_turn], next_speaker_id, addressed_user_name)
+
     # Send email notification to next speaker (if they're not the current user)
     if next_speaker_id and next_speaker_id != current_user.id:
         next_speaker = other_user  # We already determined this above
@@ -1401,6 +1722,189 @@ def respond_main_room(
         session_complete=result.get("session_complete", False)
     )
 
+
+@router.post("/{room_id}/main-room/respond", response_model=MainRoomRespondResponse)
+async def respond_main_room(
+    room_id: int,
+    payload: MainRoomRespondRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """User responds in main room, AI guides conversation."""
+    def load():
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        participants = room.participants
+        return room, participants[0], participants[1], room.breathing_break_count or 0, _main_room_session_context(db, room)
+
+    # Get user names FIRST (need them for building history)
+    room, user1, user2, breathing_break_count, session_context = await run_in_threadpool(load)
+
+    current_user_name = clean_user_name(current_user)
+    other_user = user2 if current_user.id == user1.id else user1
+    other_user_name = clean_user_name(other_user)
+
+    # Get conversation history from main room (older turns folded into a rolling summary)
+    conversation_history, exchange_count, earlier_summary = await _main_room_context(
+        db, room, user1, user2, current_user
+    )
+
+    # Process response with strict turn-by-turn and breathing break support
+    result = await process_main_room_response(
+        conversation_history,
+        payload.message,
+        current_user_name,  # Pass actual first name
+        other_user_name,    # Pass actual first name
+        exchange_count,
+        0,  # consecutive_count not used anymore
+        breathing_break_count,
+        session_context=session_context,
+        earlier_summary=earlier_summary
+    )
+
+    # Saving awards gamification points and sends emails - keep that off the event loop
+    return await run_in_threadpool(
+        _save_main_room_result, db, room, current_user, user1, user2, payload.message, result
+    )
+
+
+# Streamed main room exchanges still running (the loop only holds tasks weakly)
+_stream_exchanges: Set[asyncio.Task] = set()
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/{room_id}/main-room/respond/stream")
+async def respond_main_room_stream(
+    room_id: int,
+    payload: MainRoomRespondRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streaming variant of /main-room/respond (Server-Sent Events).
+
+    Events:
+        mode  - {"mode": "message" | "breathing_break" | "resolution" | "halt"} once the reply type is known;
+                sent again with "replace": true if the finished reply turns out to be another type
+                (drop the streamed text and render "done" instead)
+        delta - {"text": "..."} as Claude's tokens arrive
+        done  - final MainRoomRespondResponse payload, sent after turns and costs are saved (authoritative)
+        error - {"detail": "..."} if the reply couldn't be generated or saved
+
+    The user's message is saved before Claude is called, and the reply is saved even if the client
+    disconnects mid-stream.
+    """
+    def load():
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+
+        if current_user not in room.participants:
+            raise HTTPException(status_code=403, detail="Not a participant")
+
+        return room, list(room.participants), room.breathing_break_count or 0, _main_room_session_context(db, room)
+
+    room, participants, breathing_break_count, session_context = await run_in_threadpool(load)
+    user1_id = participants[0].id
+    user2_id = participants[1].id
+    current_user_id = current_user.id
+
+    current_user_name = clean_user_name(current_user)
+    other_user = participants[1] if current_user.id == user1_id else participants[0]
+    other_user_name = clean_user_name(other_user)
+
+    conversation_history, exchange_count, earlier_summary = await _main_room_context(
+        db, room, participants[0], participants[1], current_user
+    )
+
+    # Save the user's message up front so it isn't lost if the client disconnects mid-stream
+    await run_in_threadpool(_save_main_room_user_turn, db, room_id, current_user, payload.message)
+
+    def persist(result: dict) -> dict:
+        # The request-scoped session may already be closed once streaming starts,
+        # so persist the finished exchange on a session of our own
+        stream_db = SessionLocal()
+        try:
+            stream_room = stream_db.query(Room).filter(Room.id == room_id).first()
+            users = {u.id: u for u in stream_room.participants}
+            response = _save_main_room_result(
+                stream_db,
+                stream_room,
+                users[current_user_id],
+                users[user1_id],
+                users[user2_id],
+                payload.message,
+                result,
+                user_turn_saved=True
+            )
+            return response.model_dump()
+        except Exception:
+            stream_db.rollback()
+            raise
+        finally:
+            stream_db.close()
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run_exchange():
+        # Runs as its own task so a client disconnect (which closes event_stream) can't stop
+        # the reply and its turns/cost from being saved - Claude bills the tokens either way
+        result = None
+        try:
+            async for event in stream_main_room_response(
+                conversation_history,
+                payload.message,
+                current_user_name,
+                other_user_name,
+                exchange_count,
+                breathing_break_count,
+                session_context=session_context,
+                earlier_summary=earlier_summary
+            ):
+                if event["type"] == "done":
+                    result = event["result"]
+                else:
+                    events.put_nowait(event)
+        except Exception as e:
+            print(f"Main room stream error: {e}")
+            events.put_nowait({"type": "error", "detail": "Failed to generate response"})
+            return
+
+        try:
+            events.put_nowait({"type": "done", "response": await run_in_threadpool(persist, result)})
+        except Exception as e:
+            print(f"Main room stream persist error: {e}")
+            events.put_nowait({"type": "error", "detail": "Failed to save response"})
+
+    exchange = asyncio.create_task(run_exchange())
+    _stream_exchanges.add(exchange)
+    exchange.add_done_callback(_stream_exchanges.discard)
+
+    async def event_stream():
+        while True:
+            event = await events.get()
+            if event["type"] == "done":
+                yield _sse("done", event["response"])
+                return
+            if event["type"] == "error":
+                yield _sse("error", {"detail": event["detail"]})
+                return
+            if event["type"] == "mode":
+                yield _sse("mode", {key: value for key, value in event.items() if key != "type"})
+            else:
+                yield _sse("delta", {"text": event["text"]})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/", response_model=list)
 def list_my_rooms(
     db: Session = Depends(get_db),
@@ -1460,26 +1964,89 @@ def get_my_sessions(
 
     return {"rooms": result}
 
+def _main_room_message(turn: Turn) -> dict:
+    """Client-facing main room message for a turn (same shape for polling and room events)."""
+    if turn.kind == "ai_question":
+        return {
+            "id": turn.id,
+            "role": "assistant",
+            "content": turn.summary
+        }
+    if turn.kind == "resolution":
+        return {
+            "id": turn.id,
+            "role": "resolution",
+            "content": turn.summary
+        }
+
+    msg = {
+        "id": turn.id,
+        "role": "user",
+        "content": turn.summary,
+        "userId": turn.user_id
+    }
+    # Include audio URL if this was a voice message
+    if turn.audio_url:
+        msg["audioUrl"] = turn.audio_url
+    # Include attachment info if this message has a file
+    if turn.attachment_url:
+        msg["attachmentUrl"] = turn.attachment_url
+        msg["attachmentFilename"] = turn.attachment_filename
+    return msg
+
+
+def _break_info(db: Session, room: Room) -> Optional[dict]:
+    """Current breathing break request for a room, or None."""
+    if not room.break_requested_by_id:
+        return None
+    break_requester = db.query(User).filter(User.id == room.break_requested_by_id).first()
+    if not break_requester:
+        return None
+    return {
+        "requested_by_id": room.break_requested_by_id,
+        "requested_by_name": break_requester.name,
+        "requested_at": room.break_requested_at.isoformat() if room.break_requested_at else None
+    }
+
+
 @router.get("/{room_id}/main-room/messages")
 def get_main_room_messages(
     room_id: int,
+    response: Response,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
-    """Get all messages from main room conversation."""
+    """
+    Get all messages from main room conversation.
+    Pass since=<last_turn_id> to get only newer messages (recent ones may repeat - dedupe by id); send If-None-Match to get a 304 when nothing changed.
+    """
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
     # Check user is participant
-    if current_user not in room.participants:
+    if current_user.id not in {p.id for p in room.participants}:
         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    # Get all main room messages
-    turns = db.query(Turn).filter(
+
+    filters = [
         Turn.room_id == room_id,
         Turn.context == "main"
-    ).order_by(Turn.created_at.asc()).all()
+    ]
+    etag = _turns_etag(
+        db, filters, since, room.phase,
+        room.break_requested_by_id, str(room.break_requested_at)
+    )
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    _set_etag(response, etag)
+
+    # Get main room messages (only newer ones for a delta fetch)
+    turns = db.query(Turn).filter(
+        *filters,
+        *([_since_filter(db, since)] if since else [])
+    ).order_by(Turn.id.asc()).all()
     
     # CRITICAL: Determine user1/user2 by who has which summary, not participant order!
     # participants list is ordered by ID, not by who initiated
@@ -1503,56 +2070,27 @@ def get_main_room_messages(
         user1 = next((p for p in participants if p.id == user1_id), participants[0])
         user2 = next((p for p in participants if p.id != user1_id), participants[1])
     
-    messages = []
-    for turn in turns:
-        if turn.kind == "ai_question":
-            messages.append({
-                "role": "assistant",
-                "content": turn.summary
-            })
-        elif turn.kind == "resolution":
-            messages.append({
-                "role": "resolution",
-                "content": turn.summary
-            })
-        else:
-            msg = {
-                "role": "user",
-                "content": turn.summary,
-                "userId": turn.user_id
-            }
-            # Include audio URL if this was a voice message
-            if turn.audio_url:
-                msg["audioUrl"] = turn.audio_url
-            # Include attachment info if this message has a file
-            if turn.attachment_url:
-                msg["attachmentUrl"] = turn.attachment_url
-                msg["attachmentFilename"] = turn.attachment_filename
-            messages.append(msg)
+    messages = [_main_room_message(turn) for turn in turns]
     
-    # Determine current speaker (alternates)
-    user_messages = [t for t in turns if t.kind == "user_response"]
-    if not user_messages:
+    # Determine current speaker (alternates) - the last response may predate a delta fetch
+    last_user_message = db.query(Turn.user_id).filter(
+        *filters,
+        Turn.kind == "user_response"
+    ).order_by(Turn.id.desc()).first()
+    if not last_user_message:
         # No responses yet - user1 (initiator) goes first
         next_speaker_id = user1.id
     else:
         # Alternate: if last speaker was user1, now it's user2's turn
-        last_user_id = user_messages[-1].user_id
+        last_user_id = last_user_message.user_id
         next_speaker_id = user2.id if last_user_id == user1.id else user1.id
     
     # Include break information
-    break_info = None
-    if room.break_requested_by_id:
-        break_requester = db.query(User).filter(User.id == room.break_requested_by_id).first()
-        if break_requester:
-            break_info = {
-                "requested_by_id": room.break_requested_by_id,
-                "requested_by_name": break_requester.name,
-                "requested_at": room.break_requested_at.isoformat() if room.break_requested_at else None
-            }
+    break_info = _break_info(db, room)
 
     return {
         "messages": messages,
+        "last_turn_id": _next_cursor(turns, since),
         "current_speaker_id": next_speaker_id,
         "session_complete": room.phase == "resolved",
         "break_info": break_info
@@ -1578,6 +2116,9 @@ def request_break(
     room.break_requested_by_id = current_user.id
     room.break_requested_at = func.now()
     db.commit()
+    db.refresh(room)
+
+    room_events.publish(room_id, "break", break_info=_break_info(db, room))
 
     # Send email notification to other participant
     other_participant = next((p for p in room.participants if p.id != current_user.id), None)
@@ -1616,65 +2157,151 @@ def clear_break(
     room.break_requested_at = None
     db.commit()
 
+    room_events.publish(room_id, "break", break_info=None)
+
     return {"status": "break_cleared"}
 
 
+def _authorize_room_socket(room_id: int, token: str) -> Optional[int]:
+    """User id for a room socket connection, or None if the token/participant check fails."""
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db) if token else None
+        if not user:
+            return None
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room or user not in room.participants:
+            return None
+        return user.id
+    finally:
+        db.close()
+
+
+def _touch_main_room_presence(room_id: int, user_id: int):
+    """Update the user's last-seen timestamp (same fields get_main_room_summaries reports)."""
+    from datetime import datetime
+    db = SessionLocal()
+    try:
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room or len(room.participants) < 2:
+            return
+        user1, user2 = _main_room_users(db, room)
+        now = datetime.now()
+        if user_id == user1.id:
+            room.user1_last_seen_main_room = now
+        elif user_id == user2.id:
+            room.user2_last_seen_main_room = now
+        db.commit()
+    finally:
+        db.close()
+
+
+@router.websocket("/{room_id}/main-room/ws")
+async def main_room_socket(websocket: WebSocket, room_id: int, token: str = ""):
+    """
+    Push channel for the main room - replaces polling /main-room/messages.
+    Connect with ?token=<access token> (browsers can't set headers on WebSockets).
+
+    Server -> client JSON events (see services/room_events.py):
+        turn            - {"turn_id", "message"} same message shape as /main-room/messages
+        speaker         - {"current_speaker_id", "addressed_user_name"}
+        breathing_break - {"count"}
+        resolved        - {"resolution"}
+        break           - {"break_info"} (None when cleared)
+        presence        - {"user_id", "present"}
+
+    Anything the client sends (e.g. "ping") is treated as a keepalive and refreshes presence.
+    """
+    user_id = await run_in_threadpool(_authorize_room_socket, room_id, token)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+
+    async with room_events.subscribe(room_id) as queue:
+        await run_in_threadpool(_touch_main_room_presence, room_id, user_id)
+        room_events.publish(room_id, "presence", user_id=user_id, present=True)
+
+        async def send_events():
+            while True:
+                event = await queue.get()
+                await websocket.send_json(event)
+
+        async def receive_keepalives():
+            while True:
+                await websocket.receive_text()
+                await run_in_threadpool(_touch_main_room_presence, room_id, user_id)
+
+        room_events.connected(room_id, user_id)
+        tasks = [asyncio.create_task(send_events()), asyncio.create_task(receive_keepalives())]
+        try:
+            # Either side finishing means the socket is gone (disconnect or send failure)
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Other tabs of the same user keep them present
+            if room_events.disconnected(room_id, user_id):
+                room_events.publish(room_id, "presence", user_id=user_id, present=False)
+
+
 @router.get("/admin/costs")
 def get_cost_statistics(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get detailed cost statistics for all mediations."""
-    from sqlalchemy import func, text
-    
-    # Total costs
-    total_result = db.execute(
-        text("SELECT COALESCE(SUM(cost_usd), 0) as total_cost, COALESCE(SUM(input_tokens), 0) as total_input, COALESCE(SUM(output_tokens), 0) as total_output FROM turns WHERE cost_usd > 0")
-    ).first()
-    
+    """
+    Get detailed cost statistics for all mediations.
+    Reads the daily per-turn cost rollups (services/cost_rollups.py) instead of scanning turns.
+    """
+    from sqlalchemy import func
+    from app.models.subscription import CostRollup
+
+    rollups = db.query(CostRollup).filter(
+        CostRollup.source == "turns",
+        CostRollup.granularity == "day"
+    ).subquery()
+
+    # Total costs
+    total_result = db.query(
+        func.coalesce(func.sum(rollups.c.cost_usd), 0),
+        func.coalesce(func.sum(rollups.c.input_tokens), 0),
+        func.coalesce(func.sum(rollups.c.output_tokens), 0)
+    ).first()
+
     # Cost per room
-    room_costs = db.execute(text("""
-        SELECT 
-            r.id as room_id,
-            r.title,
-            r.phase,
-            COUNT(DISTINCT t.id) as ai_calls,
-            COALESCE(SUM(t.input_tokens), 0) as input_tokens,
-            COALESCE(SUM(t.output_tokens), 0) as output_tokens,
-            COALESCE(SUM(t.cost_usd), 0) as total_cost
-        FROM rooms r
-        LEFT JOIN turns t ON r.id = t.room_id AND t.cost_usd > 0
-        GROUP BY r.id, r.title, r.phase
-        HAVING COALESCE(SUM(t.cost_usd), 0) > 0
-        ORDER BY total_cost DESC
-        LIMIT 50
-    """)).fetchall()
-    
+    room_totals = db.query(
+        rollups.c.room_id,
+        func.sum(rollups.c.call_count).label("ai_calls"),
+        func.sum(rollups.c.input_tokens).label("input_tokens"),
+        func.sum(rollups.c.output_tokens).label("output_tokens"),
+        func.sum(rollups.c.cost_usd).label("total_cost")
+    ).group_by(rollups.c.room_id).subquery()
+
+    room_costs = db.query(
+        Room.id, Room.title, Room.phase,
+        room_totals.c.ai_calls, room_totals.c.input_tokens,
+        room_totals.c.output_tokens, room_totals.c.total_cost
+    ).join(room_totals, room_totals.c.room_id == Room.id).filter(
+        room_totals.c.total_cost > 0
+    ).order_by(room_totals.c.total_cost.desc()).limit(50).all()
+
     # Average cost by phase
-    phase_costs = db.execute(text("""
-        SELECT 
-            t.context as phase,
-            COUNT(*) as ai_calls,
-            AVG(t.cost_usd) as avg_cost,
-            SUM(t.cost_usd) as total_cost
-        FROM turns t
-        WHERE t.cost_usd > 0
-        GROUP BY t.context
-    """)).fetchall()
-    
+    phase_costs = db.query(
+        rollups.c.context,
+        func.sum(rollups.c.call_count),
+        func.sum(rollups.c.cost_usd)
+    ).group_by(rollups.c.context).all()
+
     # Cost per completed mediation
-    completed_rooms = db.execute(text("""
-        SELECT 
-            COUNT(*) as completed_count,
-            AVG(room_total) as avg_cost_per_mediation
-        FROM (
-            SELECT r.id, SUM(t.cost_usd) as room_total
-            FROM rooms r
-            JOIN turns t ON r.id = t.room_id
-            WHERE r.phase = 'resolved' AND t.cost_usd > 0
-            GROUP BY r.id
-        ) as room_costs
-    """)).first()
+    completed_rooms = db.query(
+        func.count(room_totals.c.room_id),
+        func.avg(room_totals.c.total_cost)
+    ).join(Room, Room.id == room_totals.c.room_id).filter(
+        Room.phase == "resolved"
+    ).first()
     
     return {
         "total_statistics": {
@@ -1691,8 +2318,8 @@ def get_cost_statistics(
             {
                 "phase": row[0],
                 "ai_calls": int(row[1]),
-                "avg_cost": float(row[2]),
-                "total_cost": float(row[3])
+                "avg_cost": float(row[2]) / int(row[1]) if row[1] else 0.0,
+                "total_cost": float(row[2])
             }
             for row in phase_costs
         ],
@@ -1774,30 +2401,29 @@ async def upload_evidence(
     current_user: User = Depends(get_current_user)
 ):
     """Upload evidence files (screenshots, documents) for AI review."""
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
+    def load():
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
 
-    # Check if user is participant
-    participant_ids = [p.id for p in room.participants]
-    if current_user.id not in participant_ids:
-        raise HTTPException(status_code=403, detail="Not a participant")
+        # Check if user is participant
+        participant_ids = [p.id for p in room.participants]
+        if current_user.id not in participant_ids:
+            raise HTTPException(status_code=403, detail="Not a participant")
+
+    await run_in_threadpool(load)
 
-    # Upload files to S3
-    from app.services.s3_service import upload_file_to_s3
+    # Stream files to S3
+    from app.services.s3_service import evidence_key, upload_fileobj_to_s3
 
     uploaded_files = []
     for file in files:
         try:
-            # Read file content
-            file_content = await file.read()
-
-            # Upload to S3
-            file_url = upload_file_to_s3(
-                file_content,
-                room_id,
-                current_user.id,
-                file.filename,
+            file_url = await blocking.run(
+                blocking.S3,
+                upload_fileobj_to_s3,
+                file.file,
+                evidence_key(room_id, current_user.id, file.filename),
                 file.content_type or "application/octet-stream"
             )
 
@@ -1815,6 +2441,43 @@ async def upload_evidence(
 
     return {"success": True, "files": uploaded_files}
 
+
+@router.post("/{room_id}/evidence/upload-url", response_model=DirectUploadResponse)
+def evidence_upload_url(
+    room_id: int,
+    payload: DirectUploadRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Presigned form for uploading one evidence file straight to S3 (confirm with evidence/complete)."""
+    _upload_room(db, room_id, current_user)
+    return _presign_room_upload(db, room_id, current_user, payload)
+
+
+@router.post("/{room_id}/evidence/complete")
+async def complete_evidence_upload(
+    room_id: int,
+    payload: DirectUploadComplete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Confirm a direct evidence upload. Returns the same shape as upload-evidence.
+    Nothing is stored, so confirming the same key again returns the same entry.
+    """
+    await run_in_threadpool(_upload_room, db, room_id, current_user)
+    uploaded = await _confirm_room_upload(db, room_id, current_user, payload.key)
+
+    print(f"Evidence uploaded: {uploaded['filename']} -> {uploaded['url']}")
+    return {
+        "success": True,
+        "files": [{
+            "filename": uploaded["filename"],
+            "url": uploaded["url"],
+            "content_type": uploaded["content_type"]
+        }]
+    }
+
 # ========================================
 # VOICE RECORDING ENDPOINTS
 # ========================================
@@ -1834,110 +2497,109 @@ async def voice_respond_coaching(
     # Check subscription access
     access = require_feature_access(subscription, "voice_recording")
 
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
+    def load():
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
 
-    # Check participant
-    if current_user not in room.participants:
-        raise HTTPException(status_code=403, detail="Not a participant")
+        # Check participant
+        if current_user not in room.participants:
+            raise HTTPException(status_code=403, detail="Not a participant")
+        return room
 
+    room = await run_in_threadpool(load)
+    user_id = current_user.id
+
+    timings = voice_pipeline.VoiceTurnTimings("coach_voice_respond", room_id=room_id, user_id=user_id)
     try:
         # Read audio file
-        audio_bytes = await audio.read()
-        audio_file = io.BytesIO(audio_bytes)
-
-        # Transcribe with Whisper
-        transcription_result = transcribe_audio(audio_file, audio.filename)
-        transcribed_text = transcription_result["text"]
-        audio_duration = transcription_result.get("duration", len(audio_bytes) / 16000)  # Estimate if not available
-
-        # Calculate and track Whisper cost
-        whisper_cost = calculate_whisper_cost(audio_duration)
-        track_api_cost(
-            db=db,
-            user_id=current_user.id,
-            service_type="openai_whisper",
-            cost_usd=whisper_cost,
-            room_id=room_id,
-            audio_seconds=audio_duration,
-            model="whisper-1"
-        )
-
-        # Get coaching conversation history
-        turns = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.user_id == current_user.id,
-            Turn.context == "pre_mediation"
-        ).order_by(Turn.created_at.asc()).all()
-
-        # Build conversation for Claude
-        conversation_history = []
-        for turn in turns:
-            if turn.kind == "ai_question":
-                conversation_history.append({"role": "assistant", "content": turn.summary})
-            else:
-                conversation_history.append({"role": "user", "content": turn.summary})
-
-        exchange_count = len([t for t in turns if t.kind == "user_response"])
-
-        # Process transcribed response through coaching
-        result = process_coaching_response(
-            conversation_history,
-            transcribed_text,
-            exchange_count
-        )
+        with timings.stage("read"):
+            audio_bytes = await audio.read()
 
-        # Upload audio to S3
-        from app.services.s3_service import upload_audio_to_s3
-        audio_url = upload_audio_to_s3(audio_bytes, room_id, current_user.id, audio.filename)
+        # Upload to S3, transcribe with Whisper and load the coaching history concurrently,
+        # then process the transcribed response through coaching
+        async def respond(transcribed_text, context):
+            conversation_history, exchange_count, earlier_summary = context
+            return await process_coaching_response(
+                conversation_history,
+                transcribed_text,
+                exchange_count,
+                earlier_summary=earlier_summary
+            )
 
-        # Save user response (with transcription note and audio URL)
-        user_turn = Turn(
-            room_id=room_id,
-            user_id=current_user.id,
-            kind="user_response",
-            summary=transcribed_text,
-            context="pre_mediation",
-            tags=["voice_recording"],
-            audio_url=audio_url
+        voice_turn = await voice_pipeline.run_voice_turn(
+            audio_bytes, audio.filename, room_id, user_id,
+            build_context=lambda: _coaching_context(db, room, current_user),
+            respond=respond,
+            timings=timings
         )
-        db.add(user_turn)
+        transcribed_text = voice_turn.text
+        result = voice_turn.result
+        audio_url = voice_turn.audio_url
+        exchange_count = result.get("exchange_count", 1) - 1
 
-        # Save AI response with cost tracking
-        if not result.get("ready_to_finalize"):
-            ai_turn = Turn(
-                room_id=room_id,
-                user_id=current_user.id,
-                kind="ai_question",
-                summary=result["ai_question"],
-                context="pre_mediation",
-                tags=["coaching"],
-                input_tokens=result.get("input_tokens", 0),
-                output_tokens=result.get("output_tokens", 0),
-                cost_usd=result.get("cost_usd", 0.0),
-                model=result.get("model")
-            )
-            db.add(ai_turn)
+        def save():
+            try:
+                # Save user response (with transcription note and audio URL)
+                user_turn = Turn(
+                    room_id=room_id,
+                    user_id=user_id,
+                    kind="user_response",
+                    summary=transcribed_text,
+                    context="pre_mediation",
+                    tags=["voice_recording"],
+                    audio_url=audio_url
+                )
+                db.add(user_turn)
+                record_event(db, user_id, "message", voice=True)
+
+                # Save AI response with cost tracking
+                if not result.get("ready_to_finalize"):
+                    ai_turn = Turn(
+                        room_id=room_id,
+                        user_id=user_id,
+                        kind="ai_question",
+                        summary=result["ai_question"],
+                        context="pre_mediation",
+                        tags=["coaching"],
+                        input_tokens=result.get("input_tokens", 0),
+                        output_tokens=result.get("output_tokens", 0),
+                        cost_usd=result.get("cost_usd", 0.0),
+                        model=result.get("model")
+                    )
+                    db.add(ai_turn)
+
+                    # Track Anthropic cost
+                    track_api_cost(
+                        db=db,
+                        user_id=user_id,
+                        service_type="anthropic",
+                        cost_usd=result.get("cost_usd", 0.0),
+                        room_id=room_id,
+                        turn_id=ai_turn.id,
+                        input_tokens=result.get("input_tokens", 0),
+                        output_tokens=result.get("output_tokens", 0),
+                        model=result.get("model"),
+                        cache_read_tokens=result.get("cache_read_tokens", 0),
+                        cache_write_tokens=result.get("cache_write_tokens", 0)
+                    )
 
-            # Track Anthropic cost
-            track_api_cost(
-                db=db,
-                user_id=current_user.id,
-                service_type="anthropic",
-                cost_usd=result.get("cost_usd", 0.0),
-                room_id=room_id,
-                turn_id=ai_turn.id,
-                input_tokens=result.get("input_tokens", 0),
-                output_tokens=result.get("output_tokens", 0),
-                model=result.get("model")
-            )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
 
-        db.commit()
+        try:
+            await run_in_threadpool(save)
+        except Exception:
+            # No turn references the recording - don't leave it in the bucket
+            await voice_pipeline.discard_audio(audio_url)
+            raise
 
         # Increment voice usage for free tier (if applicable)
         if access.get("is_trial"):
-            increment_voice_usage(db, current_user.id)
+            await run_in_threadpool(increment_voice_usage, db, user_id)
+        timings.finish()
 
         return CoachingResponseOut(
             ready_to_finalize=result.get("ready_to_finalize", False),
@@ -1949,6 +2611,7 @@ async def voice_respond_coaching(
 
     except Exception as e:
         print(f"Voice transcription error: {e}")
+        timings.finish(status="failed")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process voice recording: {str(e)}"
@@ -1970,126 +2633,56 @@ async def voice_respond_main_room(
     # Check subscription access
     access = require_feature_access(subscription, "voice_recording")
 
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-
-    if current_user not in room.participants:
-        raise HTTPException(status_code=403, detail="Not a participant")
-
-    try:
-        # Read and transcribe audio
-        audio_bytes = await audio.read()
-        audio_file = io.BytesIO(audio_bytes)
-
-        transcription_result = transcribe_audio(audio_file, audio.filename)
-        transcribed_text = transcription_result["text"]
-        audio_duration = transcription_result.get("duration", len(audio_bytes) / 16000)
-
-        # Track Whisper cost
-        whisper_cost = calculate_whisper_cost(audio_duration)
-        track_api_cost(
-            db=db,
-            user_id=current_user.id,
-            service_type="openai_whisper",
-            cost_usd=whisper_cost,
-            room_id=room_id,
-            audio_seconds=audio_duration,
-            model="whisper-1"
-        )
+    def load():
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
 
-        # Get conversation history
-        turns = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "main"
-        ).order_by(Turn.created_at.asc()).all()
+        if current_user not in room.participants:
+            raise HTTPException(status_code=403, detail="Not a participant")
 
         # Get user names FIRST (need them for building history)
         participants = room.participants
-        user1 = participants[0]
-        user2 = participants[1]
+        return room, participants[0], participants[1], _main_room_session_context(db, room)
 
-        current_user_name = clean_user_name(current_user)
-        other_user = user2 if current_user.id == user1.id else user1
-        other_user_name = clean_user_name(other_user)
+    room, user1, user2, session_context = await run_in_threadpool(load)
+    user_id = current_user.id
 
-        # Build conversation for Claude with speaker names for ALL messages
-        conversation_history = []
-        for turn in turns:
-            if turn.kind == "ai_question":
-                conversation_history.append({"role": "assistant", "content": turn.summary})
-            else:
-                # Include speaker name in user messages so AI knows who's talking
-                speaker_name = clean_user_name(user1) if turn.user_id == user1.id else clean_user_name(user2)
-                conversation_history.append({"role": "user", "content": f"{speaker_name}: {turn.summary}"})
-
-        exchange_count = len([t for t in turns if t.kind == "user_response"])
-
-        # Process through mediator
-        result = process_main_room_response(
-            conversation_history,
-            transcribed_text,
-            current_user_name,
-            other_user_name,
-            exchange_count
-        )
-
-        # Upload audio to S3
-        from app.services.s3_service import upload_audio_to_s3
-        audio_url = upload_audio_to_s3(audio_bytes, room_id, current_user.id, audio.filename)
-
-        # Save user turn with audio URL
-        user_turn = Turn(
-            room_id=room_id,
-            user_id=current_user.id,
-            kind="user_response",
-            summary=transcribed_text,
-            context="main",
-            tags=["main_room", "voice_recording"],
-            audio_url=audio_url
-        )
-        db.add(user_turn)
+    timings = voice_pipeline.VoiceTurnTimings("main_room_voice_respond", room_id=room_id, user_id=user_id)
+    try:
+        # Read audio file
+        with timings.stage("read"):
+            audio_bytes = await audio.read()
 
-        # Save AI response or resolution
-        if result.get("resolution"):
-            resolution_turn = Turn(
-                room_id=room_id,
-                user_id=current_user.id,
-                kind="resolution",
-                summary=result["resolution"],
-                context="main",
-                tags=["main_room", "resolution"],
-                input_tokens=result.get("input_tokens", 0),
-                output_tokens=result.get("output_tokens", 0),
-                cost_usd=result.get("cost_usd", 0.0),
-                model=result.get("model")
-            )
-            db.add(resolution_turn)
-            room.phase = "resolved"
-            room.resolution_text = result["resolution"]
-            room.resolved_at = func.now()
-            from datetime import date, timedelta
-            room.check_in_date = date.today() + timedelta(days=7)
-        elif result.get("ai_response"):
-            ai_turn = Turn(
-                room_id=room_id,
-                user_id=current_user.id,
-                kind="ai_question",
-                summary=result["ai_response"],
-                context="main",
-                tags=["main_room"],
-                input_tokens=result.get("input_tokens", 0),
-                output_tokens=result.get("output_tokens", 0),
-                cost_usd=result.get("cost_usd", 0.0),
-                model=result.get("model")
+        current_user_name = clean_user_name(current_user)
+        other_user = user2 if user_id == user1.id else user1
+        other_user_name = clean_user_name(other_user)
+        other_user_id = other_user.id  # Read now - a context fold commits and expires the users
+
+        # Upload to S3, transcribe with Whisper and load the conversation history
+        # (cached per room, older turns folded into a rolling summary) concurrently,
+        # then process the transcribed response through the mediator
+        async def respond(transcribed_text, context):
+            conversation_history, exchange_count, earlier_summary = context
+            return await process_main_room_response(
+                conversation_history,
+                transcribed_text,
+                current_user_name,
+                other_user_name,
+                exchange_count,
+                session_context=session_context,
+                earlier_summary=earlier_summary
             )
-            db.add(ai_turn)
-
-        db.commit()
 
-        # Increment voice usage
-        if access.get("is_trial"):
-            increment_voice_usage(db, current_user.id)
+        voice_turn = await voice_pipeline.run_voice_turn(
+            audio_bytes, audio.filename, room_id, user_id,
+            build_context=lambda: _main_room_context(db, room, user1, user2, current_user, speaker_prefix=True),
+            respond=respond,
+            timings=timings
+        )
+        transcribed_text = voice_turn.text
+        result = voice_turn.result
+        audio_url = voice_turn.audio_url
 
         # Determine next speaker using signals from AI service (no name parsing!)
         next_speaker_signal = result.get("next_speaker", "OTHER")
@@ -2097,17 +2690,89 @@ async def voice_respond_main_room(
         # Convert signal to actual user ID
         if next_speaker_signal == "SAME":
             # Stay with current speaker
-            next_speaker_id = current_user.id
+            next_speaker_id = user_id
         elif next_speaker_signal == "OTHER":
             # Switch to other user
-            next_speaker_id = other_user.id
+            next_speaker_id = other_user_id
         else:
             # Fallback: alternate turns
-            next_speaker_id = other_user.id
+            next_speaker_id = other_user_id
 
         if result.get("session_complete"):
             next_speaker_id = None
 
+        def save():
+            try:
+                # Save user turn with audio URL
+                user_turn = Turn(
+                    room_id=room_id,
+                    user_id=user_id,
+                    kind="user_response",
+                    summary=transcribed_text,
+                    context="main",
+                    tags=["main_room", "voice_recording"],
+                    audio_url=audio_url
+                )
+                db.add(user_turn)
+                record_event(db, user_id, "message", voice=True)
+
+                # Save AI response or resolution
+                ai_turn = None
+                if result.get("resolution"):
+                    ai_turn = Turn(
+                        room_id=room_id,
+                        user_id=user_id,
+                        kind="resolution",
+                        summary=result["resolution"],
+                        context="main",
+                        tags=["main_room", "resolution"],
+                        input_tokens=result.get("input_tokens", 0),
+                        output_tokens=result.get("output_tokens", 0),
+                        cost_usd=result.get("cost_usd", 0.0),
+                        model=result.get("model")
+                    )
+                    db.add(ai_turn)
+                    room.phase = "resolved"
+                    room.resolution_text = result["resolution"]
+                    room.resolved_at = func.now()
+                    from datetime import date, timedelta
+                    room.check_in_date = date.today() + timedelta(days=7)
+                    for participant in room.participants:
+                        record_event(db, participant.id, "resolution", room=room)
+                elif result.get("ai_response"):
+                    ai_turn = Turn(
+                        room_id=room_id,
+                        user_id=user_id,
+                        kind="ai_question",
+                        summary=result["ai_response"],
+                        context="main",
+                        tags=["main_room"],
+                        input_tokens=result.get("input_tokens", 0),
+                        output_tokens=result.get("output_tokens", 0),
+                        cost_usd=result.get("cost_usd", 0.0),
+                        model=result.get("model")
+                    )
+                    db.add(ai_turn)
+
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            return [user_turn, ai_turn]
+
+        try:
+            turns = await run_in_threadpool(save)
+        except Exception:
+            # No turn references the recording - don't leave it in the bucket
+            await voice_pipeline.discard_audio(audio_url)
+            raise
+        await run_in_threadpool(_publish_exchange, room, turns, next_speaker_id)
+
+        # Increment voice usage
+        if access.get("is_trial"):
+            await run_in_threadpool(increment_voice_usage, db, user_id)
+        timings.finish()
+
         return MainRoomRespondResponse(
             ai_response=result.get("ai_response"),
             resolution=result.get("resolution"),
@@ -2117,103 +2782,137 @@ async def voice_respond_main_room(
 
     except Exception as e:
         print(f"Voice transcription error: {e}")
+        timings.finish(status="failed")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to process voice recording: {str(e)}"
         )
 
 
-@router.post("/{room_id}/main-room/upload-file")
-async def upload_file_main_room(
-    room_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Upload a file (image, PDF, document) to main room.
-    File is stored in S3 and visible to both users in the chat.
-    """
+MAIN_ROOM_FILE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.pdf', '.doc', '.docx', '.txt'}
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif'}
+
+
+def _upload_room(db: Session, room_id: int, current_user: User) -> Room:
+    """The room a file is being uploaded to (caller must be a participant)."""
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
     if current_user not in room.participants:
         raise HTTPException(status_code=403, detail="Not a participant")
+    return room
 
-    # Read file bytes for validation
-    file_bytes = await file.read()
-    file_size_bytes = len(file_bytes)
 
-    # PAYWALL: Check file upload allowed and enforce size limits by tier
-    check_file_upload_allowed(current_user.id, file_size_bytes, db)
+def _main_room_file_extension(filename: str) -> str:
+    """Validate a main room attachment's file type and return its extension."""
+    file_extension = '.' + filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if file_extension not in MAIN_ROOM_FILE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"File type not allowed. Allowed: {', '.join(MAIN_ROOM_FILE_EXTENSIONS)}")
+    return file_extension
 
-    # Validate file type
-    allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.pdf', '.doc', '.docx', '.txt'}
-    file_extension = '.' + file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
-    if file_extension not in allowed_extensions:
-        raise HTTPException(status_code=400, detail=f"File type not allowed. Allowed: {', '.join(allowed_extensions)}")
 
+def _presign_room_upload(db: Session, room_id: int, current_user: User, payload: DirectUploadRequest) -> dict:
+    """Presigned POST for a room file, capped at the user's tier file size limit."""
+    # PAYWALL: Check file upload allowed and enforce size limits by tier (the S3 policy enforces the real size)
+    limits = check_file_upload_allowed(current_user.id, payload.size, db)
+    max_bytes = int(limits["max_size_mb"] * 1024 * 1024)
+
+    from app.services.s3_service import create_presigned_upload, evidence_key
     try:
-        # Upload to S3
-        from app.services.s3_service import upload_file_to_s3
-        file_url = upload_file_to_s3(
-            file_bytes=file_bytes,
-            room_id=room_id,
-            user_id=current_user.id,
-            filename=file.filename,
-            content_type=file.content_type or "application/octet-stream"
+        return create_presigned_upload(
+            evidence_key(room_id, current_user.id, payload.filename),
+            payload.content_type or "application/octet-stream",
+            max_bytes,
+            filename=payload.filename
         )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to prepare upload: {str(e)}")
 
-        # Analyze image if it's an image file
-        summary_text = f"[Uploaded file: {file.filename}]"
-        input_tokens = 0
-        output_tokens = 0
-        model_used = None
-        cost_usd = 0.0
 
-        # Check if file is an image
-        is_image = file_extension.lower() in {'.jpg', '.jpeg', '.png', '.gif'}
+async def _confirm_room_upload(db: Session, room_id: int, current_user: User, key: str) -> dict:
+    """
+    Check a direct upload landed under this user's prefix for the room and return its metadata.
+    The filename comes from the object, not the client.
+    """
+    from app.services.s3_service import evidence_prefix, get_uploaded_object
+
+    if not key.startswith(evidence_prefix(room_id, current_user.id)) or ".." in key:
+        raise HTTPException(status_code=400, detail="Invalid upload key")
 
-        if is_image:
-            try:
-                from app.services.image_analysis import analyze_image
-                from app.services.cost_tracker import calculate_anthropic_cost
-                analysis = await analyze_image(file_url, file.filename)
-                summary_text = analysis['description']
-                input_tokens = analysis['input_tokens']
-                output_tokens = analysis['output_tokens']
-                model_used = analysis['model']
-                cost_usd = calculate_anthropic_cost(input_tokens, output_tokens, model_used) if input_tokens > 0 else 0.0
-            except Exception as e:
-                print(f"Image analysis failed: {e}")
-                # Fall back to placeholder if analysis fails
-                summary_text = f"[Uploaded image: {file.filename}]"
+    try:
+        uploaded = await blocking.run(blocking.S3, get_uploaded_object, key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to confirm upload: {str(e)}")
+    if not uploaded:
+        raise HTTPException(status_code=404, detail="Upload not found - it may have been rejected or expired")
 
+    # The policy already capped the size; re-check in case the tier changed since the form was issued
+    await run_in_threadpool(check_file_upload_allowed, current_user.id, uploaded["size"], db)
+    return uploaded
+
+
+async def _save_file_turn(db: Session, room_id: int, current_user: User, file_url: str, filename: str, file_extension: str) -> dict:
+    """Create the main room turn for an uploaded file (describing images with Claude) and announce it."""
+    user_id = current_user.id
+
+    # Analyze image if it's an image file
+    summary_text = f"[Uploaded file: {filename}]"
+    input_tokens = 0
+    output_tokens = 0
+    model_used = None
+    cost_usd = 0.0
+
+    # Check if file is an image
+    is_image = file_extension.lower() in IMAGE_EXTENSIONS
+
+    if is_image:
+        try:
+            from app.services.image_analysis import analyze_image
+            from app.services.cost_tracker import calculate_anthropic_cost
+            analysis = await analyze_image(file_url, filename)
+            summary_text = analysis['description']
+            input_tokens = analysis['input_tokens']
+            output_tokens = analysis['output_tokens']
+            model_used = analysis['model']
+            cost_usd = calculate_anthropic_cost(input_tokens, output_tokens, model_used) if input_tokens > 0 else 0.0
+        except Exception as e:
+            print(f"Image analysis failed: {e}")
+            # Fall back to placeholder if analysis fails
+            summary_text = f"[Uploaded image: {filename}]"
+
+    def save():
         # Create a turn with the file attachment
         file_turn = Turn(
             room_id=room_id,
-            user_id=current_user.id,
+            user_id=user_id,
             kind="user_response",
             summary=summary_text,
             context="main",
             tags=["main_room", "file_upload", "image" if is_image else "document"],
             attachment_url=file_url,
-            attachment_filename=file.filename,
+            attachment_filename=filename,
             input_tokens=input_tokens,
             output_tokens=output_tokens,
             cost_usd=cost_usd,
             model=model_used
         )
         db.add(file_turn)
-        db.commit()
+        record_event(db, user_id, "message")
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent confirmation of the same upload already posted it
+            db.rollback()
+            return False
+
+        room_events.publish(room_id, "turn", turn_id=file_turn.id, message=_main_room_message(file_turn))
 
         # Track API cost if image was analyzed
         if is_image and input_tokens > 0:
-            from app.services.cost_tracker import track_api_cost
             track_api_cost(
                 db=db,
-                user_id=current_user.id,
+                user_id=user_id,
                 service_type="anthropic",
                 cost_usd=cost_usd,
                 room_id=room_id,
@@ -2222,13 +2921,69 @@ async def upload_file_main_room(
                 output_tokens=output_tokens,
                 model=model_used
             )
+        return True
+
+    if not await run_in_threadpool(save):
+        existing = await run_in_threadpool(_file_turn, db, room_id, file_url)
+        return _file_turn_response(existing.attachment_url, existing.attachment_filename)
+    return _file_turn_response(file_url, filename)
+
+
+def _file_turn(db: Session, room_id: int, file_url: str):
+    """(attachment_url, attachment_filename) of the turn already posted for an uploaded file, or None."""
+    return db.query(Turn.attachment_url, Turn.attachment_filename).filter(
+        Turn.room_id == room_id,
+        Turn.attachment_url == file_url
+    ).first()
 
-        return {
-            "success": True,
-            "file_url": file_url,
-            "filename": file.filename,
-            "message": "File uploaded successfully"
-        }
+
+def _file_turn_response(file_url: str, filename: str) -> dict:
+    return {
+        "success": True,
+        "file_url": file_url,
+        "filename": filename,
+        "message": "File uploaded successfully"
+    }
+
+
+@router.post("/{room_id}/main-room/upload-file")
+async def upload_file_main_room(
+    room_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload a file (image, PDF, document) to main room.
+    File is stored in S3 and visible to both users in the chat.
+    Prefer the direct upload flow (main-room/file/upload-url + complete), which
+    keeps file bytes out of the API.
+    """
+    from app.services.s3_service import evidence_key, fileobj_size, upload_fileobj_to_s3
+    file_size_bytes = fileobj_size(file.file)
+
+    def load():
+        _upload_room(db, room_id, current_user)
+
+        # PAYWALL: Check file upload allowed and enforce size limits by tier
+        check_file_upload_allowed(current_user.id, file_size_bytes, db)
+
+    await run_in_threadpool(load)
+
+    # Validate file type
+    file_extension = _main_room_file_extension(file.filename)
+
+    try:
+        # Stream to S3 (multipart for large files)
+        file_url = await blocking.run(
+            blocking.S3,
+            upload_fileobj_to_s3,
+            file.file,
+            evidence_key(room_id, current_user.id, file.filename),
+            file.content_type or "application/octet-stream"
+        )
+
+        return await _save_file_turn(db, room_id, current_user, file_url, file.filename, file_extension)
 
     except Exception as e:
         print(f"File upload error: {e}")
@@ -2238,17 +2993,59 @@ async def upload_file_main_room(
         )
 
 
-@router.post("/{room_id}/coach/telegram-import")
-async def import_telegram_coaching(
+@router.post("/{room_id}/main-room/file/upload-url", response_model=DirectUploadResponse)
+def main_room_file_upload_url(
     room_id: int,
-    payload: TelegramImportRequest,
+    payload: DirectUploadRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Import a downloaded Telegram conversation into the coaching session.
-    Analyzes the conversation with Gemini and creates a turn with AI insights.
+    Presigned form for uploading a main room file straight to S3.
+    The browser POSTs the fields plus the file to the returned url, then calls
+    main-room/file/complete with the key. Tier size limits are enforced by the
+    upload policy.
+    """
+    _upload_room(db, room_id, current_user)
+    _main_room_file_extension(payload.filename)
+    return _presign_room_upload(db, room_id, current_user, payload)
+
+
+@router.post("/{room_id}/main-room/file/complete")
+async def complete_main_room_file_upload(
+    room_id: int,
+    payload: DirectUploadComplete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """
+    Confirm a direct main room upload and post it to the chat.
+    Confirming a key again (e.g. a retried request) returns the turn already posted for it.
+    """
+    # The key's extension was derived (and checked) when the upload form was issued
+    file_extension = _main_room_file_extension(payload.key)
+    await run_in_threadpool(_upload_room, db, room_id, current_user)
+    uploaded = await _confirm_room_upload(db, room_id, current_user, payload.key)
+
+    # Cheap check for retries; concurrent ones are caught by the unique (room_id, attachment_url) index
+    existing = await run_in_threadpool(_file_turn, db, room_id, uploaded["url"])
+    if existing is not None:
+        return _file_turn_response(existing.attachment_url, existing.attachment_filename)
+
+    try:
+        return await _save_file_turn(db, room_id, current_user, uploaded["url"], uploaded["filename"], file_extension)
+    except Exception as e:
+        print(f"File upload error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload file: {str(e)}"
+        )
+
+
+def _telegram_import_download(db: Session, room_id: int, payload: TelegramImportRequest, current_user: User):
+    """Validate a Telegram import request before its analysis job is queued."""
+    from app.models.telegram import TelegramDownload
+
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
@@ -2256,85 +3053,200 @@ async def import_telegram_coaching(
     if current_user not in room.participants:
         raise HTTPException(status_code=403, detail="Not a participant")
 
-    try:
-        # Get the Telegram download with messages
-        from app.models.telegram import TelegramDownload, TelegramMessage
-        from app.services.gemini_rag_service import GeminiRAGService
-
-        download = db.query(TelegramDownload).filter(
-            TelegramDownload.id == payload.download_id,
-            TelegramDownload.user_id == current_user.id,
-            TelegramDownload.status == "completed"
-        ).first()
+    download = db.query(TelegramDownload).filter(
+        TelegramDownload.id == payload.download_id,
+        TelegramDownload.user_id == current_user.id,
+        TelegramDownload.status == "completed"
+    ).first()
 
-        if not download:
-            raise HTTPException(status_code=404, detail="Download not found or not completed")
+    if not download:
+        raise HTTPException(status_code=404, detail="Download not found or not completed")
+    return download
 
-        # Get messages for analysis
-        messages = db.query(TelegramMessage).filter(
-            TelegramMessage.download_id == payload.download_id
-        ).order_by(TelegramMessage.date.asc()).all()
 
-        # Convert to dict format for analysis
-        message_dicts = [
-            {
-                "id": msg.id,
-                "from_me": False,  # For coaching, we don't determine this - just use sender_name
-                "text": msg.text or "[Media]",
-                "timestamp": msg.date.strftime("%Y-%m-%d %H:%M:%S") if msg.date else "Unknown",
-                "sender_name": msg.sender_name or "Unknown"
-            }
-            for msg in messages
-        ]
+@router.post("/{room_id}/coach/telegram-import", status_code=202)
+async def import_telegram_coaching(
+    room_id: int,
+    payload: TelegramImportRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Import a downloaded Telegram conversation into the coaching session.
+    Queues a job that analyzes the conversation and creates a turn with AI insights;
+    poll GET /jobs/{job_id} for the result.
+    """
+    _telegram_import_download(db, room_id, payload, current_user)
 
-        # Identify unique sender names in the conversation
-        unique_senders = list(set(msg.sender_name for msg in messages if msg.sender_name))
-
-        # Try to match one of the senders to the current user's name
-        # This helps Claude know who uploaded the conversation
-        uploader_name = current_user.name or "You"
-        other_person_name = "the other person"
-
-        # Check if uploader's name matches any sender in the conversation
-        for sender in unique_senders:
-            if sender and uploader_name.lower() in sender.lower():
-                # Found a match - use the other sender as "other person"
-                other_senders = [s for s in unique_senders if s != sender]
-                if other_senders:
-                    other_person_name = other_senders[0]
-                break
-
-        # Get previous conversation turns for context
-        previous_turns = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "pre_mediation",
-            Turn.user_id == current_user.id
-        ).order_by(Turn.created_at.asc()).all()
+    job = job_queue.enqueue(
+        db,
+        "telegram_coaching_import",
+        {"room_id": room_id, "user_id": current_user.id, **payload.model_dump()},
+        user_id=current_user.id,
+        priority=job_queue.PRIORITY_INTERACTIVE,
+        idempotency_key=idempotency_key or f"telegram_import:coaching:{room_id}:{current_user.id}:{payload.download_id}"
+    )
+    return job_queue.job_response(job)
 
-        # Build prior context from conversation history
-        prior_context = ""
-        if previous_turns:
-            prior_context = "\n=== PRIOR CONVERSATION CONTEXT ===\n"
-            for turn in previous_turns[-5:]:  # Last 5 turns for context
-                role = "User" if turn.kind == "user_message" else "Meedi"
-                # Extract text from summary field
-                content = turn.summary if turn.summary else ""
-                if content and len(content) < 500:  # Keep it concise
-                    prior_context += f"{role}: {content}\n"
-            prior_context += "\n"
-
-        # Format messages for Claude analysis
-        conversation_text = f"=== TELEGRAM CONVERSATION ===\n"
-        conversation_text += f"Uploaded by: {uploader_name}\n"
-        conversation_text += f"Total Messages: {len(message_dicts)}\n\n"
-        for msg in message_dicts[:50]:  # Limit to first 50 messages for token efficiency
-            conversation_text += f"[{msg['timestamp']}] {msg['sender_name']}: {msg['text']}\n"
 
-        # Analyze with Claude (much simpler than Gemini!)
-        print(f"[Coaching Telegram Import] Analyzing {len(message_dicts)} messages with Claude...")
+TELEGRAM_IMPORT_MODEL = "claude-sonnet-4-5-20250929"
+
+def _telegram_import_analysis(kind: str, analysis_prompt: str, max_tokens: int = 500) -> str:
+    """
+    Claude's analysis of a Telegram import. The prompt holds the messages, names and any
+    prior context, so re-importing the same chat into the same situation is a cache hit.
+    """
+    key = analysis_cache.cache_key(kind, model=TELEGRAM_IMPORT_MODEL, prompt=analysis_prompt)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        print(f"[Telegram Import] Reusing cached {kind} analysis")
+        return cached["analysis_summary"]
+
+    response = get_sync_client().messages.create(
+        model=TELEGRAM_IMPORT_MODEL,
+        max_tokens=max_tokens,
+        messages=[{"role": "user", "content": analysis_prompt}]
+    )
+    analysis_summary = response.content[0].text
+
+    from app.config import settings
+    ttl_hours = settings.TELEGRAM_ANALYSIS_CACHE_TTL_HOURS
+    analysis_cache.put(key, kind, {"analysis_summary": analysis_summary}, ttl_hours * 3600 if ttl_hours else None)
+    return analysis_summary
+
+
+def _telegram_conversation_text(kind: str, download_id: int, header: str, message_dicts: List[dict]) -> str:
+    """
+    The conversation section of a Telegram import prompt, with progress recorded on the download.
+
+    Histories within TELEGRAM_IMPORT_CHUNK_TOKEN_BUDGET are included whole. Larger ones are
+    split into chronological chunks that Claude summarizes concurrently (map); the import's
+    own analysis call then works from those notes (reduce), so no prompt outgrows the context.
+    """
+    from app.config import settings
+    from app.models.telegram import TelegramDownload
+    from app.services import telegram_chunks
+
+    chunks = telegram_chunks.chunk_messages(message_dicts, settings.TELEGRAM_IMPORT_CHUNK_TOKEN_BUDGET)
+    telegram_chunks.update_analysis_progress(
+        download_id,
+        analysis_status="analyzing",
+        analysis_chunks_total=len(chunks),
+        analysis_chunks_done=0
+    )
+
+    if len(chunks) == 1:
+        return header + "".join(f"{telegram_chunks.message_line(msg)}\n" for msg in chunks[0])
+
+    def summarize_chunk(index: int, chunk: List[dict]) -> str:
+        transcript = "\n".join(telegram_chunks.message_line(msg) for msg in chunk)
+        prompt = f"""This is part {index + 1} of {len(chunks)} of a long Telegram conversation between two people who are in mediation, covering {chunk[0]['timestamp']} to {chunk[-1]['timestamp']}.
+
+{transcript}
+
+Write concise notes (at most 8 bullet points) on this part only: recurring topics and conflicts, emotional triggers, how each person communicates, and any positive moments. Name who said what. These notes are combined with the other parts afterwards."""
+        notes = _telegram_import_analysis(f"{kind}_chunk", prompt, max_tokens=400)
+        telegram_chunks.update_analysis_progress(
+            download_id, analysis_chunks_done=TelegramDownload.analysis_chunks_done + 1
+        )
+        return f"--- Part {index + 1} ({chunk[0]['timestamp']} to {chunk[-1]['timestamp']}) ---\n{notes}\n"
+
+    print(f"[Telegram Import] Summarizing {len(message_dicts)} messages in {len(chunks)} chunks")
+    with ThreadPoolExecutor(max_workers=settings.TELEGRAM_IMPORT_CHUNK_CONCURRENCY) as pool:
+        notes = list(pool.map(summarize_chunk, range(len(chunks)), chunks))
+
+    return header + "(Too long to include in full - notes on each part, oldest first)\n\n" + "\n".join(notes)
+
 
-        from anthropic import Anthropic
-        anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+def _finish_telegram_analysis(download_id: int, analysis_status: str) -> None:
+    from app.models.telegram import TelegramDownload
+    from app.services import telegram_chunks
+
+    values = {"analysis_status": analysis_status}
+    if analysis_status == "completed":
+        values["analysis_chunks_done"] = TelegramDownload.analysis_chunks_total
+    telegram_chunks.update_analysis_progress(download_id, **values)
+
+
+@job_queue.handler("telegram_coaching_import")
+def run_telegram_coaching_import(db: Session, payload: dict) -> dict:
+    """
+    Job: analyze an imported Telegram conversation and add it to the coaching session.
+    Sync so the queue runs it in a worker thread - loading the chat and saving the turn
+    stay off the event loop (the Claude call uses the sync client).
+    """
+    from app.models.telegram import TelegramMessage
+
+    room_id = payload["room_id"]
+    download_id = payload["download_id"]
+    current_user = db.query(User).filter(User.id == payload["user_id"]).first()
+    if not current_user:
+        raise job_queue.PermanentJobError("User not found")
+
+    # Get messages for analysis
+    messages = db.query(TelegramMessage).filter(
+        TelegramMessage.download_id == download_id
+    ).order_by(TelegramMessage.date.asc()).all()
+
+    # Convert to dict format for analysis
+    message_dicts = [
+        {
+            "id": msg.id,
+            "from_me": False,  # For coaching, we don't determine this - just use sender_name
+            "text": msg.text or "[Media]",
+            "timestamp": msg.date.strftime("%Y-%m-%d %H:%M:%S") if msg.date else "Unknown",
+            "sender_name": msg.sender_name or "Unknown"
+        }
+        for msg in messages
+    ]
+
+    # Identify unique sender names in the conversation
+    unique_senders = list(set(msg.sender_name for msg in messages if msg.sender_name))
+
+    # Try to match one of the senders to the current user's name
+    # This helps Claude know who uploaded the conversation
+    uploader_name = current_user.name or "You"
+    other_person_name = "the other person"
+
+    # Check if uploader's name matches any sender in the conversation
+    for sender in unique_senders:
+        if sender and uploader_name.lower() in sender.lower():
+            # Found a match - use the other sender as "other person"
+            other_senders = [s for s in unique_senders if s != sender]
+            if other_senders:
+                other_person_name = other_senders[0]
+            break
+
+    # Get previous conversation turns for context
+    previous_turns = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.context == "pre_mediation",
+        Turn.user_id == current_user.id
+    ).order_by(Turn.created_at.asc()).all()
+
+    # Build prior context from conversation history
+    prior_context = ""
+    if previous_turns:
+        prior_context = "\n=== PRIOR CONVERSATION CONTEXT ===\n"
+        for turn in previous_turns[-5:]:  # Last 5 turns for context
+            role = "User" if turn.kind == "user_message" else "Meedi"
+            # Extract text from summary field
+            content = turn.summary if turn.summary else ""
+            if content and len(content) < 500:  # Keep it concise
+                prior_context += f"{role}: {content}\n"
+        prior_context += "\n"
+
+    # Analyze with Claude (much simpler than Gemini!)
+    print(f"[Coaching Telegram Import] Analyzing {len(message_dicts)} messages with Claude...")
+    try:
+        # Format messages for Claude analysis (long histories are summarized in chunks first)
+        conversation_text = _telegram_conversation_text(
+            "telegram_coaching_import",
+            download_id,
+            f"=== TELEGRAM CONVERSATION ===\nUploaded by: {uploader_name}\nTotal Messages: {len(message_dicts)}\n\n",
+            message_dicts
+        )
 
         analysis_prompt = f"""You're reviewing a Telegram conversation between two people who are about to enter mediation coaching with Meedi (an AI mediator).
 
@@ -2356,120 +3268,115 @@ IMPORTANT:
 - End with a thoughtful question that invites {uploader_name} to share more about the situation or their feelings
 - Be warm, insightful, and concise"""
 
-        response = anthropic_client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=500,
-            messages=[{"role": "user", "content": analysis_prompt}]
-        )
-
-        analysis_summary = response.content[0].text
-        print(f"[Coaching Telegram Import] Claude analysis complete")
+        analysis_summary = _telegram_import_analysis("telegram_coaching_import", analysis_prompt)
+    except Exception:
+        _finish_telegram_analysis(download_id, "failed")
+        raise
+    _finish_telegram_analysis(download_id, "completed")
+    print(f"[Coaching Telegram Import] Claude analysis complete")
 
-        # Create summary with follow-up question
-        summary_text = f"""What I see here is: {analysis_summary}
+    # Create summary with follow-up question
+    summary_text = f"""What I see here is: {analysis_summary}
 
 What specifically do you want to look at?
 
-[View full conversation ({payload.message_count} messages) →](/telegram/downloads/{payload.download_id}/messages)"""
+[View full conversation ({payload["message_count"]} messages) →](/telegram/downloads/{download_id}/messages)"""
 
-        # Create a turn with Telegram metadata and Gemini analysis
-        # NOTE: metadata field doesn't exist - storing in summary for now
-        telegram_turn = Turn(
-            room_id=room_id,
-            user_id=current_user.id,
-            kind="telegram_import",
-            summary=summary_text,
-            context="pre_mediation",  # Coaching context
-            tags=["coaching", "telegram_import", f"download_{payload.download_id}"]
-        )
-        db.add(telegram_turn)
-        db.commit()
-        db.refresh(telegram_turn)
+    # Create a turn with Telegram metadata and Gemini analysis
+    # NOTE: metadata field doesn't exist - storing in summary for now
+    telegram_turn = Turn(
+        room_id=room_id,
+        user_id=current_user.id,
+        kind="telegram_import",
+        summary=summary_text,
+        context="pre_mediation",  # Coaching context
+        tags=["coaching", "telegram_import", f"download_{download_id}"]
+    )
+    db.add(telegram_turn)
+    db.commit()
+    db.refresh(telegram_turn)
 
-        return {
-            "success": True,
-            "turn_id": telegram_turn.id,
-            "download_id": payload.download_id,
-            "analysis_summary": analysis_summary,
-            "message": "Telegram conversation analyzed and imported successfully"
-        }
+    return {
+        "success": True,
+        "turn_id": telegram_turn.id,
+        "download_id": download_id,
+        "analysis_summary": analysis_summary,
+        "message": "Telegram conversation analyzed and imported successfully"
+    }
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Coaching Telegram import error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to import Telegram conversation: {str(e)}"
-        )
 
-@router.post("/{room_id}/main-room/telegram-import")
+@router.post("/{room_id}/main-room/telegram-import", status_code=202)
 async def import_telegram_conversation(
     room_id: int,
     payload: TelegramImportRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Import a downloaded Telegram conversation into the main room.
-    Analyzes the conversation with Gemini and creates a turn with AI insights.
+    Queues a job that analyzes the conversation and creates a turn with AI insights;
+    poll GET /jobs/{job_id} for the result.
     """
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
+    _telegram_import_download(db, room_id, payload, current_user)
 
-    if current_user not in room.participants:
-        raise HTTPException(status_code=403, detail="Not a participant")
+    job = job_queue.enqueue(
+        db,
+        "telegram_main_room_import",
+        {"room_id": room_id, "user_id": current_user.id, **payload.model_dump()},
+        user_id=current_user.id,
+        priority=job_queue.PRIORITY_INTERACTIVE,
+        idempotency_key=idempotency_key or f"telegram_import:main:{room_id}:{current_user.id}:{payload.download_id}"
+    )
+    return job_queue.job_response(job)
 
-    try:
-        # Get the Telegram download with messages
-        from app.models.telegram import TelegramDownload, TelegramMessage
-        from app.services.gemini_rag_service import GeminiRAGService
-
-        download = db.query(TelegramDownload).filter(
-            TelegramDownload.id == payload.download_id,
-            TelegramDownload.user_id == current_user.id,
-            TelegramDownload.status == "completed"
-        ).first()
 
-        if not download:
-            raise HTTPException(status_code=404, detail="Download not found or not completed")
+@job_queue.handler("telegram_main_room_import")
+def run_telegram_main_room_import(db: Session, payload: dict) -> dict:
+    """Job: analyze an imported Telegram conversation and add it to the main room (sync, like the coaching import)."""
+    from app.models.telegram import TelegramMessage
 
-        # Get participant names
-        participants = room.participants
-        other_user = next((p for p in participants if p.id != current_user.id), None)
+    room_id = payload["room_id"]
+    download_id = payload["download_id"]
+    room = db.query(Room).filter(Room.id == room_id).first()
+    current_user = db.query(User).filter(User.id == payload["user_id"]).first()
+    if not room or not current_user:
+        raise job_queue.PermanentJobError("Room or user not found")
 
-        user1_name = current_user.name or "User 1"
-        user2_name = other_user.name if other_user else "User 2"
+    # Get participant names
+    participants = room.participants
+    other_user = next((p for p in participants if p.id != current_user.id), None)
 
-        # Get messages for analysis
-        messages = db.query(TelegramMessage).filter(
-            TelegramMessage.download_id == payload.download_id
-        ).order_by(TelegramMessage.date.asc()).all()
+    user1_name = current_user.name or "User 1"
+    user2_name = other_user.name if other_user else "User 2"
 
-        # Convert to dict format for Gemini
-        message_dicts = [
-            {
-                "id": msg.id,
-                "from_me": False,  # We don't determine this - Gemini will use sender_name
-                "text": msg.text or "[Media]",
-                "timestamp": msg.date.strftime("%Y-%m-%d %H:%M:%S") if msg.date else "Unknown",
-                "sender_name": msg.sender_name or "Unknown"
-            }
-            for msg in messages
-        ]
+    # Get messages for analysis
+    messages = db.query(TelegramMessage).filter(
+        TelegramMessage.download_id == download_id
+    ).order_by(TelegramMessage.date.asc()).all()
 
-        # Format messages for Claude analysis
-        conversation_text = f"=== TELEGRAM CONVERSATION ===\nBetween: {user1_name} and {user2_name}\nTotal Messages: {len(message_dicts)}\n\n"
-        for msg in message_dicts[:50]:  # Limit to first 50 messages for token efficiency
-            conversation_text += f"[{msg['timestamp']}] {msg['sender_name']}: {msg['text']}\n"
+    # Convert to dict format for Gemini
+    message_dicts = [
+        {
+            "id": msg.id,
+            "from_me": False,  # We don't determine this - Gemini will use sender_name
+            "text": msg.text or "[Media]",
+            "timestamp": msg.date.strftime("%Y-%m-%d %H:%M:%S") if msg.date else "Unknown",
+            "sender_name": msg.sender_name or "Unknown"
+        }
+        for msg in messages
+    ]
 
-        # Analyze with Claude (much simpler than Gemini!)
-        from anthropic import Anthropic
-        anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    try:
+        # Format messages for Claude analysis (long histories are summarized in chunks first)
+        conversation_text = _telegram_conversation_text(
+            "telegram_main_room_import",
+            download_id,
+            f"=== TELEGRAM CONVERSATION ===\nBetween: {user1_name} and {user2_name}\nTotal Messages: {len(message_dicts)}\n\n",
+            message_dicts
+        )
 
+        # Analyze with Claude (much simpler than Gemini!)
         analysis_prompt = f"""You're reviewing a Telegram conversation between two people who are in mediation together.
 
 {conversation_text}
@@ -2481,75 +3388,58 @@ Please provide a brief analysis (3-4 sentences) covering:
 
 Keep it concise and actionable."""
 
-        response = anthropic_client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=500,
-            messages=[{"role": "user", "content": analysis_prompt}]
-        )
-
-        analysis_summary = response.content[0].text
+        analysis_summary = _telegram_import_analysis("telegram_main_room_import", analysis_prompt)
+    except Exception:
+        _finish_telegram_analysis(download_id, "failed")
+        raise
+    _finish_telegram_analysis(download_id, "completed")
 
-        # Create simple summary with link to view full conversation
-        summary_text = f"""📱 **Telegram Conversation Imported**
+    # Create simple summary with link to view full conversation
+    summary_text = f"""📱 **Telegram Conversation Imported**
 
-**Chat:** {payload.chat_name}
-**Messages:** {payload.message_count}
+**Chat:** {payload["chat_name"]}
+**Messages:** {payload["message_count"]}
 
 **My Analysis:**
 {analysis_summary}
 
-[View full conversation →](/telegram/downloads/{payload.download_id}/messages)"""
+[View full conversation →](/telegram/downloads/{download_id}/messages)"""
 
-        # Create a turn with Telegram metadata and Claude analysis
-        telegram_turn = Turn(
-            room_id=room_id,
-            user_id=current_user.id,
-            kind="telegram_import",
-            summary=summary_text,
-            context="main",
-            tags=["main_room", "telegram_import", f"download_{payload.download_id}"]
-        )
-        db.add(telegram_turn)
-        db.commit()
-        db.refresh(telegram_turn)
+    # Create a turn with Telegram metadata and Claude analysis
+    telegram_turn = Turn(
+        room_id=room_id,
+        user_id=current_user.id,
+        kind="telegram_import",
+        summary=summary_text,
+        context="main",
+        tags=["main_room", "telegram_import", f"download_{download_id}"]
+    )
+    db.add(telegram_turn)
+    db.commit()
+    db.refresh(telegram_turn)
 
-        return {
-            "success": True,
-            "turn_id": telegram_turn.id,
-            "download_id": payload.download_id,
-            "analysis_summary": analysis_summary,
-            "message": "Telegram conversation analyzed and imported successfully"
-        }
+    room_events.publish(room_id, "turn", turn_id=telegram_turn.id, message=_main_room_message(telegram_turn))
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Telegram import error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to import Telegram conversation: {str(e)}"
-        )
+    return {
+        "success": True,
+        "turn_id": telegram_turn.id,
+        "download_id": download_id,
+        "analysis_summary": analysis_summary,
+        "message": "Telegram conversation analyzed and imported successfully"
+    }
 
 
 # ============================================
 # SOLO MODE ENDPOINTS
 # ============================================
 
-@router.post("/{room_id}/solo/start")
-def start_solo_coaching(
-    room_id: int,
-    payload: StartCoachingRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Start Solo coaching session for self-reflection and conflict processing."""
+def _solo_room(db: Session, room_id: int, current_user: User) -> Room:
+    """The solo room being coached (caller must be a participant)."""
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    # Check if user is participant
+    # Check participant
     if current_user not in room.participants:
         raise HTTPException(status_code=403, detail="Not a participant")
 
@@ -2557,49 +3447,65 @@ def start_solo_coaching(
     if room.room_type != 'solo':
         raise HTTPException(status_code=400, detail="This endpoint is for Solo mode only")
 
+    return room
+
+
+@router.post("/{room_id}/solo/start")
+async def start_solo_coaching(
+    room_id: int,
+    payload: StartCoachingRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Start Solo coaching session for self-reflection and conflict processing."""
+    room = await run_in_threadpool(_solo_room, db, room_id, current_user)
+
     # Get user's name for personalization
     user_name = clean_user_name(current_user)
 
     # Start Solo session
-    result = start_solo_session(payload.initial_message, user_name)
+    result = await start_solo_session(payload.initial_message, user_name)
 
-    # Save initial turn (intake)
-    turn = Turn(
-        room_id=room_id,
-        user_id=current_user.id,
-        kind="intake",
-        summary=payload.initial_message,
-        context="solo",
-        tags=["solo_start"]
-    )
-    db.add(turn)
+    def save() -> dict:
+        # Save initial turn (intake)
+        turn = Turn(
+            room_id=room_id,
+            user_id=current_user.id,
+            kind="intake",
+            summary=payload.initial_message,
+            context="solo",
+            tags=["solo_start"]
+        )
+        db.add(turn)
 
-    # Save AI response with cost tracking
-    ai_turn = Turn(
-        room_id=room_id,
-        user_id=current_user.id,
-        kind="ai_question",
-        summary=result["ai_response"],
-        context="solo",
-        tags=["solo"],
-        input_tokens=result.get("input_tokens", 0),
-        output_tokens=result.get("output_tokens", 0),
-        cost_usd=result.get("cost_usd", 0.0),
-        model=result.get("model")
-    )
-    db.add(ai_turn)
+        # Save AI response with cost tracking
+        ai_turn = Turn(
+            room_id=room_id,
+            user_id=current_user.id,
+            kind="ai_question",
+            summary=result["ai_response"],
+            context="solo",
+            tags=["solo"],
+            input_tokens=result.get("input_tokens", 0),
+            output_tokens=result.get("output_tokens", 0),
+            cost_usd=result.get("cost_usd", 0.0),
+            model=result.get("model")
+        )
+        db.add(ai_turn)
 
-    # Update room phase
-    if room.phase == "solo_intake":
-        room.phase = "solo_reflection"
+        # Update room phase
+        if room.phase == "solo_intake":
+            room.phase = "solo_reflection"
 
-    db.commit()
+        db.commit()
+
+        return {
+            "ai_response": result["ai_response"],
+            "ready_for_clarity": result.get("ready_for_clarity", False),
+            "room_phase": room.phase
+        }
 
-    return {
-        "ai_response": result["ai_response"],
-        "ready_for_clarity": result.get("ready_for_clarity", False),
-        "room_phase": room.phase
-    }
+    return await run_in_threadpool(save)
 
 
 @router.post("/{room_id}/solo/respond")
@@ -2612,17 +3518,10 @@ async def respond_solo_coaching(
     subscription: Subscription = Depends(get_current_subscription)
 ):
     """Process Solo response (text or audio). Returns ai_response or clarity_summary."""
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-
-    # Check participant
-    if current_user not in room.participants:
-        raise HTTPException(status_code=403, detail="Not a participant")
-
-    # Verify this is a solo room
-    if room.room_type != 'solo':
-        raise HTTPException(status_code=400, detail="This endpoint is for Solo mode only")
+    room = await run_in_threadpool(_solo_room, db, room_id, current_user)
+    # Read before anything commits (commits expire loaded instances)
+    user_id = current_user.id
+    user_name = clean_user_name(current_user)
 
     # Process audio if provided
     transcribed_text = None
@@ -2636,16 +3535,17 @@ async def respond_solo_coaching(
             audio_bytes = await audio.read()
             audio_file = io.BytesIO(audio_bytes)
 
-            transcription_result = transcribe_audio(audio_file, audio.filename)
+            transcription_result = await blocking.run(blocking.LLM, transcribe_audio, audio_file, audio.filename)
             transcribed_text = transcription_result["text"]
             text = transcribed_text  # Use transcription as text
             audio_duration = transcription_result.get("duration", len(audio_bytes) / 16000)
 
             # Track Whisper cost
             whisper_cost = calculate_whisper_cost(audio_duration)
-            track_api_cost(
+            await run_in_threadpool(
+                track_api_cost,
                 db=db,
-                user_id=current_user.id,
+                user_id=user_id,
                 service_type="openai_whisper",
                 cost_usd=whisper_cost,
                 room_id=room_id,
@@ -2655,11 +3555,11 @@ async def respond_solo_coaching(
 
             # Upload audio to S3
             from app.services.s3_service import upload_audio_to_s3
-            audio_url = upload_audio_to_s3(audio_bytes, room_id, current_user.id, audio.filename)
+            audio_url = await blocking.run(blocking.S3, upload_audio_to_s3, audio_bytes, room_id, user_id, audio.filename)
 
             # Increment voice usage for free tier
             if access.get("is_trial"):
-                increment_voice_usage(db, current_user.id)
+                await run_in_threadpool(increment_voice_usage, db, user_id)
 
         except Exception as e:
             print(f"Voice transcription error: {e}")
@@ -2672,111 +3572,134 @@ async def respond_solo_coaching(
         raise HTTPException(status_code=400, detail="Response text is required")
 
     # Get Solo conversation history
-    turns = db.query(Turn).filter(
-        Turn.room_id == room_id,
-        Turn.user_id == current_user.id,
-        Turn.context == "solo"
-    ).order_by(Turn.created_at.asc()).all()
+    def load_history() -> List[Dict]:
+        turns = db.query(Turn).filter(
+            Turn.room_id == room_id,
+            Turn.user_id == current_user.id,
+            Turn.context == "solo"
+        ).order_by(Turn.created_at.asc()).all()
 
-    # Build conversation for Claude
-    conversation_history = []
-    for turn in turns:
-        if turn.kind == "ai_question":
-            conversation_history.append({"role": "assistant", "content": turn.summary})
-        else:
-            conversation_history.append({"role": "user", "content": turn.summary})
+        # Build conversation for Claude
+        conversation_history = []
+        for turn in turns:
+            if turn.kind == "ai_question":
+                conversation_history.append({"role": "assistant", "content": turn.summary})
+            else:
+                conversation_history.append({"role": "user", "content": turn.summary})
+        return conversation_history
 
-    # Get user's name
-    user_name = clean_user_name(current_user)
+    conversation_history = await run_in_threadpool(load_history)
 
     # Process response through Solo coach
-    result = process_solo_response(conversation_history, text, user_name)
-
-    # Save user response
-    user_turn = Turn(
-        room_id=room_id,
-        user_id=current_user.id,
-        kind="user_response",
-        summary=text,
-        context="solo",
-        tags=["solo", "voice_recording"] if audio_url else ["solo"],
-        audio_url=audio_url
-    )
-    db.add(user_turn)
+    result = await process_solo_response(conversation_history, text, user_name)
 
-    # If ready for clarity, save clarity summary to Room
-    if result.get("ready_for_clarity"):
-        room.clarity_summary = result["clarity_summary"]
-        room.key_insights = result.get("key_insights", [])
-        room.suggested_actions = result.get("suggested_actions", [])
-        room.phase = "solo_clarity"
-
-        db.commit()
-
-        return {
-            "ready_for_clarity": True,
-            "clarity_summary": result["clarity_summary"],
-            "key_insights": result.get("key_insights", []),
-            "suggested_actions": result.get("suggested_actions", []),
-            "possible_actions": result.get("possible_actions", []),
-            "transcribed_text": transcribed_text
-        }
-    else:
-        # Save next AI question with cost tracking
-        ai_turn = Turn(
+    def save() -> dict:
+        # Save user response
+        user_turn = Turn(
             room_id=room_id,
             user_id=current_user.id,
-            kind="ai_question",
-            summary=result["ai_response"],
+            kind="user_response",
+            summary=text,
             context="solo",
-            tags=["solo"],
-            input_tokens=result.get("input_tokens", 0),
-            output_tokens=result.get("output_tokens", 0),
-            cost_usd=result.get("cost_usd", 0.0),
-            model=result.get("model")
+            tags=["solo", "voice_recording"] if audio_url else ["solo"],
+            audio_url=audio_url
         )
-        db.add(ai_turn)
+        db.add(user_turn)
+        record_event(db, current_user.id, "message", voice=bool(audio_url))
+
+        # If ready for clarity, save clarity summary to Room
+        if result.get("ready_for_clarity"):
+            room.clarity_summary = result["clarity_summary"]
+            room.key_insights = result.get("key_insights", [])
+            room.suggested_actions = result.get("suggested_actions", [])
+            room.phase = "solo_clarity"
+
+            db.commit()
+
+            return {
+                "ready_for_clarity": True,
+                "clarity_summary": result["clarity_summary"],
+                "key_insights": result.get("key_insights", []),
+                "suggested_actions": result.get("suggested_actions", []),
+                "possible_actions": result.get("possible_actions", []),
+                "transcribed_text": transcribed_text
+            }
+        else:
+            # Save next AI question with cost tracking
+            ai_turn = Turn(
+                room_id=room_id,
+                user_id=current_user.id,
+                kind="ai_question",
+                summary=result["ai_response"],
+                context="solo",
+                tags=["solo"],
+                input_tokens=result.get("input_tokens", 0),
+                output_tokens=result.get("output_tokens", 0),
+                cost_usd=result.get("cost_usd", 0.0),
+                model=result.get("model")
+            )
+            db.add(ai_turn)
 
-        db.commit()
+            db.commit()
 
-        return {
-            "ai_response": result["ai_response"],
-            "ready_for_clarity": False,
-            "transcribed_text": transcribed_text
-        }
+            return {
+                "ai_response": result["ai_response"],
+                "ready_for_clarity": False,
+                "transcribed_text": transcribed_text
+            }
+
+    return await run_in_threadpool(save)
 
 
 @router.get("/{room_id}/solo/turns")
 def get_solo_turns(
     room_id: int,
+    response: Response,
+    since: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserSnapshot = Depends(get_current_user_snapshot)
 ):
-    """Get all Solo conversation turns for this room."""
+    """
+    Get all Solo conversation turns for this room.
+    Pass since=<last_turn_id> to get only newer turns (recent ones may repeat - dedupe by id); send If-None-Match to get a 304 when nothing changed.
+    """
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
     # Check participant
-    if current_user not in room.participants:
+    if current_user.id not in {p.id for p in room.participants}:
         raise HTTPException(status_code=403, detail="Not a participant")
 
-    # Get all solo turns
-    turns = db.query(Turn).filter(
+    filters = [
         Turn.room_id == room_id,
         Turn.context == "solo"
-    ).order_by(Turn.id).all()
+    ]
+    etag = _turns_etag(
+        db, filters, since, room.phase, room.clarity_summary,
+        json.dumps(room.key_insights), json.dumps(room.suggested_actions), room.action_taken
+    )
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    _set_etag(response, etag)
+
+    if since:
+        filters.append(_since_filter(db, since))
+
+    # Get all solo turns
+    turns = db.query(Turn).filter(*filters).order_by(Turn.id).all()
 
     # Format as conversation messages
     messages = []
     for turn in turns:
         if turn.kind == "user_response" or turn.kind == "intake":
-            msg = {"role": "user", "content": turn.summary or ""}
+            msg = {"id": turn.id, "role": "user", "content": turn.summary or ""}
             if turn.audio_url:
                 msg["audioUrl"] = turn.audio_url
             messages.append(msg)
         elif turn.kind == "ai_question":
-            messages.append({"role": "assistant", "content": turn.summary or ""})
+            messages.append({"id": turn.id, "role": "assistant", "content": turn.summary or ""})
 
     # Include clarity summary if exists
     clarity_data = None
@@ -2790,6 +3713,7 @@ def get_solo_turns(
 
     return {
         "messages": messages,
+        "last_turn_id": _next_cursor(turns, since),
         "clarity_summary": clarity_data,
         "room_phase": room.phase
     }
@@ -2822,6 +3746,7 @@ def finalize_solo_session(
     from datetime import datetime
     room.phase = "resolved"
     room.resolved_at = datetime.utcnow()
+    record_event(db, current_user.id, "resolution", room=room)
     db.commit()
 
     return {
@@ -2966,6 +3891,7 @@ def convert_solo_to_mediation(
     room.phase = 'user2_lobby'
     room.converted_from_solo = True
     room.converted_at = func.now()
+    record_event(db, current_user.id, "coaching_complete")
 
     db.commit()
 
@@ -2987,6 +3913,17 @@ def convert_solo_to_mediation(
 
 # === ROOM DELETION ENDPOINTS ===
 
+def _room_file_urls(db: Session, room_ids: List[int]) -> List[str]:
+    """S3 URLs (voice recordings and attachments) of every turn in these rooms."""
+    if not room_ids:
+        return []
+    rows = db.query(Turn.audio_url, Turn.attachment_url).filter(
+        Turn.room_id.in_(room_ids),
+        (Turn.audio_url.isnot(None)) | (Turn.attachment_url.isnot(None))
+    ).all()
+    return [url for row in rows for url in row if url]
+
+
 @router.delete("/{room_id}")
 def delete_room(
     room_id: int,
@@ -3002,23 +3939,16 @@ def delete_room(
     if current_user not in room.participants:
         raise HTTPException(status_code=403, detail="Not authorized to delete this room")
 
-    # Delete all S3 audio files associated with this room
-    from app.services.s3_service import delete_audio_from_s3
-    turns_with_audio = db.query(Turn).filter(
-        Turn.room_id == room_id,
-        Turn.audio_url.isnot(None)
-    ).all()
-
-    for turn in turns_with_audio:
-        try:
-            delete_audio_from_s3(turn.audio_url)
-        except Exception as e:
-            print(f"Error deleting S3 file {turn.audio_url}: {e}")
-            # Continue deletion even if S3 delete fails
+    from app.services.s3_service import delete_objects_from_s3
+    file_urls = _room_file_urls(db, [room_id])
 
     # Delete room (cascade will handle turns and associations)
     db.delete(room)
     db.commit()
+    conversation_cache.invalidate(room_id)
+
+    # Then its S3 audio and attachments in one batch (failures are logged, not raised)
+    delete_objects_from_s3(file_urls)
 
     return {"success": True, "message": "Room deleted successfully"}
 
@@ -3035,8 +3965,9 @@ def bulk_delete_rooms(
 
     deleted_count = 0
     errors = []
+    deleted_room_ids = []
 
-    from app.services.s3_service import delete_audio_from_s3
+    from app.services.s3_service import delete_objects_from_s3
 
     for room_id in room_ids:
         try:
@@ -3050,26 +3981,20 @@ def bulk_delete_rooms(
                 errors.append(f"Not authorized to delete room {room_id}")
                 continue
 
-            # Delete S3 files
-            turns_with_audio = db.query(Turn).filter(
-                Turn.room_id == room_id,
-                Turn.audio_url.isnot(None)
-            ).all()
-
-            for turn in turns_with_audio:
-                try:
-                    delete_audio_from_s3(turn.audio_url)
-                except Exception as e:
-                    print(f"Error deleting S3 file {turn.audio_url}: {e}")
-
             # Delete room
             db.delete(room)
+            deleted_room_ids.append(room_id)
             deleted_count += 1
 
         except Exception as e:
             errors.append(f"Error deleting room {room_id}: {str(e)}")
 
+    # S3 files of every deleted room, gathered before the commit and removed in batches after it
+    file_urls = _room_file_urls(db, deleted_room_ids)
     db.commit()
+    for room_id in deleted_room_ids:
+        conversation_cache.invalidate(room_id)
+    delete_objects_from_s3(file_urls)
 
     return {
         "success": True,
@@ -3082,12 +4007,14 @@ def bulk_delete_rooms(
 @router.post("/{room_id}/generate-report")
 def generate_professional_report(
     room_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Generate a professional therapy-style PDF report for a resolved mediation room.
-    Returns the S3 URL of the generated PDF.
+    Returns the S3 URL if the report already exists; otherwise queues a job
+    (202) whose result holds the S3 URL of the generated PDF.
     """
     # Get room
     room = db.query(Room).filter(Room.id == room_id).first()
@@ -3110,120 +4037,141 @@ def generate_professional_report(
             "message": "Report already exists"
         }
 
-    try:
-        # Get participants (determine User1 and User2)
-        participants = room.participants
-        if len(participants) < 2:
-            raise HTTPException(status_code=400, detail="Room must have 2 participants")
+    if len(room.participants) < 2:
+        raise HTTPException(status_code=400, detail="Room must have 2 participants")
 
-        # Determine User1 by finding who started coaching first
-        first_turn = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "pre_mediation"
-        ).order_by(Turn.created_at.asc()).first()
+    job = job_queue.enqueue(
+        db,
+        "professional_report",
+        {"room_id": room_id},
+        user_id=current_user.id,
+        priority=job_queue.PRIORITY_REPORT,
+        idempotency_key=f"professional_report:{room_id}:{current_user.id}"
+    )
+    response.status_code = 202
+    return job_queue.job_response(job)
 
-        if not first_turn:
-            # Fallback to participant order
-            user1 = participants[0]
-            user2 = participants[1]
-        else:
-            user1_id = first_turn.user_id
-            user1 = next((p for p in participants if p.id == user1_id), participants[0])
-            user2 = next((p for p in participants if p.id != user1_id), participants[1])
 
-        user1_name = clean_user_name(user1)
-        user2_name = clean_user_name(user2)
+@job_queue.handler("professional_report")
+def run_professional_report(db: Session, payload: dict) -> dict:
+    """Job: write the report with Claude, render the PDF and upload it to S3."""
+    room_id = payload["room_id"]
+    room = db.query(Room).filter(Room.id == room_id).first()
+    if not room:
+        raise job_queue.PermanentJobError("Room not found")
 
-        # Get main room conversation transcript
-        main_turns = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "main"
-        ).order_by(Turn.created_at.asc()).all()
+    # Another job for this room (other participant) may have finished first
+    if room.professional_report_url:
+        return {
+            "success": True,
+            "report_url": room.professional_report_url,
+            "message": "Report already exists"
+        }
 
-        # Build transcript for Claude
-        transcript = []
-        for turn in main_turns:
-            if turn.kind == "ai_question":
-                transcript.append({
-                    "role": "assistant",
-                    "content": turn.summary,
-                    "userId": None,
-                    "isUser1": None
-                })
-            elif turn.kind == "resolution":
-                transcript.append({
-                    "role": "resolution",
-                    "content": turn.summary,
-                    "userId": None,
-                    "isUser1": None
-                })
-            else:
-                is_user1 = turn.user_id == user1.id
-                transcript.append({
-                    "role": "user",
-                    "content": turn.summary,
-                    "userId": turn.user_id,
-                    "isUser1": is_user1
-                })
-
-        # Import report generation services
-        from app.services.report_generator import generate_report_content_with_claude, create_pdf_report
-        from app.services.s3_service import upload_report_to_s3
-
-        # Generate report content using Claude
-        report_data = generate_report_content_with_claude(
-            room_title=room.title,
-            category=room.category or "general",
-            user1_name=user1_name,
-            user2_name=user2_name,
-            user1_summary=room.user1_summary or "",
-            user2_summary=room.user2_summary or "",
-            transcript=transcript,
-            resolution_text=room.resolution_text or ""
-        )
+    # Get participants (determine User1 and User2)
+    participants = room.participants
+    if len(participants) < 2:
+        raise HTTPException(status_code=400, detail="Room must have 2 participants")
 
-        # Create PDF
-        pdf_bytes = create_pdf_report(
-            room_id=room.id,
-            room_title=room.title,
-            category=room.category or "general",
-            created_at=room.created_at,
-            user1_name="User 1",  # Anonymized in PDF
-            user2_name="User 2",  # Anonymized in PDF
-            report_content=report_data["report_content"],
-            resolution_text=room.resolution_text or ""
-        )
+    # Determine User1 by finding who started coaching first
+    first_turn = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.context == "pre_mediation"
+    ).order_by(Turn.created_at.asc()).first()
 
-        # Upload to S3
-        report_url = upload_report_to_s3(pdf_bytes, room.id)
+    if not first_turn:
+        # Fallback to participant order
+        user1 = participants[0]
+        user2 = participants[1]
+    else:
+        user1_id = first_turn.user_id
+        user1 = next((p for p in participants if p.id == user1_id), participants[0])
+        user2 = next((p for p in participants if p.id != user1_id), participants[1])
 
-        # Save URL to database
-        room.professional_report_url = report_url
-        db.commit()
+    user1_name = clean_user_name(user1)
+    user2_name = clean_user_name(user2)
 
-        return {
-            "success": True,
-            "report_url": report_url,
-            "message": "Report generated successfully",
-            "cost_info": {
-                "input_tokens": report_data["input_tokens"],
-                "output_tokens": report_data["output_tokens"],
-                "cost_usd": report_data["cost_usd"],
-                "model": report_data["model"]
-            }
-        }
+    # Get main room conversation transcript
+    main_turns = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.context == "main"
+    ).order_by(Turn.created_at.asc()).all()
 
-    except Exception as e:
-        print(f"Error generating report: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to generate report: {str(e)}"
-        )
+    # Build transcript for Claude
+    transcript = []
+    for turn in main_turns:
+        if turn.kind == "ai_question":
+            transcript.append({
+                "role": "assistant",
+                "content": turn.summary,
+                "userId": None,
+                "isUser1": None
+            })
+        elif turn.kind == "resolution":
+            transcript.append({
+                "role": "resolution",
+                "content": turn.summary,
+                "userId": None,
+                "isUser1": None
+            })
+        else:
+            is_user1 = turn.user_id == user1.id
+            transcript.append({
+                "role": "user",
+                "content": turn.summary,
+                "userId": turn.user_id,
+                "isUser1": is_user1
+            })
+
+    # Import report generation services
+    from app.services.report_generator import generate_report_content_with_claude, create_pdf_report
+    from app.services.s3_service import upload_report_to_s3
+
+    # Generate report content using Claude
+    report_data = generate_report_content_with_claude(
+        room_title=room.title,
+        category=room.category or "general",
+        user1_name=user1_name,
+        user2_name=user2_name,
+        user1_summary=room.user1_summary or "",
+        user2_summary=room.user2_summary or "",
+        transcript=transcript,
+        resolution_text=room.resolution_text or ""
+    )
+
+    # Create PDF
+    pdf_bytes = create_pdf_report(
+        room_id=room.id,
+        room_title=room.title,
+        category=room.category or "general",
+        created_at=room.created_at,
+        user1_name="User 1",  # Anonymized in PDF
+        user2_name="User 2",  # Anonymized in PDF
+        report_content=report_data["report_content"],
+        resolution_text=room.resolution_text or ""
+    )
+
+    # Upload to S3
+    report_url = upload_report_to_s3(pdf_bytes, room.id)
+
+    # Save URL to database
+    room.professional_report_url = report_url
+    db.commit()
+
+    return {
+        "success": True,
+        "report_url": report_url,
+        "message": "Report generated successfully",
+        "cost_info": {
+            "input_tokens": report_data["input_tokens"],
+            "output_tokens": report_data["output_tokens"],
+            "cost_usd": report_data["cost_usd"],
+            "model": report_data["model"]
+        }
+    }
 
 
-@router.post("/{room_id}/generate-comprehensive-report")
+@router.post("/{room_id}/generate-comprehensive-report", status_code=202)
 def generate_comprehensive_report(
     room_id: int,
     db: Session = Depends(get_db),
@@ -3232,7 +4180,8 @@ def generate_comprehensive_report(
     """
     Generate a comprehensive therapist-style report using OpenAI GPT-4.
     Includes individual coaching analysis and professional recommendations.
-    Returns markdown report with referral to professional therapy.
+    Queues a job whose result holds the markdown report with referral to
+    professional therapy (poll GET /jobs/{job_id}).
 
     Access requires PRO subscription OR one-time purchase.
     """
@@ -3262,95 +4211,103 @@ def generate_comprehensive_report(
             detail="Payment required. Please purchase the comprehensive report or upgrade to PRO."
         )
 
-    try:
-        # Get participants
-        participants = room.participants
-        if len(participants) < 2:
-            raise HTTPException(status_code=400, detail="Room must have 2 participants")
+    if len(room.participants) < 2:
+        raise HTTPException(status_code=400, detail="Room must have 2 participants")
 
-        # Determine User1 by finding who started coaching first
-        first_turn = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "pre_mediation"
-        ).order_by(Turn.created_at.asc()).first()
+    job = job_queue.enqueue(
+        db,
+        "comprehensive_report",
+        {"room_id": room_id},
+        user_id=current_user.id,
+        priority=job_queue.PRIORITY_REPORT,
+        idempotency_key=f"comprehensive_report:{room_id}:{current_user.id}"
+    )
+    return job_queue.job_response(job)
 
-        if not first_turn:
-            user1 = participants[0]
-            user2 = participants[1]
-        else:
-            user1_id = first_turn.user_id
-            user1 = next((p for p in participants if p.id == user1_id), participants[0])
-            user2 = next((p for p in participants if p.id != user1_id), participants[1])
 
-        # Get User 1's coaching turns
-        user1_coaching = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.user_id == user1.id,
-            Turn.context == "pre_mediation"
-        ).order_by(Turn.created_at.asc()).all()
+@job_queue.handler("comprehensive_report")
+def run_comprehensive_report(db: Session, payload: dict) -> dict:
+    """Job: generate the comprehensive report for a resolved room."""
+    room_id = payload["room_id"]
+    room = db.query(Room).filter(Room.id == room_id).first()
+    if not room:
+        raise job_queue.PermanentJobError("Room not found")
 
-        # Get User 2's coaching turns
-        user2_coaching = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.user_id == user2.id,
-            Turn.context == "pre_mediation"
-        ).order_by(Turn.created_at.asc()).all()
+    # Get participants
+    participants = room.participants
+    if len(participants) < 2:
+        raise HTTPException(status_code=400, detail="Room must have 2 participants")
 
-        # Get main room turns
-        main_turns = db.query(Turn).filter(
-            Turn.room_id == room_id,
-            Turn.context == "main"
-        ).order_by(Turn.created_at.asc()).all()
+    # Determine User1 by finding who started coaching first
+    first_turn = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.context == "pre_mediation"
+    ).order_by(Turn.created_at.asc()).first()
 
-        # Format turns for report generator
-        def format_turns(turns):
-            formatted = []
-            for turn in turns:
-                formatted.append({
-                    "kind": turn.kind,
-                    "content": turn.summary,
-                    "role": "assistant" if turn.kind in ["ai_question", "ai_response"] else "user",
-                    "speaker_name": clean_user_name(db.query(User).filter(User.id == turn.user_id).first()) if turn.user_id else "AI"
-                })
-            return formatted
-
-        # Generate comprehensive report
-        from app.services.mediation_report import generate_mediation_report
-
-        report_result = generate_mediation_report(
-            resolution_text=room.resolution_text or "No formal resolution recorded",
-            user1_coaching_turns=format_turns(user1_coaching),
-            user2_coaching_turns=format_turns(user2_coaching),
-            main_room_turns=format_turns(main_turns),
-            user1_name="Party A",  # Anonymized
-            user2_name="Party B",  # Anonymized
-            room_title=room.title or "Mediation Session"
-        )
+    if not first_turn:
+        user1 = participants[0]
+        user2 = participants[1]
+    else:
+        user1_id = first_turn.user_id
+        user1 = next((p for p in participants if p.id == user1_id), participants[0])
+        user2 = next((p for p in participants if p.id != user1_id), participants[1])
 
-        if "error" in report_result:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Report generation failed: {report_result['error']}"
-            )
+    # Get User 1's coaching turns
+    user1_coaching = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.user_id == user1.id,
+        Turn.context == "pre_mediation"
+    ).order_by(Turn.created_at.asc()).all()
 
-        return {
-            "success": True,
-            "report": report_result["full_report"],
-            "resolution": report_result["resolution"],
-            "cost_info": report_result["cost_info"],
-            "message": "Comprehensive report generated successfully"
-        }
+    # Get User 2's coaching turns
+    user2_coaching = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.user_id == user2.id,
+        Turn.context == "pre_mediation"
+    ).order_by(Turn.created_at.asc()).all()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error generating comprehensive report: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to generate comprehensive report: {str(e)}"
-        )
+    # Get main room turns
+    main_turns = db.query(Turn).filter(
+        Turn.room_id == room_id,
+        Turn.context == "main"
+    ).order_by(Turn.created_at.asc()).all()
+
+    # Format turns for report generator
+    def format_turns(turns):
+        formatted = []
+        for turn in turns:
+            formatted.append({
+                "kind": turn.kind,
+                "content": turn.summary,
+                "role": "assistant" if turn.kind in ["ai_question", "ai_response"] else "user",
+                "speaker_name": clean_user_name(db.query(User).filter(User.id == turn.user_id).first()) if turn.user_id else "AI"
+            })
+        return formatted
+
+    # Generate comprehensive report
+    from app.services.mediation_report import generate_mediation_report
+
+    report_result = generate_mediation_report(
+        resolution_text=room.resolution_text or "No formal resolution recorded",
+        user1_coaching_turns=format_turns(user1_coaching),
+        user2_coaching_turns=format_turns(user2_coaching),
+        main_room_turns=format_turns(main_turns),
+        user1_name="Party A",  # Anonymized
+        user2_name="Party B",  # Anonymized
+        room_title=room.title or "Mediation Session"
+    )
+
+    if "error" in report_result:
+        # Usually a transient OpenAI failure - let the queue retry it
+        raise RuntimeError(f"Report generation failed: {report_result['error']}")
+
+    return {
+        "success": True,
+        "report": report_result["full_report"],
+        "resolution": report_result["resolution"],
+        "cost_info": report_result["cost_info"],
+        "message": "Comprehensive report generated successfully"
+    }
 
 
 # ========================================
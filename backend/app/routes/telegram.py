@@ -7,7 +7,7 @@ and downloading chat histories for conflict analysis.
 
 from typing import Dict, Tuple, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from telethon import TelegramClient
@@ -16,6 +16,7 @@ from ..db import get_db
 from ..deps import get_current_user
 from ..models.user import User
 from ..models.telegram import TelegramSession, TelegramDownload, TelegramMessage
+from ..services import job_queue
 from ..services.telegram_service import TelegramService
 from ..services.subscription_service import check_telegram_import_allowed
 
@@ -134,6 +135,9 @@ class DownloadStatusResponse(BaseModel):
     status: str
     message_count: int
     chat_name: Optional[str] = None
+    analysis_status: Optional[str] = None
+    analysis_chunks_done: int = 0
+    analysis_chunks_total: int = 0
 
 
 class DisconnectResponse(BaseModel):
@@ -229,33 +233,50 @@ class DownloadedMessagesResponse(BaseModel):
 
 # ===== Helper Functions =====
 
-async def background_download_task(
-    encrypted_session: str,
-    chat_id: int,
-    start_date: datetime,
-    end_date: datetime,
-    db: Session,
-    user_id: int,
-    session_id: int,
-    download_id: int = None
-):
-    """Background task to download chat history."""
-    try:
-        await TelegramService.download_chat_history(
-            encrypted_session=encrypted_session,
-            chat_id=chat_id,
-            start_date=start_date,
-            end_date=end_date,
-            db=db,
-            user_id=user_id,
-            session_id=session_id,
-            download_id=download_id  # Pass download ID to service
-        )
-    except Exception as e:
-        # Log error - download status already updated in service
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Background download task failed for chat {chat_id}: {e}")
+@job_queue.handler("telegram_download")
+async def run_telegram_download(db: Session, payload: dict) -> dict:
+    """Job: download (or resume) a chat's history. Retries resume after the last stored message."""
+    def load() -> str:
+        download = db.query(TelegramDownload).filter(TelegramDownload.id == payload["download_id"]).first()
+        if not download:
+            raise job_queue.PermanentJobError(f"Download {payload['download_id']} not found")
+
+        telegram_session = db.query(TelegramSession).filter(
+            TelegramSession.id == download.session_id,
+            TelegramSession.is_active == True
+        ).first()
+        if not telegram_session:
+            download.status = "failed"
+            download.error_message = "Telegram session disconnected"
+            db.commit()
+            raise job_queue.PermanentJobError("Telegram session disconnected")
+
+        encrypted_session = telegram_session.encrypted_session
+        # Don't hold this session's connection while the download streams
+        db.close()
+        return encrypted_session
+
+    # Async for Telethon, so the queue runs it on the event loop - keep the queries off it
+    encrypted_session = await asyncio.to_thread(load)
+
+    await TelegramService.download_chat_history(
+        encrypted_session=encrypted_session,
+        download_id=payload["download_id"]
+    )
+    return {"download_id": payload["download_id"]}
+
+
+def _enqueue_download(db: Session, download: TelegramDownload):
+    # One job per download; re-enqueuing a failed one retries it (resuming where it stopped)
+    return job_queue.enqueue(
+        db,
+        "telegram_download",
+        {"download_id": download.id},
+        user_id=download.user_id,
+        priority=job_queue.PRIORITY_BULK,
+        idempotency_key=f"telegram_download:{download.id}",
+        max_attempts=5
+    )
 
 
 # ===== API Endpoints =====
@@ -763,7 +784,6 @@ async def get_contacts(
 @router.post("/download", response_model=DownloadResponse)
 async def start_download(
     payload: DownloadRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -771,7 +791,7 @@ async def start_download(
     Start downloading chat history for specified date range.
 
     Returns immediately with download_id. Use /download/{id} to check status.
-    The actual download happens in the background via BackgroundTasks.
+    The actual download runs as a durable background job (survives restarts).
     """
     try:
         # Check for active session
@@ -816,33 +836,12 @@ async def start_download(
         db.commit()
         db.refresh(download)
 
-        # Schedule background task
-        # Note: We need to create a new db session for the background task
-        # to avoid session conflicts
-        from ..db import SessionLocal
-
-        async def download_wrapper():
-            bg_db = SessionLocal()
-            try:
-                await background_download_task(
-                    encrypted_session=telegram_session.encrypted_session,
-                    chat_id=payload.chat_id,
-                    start_date=start_date,
-                    end_date=end_date,
-                    db=bg_db,
-                    user_id=current_user.id,
-                    session_id=telegram_session.id,
-                    download_id=download.id  # Pass existing download ID
-                )
-            finally:
-                bg_db.close()
-
-        background_tasks.add_task(download_wrapper)
-
         # Update download status to processing
         download.status = "processing"
         db.commit()
 
+        _enqueue_download(db, download)
+
         return DownloadResponse(
             success=True,
             download_id=download.id,
@@ -890,7 +889,10 @@ async def get_download_status(
             id=download.id,
             status=download.status,
             message_count=download.message_count,
-            chat_name=download.chat_name
+            chat_name=download.chat_name,
+            analysis_status=download.analysis_status,
+            analysis_chunks_done=download.analysis_chunks_done or 0,
+            analysis_chunks_total=download.analysis_chunks_total or 0
         )
 
     except HTTPException:
@@ -1085,6 +1087,49 @@ async def get_download_status_plural(
     return await get_download_status(download_id, current_user, db)
 
 
+@router.post("/downloads/{download_id}/resume", response_model=DownloadResponse)
+async def resume_download(
+    download_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Resume a failed download from the last stored message.
+    Messages already downloaded are kept; only older ones in the range are fetched.
+    """
+    download = db.query(TelegramDownload).filter(
+        TelegramDownload.id == download_id,
+        TelegramDownload.user_id == current_user.id
+    ).first()
+
+    if not download:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Download not found")
+
+    if download.status not in ("failed", "retrying", "processing"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Download is {download.status} and can't be resumed"
+        )
+
+    telegram_session = db.query(TelegramSession).filter(
+        TelegramSession.id == download.session_id,
+        TelegramSession.is_active == True
+    ).first()
+
+    if not telegram_session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active Telegram session. Please connect first."
+        )
+
+    # A download that's still queued or running just keeps its current job
+    download.status = "processing"
+    db.commit()
+    _enqueue_download(db, download)
+
+    return DownloadResponse(success=True, download_id=download.id, status="processing")
+
+
 @router.get("/downloads/{download_id}/messages", response_model=DownloadedMessagesResponse)
 async def get_download_messages(
     download_id: int,
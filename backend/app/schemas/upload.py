@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+
+class DirectUploadRequest(BaseModel):
+    """Ask for a presigned form to upload one file straight to S3."""
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field("application/octet-stream", max_length=100)
+    size: int = Field(..., gt=0)  # Declared size in bytes (the S3 policy enforces the real limit)
+
+class DirectUploadResponse(BaseModel):
+    url: str  # POST the form here
+    fields: Dict[str, str]  # Form fields to send before the file field
+    key: str  # Pass back to the complete endpoint
+    max_bytes: int
+    expires_in: int
+
+class DirectUploadComplete(BaseModel):
+    """Confirm a direct upload once S3 has accepted it."""
+    key: str = Field(..., min_length=1, max_length=1024)
+    filename: Optional[str] = Field(None, max_length=255)  # Ignored - the name is read back from the upload
@@ -2,7 +2,6 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from jose import jwt, JWTError
-from passlib.hash import argon2
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -10,6 +9,7 @@ from sqlalchemy.orm import Session
 from .config import settings
 from .db import SessionLocal
 from .models.user import User
+from .services import password_hashing
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -20,15 +20,12 @@ def get_db():
     finally:
         db.close()
 
-# password
+# password (hashed in the password_hashing process pool; async handlers should await that module directly)
 def hash_password(password: str) -> str:
-    return argon2.hash(password)
+    return password_hashing.hash_password_sync(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    try:
-        return argon2.verify(plain, hashed)
-    except Exception:
-        return False
+    return password_hashing.verify_password_sync(plain, hashed)[0]
 
 # jwt
 def create_access_token(data: dict, expires_minutes: int = 30) -> str:
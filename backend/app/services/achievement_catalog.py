@@ -0,0 +1,191 @@
+"""
+Achievement Catalog Cache
+Keeps the achievement definitions and each user's earned set in memory so the
+achievements screen is a dictionary lookup instead of a full Achievement scan
+plus a rebuild of every badge on each request.
+
+- The catalog is an immutable snapshot tagged with a version. Seeding bumps
+  the version (invalidate_catalog); other workers pick the change up within
+  CATALOG_TTL_SECONDS.
+- Per-user entries hold the earned set ({achievement_id: unlocked_at}) and the
+  built achievements view for one catalog version. Awarding an achievement
+  drops the user's entry once the award commits (invalidate_user_on_commit);
+  other workers refresh within EARNED_TTL_SECONDS.
+
+Award checks (services/achievement_checker.py) still read the earned set from
+the database - a stale cache must never cause a duplicate award.
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.gamification import Achievement, UserAchievement
+
+# Re-read the catalog this often even without an invalidation (seeds run in other workers too)
+CATALOG_TTL_SECONDS = 300
+# Per-user earned sets are refreshed this often (awards in other workers)
+EARNED_TTL_SECONDS = 60
+# Upper bound on users kept in memory (least recently used are evicted first)
+MAX_CACHED_USERS = 10000
+
+
+@dataclass(frozen=True)
+class CatalogAchievement:
+    id: int
+    code: str
+    name: str
+    description: str
+    icon: str
+    category: str
+    criteria: dict
+    xp_reward: int
+    rarity: str
+    sort_order: int
+    is_hidden: bool
+    visibility_tier: str
+    hint: Optional[str]
+
+
+@dataclass
+class Catalog:
+    version: int
+    achievements: List[CatalogAchievement]  # Ordered by category, sort_order
+    by_dependency: Dict[str, List[CatalogAchievement]]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class UserAchievements:
+    catalog_version: int
+    earned: Dict[int, datetime]  # achievement_id -> unlocked_at
+    view: Any = None  # Built achievements-screen response for catalog_version
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+_catalog: Optional[Catalog] = None
+_version = 0
+_users: "OrderedDict[int, UserAchievements]" = OrderedDict()
+# Bumped by every invalidate_user, so a read that overlapped one isn't cached
+_user_invalidations = 0
+_lock = threading.Lock()
+
+# Session.info key for users whose cache entry is dropped when the session commits
+_PENDING_INVALIDATIONS = "achievement_catalog_users"
+
+
+def get_catalog(db: Session) -> Catalog:
+    """The current catalog snapshot, loading it if missing or expired."""
+    global _catalog
+    with _lock:
+        catalog = _catalog
+        version = _version
+    if catalog is not None and time.monotonic() - catalog.loaded_at < CATALOG_TTL_SECONDS:
+        return catalog
+
+    from app.services.achievement_checker import dependency_of
+
+    rows = db.query(Achievement).order_by(Achievement.category, Achievement.sort_order).all()
+    achievements = [
+        CatalogAchievement(
+            id=a.id,
+            code=a.code,
+            name=a.name,
+            description=a.description,
+            icon=a.icon,
+            category=a.category,
+            criteria=dict(a.criteria or {}),
+            xp_reward=a.xp_reward,
+            rarity=a.rarity,
+            sort_order=a.sort_order,
+            is_hidden=a.is_hidden,
+            visibility_tier=getattr(a, 'visibility_tier', 'visible') or 'visible',
+            hint=a.hint
+        )
+        for a in rows
+    ]
+    by_dependency = defaultdict(list)
+    for achievement in achievements:
+        key = dependency_of(achievement)
+        if key:
+            by_dependency[key].append(achievement)
+
+    with _lock:
+        if _version != version:
+            # Invalidated while loading - serve this load without caching it (or views built on it)
+            return Catalog(-1, achievements, dict(by_dependency))
+        # Each load is a new version: the content may have been re-seeded by another worker
+        _bump_version()
+        _catalog = Catalog(_version, achievements, dict(by_dependency))
+        return _catalog
+
+
+def _bump_version():
+    global _version
+    _version += 1
+    _users.clear()
+
+
+def invalidate_catalog() -> None:
+    """Drop the catalog and every user's view (call after seeding or editing achievements)."""
+    global _catalog
+    with _lock:
+        _catalog = None
+        _bump_version()
+
+
+def user_achievements(db: Session, user_id: int, catalog: Catalog) -> UserAchievements:
+    """A user's earned set (cached), tied to the given catalog version."""
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is not None:
+            fresh = time.monotonic() - entry.loaded_at < EARNED_TTL_SECONDS
+            if fresh and entry.catalog_version == catalog.version:
+                _users.move_to_end(user_id)
+                return entry
+        invalidations = _user_invalidations
+
+    earned = dict(db.query(UserAchievement.achievement_id, UserAchievement.unlocked_at).filter(
+        UserAchievement.user_id == user_id
+    ).all())
+    entry = UserAchievements(catalog.version, earned)
+
+    with _lock:
+        if catalog.version == _version and invalidations == _user_invalidations:
+            _users[user_id] = entry
+            _users.move_to_end(user_id)
+            while len(_users) > MAX_CACHED_USERS:
+                _users.popitem(last=False)
+    return entry
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a user's cached earned set and view."""
+    global _user_invalidations
+    with _lock:
+        _user_invalidations += 1
+        _users.pop(user_id, None)
+
+
+def invalidate_user_on_commit(db: Session, user_id: int) -> None:
+    """
+    Drop a user's cached earned set and view once db commits (call when awarding).
+    Invalidating before the commit would let a concurrent read re-cache the pre-award set.
+    """
+    db.info.setdefault(_PENDING_INVALIDATIONS, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_rolled_back(session, transaction):
+    # Awards rolled back with the outermost transaction never happened (a commit already popped them)
+    if transaction.parent is None:
+        session.info.pop(_PENDING_INVALIDATIONS, None)
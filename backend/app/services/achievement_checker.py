@@ -1,22 +1,221 @@
 """
 Achievement checker service.
-Checks if users have earned achievements and awards them.
+Awards achievements incrementally from domain events instead of re-checking
+every achievement with fresh COUNT(*) queries.
+
+- Per-user counters (user_counters) hold the totals count achievements depend
+  on (messages, resolutions, gratitude entries, ...). Each counter is seeded
+  once from the historical COUNT the first time it's needed, then kept up to
+  date by record_event().
+- Achievements are indexed by what they depend on (a counter, a UserProgress
+  stat, the streak, the tier or a special rule) in the cached catalog
+  (services/achievement_catalog.py), so an event only evaluates the unearned
+  achievements it can affect.
+
+Call record_event() after adding the new domain row (it flushes) and before
+committing - the counter update and any awards commit with the change itself:
+
+    db.add(new_entry)
+    new_achievements = record_event(db, user_id, "gratitude_entry", progress=progress)
+    db.commit()
 """
 
+from collections import defaultdict
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime, timezone
-from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
 
 from app.models.gamification import (
     UserProgress,
     Achievement,
     UserAchievement,
+    UserCounter,
     GratitudeEntry,
     BreathingSession,
     EmotionalCheckin,
 )
-from app.models.room import Room
+from app.models.room import Room, Turn, room_participants
+from app.services import achievement_catalog
+
+
+# ========================================
+# COUNTERS
+# ========================================
+
+def _count_messages(db: Session, user_id: int) -> int:
+    return db.query(func.count(Turn.id)).filter(
+        Turn.user_id == user_id,
+        Turn.kind == "user_response"
+    ).scalar() or 0
+
+
+def _count_voice_messages(db: Session, user_id: int) -> int:
+    return db.query(func.count(Turn.id)).filter(
+        Turn.user_id == user_id,
+        Turn.audio_url.isnot(None)
+    ).scalar() or 0
+
+
+def _count_rooms_in_phases(db: Session, user_id: int, phases: List[str]) -> int:
+    return db.query(func.count(Room.id)).join(
+        room_participants, Room.id == room_participants.c.room_id
+    ).filter(
+        room_participants.c.user_id == user_id,
+        Room.phase.in_(phases)
+    ).scalar() or 0
+
+
+def _count_gratitude_entries(db: Session, user_id: int) -> int:
+    return db.query(func.count(GratitudeEntry.id)).filter(
+        GratitudeEntry.user_id == user_id
+    ).scalar() or 0
+
+
+def _count_mood_checkins(db: Session, user_id: int) -> int:
+    return db.query(func.count(EmotionalCheckin.id)).filter(
+        EmotionalCheckin.user_id == user_id
+    ).scalar() or 0
+
+
+# Counter name -> query that seeds it from history
+COUNTERS = {
+    "messages": _count_messages,
+    "voice_messages": _count_voice_messages,
+    "coaching_complete": lambda db, user_id: _count_rooms_in_phases(
+        db, user_id, ["user2_lobby", "user2_coaching", "main_room", "resolved"]
+    ),
+    "resolutions": lambda db, user_id: _count_rooms_in_phases(db, user_id, ["resolved"]),
+    "gratitude_entries": _count_gratitude_entries,
+    "mood_checkins": _count_mood_checkins,
+}
+
+# Count targets already tracked on UserProgress
+PROGRESS_STATS = {
+    "breathing_sessions": "total_breathing_sessions",
+    "breathing_minutes": "total_breathing_minutes",
+}
+
+# Event -> counters it increments
+EVENT_COUNTERS = {
+    "message": ["messages"],
+    "coaching_complete": ["coaching_complete"],
+    "resolution": ["resolutions"],
+    "gratitude_entry": ["gratitude_entries"],
+    "mood_checkin": ["mood_checkins"],
+}
+
+# Event -> achievement dependencies it can change ("streak"/"tier" for events that move score or streak)
+EVENT_DEPENDENCIES = {
+    "message": {"messages", "voice_messages", "late_night", "early_morning"},
+    "coaching_complete": {"coaching_complete"},
+    "resolution": {"resolutions", "fast_resolution", "streak", "tier"},
+    "gratitude_entry": {"gratitude_entries", "streak", "tier"},
+    "mood_checkin": {"mood_checkins", "streak", "tier"},
+    "breathing_session": {"breathing_sessions", "breathing_minutes", "double_breath_streak", "streak", "tier"},
+    "daily_checkin": {"streak", "tier"},
+    "challenge_claimed": {"tier"},
+}
+
+# Dependencies evaluated against UserProgress
+_PROGRESS_DEPENDENCIES = {"streak", "tier", *PROGRESS_STATS}
+
+
+def _increment_counter(db: Session, user_id: int, name: str, amount: int) -> int:
+    """Add amount to a counter (seeding it from history first if it doesn't exist). Returns the new value."""
+    updated = db.query(UserCounter).filter(
+        UserCounter.user_id == user_id,
+        UserCounter.counter == name
+    ).update({UserCounter.value: UserCounter.value + amount}, synchronize_session=False)
+
+    if not updated:
+        # The seed count already includes the row behind this event
+        return _seed_counter(db, user_id, name)
+
+    return db.query(UserCounter.value).filter(
+        UserCounter.user_id == user_id,
+        UserCounter.counter == name
+    ).scalar()
+
+
+def _seed_counter(db: Session, user_id: int, name: str) -> int:
+    value = COUNTERS[name](db, user_id)
+    try:
+        with db.begin_nested():
+            db.add(UserCounter(user_id=user_id, counter=name, value=value))
+    except IntegrityError:
+        # Seeded concurrently - use that row
+        value = db.query(UserCounter.value).filter(
+            UserCounter.user_id == user_id,
+            UserCounter.counter == name
+        ).scalar()
+    return value
+
+
+def _counter_values(db: Session, user_id: int, names: Iterable[str]) -> Dict[str, int]:
+    """Current values of counters, seeding any the user doesn't have yet."""
+    names = set(names)
+    values = dict(db.query(UserCounter.counter, UserCounter.value).filter(
+        UserCounter.user_id == user_id,
+        UserCounter.counter.in_(names)
+    ).all())
+    for name in names - set(values):
+        values[name] = _seed_counter(db, user_id, name)
+    return values
+
+
+# ========================================
+# EVALUATION
+# ========================================
+
+def dependency_of(achievement: Achievement) -> Optional[str]:
+    """What an achievement's criteria depend on: a counter/stat name, "streak", "tier" or a special rule."""
+    criteria = achievement.criteria or {}
+    criteria_type = criteria.get("type")
+    if criteria_type in ("count", "special"):
+        return criteria.get("target")
+    if criteria_type in ("streak", "tier"):
+        return criteria_type
+    return None
+
+
+def record_event(
+    db: Session,
+    user_id: int,
+    event: str,
+    progress: Optional[UserProgress] = None,
+    voice: bool = False,
+    room: Optional[Room] = None,
+    at: Optional[datetime] = None
+) -> List[dict]:
+    """
+    Record a domain event for a user: bump the counters it affects and award any
+    achievements it unlocks. Does not commit.
+
+    Args:
+        event: One of EVENT_DEPENDENCIES (message, resolution, gratitude_entry, ...)
+        progress: The user's UserProgress if the caller already has it loaded
+        voice: For "message", whether it was a voice message
+        room: For "resolution", the room that was resolved
+        at: When the event happened (default now)
+
+    Returns:
+        Newly awarded achievements
+    """
+    db.flush()
+
+    increments = list(EVENT_COUNTERS.get(event, []))
+    if event == "message" and voice:
+        increments.append("voice_messages")
+    counters = {name: _increment_counter(db, user_id, name, 1) for name in increments}
+
+    dependencies = set(EVENT_DEPENDENCIES[event])
+    if event == "message" and not voice:
+        dependencies.discard("voice_messages")
+
+    context = {"at": at or datetime.now(timezone.utc), "room": room}
+    return _award(db, user_id, dependencies, counters, progress, context)
 
 
 def check_and_award_achievements(db: Session, user_id: int) -> List[dict]:
@@ -24,52 +223,74 @@ def check_and_award_achievements(db: Session, user_id: int) -> List[dict]:
     Check all achievements and award any that the user has earned.
     Returns list of newly awarded achievements.
     """
-    newly_awarded = []
-
-    # Get user progress
     progress = db.query(UserProgress).filter(
         UserProgress.user_id == user_id
     ).first()
 
     if not progress:
-        return newly_awarded
+        return []
+
+    newly_awarded = _award(db, user_id, None, {}, progress, {})
+    if newly_awarded:
+        db.commit()
 
-    # Get all achievements
-    achievements = db.query(Achievement).all()
+    return newly_awarded
+
+
+def _award(
+    db: Session,
+    user_id: int,
+    dependencies: Optional[Set[str]],
+    counters: Dict[str, int],
+    progress: Optional[UserProgress],
+    context: dict
+) -> List[dict]:
+    """Evaluate the unearned achievements for the given dependencies (None = all) and award those met."""
+    index = achievement_catalog.get_catalog(db).by_dependency
+    keys = set(index) if dependencies is None else dependencies & set(index)
+    candidates = [achievement for key in keys for achievement in index[key]]
+    if not candidates:
+        return []
 
-    # Get already earned achievement IDs
     earned_ids = set(
-        ua.achievement_id for ua in db.query(UserAchievement).filter(
-            UserAchievement.user_id == user_id
+        achievement_id for (achievement_id,) in db.query(UserAchievement.achievement_id).filter(
+            UserAchievement.user_id == user_id,
+            UserAchievement.achievement_id.in_([a.id for a in candidates])
         ).all()
     )
+    candidates = [a for a in candidates if a.id not in earned_ids]
+    if not candidates:
+        return []
 
-    # Check each achievement
-    for achievement in achievements:
-        if achievement.id in earned_ids:
+    if progress is None and keys & _PROGRESS_DEPENDENCIES:
+        progress = db.query(UserProgress).filter(UserProgress.user_id == user_id).first()
+
+    missing = {dependency_of(a) for a in candidates} & set(COUNTERS) - set(counters)
+    if missing:
+        counters = {**counters, **_counter_values(db, user_id, missing)}
+
+    newly_awarded = []
+    for achievement in candidates:
+        if not check_achievement_criteria(db, user_id, progress, achievement, counters, context):
             continue
 
-        if check_achievement_criteria(db, user_id, progress, achievement):
-            # Award the achievement
-            user_achievement = UserAchievement(
-                user_id=user_id,
-                achievement_id=achievement.id,
-                unlocked_at=datetime.now(timezone.utc)
-            )
-            db.add(user_achievement)
-
-            newly_awarded.append({
-                "id": achievement.id,
-                "code": achievement.code,
-                "name": achievement.name,
-                "description": achievement.description,
-                "icon": achievement.icon,
-                "xp_reward": achievement.xp_reward,
-                "rarity": achievement.rarity
-            })
+        db.add(UserAchievement(
+            user_id=user_id,
+            achievement_id=achievement.id,
+            unlocked_at=datetime.now(timezone.utc)
+        ))
+        newly_awarded.append({
+            "id": achievement.id,
+            "code": achievement.code,
+            "name": achievement.name,
+            "description": achievement.description,
+            "icon": achievement.icon,
+            "xp_reward": achievement.xp_reward,
+            "rarity": achievement.rarity
+        })
 
     if newly_awarded:
-        db.commit()
+        achievement_catalog.invalidate_user_on_commit(db, user_id)
 
     return newly_awarded
 
@@ -77,8 +298,10 @@ def check_and_award_achievements(db: Session, user_id: int) -> List[dict]:
 def check_achievement_criteria(
     db: Session,
     user_id: int,
-    progress: UserProgress,
-    achievement: Achievement
+    progress: Optional[UserProgress],
+    achievement: Achievement,
+    counters: Dict[str, int],
+    context: dict
 ) -> bool:
     """
     Check if user meets the criteria for a specific achievement.
@@ -89,91 +312,35 @@ def check_achievement_criteria(
     value = criteria.get("value")
 
     if criteria_type == "count":
-        return check_count_criteria(db, user_id, progress, target, value)
+        return check_count_criteria(progress, counters, target, value)
 
     elif criteria_type == "streak":
-        return check_streak_criteria(progress, target, value)
+        return progress is not None and check_streak_criteria(progress, target, value)
 
     elif criteria_type == "tier":
-        return check_tier_criteria(progress, target, value)
+        return progress is not None and check_tier_criteria(progress, target, value)
 
     elif criteria_type == "special":
-        return check_special_criteria(db, user_id, progress, target, value)
+        return check_special_criteria(db, user_id, target, value, context)
 
     return False
 
 
 def check_count_criteria(
-    db: Session,
-    user_id: int,
-    progress: UserProgress,
+    progress: Optional[UserProgress],
+    counters: Dict[str, int],
     target: str,
     value: int
 ) -> bool:
     """Check count-based achievements."""
 
-    if target == "messages":
-        # Count total messages sent by user (user_response kind)
-        from app.models.room import Turn
-        count = db.query(func.count(Turn.id)).filter(
-            Turn.user_id == user_id,
-            Turn.kind == "user_response"
-        ).scalar() or 0
-        return count >= value
-
-    elif target == "voice_messages":
-        # Count voice messages (those with audio_url set)
-        from app.models.room import Turn
-        count = db.query(func.count(Turn.id)).filter(
-            Turn.user_id == user_id,
-            Turn.audio_url.isnot(None)
-        ).scalar() or 0
-        return count >= value
-
-    elif target == "coaching_complete":
-        # Count completed coaching sessions
-        from app.models.room import Room, room_participants
-        count = db.query(func.count(Room.id)).join(
-            room_participants, Room.id == room_participants.c.room_id
-        ).filter(
-            room_participants.c.user_id == user_id,
-            Room.phase.in_(["user2_lobby", "user2_coaching", "main_room", "resolved"])
-        ).scalar() or 0
-        return count >= value
-
-    elif target == "summaries_read":
-        # This would need tracking - skip for now
-        return False
+    if target in counters:
+        return counters[target] >= value
 
-    elif target == "resolutions":
-        # Count resolved mediations
-        from app.models.room import Room, room_participants
-        count = db.query(func.count(Room.id)).join(
-            room_participants, Room.id == room_participants.c.room_id
-        ).filter(
-            room_participants.c.user_id == user_id,
-            Room.phase == "resolved"
-        ).scalar() or 0
-        return count >= value
-
-    elif target == "breathing_sessions":
-        return progress.total_breathing_sessions >= value
-
-    elif target == "breathing_minutes":
-        return progress.total_breathing_minutes >= value
-
-    elif target == "gratitude_entries":
-        count = db.query(func.count(GratitudeEntry.id)).filter(
-            GratitudeEntry.user_id == user_id
-        ).scalar() or 0
-        return count >= value
-
-    elif target == "mood_checkins":
-        count = db.query(func.count(EmotionalCheckin.id)).filter(
-            EmotionalCheckin.user_id == user_id
-        ).scalar() or 0
-        return count >= value
+    if target in PROGRESS_STATS:
+        return progress is not None and getattr(progress, PROGRESS_STATS[target]) >= value
 
+    # summaries_read would need tracking - skip for now
     return False
 
 
@@ -215,33 +382,35 @@ def check_tier_criteria(
 def check_special_criteria(
     db: Session,
     user_id: int,
-    progress: UserProgress,
     target: str,
-    value
+    value,
+    context: dict
 ) -> bool:
-    """Check special achievement criteria."""
+    """
+    Check special achievement criteria. With an event context (its time or
+    room) only that event is checked; a full check falls back to history.
+    """
+    at = context.get("at")
 
     if target == "double_breath_streak":
         # Check if user has breathed at least twice per day for X consecutive days
-        from datetime import timedelta
+        today = datetime.now(timezone.utc).date()
+        window_start = today - timedelta(days=value + 30)
 
-        sessions = db.query(BreathingSession).filter(
-            BreathingSession.user_id == user_id
-        ).order_by(BreathingSession.created_at.desc()).all()
+        sessions = db.query(BreathingSession.created_at).filter(
+            BreathingSession.user_id == user_id,
+            BreathingSession.created_at >= window_start
+        ).all()
 
         if not sessions:
             return False
 
         # Group sessions by date
-        sessions_by_date = {}
-        for session in sessions:
-            date_key = session.created_at.date()
-            if date_key not in sessions_by_date:
-                sessions_by_date[date_key] = 0
-            sessions_by_date[date_key] += 1
+        sessions_by_date = defaultdict(int)
+        for (created_at,) in sessions:
+            sessions_by_date[created_at.date()] += 1
 
         # Check for consecutive days with 2+ sessions
-        today = datetime.now(timezone.utc).date()
         consecutive_days = 0
 
         for i in range(value + 30):  # Check up to 30 days back from required
@@ -256,26 +425,31 @@ def check_special_criteria(
         return False
 
     elif target == "fast_resolution":
-        # Check if any mediation was resolved in under X minutes
-        from app.models.room import Room, room_participants
-        rooms = db.query(Room).join(
-            room_participants, Room.id == room_participants.c.room_id
-        ).filter(
-            room_participants.c.user_id == user_id,
-            Room.phase == "resolved"
-        ).all()
+        # Check if a mediation was resolved in under X minutes
+        room = context.get("room")
+        if room is not None:
+            rooms = [room]
+        else:
+            rooms = db.query(Room).join(
+                room_participants, Room.id == room_participants.c.room_id
+            ).filter(
+                room_participants.c.user_id == user_id,
+                Room.phase == "resolved"
+            ).all()
 
         for room in rooms:
-            if room.resolved_at and room.created_at:
-                duration_minutes = (room.resolved_at - room.created_at).total_seconds() / 60
+            resolved_at = room.resolved_at if isinstance(room.resolved_at, datetime) else at
+            if resolved_at and room.created_at:
+                duration_minutes = (_as_utc(resolved_at) - _as_utc(room.created_at)).total_seconds() / 60
                 if duration_minutes <= value:
                     return True
         return False
 
     elif target == "late_night":
-        # Check if user completed any session after midnight
-        from app.models.room import Turn
-        late_turns = db.query(Turn).filter(
+        # Check if user sent a message after midnight
+        if at is not None:
+            return at.hour < 5
+        late_turns = db.query(Turn.id).filter(
             Turn.user_id == user_id,
             func.extract('hour', Turn.created_at) >= 0,
             func.extract('hour', Turn.created_at) < 5
@@ -283,12 +457,18 @@ def check_special_criteria(
         return late_turns is not None
 
     elif target == "early_morning":
-        # Check if user completed any session before X am
-        from app.models.room import Turn
-        early_turns = db.query(Turn).filter(
+        # Check if user sent a message before X am
+        if at is not None:
+            return at.hour < value
+        early_turns = db.query(Turn.id).filter(
             Turn.user_id == user_id,
             func.extract('hour', Turn.created_at) < value
         ).first()
         return early_turns is not None
 
     return False
+
+
+def _as_utc(dt: datetime) -> datetime:
+    """Timestamps are timezone-aware on Postgres and naive (UTC) on SQLite."""
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
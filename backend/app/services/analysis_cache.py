@@ -0,0 +1,65 @@
+"""
+Analysis Cache
+DB-backed, content-addressed cache for expensive AI analyses. Callers hash
+everything that determines the output (normalized input, names, prompt
+version, model) with cache_key(); a repeat analysis of the same content then
+returns the stored result instantly at no API cost.
+
+Entries optionally expire (ttl_seconds); expired entries are ignored and
+removed on the next lookup.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from sqlalchemy.exc import IntegrityError
+from app.db import SessionLocal
+from app.models.analysis_cache import AnalysisCacheEntry
+
+
+def cache_key(kind: str, **parts: Any) -> str:
+    """Stable SHA-256 over the analysis kind and its inputs (must be JSON-serializable)."""
+    canonical = json.dumps({"kind": kind, **parts}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[dict]:
+    """Cached result for a key, or None on a miss/expired entry."""
+    db = SessionLocal()
+    try:
+        entry = db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.cache_key == key).first()
+        if entry is None:
+            return None
+
+        now = datetime.utcnow()
+        if entry.expires_at is not None and entry.expires_at <= now:
+            db.delete(entry)
+            db.commit()
+            return None
+
+        entry.hit_count += 1
+        entry.last_hit_at = now
+        db.commit()
+        return entry.result
+    finally:
+        db.close()
+
+
+def put(key: str, kind: str, result: dict, ttl_seconds: Optional[int] = None):
+    """Store a result (replacing any existing entry for the key)."""
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds) if ttl_seconds else None
+    db = SessionLocal()
+    try:
+        entry = db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.cache_key == key).first()
+        if entry is None:
+            db.add(AnalysisCacheEntry(cache_key=key, kind=kind, result=result, expires_at=expires_at))
+        else:
+            entry.result = result
+            entry.expires_at = expires_at
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker cached the same analysis first - identical content, keep theirs
+            db.rollback()
+    finally:
+        db.close()
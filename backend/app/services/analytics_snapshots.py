@@ -0,0 +1,150 @@
+"""
+Analytics Snapshots
+Precomputes /admin/analytics into per-day DailyMetric rows so the endpoint sums
+small daily buckets for any date range instead of rescanning users, rooms and turns.
+
+Metrics per day:
+- signups, completions, turns          - counts of rows created/resolved that day
+- first_turn_rooms                     - rooms whose first turn was that day (for avg turns per room)
+- active_user (dimension = user id)    - users with at least one turn that day
+- tier, room_phase (dimension = name)  - point-in-time breakdowns, only recorded for "today"
+
+The scheduler refreshes today every few minutes and recomputes yesterday and
+today once a day (just after midnight UTC); older days are only recomputed by
+the startup backfill of an empty table. Past days can still change afterwards -
+deleted users/rooms/turns, or rows committed late with an earlier timestamp -
+and those changes don't show up until the day is refreshed again, e.g. with
+refresh_daily_metrics(db, since=<day>). The endpoint only reads.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, exists, func
+from sqlalchemy.orm import Session, aliased
+from app.models.analytics import DailyMetric
+from app.models.room import Room, Turn
+from app.models.subscription import Subscription
+from app.models.user import User
+
+def _day_bounds(day: date):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def _compute_day(db: Session, day: date) -> List[Dict]:
+    """All metric rows for one day."""
+    start, end = _day_bounds(day)
+    rows = []
+
+    def add(metric: str, value: int, dimension: str = ""):
+        rows.append({"date": day, "metric": metric, "dimension": dimension, "value": int(value or 0)})
+
+    add("signups", db.query(func.count(User.id)).filter(
+        User.created_at >= start, User.created_at < end
+    ).scalar())
+
+    add("completions", db.query(func.count(Room.id)).filter(
+        Room.resolved_at >= start, Room.resolved_at < end, Room.phase == "resolved"
+    ).scalar())
+
+    add("turns", db.query(func.count(Turn.id)).filter(
+        Turn.created_at >= start, Turn.created_at < end
+    ).scalar())
+
+    # Rooms that got their first turn today - summing this over all days gives "rooms with turns"
+    earlier = aliased(Turn)
+    add("first_turn_rooms", db.query(func.count(func.distinct(Turn.room_id))).filter(
+        Turn.created_at >= start,
+        Turn.created_at < end,
+        ~exists().where(and_(earlier.room_id == Turn.room_id, earlier.created_at < start))
+    ).scalar())
+
+    for user_id, turn_count in db.query(Turn.user_id, func.count(Turn.id)).filter(
+        Turn.created_at >= start, Turn.created_at < end
+    ).group_by(Turn.user_id):
+        add("active_user", turn_count, str(user_id))
+
+    # Current-state breakdowns can only be observed today
+    if day == datetime.utcnow().date():
+        for tier, count in db.query(Subscription.tier, func.count(Subscription.id)).group_by(Subscription.tier):
+            add("tier", count, getattr(tier, "value", tier) or "")
+        for phase, count in db.query(Room.phase, func.count(Room.id)).group_by(Room.phase):
+            add("room_phase", count, phase or "")
+
+    return rows
+
+
+def refresh_day(db: Session, day: date):
+    """Recompute and replace one day's metrics."""
+    rows = _compute_day(db, day)
+    db.query(DailyMetric).filter(DailyMetric.date == day).delete(synchronize_session=False)
+    db.bulk_insert_mappings(DailyMetric, rows)
+    db.commit()
+
+
+def refresh_daily_metrics(db: Session, since: Optional[date] = None) -> int:
+    """
+    Refresh days from `since` (default: yesterday) through today.
+    On an empty table, backfills from the first signup. Returns days refreshed.
+    """
+    today = datetime.utcnow().date()
+    if since is None:
+        has_metrics = db.query(DailyMetric.id).first() is not None
+        if has_metrics:
+            since = today - timedelta(days=1)
+        else:
+            first_signup = db.query(func.min(User.created_at)).scalar()
+            since = first_signup.date() if first_signup else today
+
+    day = since
+    refreshed = 0
+    while day <= today:
+        refresh_day(db, day)
+        refreshed += 1
+        day += timedelta(days=1)
+    return refreshed
+
+
+def refresh_today(db: Session) -> int:
+    """Recompute only the current day. Returns metric rows written."""
+    today = datetime.utcnow().date()
+    refresh_day(db, today)
+    return db.query(func.count(DailyMetric.id)).filter(DailyMetric.date == today).scalar() or 0
+
+
+def metric_by_day(db: Session, metric: str, start: date, end: date) -> List[Dict]:
+    """[{date, count}] for a metric over [start, end], days with zero omitted."""
+    rows = db.query(DailyMetric.date, func.sum(DailyMetric.value)).filter(
+        DailyMetric.metric == metric,
+        DailyMetric.date >= start,
+        DailyMetric.date <= end
+    ).group_by(DailyMetric.date).order_by(DailyMetric.date).all()
+    return [{"date": str(day), "count": int(count)} for day, count in rows if count]
+
+
+def metric_total(db: Session, metric: str, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    query = db.query(func.sum(DailyMetric.value)).filter(DailyMetric.metric == metric)
+    if start is not None:
+        query = query.filter(DailyMetric.date >= start)
+    if end is not None:
+        query = query.filter(DailyMetric.date <= end)
+    return int(query.scalar() or 0)
+
+
+def distinct_dimensions(db: Session, metric: str, start: date, end: date) -> int:
+    """Distinct dimension values over a range (e.g. active users across several days)."""
+    return db.query(func.count(func.distinct(DailyMetric.dimension))).filter(
+        DailyMetric.metric == metric,
+        DailyMetric.date >= start,
+        DailyMetric.date <= end
+    ).scalar() or 0
+
+
+def latest_breakdown(db: Session, metric: str) -> List[Tuple[str, int]]:
+    """[(dimension, value)] from the most recent day a point-in-time breakdown was recorded."""
+    latest = db.query(func.max(DailyMetric.date)).filter(DailyMetric.metric == metric).scalar()
+    if latest is None:
+        return []
+    return db.query(DailyMetric.dimension, DailyMetric.value).filter(
+        DailyMetric.metric == metric,
+        DailyMetric.date == latest
+    ).all()
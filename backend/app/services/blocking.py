@@ -0,0 +1,102 @@
+"""
+Blocking Call Executors
+Dedicated, bounded thread pools for blocking calls made from async handlers.
+
+Each resource class gets its own pool so a slow dependency can only tie up its
+own threads: a stalled S3 upload can't delay transcriptions, and a burst of
+Whisper transcriptions can't starve S3. Callers await the result instead of
+running the call on the event loop:
+
+    result = await blocking.run(blocking.LLM, transcribe_audio, audio_file, filename)
+
+Pools:
+- LLM: blocking AI SDK calls (OpenAI Whisper, sync Anthropic client)
+- S3: boto3 uploads, downloads and deletes
+
+Password hashing has its own process pool (services/password_hashing.py).
+
+Pool sizes come from settings (EXECUTOR_*_THREADS). stats() reports active and
+queued calls per pool for the admin event-loop endpoint.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.config import settings
+
+LLM = "llm"
+S3 = "s3"
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_active: Dict[str, int] = {}
+_queued: Dict[str, int] = {}
+_completed: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _pool_size(pool: str) -> int:
+    return {
+        LLM: settings.EXECUTOR_LLM_THREADS,
+        S3: settings.EXECUTOR_S3_THREADS,
+    }[pool]
+
+
+def get_executor(pool: str) -> ThreadPoolExecutor:
+    """Get the thread pool for a resource class (created on first use)."""
+    executor = _pools.get(pool)
+    if executor is None:
+        with _lock:
+            executor = _pools.get(pool)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=_pool_size(pool), thread_name_prefix=f"{pool}-pool")
+                _pools[pool] = executor
+                _active[pool] = _queued[pool] = _completed[pool] = 0
+    return executor
+
+
+def _tracked(pool: str, func: Callable) -> Any:
+    with _lock:
+        _queued[pool] -= 1
+        _active[pool] += 1
+    try:
+        return func()
+    finally:
+        with _lock:
+            _active[pool] -= 1
+            _completed[pool] += 1
+
+
+async def run(pool: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call on the pool for its resource class and await the result."""
+    executor = get_executor(pool)
+    # Carry context variables into the worker thread, like asyncio.to_thread
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    with _lock:
+        _queued[pool] += 1
+    return await asyncio.get_running_loop().run_in_executor(executor, _tracked, pool, call)
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """Size, active, queued and completed calls for each pool created so far."""
+    with _lock:
+        return {
+            pool: {
+                "threads": executor._max_workers,
+                "active": _active[pool],
+                "queued": _queued[pool],
+                "completed": _completed[pool],
+            }
+            for pool, executor in _pools.items()
+        }
+
+
+def shutdown() -> None:
+    """Stop accepting work and let in-flight calls finish (app shutdown)."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for executor in pools:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,131 @@
+"""
+Conversation Context Window
+Keeps long mediations inside a per-model token budget: the most recent messages
+are sent verbatim and everything older is folded into a rolling summary that is
+persisted on the Room (Room.context_summaries) and sent as a cached system block.
+
+A fold only happens when the verbatim history goes over budget, and it folds
+down to the recent window, so the summary changes rarely and input tokens per
+turn stay flat as a session gets long.
+"""
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.cost_tracker import extract_usage
+from app.services.llm_gateway import create_message
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation guided by an AI mediator/coach.
+
+Update the summary with the new messages below. Keep:
+- Each person's key observations, feelings and needs (NVC), in their own words where possible
+- Agreements, open questions and anything either person asked to come back to
+- Moments of escalation and how they were handled
+
+Write in third person, using first names. Be concise - at most 250 words. Output ONLY the updated summary."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) - good enough for budgeting."""
+    return len(text or "") // 4 + 1
+
+
+def token_budget(model: str) -> int:
+    """History token budget for a model (CONTEXT_MODEL_TOKEN_BUDGETS override or the default)."""
+    return settings.context_model_token_budgets.get(model, settings.CONTEXT_TOKEN_BUDGET)
+
+
+def summary_block(summary: Optional[str]) -> Optional[str]:
+    """Format a rolling summary as a system block (None when there is nothing folded yet)."""
+    if not summary:
+        return None
+    return f"EARLIER IN THIS CONVERSATION (summarized):\n{summary}"
+
+
+def _transcript(messages: List[Dict], speakers: List[Optional[str]]) -> str:
+    lines = []
+    for message, name in zip(messages, speakers):
+        content = message["content"]
+        if message["role"] == "assistant":
+            speaker = "AI"
+        else:
+            speaker = name or "User"
+            # Messages that already start with the speaker's name don't need it twice
+            if content.startswith(f"{speaker}: "):
+                content = content[len(speaker) + 2:]
+        lines.append(f"{speaker}: {content}")
+    return "\n\n".join(lines)
+
+
+async def _summarize(
+    previous_summary: Optional[str],
+    messages: List[Dict],
+    speakers: List[Optional[str]]
+) -> Tuple[Optional[str], Dict]:
+    """Fold messages into the previous summary. Returns (summary, usage) - summary is None on failure."""
+    prompt = f"""CURRENT SUMMARY:
+{previous_summary or "(none yet)"}
+
+NEW MESSAGES:
+{_transcript(messages, speakers)}"""
+
+    try:
+        response = await create_message(
+            model=settings.CONTEXT_SUMMARY_MODEL,
+            max_tokens=500,
+            system=SUMMARY_PROMPT,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text.strip(), extract_usage(response)
+    except Exception as e:
+        print(f"⚠️ Context summary failed, sending full history: {e}")
+        return None, {}
+
+
+async def fit_history(
+    messages: List[Dict],
+    turn_ids: List[int],
+    state: Optional[Dict],
+    model: str,
+    speakers: Optional[List[Optional[str]]] = None
+) -> Tuple[List[Dict], Optional[Dict], Dict]:
+    """
+    Fit a conversation into the model's token budget.
+
+    Args:
+        messages: Full conversation [{role, content}], oldest first
+        turn_ids: Turn id for each message (same order)
+        state: Persisted window state {"summary", "through_turn_id"} or None
+        model: Model the history will be sent to
+        speakers: First name of whoever wrote each message (same order, None for
+            AI or unknown) - lets the summary say who said what
+
+    Returns:
+        (history, state, usage) - history is what to send verbatim, state is the
+        (possibly updated) window state to persist, usage is the summary call's
+        token usage ({} when no summary call was made).
+    """
+    state = state or {}
+    summary = state.get("summary")
+    through_turn_id = state.get("through_turn_id", 0)
+
+    # Drop everything already folded into the summary
+    start = 0
+    while start < len(turn_ids) and turn_ids[start] <= through_turn_id:
+        start += 1
+    history = messages[start:]
+    ids = turn_ids[start:]
+    names = (speakers or [None] * len(messages))[start:]
+
+    used = estimate_tokens(summary) + sum(estimate_tokens(m["content"]) for m in history)
+    keep = settings.CONTEXT_RECENT_MESSAGES
+    if used <= token_budget(model) or len(history) <= keep:
+        return history, state or None, {}
+
+    # Over budget - fold all but the most recent messages into the summary
+    fold_count = len(history) - keep
+    new_summary, usage = await _summarize(summary, history[:fold_count], names[:fold_count])
+    if new_summary is None:
+        return history, state or None, {}
+
+    print(f"🗜️ Folded {fold_count} messages into context summary (~{used} tokens, budget {token_budget(model)})")
+    new_state = {"summary": new_summary, "through_turn_id": ids[fold_count - 1]}
+    return history[fold_count:], new_state, usage
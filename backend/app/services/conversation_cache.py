@@ -0,0 +1,66 @@
+"""
+Main Room Conversation Cache
+Keeps each room's already-cleaned Claude history in memory so a new turn only
+appends the turns created since the last request instead of rebuilding the
+whole transcript.
+
+Entries are keyed by room id and remember the id of the last turn they cover.
+Callers always fetch turns with a higher id from the database, so the cache is
+safe to use across workers - a stale entry just means a larger delta. Because
+ids can commit out of order, callers also compare the number of turns up to
+last_turn_id with the entry's and rebuild on a mismatch (store(replace=True)).
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Upper bound on rooms kept in memory (least recently used are evicted first)
+MAX_CACHED_ROOMS = 500
+
+
+@dataclass
+class RoomHistory:
+    last_turn_id: int = 0
+    messages: List[Dict] = field(default_factory=list)
+    turn_ids: List[int] = field(default_factory=list)  # Turn id of each message (same order)
+    exchange_count: int = 0
+    speakers: List[Optional[str]] = field(default_factory=list)  # Speaker first name per message (None for AI)
+
+
+_histories: "OrderedDict[int, RoomHistory]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get(room_id: int) -> RoomHistory:
+    """Return a snapshot of the cached history for a room (empty if not cached)."""
+    with _lock:
+        entry = _histories.get(room_id)
+        if entry is None:
+            return RoomHistory()
+        _histories.move_to_end(room_id)
+        return RoomHistory(
+            entry.last_turn_id, list(entry.messages), list(entry.turn_ids), entry.exchange_count,
+            list(entry.speakers)
+        )
+
+
+def store(room_id: int, history: RoomHistory, replace: bool = False) -> None:
+    """Save a room's history, unless a newer one was stored concurrently (replace=True always saves a rebuild)."""
+    with _lock:
+        current = _histories.get(room_id)
+        if not replace and current is not None and current.last_turn_id > history.last_turn_id:
+            return
+        _histories[room_id] = history
+        _histories.move_to_end(room_id)
+        while len(_histories) > MAX_CACHED_ROOMS:
+            _histories.popitem(last=False)
+
+
+def invalidate(room_id: Optional[int] = None) -> None:
+    """Drop a room's cached history (or every room when room_id is None)."""
+    with _lock:
+        if room_id is None:
+            _histories.clear()
+        else:
+            _histories.pop(room_id, None)
@@ -0,0 +1,186 @@
+"""
+AI Cost Rollups
+Maintains the hourly/daily CostRollup table the admin cost dashboards read from,
+so page loads aggregate a few thousand rollup rows instead of scanning api_costs
+and turns.
+
+refresh_cost_rollups() is incremental: it rebuilds the hourly buckets from the
+newest one already rolled up (a re-run just rewrites the same buckets), then
+rebuilds the daily buckets for the affected days from those hours. The first
+run backfills history one day at a time. Runs from the scheduler every few
+minutes - dashboards can lag by that much.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.room import Turn
+from app.models.subscription import ApiCost, CostRollup
+
+SOURCES = ("api_costs", "turns")
+
+# Re-aggregate this far behind the newest hourly bucket to pick up late rows
+LATE_ROW_MARGIN = timedelta(hours=1)
+
+_SUM_FIELDS = ("call_count", "input_tokens", "output_tokens", "cache_read_tokens",
+               "cache_write_tokens", "audio_seconds", "cost_usd")
+
+
+def _utc_naive(dt: datetime) -> datetime:
+    """Rollup buckets are naive UTC (created_at is timezone-aware on Postgres, naive on SQLite)."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def hour_start(dt: datetime) -> datetime:
+    return _utc_naive(dt).replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(dt: datetime) -> datetime:
+    return _utc_naive(dt).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _empty_totals() -> Dict:
+    return {field: 0 for field in _SUM_FIELDS}
+
+
+def _source_rows(db: Session, source: str, start: datetime, end: datetime):
+    """Raw cost rows created in [start, end) as (created_at, key, totals) tuples."""
+    if source == "api_costs":
+        rows = db.query(
+            ApiCost.created_at, ApiCost.service_type, ApiCost.model, ApiCost.user_id, ApiCost.room_id,
+            ApiCost.input_tokens, ApiCost.output_tokens, ApiCost.cache_read_tokens,
+            ApiCost.cache_write_tokens, ApiCost.audio_seconds, ApiCost.cost_usd
+        ).filter(
+            ApiCost.created_at >= start,
+            ApiCost.created_at < end
+        ).yield_per(5000)
+
+        for (created_at, service_type, model, user_id, room_id,
+             input_tokens, output_tokens, cache_read, cache_write, audio_seconds, cost_usd) in rows:
+            yield created_at, (service_type, None, model, user_id, room_id), (
+                1, input_tokens or 0, output_tokens or 0, cache_read or 0, cache_write or 0,
+                audio_seconds or 0, cost_usd or 0
+            )
+    else:
+        rows = db.query(
+            Turn.created_at, Turn.context, Turn.model, Turn.user_id, Turn.room_id,
+            Turn.input_tokens, Turn.output_tokens, Turn.cost_usd
+        ).filter(
+            Turn.created_at >= start,
+            Turn.created_at < end,
+            Turn.cost_usd > 0
+        ).yield_per(5000)
+
+        for created_at, context, model, user_id, room_id, input_tokens, output_tokens, cost_usd in rows:
+            yield created_at, ("anthropic", context, model, user_id, room_id), (
+                1, input_tokens or 0, output_tokens or 0, 0, 0, 0, cost_usd or 0
+            )
+
+
+def _write_buckets(db: Session, source: str, granularity: str, buckets: Dict[Tuple, Dict]):
+    db.bulk_insert_mappings(CostRollup, [
+        {
+            "source": source,
+            "granularity": granularity,
+            "bucket_start": bucket_start,
+            "service_type": service_type,
+            "context": context,
+            "model": model,
+            "user_id": user_id,
+            "room_id": room_id,
+            **totals
+        }
+        for (bucket_start, service_type, context, model, user_id, room_id), totals in buckets.items()
+    ])
+
+
+def _rebuild_hours(db: Session, source: str, start: datetime, end: datetime) -> int:
+    """Replace hourly buckets in [start, end) for one source. Returns buckets written."""
+    db.query(CostRollup).filter(
+        CostRollup.source == source,
+        CostRollup.granularity == "hour",
+        CostRollup.bucket_start >= start,
+        CostRollup.bucket_start < end
+    ).delete(synchronize_session=False)
+
+    buckets = defaultdict(_empty_totals)
+    for created_at, key, values in _source_rows(db, source, start, end):
+        totals = buckets[(hour_start(created_at),) + key]
+        for field, value in zip(_SUM_FIELDS, values):
+            totals[field] += value
+
+    _write_buckets(db, source, "hour", buckets)
+    return len(buckets)
+
+
+def _rebuild_days(db: Session, source: str, start: datetime, end: datetime):
+    """Replace daily buckets in [start, end) by summing that range's hourly buckets."""
+    db.query(CostRollup).filter(
+        CostRollup.source == source,
+        CostRollup.granularity == "day",
+        CostRollup.bucket_start >= start,
+        CostRollup.bucket_start < end
+    ).delete(synchronize_session=False)
+
+    hours = db.query(CostRollup).filter(
+        CostRollup.source == source,
+        CostRollup.granularity == "hour",
+        CostRollup.bucket_start >= start,
+        CostRollup.bucket_start < end
+    ).yield_per(5000)
+
+    buckets = defaultdict(_empty_totals)
+    for hour in hours:
+        totals = buckets[(day_start(hour.bucket_start), hour.service_type, hour.context,
+                          hour.model, hour.user_id, hour.room_id)]
+        for field in _SUM_FIELDS:
+            totals[field] += getattr(hour, field) or 0
+
+    _write_buckets(db, source, "day", buckets)
+
+
+def _refresh_from(db: Session, source: str) -> Optional[datetime]:
+    """Where an incremental refresh of a source should start (None = nothing to do)."""
+    newest_hour = db.query(func.max(CostRollup.bucket_start)).filter(
+        CostRollup.source == source,
+        CostRollup.granularity == "hour"
+    ).scalar()
+    if newest_hour is not None:
+        return newest_hour - LATE_ROW_MARGIN
+
+    # First run - backfill from the oldest row
+    model = ApiCost if source == "api_costs" else Turn
+    oldest = db.query(func.min(model.created_at)).scalar()
+    return hour_start(oldest) if oldest else None
+
+
+def refresh_cost_rollups(db: Session, since: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Bring the rollups up to date. Pass since to force a rebuild from that time.
+
+    Returns:
+        Dict of source -> hourly buckets written
+    """
+    end = hour_start(datetime.utcnow()) + timedelta(hours=1)
+    written = {}
+
+    for source in SOURCES:
+        start = hour_start(since) if since else _refresh_from(db, source)
+        written[source] = 0
+        if start is None:
+            continue
+
+        # One day per transaction keeps the backfill's memory use flat
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(day_start(chunk_start) + timedelta(days=1), end)
+            written[source] += _rebuild_hours(db, source, chunk_start, chunk_end)
+            _rebuild_days(db, source, day_start(chunk_start), day_start(chunk_start) + timedelta(days=1))
+            db.commit()
+            chunk_start = chunk_end
+
+    return written
+
@@ -3,6 +3,7 @@ Cost tracking for all API usage
 Pricing as of Nov 2024:
 - Claude Sonnet 4: Input $3/M tokens, Output $15/M tokens
 - Claude Sonnet 4.5: Input $3/M tokens, Output $15/M tokens
+- Claude prompt caching: Cache write $3.75/M tokens, Cache read $0.30/M tokens
 - Gemini 1.5 Flash: Input $0.075/M tokens, Output $0.30/M tokens (under 128k)
 - Gemini 1.5 Pro: Input $1.25/M tokens, Output $5.00/M tokens (under 128k)
 - OpenAI Whisper: $0.006 per minute
@@ -44,15 +45,28 @@ def calculate_openai_cost(input_tokens: int, output_tokens: int, model: str = "g
     return input_cost + output_cost
 
 
-def calculate_anthropic_cost(input_tokens: int, output_tokens: int, model: str = "claude-sonnet-4-20250514") -> float:
-    """Calculate cost in USD for Claude API call"""
+def calculate_anthropic_cost(
+    input_tokens: int,
+    output_tokens: int,
+    model: str = "claude-sonnet-4-20250514",
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0
+) -> float:
+    """
+    Calculate cost in USD for Claude API call.
+    input_tokens excludes cached tokens - cache reads/writes are billed separately.
+    """
     INPUT_COST_PER_MILLION = 3.0
     OUTPUT_COST_PER_MILLION = 15.0
+    CACHE_WRITE_COST_PER_MILLION = 3.75
+    CACHE_READ_COST_PER_MILLION = 0.30
 
     input_cost = (input_tokens / 1_000_000) * INPUT_COST_PER_MILLION
     output_cost = (output_tokens / 1_000_000) * OUTPUT_COST_PER_MILLION
+    cache_write_cost = (cache_write_tokens / 1_000_000) * CACHE_WRITE_COST_PER_MILLION
+    cache_read_cost = (cache_read_tokens / 1_000_000) * CACHE_READ_COST_PER_MILLION
 
-    return input_cost + output_cost
+    return input_cost + output_cost + cache_write_cost + cache_read_cost
 
 
 def calculate_whisper_cost(audio_seconds: float) -> float:
@@ -73,14 +87,23 @@ def extract_usage(response) -> dict:
     Extract token usage from Claude API response.
 
     Returns:
-        Dict with input_tokens, output_tokens, cost_usd, model
+        Dict with input_tokens, output_tokens, cache_read_tokens, cache_write_tokens, cost_usd, model
     """
     usage = response.usage
+    cache_read_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
 
     return {
         "input_tokens": usage.input_tokens,
         "output_tokens": usage.output_tokens,
-        "cost_usd": calculate_anthropic_cost(usage.input_tokens, usage.output_tokens),
+        "cache_read_tokens": cache_read_tokens,
+        "cache_write_tokens": cache_write_tokens,
+        "cost_usd": calculate_anthropic_cost(
+            usage.input_tokens,
+            usage.output_tokens,
+            cache_read_tokens=cache_read_tokens,
+            cache_write_tokens=cache_write_tokens
+        ),
         "model": response.model
     }
 
@@ -95,12 +118,15 @@ def track_api_cost(
     input_tokens: int = 0,
     output_tokens: int = 0,
     audio_seconds: float = 0.0,
-    model: str = None
+    model: str = None,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0
 ):
     """
     Track API cost in database for profitability analysis.
 
     service_type: 'anthropic', 'openai_whisper', 'openai_tts'
+    cache_read_tokens / cache_write_tokens: Anthropic prompt-cache usage (not included in input_tokens)
     """
     api_cost = ApiCost(
         user_id=user_id,
@@ -109,6 +135,8 @@ def track_api_cost(
         service_type=service_type,
         input_tokens=input_tokens,
         output_tokens=output_tokens,
+        cache_read_tokens=cache_read_tokens or 0,
+        cache_write_tokens=cache_write_tokens or 0,
         audio_seconds=Decimal(str(audio_seconds)),
         cost_usd=Decimal(str(cost_usd)),
         model=model
@@ -0,0 +1,233 @@
+"""
+Daily Challenges
+Assignment, lookup and progress tracking for daily challenges. Challenge
+progress is updated on many user actions, so each operation is a single
+statement:
+
+- Challenge definitions are held in an in-process snapshot (reloaded after
+  CATALOG_TTL_SECONDS, or immediately after seeding via invalidate_challenges).
+- todays_challenges() fetches today's assignments joined to their definitions
+  in one query.
+- assign() picks from the cached active challenges and creates the assignments
+  with one bulk INSERT ... RETURNING.
+- record_action() advances every matching challenge with one
+  UPDATE ... RETURNING (progress is incremented in SQL, so concurrent actions
+  are never lost).
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Row, case, insert, update
+from sqlalchemy.orm import Session
+from app.models.gamification import DailyChallenge, UserDailyChallenge
+
+# Re-read challenge definitions this often even without an invalidation (seeds run in other workers too)
+CATALOG_TTL_SECONDS = 300
+# Challenges assigned to each user per day
+CHALLENGES_PER_DAY = 3
+
+
+@dataclass(frozen=True)
+class CachedChallenge:
+    id: int
+    code: str
+    title: str
+    description: str
+    requirements: dict
+    score_reward: int
+    is_active: bool
+
+    @property
+    def action(self) -> Optional[str]:
+        return self.requirements.get("action")
+
+    @property
+    def target(self) -> int:
+        return self.requirements.get("count", 1)
+
+
+@dataclass
+class ChallengeCatalog:
+    by_id: Dict[int, CachedChallenge]
+    active: List[CachedChallenge]
+    by_action: Dict[str, List[CachedChallenge]]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+_catalog: Optional[ChallengeCatalog] = None
+_generation = 0
+_lock = threading.Lock()
+
+
+def get_catalog(db: Session) -> ChallengeCatalog:
+    """All challenge definitions (active and retired), loading them if missing or expired."""
+    global _catalog
+    with _lock:
+        catalog = _catalog
+        generation = _generation
+    if catalog is not None and time.monotonic() - catalog.loaded_at < CATALOG_TTL_SECONDS:
+        return catalog
+
+    by_id = {}
+    by_action = defaultdict(list)
+    for c in db.query(DailyChallenge).order_by(DailyChallenge.id).all():
+        challenge = CachedChallenge(
+            id=c.id,
+            code=c.code,
+            title=c.title,
+            description=c.description,
+            requirements=dict(c.requirements or {}),
+            score_reward=c.score_reward,
+            is_active=c.is_active
+        )
+        by_id[challenge.id] = challenge
+        if challenge.action:
+            by_action[challenge.action].append(challenge)
+
+    catalog = ChallengeCatalog(
+        by_id=by_id,
+        active=[c for c in by_id.values() if c.is_active],
+        by_action=dict(by_action)
+    )
+    with _lock:
+        # Don't cache a load that raced with an invalidation
+        if _generation == generation:
+            _catalog = catalog
+    return catalog
+
+
+def invalidate_challenges() -> None:
+    """Drop the cached definitions (call after seeding or editing challenges)."""
+    global _catalog, _generation
+    with _lock:
+        _catalog = None
+        _generation += 1
+
+
+def _today_window(now: datetime) -> Tuple[datetime, datetime]:
+    """(assigned on/after, expiring by) bounds for today's assignments."""
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return today_start, today_start + timedelta(days=1, hours=6)  # Buffer for timezone
+
+
+def todays_challenges(
+    db: Session,
+    user_id: int,
+    now: Optional[datetime] = None
+) -> List[Tuple[UserDailyChallenge, DailyChallenge]]:
+    """Today's assignments for a user with their challenge definitions, in one query."""
+    now = now or datetime.now(timezone.utc)
+    assigned_after, expires_by = _today_window(now)
+
+    return db.query(UserDailyChallenge, DailyChallenge).join(
+        DailyChallenge, DailyChallenge.id == UserDailyChallenge.challenge_id
+    ).filter(
+        UserDailyChallenge.user_id == user_id,
+        UserDailyChallenge.assigned_at >= assigned_after,
+        UserDailyChallenge.expires_at <= expires_by
+    ).order_by(UserDailyChallenge.id).all()
+
+
+def assign(
+    db: Session,
+    user_id: int,
+    now: Optional[datetime] = None
+) -> List[Tuple[Row, CachedChallenge]]:
+    """
+    Assign up to CHALLENGES_PER_DAY random active challenges for today and
+    commit. Returns (assignment row, challenge) pairs.
+    """
+    now = now or datetime.now(timezone.utc)
+    tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    active = get_catalog(db).active
+    if not active:
+        return []
+
+    selected = random.sample(active, min(CHALLENGES_PER_DAY, len(active)))
+
+    # Plain rows rather than ORM objects, so the commit below doesn't expire them into N refreshes
+    assigned = db.execute(
+        insert(UserDailyChallenge).returning(
+            UserDailyChallenge.id,
+            UserDailyChallenge.challenge_id,
+            UserDailyChallenge.progress,
+            UserDailyChallenge.expires_at,
+            UserDailyChallenge.completed_at,
+            UserDailyChallenge.claimed_at
+        ),
+        [
+            {
+                "user_id": user_id,
+                "challenge_id": challenge.id,
+                "assigned_at": now,
+                "expires_at": tomorrow,
+                "progress": 0
+            }
+            for challenge in selected
+        ]
+    ).all()
+    db.commit()
+
+    # Pair by challenge_id (unique within one assignment) - RETURNING order isn't guaranteed
+    by_challenge = {c.id: c for c in selected}
+    return sorted(((row, by_challenge[row.challenge_id]) for row in assigned), key=lambda pair: pair[0].id)
+
+
+def record_action(db: Session, user_id: int, action: str, now: Optional[datetime] = None) -> List[dict]:
+    """
+    Advance today's incomplete challenges that count this action, marking the
+    ones that reach their target as completed. Does not commit.
+    """
+    now = now or datetime.now(timezone.utc)
+    catalog = get_catalog(db)
+    matching = catalog.by_action.get(action)
+    if not matching:
+        return []
+
+    assigned_after, expires_by = _today_window(now)
+    target = case(
+        {c.id: c.target for c in matching},
+        value=UserDailyChallenge.challenge_id,
+        else_=1
+    )
+
+    rows = db.execute(
+        update(UserDailyChallenge)
+        .where(
+            UserDailyChallenge.user_id == user_id,
+            UserDailyChallenge.challenge_id.in_([c.id for c in matching]),
+            UserDailyChallenge.assigned_at >= assigned_after,
+            UserDailyChallenge.expires_at <= expires_by,
+            UserDailyChallenge.completed_at.is_(None)
+        )
+        .values(
+            progress=UserDailyChallenge.progress + 1,
+            # SET expressions see the old row, so this checks the incremented progress
+            completed_at=case((UserDailyChallenge.progress + 1 >= target, now), else_=None)
+        )
+        .returning(
+            UserDailyChallenge.challenge_id,
+            UserDailyChallenge.progress,
+            UserDailyChallenge.completed_at
+        )
+        .execution_options(synchronize_session="fetch")
+    ).all()
+
+    updated = []
+    for row in sorted(rows, key=lambda r: r.challenge_id):
+        challenge = catalog.by_id[row.challenge_id]
+        updated.append({
+            "challenge_id": challenge.id,
+            "code": challenge.code,
+            "title": challenge.title,
+            "progress": row.progress,
+            "target": challenge.target,
+            "completed": row.completed_at is not None,
+            "score_reward": challenge.score_reward
+        })
+    return updated
@@ -0,0 +1,199 @@
+"""
+Gamification Maintenance Jobs
+Nightly streak-breaking and inactivity penalties, written as set-based
+statements so they scale to hundreds of thousands of users:
+
+- user_progress is walked in keyset-paginated id ranges (GAMIFICATION_JOB_BATCH_SIZE
+  rows per range), one short transaction per range - no giant transaction and
+  no rows loaded into Python.
+- break_expired_streaks() is one bulk UPDATE per range.
+- apply_inactivity_penalties() is one INSERT ... SELECT of ScoreEvents plus one
+  UPDATE ... FROM score_events per range. Each user gets only their highest
+  applicable tier, at most once per day (the "already penalized today" check is
+  a NOT EXISTS in the same INSERT, not a query per user).
+
+Both return run metrics ({"rows", "batches", "duration_ms", ...}) that the
+scheduler logs and the admin endpoints return.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple
+from sqlalchemy import and_, case, exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session, aliased
+from app.config import settings
+from app.models.gamification import ScoreEvent, UserProgress
+
+# Days inactive -> score change (only the highest tier reached applies)
+INACTIVITY_PENALTIES = {
+    7: -5,
+    14: -10,
+    30: -15
+}
+
+INACTIVITY_EVENT_PREFIX = "inactivity_penalty_"
+
+# Streaks break after this long without activity (unless protected)
+STREAK_EXPIRY = timedelta(hours=24)
+
+
+def _id_ranges(db: Session, batch_size: int) -> Iterator[Tuple[int, int]]:
+    """Yield (after_id, up_to_id] ranges covering user_progress, batch_size rows each."""
+    after_id = 0
+    while True:
+        upper = db.execute(
+            select(UserProgress.id)
+            .where(UserProgress.id > after_id)
+            .order_by(UserProgress.id)
+            .offset(batch_size - 1)
+            .limit(1)
+        ).scalar()
+        if upper is None:
+            # Last, partial range
+            upper = db.execute(select(func.max(UserProgress.id)).where(UserProgress.id > after_id)).scalar()
+            if upper is None:
+                return
+            yield after_id, upper
+            return
+        yield after_id, upper
+        after_id = upper
+
+
+def _in_range(after_id: int, up_to_id: int):
+    return and_(UserProgress.id > after_id, UserProgress.id <= up_to_id)
+
+
+def _metrics(job: str, started: float, rows: int, batches: int, **extra) -> Dict:
+    metrics = {
+        "job": job,
+        "rows": rows,
+        "batches": batches,
+        "duration_ms": round((time.monotonic() - started) * 1000),
+        **extra
+    }
+    print(f"[Gamification] {job}: {rows} rows in {batches} batch(es), {metrics['duration_ms']} ms")
+    return metrics
+
+
+def break_expired_streaks(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> Dict:
+    """
+    Reset streaks of users inactive for 24+ hours (unless protected), keeping
+    longest_streak up to date.
+    """
+    started = time.monotonic()
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.GAMIFICATION_JOB_BATCH_SIZE
+    threshold = now - STREAK_EXPIRY
+
+    rows = batches = 0
+    for after_id, up_to_id in _id_ranges(db, batch_size):
+        result = db.execute(
+            update(UserProgress)
+            .where(
+                _in_range(after_id, up_to_id),
+                UserProgress.current_streak > 0,
+                UserProgress.streak_last_activity < threshold,
+                or_(UserProgress.streak_protected_until.is_(None), UserProgress.streak_protected_until < now)
+            )
+            .values(
+                # SET expressions see the old row, so this compares the streak being broken
+                longest_streak=case(
+                    (UserProgress.current_streak > UserProgress.longest_streak, UserProgress.current_streak),
+                    else_=UserProgress.longest_streak
+                ),
+                current_streak=0
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        rows += result.rowcount
+        batches += 1
+
+    return _metrics("break_expired_streaks", started, rows, batches)
+
+
+def apply_inactivity_penalties(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> Dict:
+    """
+    Deduct the highest applicable inactivity penalty from each inactive user
+    with a positive score, once per day, logging a ScoreEvent for each.
+    """
+    from app.routes.gamification import TIER_THRESHOLDS
+
+    started = time.monotonic()
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.GAMIFICATION_JOB_BATCH_SIZE
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # Highest tier first so CASE picks the longest inactivity reached
+    tiers = sorted(INACTIVITY_PENALTIES.items(), reverse=True)
+    min_days = tiers[-1][0]
+
+    def by_tier(value_for):
+        return case(
+            *((UserProgress.streak_last_activity < now - timedelta(days=days), value_for(days, change))
+              for days, change in tiers[:-1]),
+            else_=value_for(*tiers[-1])
+        )
+
+    score_change = by_tier(lambda days, change: literal(change))
+    score_after = case(
+        (UserProgress.health_score + score_change < 0, 0),
+        else_=UserProgress.health_score + score_change
+    )
+
+    penalized_today = exists().where(
+        ScoreEvent.user_id == UserProgress.user_id,
+        ScoreEvent.event_type.like(f"{INACTIVITY_EVENT_PREFIX}%"),
+        ScoreEvent.created_at >= today_start
+    )
+
+    event = aliased(ScoreEvent)
+    new_tier = case(
+        (event.score_after >= TIER_THRESHOLDS["platinum"], "platinum"),
+        (event.score_after >= TIER_THRESHOLDS["gold"], "gold"),
+        (event.score_after >= TIER_THRESHOLDS["silver"], "silver"),
+        else_="bronze"
+    )
+
+    rows = batches = 0
+    for after_id, up_to_id in _id_ranges(db, batch_size):
+        # 1. Log one penalty event per eligible user in the range
+        select_penalties = select(
+            UserProgress.user_id,
+            by_tier(lambda days, change: literal(f"{INACTIVITY_EVENT_PREFIX}{days}d")),
+            score_change,
+            UserProgress.health_score,
+            score_after,
+            by_tier(lambda days, change: literal(f"{days}-day inactivity penalty")),
+            literal(now)
+        ).where(
+            _in_range(after_id, up_to_id),
+            UserProgress.streak_last_activity < now - timedelta(days=min_days),
+            UserProgress.health_score > 0,
+            ~penalized_today
+        )
+        result = db.execute(
+            insert(ScoreEvent).from_select(
+                ["user_id", "event_type", "score_change", "score_before", "score_after", "description", "created_at"],
+                select_penalties
+            )
+        )
+
+        # 2. Apply exactly the events just logged (matched on this run's timestamp)
+        if result.rowcount:
+            db.execute(
+                update(UserProgress)
+                .where(
+                    _in_range(after_id, up_to_id),
+                    event.user_id == UserProgress.user_id,
+                    event.event_type.like(f"{INACTIVITY_EVENT_PREFIX}%"),
+                    event.created_at == now,
+                    UserProgress.health_score == event.score_before
+                )
+                .values(health_score=event.score_after, health_tier=new_tier)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        rows += result.rowcount
+        batches += 1
+
+    return _metrics("apply_inactivity_penalties", started, rows, batches)
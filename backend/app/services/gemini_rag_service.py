@@ -21,6 +21,12 @@ from datetime import datetime
 import google.generativeai as genai
 from google.generativeai import caching
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from app.config import settings
+from app.models.telegram import TelegramDownload
+from app.services import analysis_cache, telegram_chunks
+
+# Part of the analysis cache key - bump when the Telegram analysis prompt or output shape changes
+TELEGRAM_ANALYSIS_PROMPT_VERSION = 1
 
 
 class GeminiRAGService:
@@ -69,6 +75,7 @@ class GeminiRAGService:
 
         IMPORTANT: This method now stores files PERSISTENTLY in Gemini for future retrieval.
         The corpus_id is returned and should be saved to TelegramDownload.gemini_corpus_id
+        (None for histories large enough to be analyzed in chunks - those aren't uploaded whole)
 
         Args:
             messages: List of {id, from_me, text, timestamp, sender_name}
@@ -90,18 +97,137 @@ class GeminiRAGService:
         """
         print(f"[Gemini RAG] Analyzing {len(messages)} Telegram messages for room {room_id}")
 
+        # Same messages + names + prompt = same analysis (e.g. imported into coaching, then the main room)
+        cache_key = self._telegram_cache_key(messages, user1_name, user2_name)
+        cached = await asyncio.to_thread(analysis_cache.get, cache_key)
+        if cached is not None:
+            print(f"[Gemini RAG] Analysis cache hit for download {download_id}")
+            await self._update_analysis_progress(download_id, analysis_status="completed")
+            return cached
+
         corpus_id = None
         temp_path = None
 
         try:
-            # 1. Create corpus for persistent storage
-            corpus_name = f"meedi8_room_{room_id}_download_{download_id}"
-            print(f"[Gemini RAG] Creating corpus: {corpus_name}")
+            # 1. Split very large histories into chunks that are analyzed separately
+            chunks = self._chunk_messages(messages, user1_name, user2_name)
+            await self._update_analysis_progress(
+                download_id,
+                analysis_status="analyzing",
+                analysis_chunks_total=len(chunks),
+                analysis_chunks_done=0
+            )
+
+            if len(chunks) == 1:
+                corpus_id, telegram_file, temp_path = await self._upload_telegram_history(
+                    messages, user1_name, user2_name, room_id, download_id
+                )
+
+                # 2. Query corpus with file context
+                print(f"[Gemini RAG] Generating analysis from corpus...")
+                response = await self.model.generate_content_async(
+                    [telegram_file, self._telegram_analysis_prompt(user1_name, user2_name)]
+                )
+
+                # 3. Parse JSON response
+                analysis = self._parse_json_response(response.text)
+                if analysis is None:
+                    print(f"[Gemini RAG] Response text: {response.text[:500]}")
+                await self._update_analysis_progress(download_id, analysis_chunks_done=1)
+            else:
+                # 2-3. Map over chunks in parallel, then reduce into one analysis. Chunks are sent
+                # inline, so very large histories skip the whole-history upload (and have no corpus)
+                analysis = await self._analyze_chunks(chunks, user1_name, user2_name, download_id)
+
+            parsed = analysis is not None
+            if not parsed:
+                # Fallback to basic analysis
+                analysis = {
+                    "summary": f"Analyzed conversation between {user1_name} and {user2_name}",
+                    "recurring_themes": [],
+                    "communication_patterns": {},
+                    "emotional_triggers": {},
+                    "positive_moments": [],
+                    "key_conflicts": []
+                }
+
+            print(f"[Gemini RAG] Analysis complete")
+            await self._update_analysis_progress(download_id, analysis_status="completed" if parsed else "failed")
+
+            # 4. Clean up temp file ONLY (keep file in Gemini corpus for future retrieval)
+            try:
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                print(f"[Gemini RAG] Temp file cleanup complete")
+                print(f"[Gemini RAG] Corpus {corpus_id} and file persist in Gemini for future queries")
+            except Exception as e:
+                print(f"[Gemini RAG] Cleanup warning: {e}")
+
+            # 5. Add corpus_id to analysis for storage in database
+            analysis["corpus_id"] = corpus_id
+
+            # 6. Cache real analyses only (not the parse-failure fallback)
+            if parsed:
+                ttl_hours = settings.TELEGRAM_ANALYSIS_CACHE_TTL_HOURS
+                await asyncio.to_thread(
+                    analysis_cache.put, cache_key, "telegram_history", analysis,
+                    ttl_hours * 3600 if ttl_hours else None
+                )
+
+            return analysis
 
-            corpus = genai.create_corpus(display_name=corpus_name)
-            corpus_id = corpus.name
-            print(f"[Gemini RAG] Corpus created: {corpus_id}")
+        except Exception as e:
+            print(f"[Gemini RAG] Error analyzing Telegram history: {e}")
+            import traceback
+            traceback.print_exc()
 
+            # Clean up on error (delete corpus and temp files)
+            try:
+                if corpus_id:
+                    print(f"[Gemini RAG] Cleaning up corpus {corpus_id} due to error")
+                    genai.delete_corpus(corpus_id)
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+            except Exception as cleanup_error:
+                print(f"[Gemini RAG] Cleanup error: {cleanup_error}")
+
+            await self._update_analysis_progress(download_id, analysis_status="failed")
+
+            # Return minimal analysis on error
+            return {
+                "summary": f"Error analyzing conversation: {str(e)}",
+                "recurring_themes": [],
+                "communication_patterns": {},
+                "emotional_triggers": {},
+                "positive_moments": [],
+                "key_conflicts": [],
+                "corpus_id": None
+            }
+
+    async def _upload_telegram_history(
+        self,
+        messages: List[Dict],
+        user1_name: str,
+        user2_name: str,
+        room_id: int,
+        download_id: int
+    ):
+        """
+        Upload the whole history to a new corpus for persistent storage.
+
+        Returns:
+            (corpus_id, uploaded file, temp file path)
+        """
+        # 1. Create corpus for persistent storage
+        corpus_name = f"meedi8_room_{room_id}_download_{download_id}"
+        print(f"[Gemini RAG] Creating corpus: {corpus_name}")
+
+        corpus = genai.create_corpus(display_name=corpus_name)
+        corpus_id = corpus.name
+        print(f"[Gemini RAG] Corpus created: {corpus_id}")
+        temp_path = None
+
+        try:
             # 2. Format messages into uploadable document
             formatted_text = self._format_telegram_messages(
                 messages=messages,
@@ -139,9 +265,18 @@ class GeminiRAGService:
 
             print(f"[Gemini RAG] Document created in corpus: {document.name}")
             print(f"[Gemini RAG] File will remain in Gemini for future retrieval")
+        except Exception:
+            # The caller only cleans up what it got back
+            genai.delete_corpus(corpus_id)
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return corpus_id, telegram_file, temp_path
 
-            # 7. Create analysis prompt with corpus query
-            prompt = f"""Analyze this Telegram conversation between {user1_name} and {user2_name} who are about to enter mediation.
+    def _telegram_analysis_prompt(self, user1_name: str, user2_name: str, part: Optional[str] = None) -> str:
+        """Analysis prompt for a whole conversation, or for one part of a chunked one."""
+        prompt = f"""Analyze this Telegram conversation between {user1_name} and {user2_name} who are about to enter mediation.
 
 They are having conflicts and need professional help. Provide deep insights to help their mediator (AI coach) guide them effectively.
 
@@ -201,80 +336,206 @@ Focus on:
 5. Actionable insights for the mediator
 
 Be empathetic but objective. This analysis helps them resolve conflicts."""
+        if part:
+            prompt = f"""{part} Analyze only the messages in this part; the parts are combined afterwards.
 
-            # 8. Query corpus with file context
-            print(f"[Gemini RAG] Generating analysis from corpus...")
-            response = self.model.generate_content([telegram_file, prompt])
+{prompt}"""
+        return prompt
 
-            # 9. Parse JSON response
-            response_text = response.text.strip()
+    @staticmethod
+    def _parse_json_response(response_text: str) -> Optional[Dict]:
+        """Parse a JSON response, stripping markdown code blocks. Returns None if it isn't valid JSON."""
+        response_text = response_text.strip()
 
-            # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
+        # Remove markdown code blocks if present
+        if response_text.startswith('```json'):
+            response_text = response_text[7:]
+        if response_text.startswith('```'):
+            response_text = response_text[3:]
+        if response_text.endswith('```'):
+            response_text = response_text[:-3]
 
-            response_text = response_text.strip()
+        try:
+            return json.loads(response_text.strip())
+        except json.JSONDecodeError as e:
+            print(f"[Gemini RAG] JSON parse error: {e}")
+            return None
 
-            try:
-                analysis = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                print(f"[Gemini RAG] JSON parse error: {e}")
-                print(f"[Gemini RAG] Response text: {response_text[:500]}")
-                # Fallback to basic analysis
-                analysis = {
-                    "summary": f"Analyzed conversation between {user1_name} and {user2_name}",
-                    "recurring_themes": [],
-                    "communication_patterns": {},
-                    "emotional_triggers": {},
-                    "positive_moments": [],
-                    "key_conflicts": []
-                }
+    @staticmethod
+    async def _update_analysis_progress(download_id: int, **values):
+        """Record analysis progress on the TelegramDownload (polled via GET /telegram/downloads/{id})."""
+        await asyncio.to_thread(telegram_chunks.update_analysis_progress, download_id, **values)
 
-            print(f"[Gemini RAG] Analysis complete")
+    # ─────────────────────────────────────────────────────────────
+    # CHUNKED (MAP-REDUCE) ANALYSIS FOR LARGE HISTORIES
+    # ─────────────────────────────────────────────────────────────
 
-            # 10. Clean up temp file ONLY (keep file in Gemini corpus for future retrieval)
-            try:
-                if temp_path and os.path.exists(temp_path):
-                    os.remove(temp_path)
-                print(f"[Gemini RAG] Temp file cleanup complete")
-                print(f"[Gemini RAG] Corpus {corpus_id} and file persist in Gemini for future queries")
-            except Exception as e:
-                print(f"[Gemini RAG] Cleanup warning: {e}")
+    def _chunk_messages(self, messages: List[Dict], user1_name: str, user2_name: str) -> List[List[Dict]]:
+        """
+        Split messages (oldest first) into consecutive chunks of at most
+        GEMINI_CHUNK_TOKEN_BUDGET estimated tokens. Small histories stay one chunk.
+        """
+        return telegram_chunks.chunk_messages(messages, settings.GEMINI_CHUNK_TOKEN_BUDGET, user1_name, user2_name)
 
-            # 11. Add corpus_id to analysis for storage in database
-            analysis["corpus_id"] = corpus_id
+    async def _analyze_chunks(
+        self,
+        chunks: List[List[Dict]],
+        user1_name: str,
+        user2_name: str,
+        download_id: int
+    ) -> Optional[Dict]:
+        """
+        Analyze chunks concurrently (at most GEMINI_CHUNK_CONCURRENCY at once) and
+        merge the results. Returns None unless every chunk produced valid JSON, so a
+        partial analysis is never cached as if it were complete.
+        """
+        print(f"[Gemini RAG] Analyzing {len(chunks)} chunks ({settings.GEMINI_CHUNK_CONCURRENCY} at a time)")
+        semaphore = asyncio.Semaphore(settings.GEMINI_CHUNK_CONCURRENCY)
 
-            return analysis
+        async def analyze_chunk(index: int, chunk: List[Dict]) -> Optional[Dict]:
+            part = (
+                f"This is part {index + 1} of {len(chunks)} of a longer conversation, "
+                f"covering {chunk[0].get('timestamp', '?')} to {chunk[-1].get('timestamp', '?')}."
+            )
+            prompt = self._telegram_analysis_prompt(user1_name, user2_name, part=part)
+            text = self._format_telegram_messages(messages=chunk, user1_name=user1_name, user2_name=user2_name)
+            async with semaphore:
+                try:
+                    response = await self.model.generate_content_async([text, prompt])
+                    result = self._parse_json_response(response.text)
+                except Exception as e:
+                    print(f"[Gemini RAG] Chunk {index + 1}/{len(chunks)} failed: {e}")
+                    result = None
+            await self._update_analysis_progress(
+                download_id, analysis_chunks_done=TelegramDownload.analysis_chunks_done + 1
+            )
+            return result
+
+        results = await asyncio.gather(*(analyze_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+        if any(result is None for result in results):
+            failed = sum(1 for result in results if result is None)
+            print(f"[Gemini RAG] {failed}/{len(chunks)} chunks failed - not merging a partial analysis")
+            return None
+
+        analysis = self._merge_chunk_analyses(results)
+        analysis["summary"] = await self._summarize_chunk_summaries(
+            [result.get("summary", "") for result in results], user1_name, user2_name
+        ) or analysis["summary"]
+        return analysis
+
+    @staticmethod
+    def _merge_chunk_analyses(results: List[Dict]) -> Dict:
+        """
+        Reduce step: combine per-chunk analyses (in chronological order).
+        Themes and conflicts with the same name are merged, triggers are unioned
+        per person, and communication patterns come from the most recent chunk.
+        """
+        frequency_rank = {"low": 0, "medium": 1, "high": 2}
+
+        def name_key(value) -> str:
+            return " ".join(str(value or "").lower().split())
+
+        themes: Dict[str, Dict] = {}
+        theme_counts: Dict[str, int] = {}
+        conflicts: Dict[str, Dict] = {}
+        triggers: Dict[str, List[str]] = {}
+        positive_moments: List[Dict] = []
+        seen_moments = set()
+        communication_patterns: Dict = {}
+
+        for result in results:
+            for theme in result.get("recurring_themes") or []:
+                key = name_key(theme.get("theme"))
+                if not key:
+                    continue
+                theme_counts[key] = theme_counts.get(key, 0) + 1
+                if key not in themes:
+                    themes[key] = {**theme, "examples": list(theme.get("examples") or [])}
+                    continue
+                merged = themes[key]
+                if frequency_rank.get(theme.get("frequency"), 0) > frequency_rank.get(merged.get("frequency"), 0):
+                    merged["frequency"] = theme.get("frequency")
+                for example in theme.get("examples") or []:
+                    if example not in merged["examples"] and len(merged["examples"]) < 5:
+                        merged["examples"].append(example)
+
+            for person, person_triggers in (result.get("emotional_triggers") or {}).items():
+                merged_triggers = triggers.setdefault(person, [])
+                seen = {name_key(t) for t in merged_triggers}
+                for trigger in person_triggers or []:
+                    if name_key(trigger) not in seen:
+                        seen.add(name_key(trigger))
+                        merged_triggers.append(trigger)
+
+            for conflict in result.get("key_conflicts") or []:
+                key = name_key(conflict.get("conflict"))
+                if not key:
+                    continue
+                if key not in conflicts:
+                    conflicts[key] = {**conflict, "unmet_needs": dict(conflict.get("unmet_needs") or {})}
+                    continue
+                needs = conflicts[key]["unmet_needs"]
+                for person, need in (conflict.get("unmet_needs") or {}).items():
+                    if need and not needs.get(person):
+                        needs[person] = need
+
+            for moment in result.get("positive_moments") or []:
+                key = name_key(moment.get("moment"))
+                if key and key not in seen_moments:
+                    seen_moments.add(key)
+                    positive_moments.append(moment)
+
+            if result.get("communication_patterns"):
+                communication_patterns = result["communication_patterns"]
+
+        # Themes seen in more chunks (then more frequent ones) first
+        ordered_themes = sorted(
+            themes.items(),
+            key=lambda item: (theme_counts[item[0]], frequency_rank.get(item[1].get("frequency"), 0)),
+            reverse=True
+        )
 
-        except Exception as e:
-            print(f"[Gemini RAG] Error analyzing Telegram history: {e}")
-            import traceback
-            traceback.print_exc()
+        return {
+            "summary": results[-1].get("summary", ""),
+            "recurring_themes": [theme for _, theme in ordered_themes],
+            "communication_patterns": communication_patterns,
+            "emotional_triggers": triggers,
+            "positive_moments": positive_moments,
+            "key_conflicts": list(conflicts.values())
+        }
 
-            # Clean up on error (delete corpus and temp files)
-            try:
-                if corpus_id:
-                    print(f"[Gemini RAG] Cleaning up corpus {corpus_id} due to error")
-                    genai.delete_corpus(corpus_id)
-                if temp_path and os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception as cleanup_error:
-                print(f"[Gemini RAG] Cleanup error: {cleanup_error}")
+    async def _summarize_chunk_summaries(self, summaries: List[str], user1_name: str, user2_name: str) -> Optional[str]:
+        """Condense per-chunk summaries (oldest first) into one overview. Returns None on failure."""
+        numbered = "\n".join(f"{i + 1}. {summary}" for i, summary in enumerate(summaries) if summary)
+        prompt = f"""These are summaries of consecutive periods of a Telegram conversation between {user1_name} and {user2_name}, oldest first:
 
-            # Return minimal analysis on error
-            return {
-                "summary": f"Error analyzing conversation: {str(e)}",
-                "recurring_themes": [],
-                "communication_patterns": {},
-                "emotional_triggers": {},
-                "positive_moments": [],
-                "key_conflicts": [],
-                "corpus_id": None
-            }
+{numbered}
+
+Write a 2-3 sentence overview of their relationship dynamics across the whole conversation, noting how things changed over time. Return only the overview text."""
+        try:
+            response = await self.model.generate_content_async(prompt)
+            return response.text.strip() or None
+        except Exception as e:
+            print(f"[Gemini RAG] Summary reduce failed, using latest chunk summary: {e}")
+            return None
+
+    def _telegram_cache_key(self, messages: List[Dict], user1_name: str, user2_name: str) -> str:
+        """Content hash of a Telegram analysis request (independent of row ids and message order)."""
+        normalized = sorted(
+            (
+                str(msg.get('timestamp', '')),
+                msg.get('sender_name') or (user1_name if msg.get('from_me') else user2_name),
+                (msg.get('text') or '').strip()
+            )
+            for msg in messages
+        )
+        return analysis_cache.cache_key(
+            "telegram_history",
+            prompt_version=TELEGRAM_ANALYSIS_PROMPT_VERSION,
+            model=self.model.model_name,
+            users=[user1_name, user2_name],
+            messages=normalized
+        )
 
     def _format_telegram_messages(
         self,
@@ -3,10 +3,7 @@ Image Analysis Service
 Analyzes uploaded images using Claude Vision API
 """
 import os
-from anthropic import Anthropic
-from app.config import settings
-
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+from app.services.llm_gateway import create_message
 
 async def analyze_image(image_url: str, filename: str) -> dict:
     """
@@ -29,7 +26,7 @@ async def analyze_image(image_url: str, filename: str) -> dict:
         )
 
         # Call Claude with vision capabilities
-        response = client.messages.create(
+        response = await create_message(
             model="claude-3-5-sonnet-20241022",  # Vision-capable model
             max_tokens=300,  # Keep description concise
             messages=[{
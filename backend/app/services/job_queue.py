@@ -0,0 +1,362 @@
+"""
+Job Queue
+Durable, DB-backed queue for long-running work (Telegram downloads, Telegram
+import analysis, report generation) so it survives restarts/redeploys and runs
+outside the API workers handling interactive mediation traffic.
+
+- enqueue() stores a Job row; an idempotency key returns the existing job
+  instead of creating a duplicate (a failed one is re-queued).
+- Workers claim the highest-priority due job (FOR UPDATE SKIP LOCKED on
+  Postgres), run its handler with a fresh DB session, and record the result.
+- Failures retry with exponential backoff up to max_attempts; raise
+  PermanentJobError (or an HTTPException) to fail immediately. Handlers can
+  check final_attempt() to tell a retryable failure from the last one.
+- Running jobs heartbeat their lease; a job whose worker died is picked up
+  again once the lease expires (one interrupted by a clean shutdown is
+  re-queued right away).
+
+Handlers are registered next to the endpoints that enqueue them:
+
+    @job_queue.handler("professional_report")
+    def run_professional_report(db: Session, payload: dict) -> dict:
+        ...
+
+Handlers that do DB work should be sync functions (they run in a worker
+thread); async handlers run on the event loop and must offload their own
+queries.
+
+Jobs are processed by dedicated workers: `python -m app.worker` (the
+Procfile's worker process, the `worker` Railway service in
+railway.worker.toml, the `worker` docker-compose service). The API processes
+don't claim jobs. Single-process setups without a worker can opt in with
+JOB_WORKERS_IN_PROCESS=N, which runs N worker loops inside each API process -
+they then compete with interactive requests for the API's loop and threads.
+"""
+import asyncio
+import contextvars
+import inspect
+import os
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db import SessionLocal
+from app.models.job import Job
+
+# Higher runs first: a user waiting on screen > reports > bulk downloads
+PRIORITY_INTERACTIVE = 10
+PRIORITY_REPORT = 5
+PRIORITY_BULK = 0
+
+# Seconds an idle worker waits before polling for new jobs again
+POLL_INTERVAL = 1.0
+
+_handlers: Dict[str, Callable] = {}
+_worker_tasks: List[asyncio.Task] = []
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+# Job being run by the current task (copied into the thread for sync handlers)
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying can't help (bad input, missing records)."""
+
+
+def handler(kind: str):
+    """Register a sync or async function(db, payload) -> dict as the handler for a job kind."""
+    def register(func: Callable) -> Callable:
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict,
+    user_id: Optional[int] = None,
+    priority: int = 0,
+    idempotency_key: Optional[str] = None,
+    max_attempts: int = 3
+) -> Job:
+    """
+    Queue a job. With an idempotency key, returns the existing job for that key
+    (re-queuing it if it had failed) instead of creating another.
+    """
+    if idempotency_key:
+        existing = db.query(Job).filter(Job.idempotency_key == idempotency_key).first()
+        if existing is not None:
+            return _requeue_if_failed(db, existing)
+
+    job = Job(
+        kind=kind,
+        payload=payload,
+        user_id=user_id,
+        priority=priority,
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow()
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Same key enqueued concurrently - use the winner
+        db.rollback()
+        return db.query(Job).filter(Job.idempotency_key == idempotency_key).one()
+
+    db.refresh(job)
+    _notify()
+    return job
+
+
+def _requeue_if_failed(db: Session, job: Job) -> Job:
+    if job.status == "failed":
+        job.status = "queued"
+        job.attempts = 0
+        job.error = None
+        job.run_after = datetime.utcnow()
+        job.finished_at = None
+        db.commit()
+        _notify()
+    return job
+
+
+def final_attempt() -> bool:
+    """True when called from a handler whose failure would not be retried."""
+    job = _current_job.get()
+    return job is None or job.attempts >= job.max_attempts
+
+
+def job_response(job: Job) -> dict:
+    """Response body for an endpoint that queued a job (poll GET /jobs/{id})."""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }
+
+
+def _notify():
+    """Wake this process's idle workers (other processes pick the job up on their next poll)."""
+    if _wakeup is not None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            _wakeup.set()
+        elif _worker_loop is not None:
+            _worker_loop.call_soon_threadsafe(_wakeup.set)
+
+
+# ========================================
+# WORKER
+# ========================================
+
+
+def _worker_id(index: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def _claim(worker_id: str) -> Optional[Job]:
+    """Lock the next due job (or one whose lease expired) and mark it running."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        job = db.query(Job).filter(
+            or_(
+                (Job.status == "queued") & (Job.run_after <= now),
+                (Job.status == "running") & (Job.locked_at < lease_expired)
+            )
+        ).order_by(
+            Job.priority.desc(), Job.run_after, Job.id
+        ).with_for_update(skip_locked=True).first()
+
+        if job is None:
+            db.rollback()
+            return None
+
+        if job.status == "running":
+            print(f"[Jobs] Reclaiming job {job.id} ({job.kind}) from {job.locked_by} - lease expired")
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.started_at = now
+        db.commit()
+        db.refresh(job)
+        db.expunge(job)
+        return job
+    finally:
+        db.close()
+
+
+def _heartbeat(job_id: int, worker_id: str):
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id).update(
+            {Job.locked_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _finish(job_id: int, worker_id: str, result: Optional[dict] = None, error: Optional[Exception] = None):
+    """Record success, schedule a retry, or mark the job failed."""
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job is None or job.locked_by != worker_id:
+            # Lease expired and another worker took over - its outcome wins
+            return
+
+        now = datetime.utcnow()
+        job.locked_by = None
+        job.locked_at = None
+
+        if error is None:
+            job.status = "succeeded"
+            job.result = result
+            job.error = None
+            job.finished_at = now
+        else:
+            job.error = _error_message(error)
+            permanent = isinstance(error, (PermanentJobError, HTTPException))
+            if permanent or job.attempts >= job.max_attempts:
+                job.status = "failed"
+                job.finished_at = now
+            else:
+                job.status = "queued"
+                job.run_after = now + timedelta(seconds=_backoff(job.attempts))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _release(job_id: int, worker_id: str):
+    """Put a job interrupted by shutdown straight back on the queue (without using up an attempt)."""
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id).update({
+            Job.status: "queued",
+            Job.attempts: Job.attempts - 1,
+            Job.locked_by: None,
+            Job.locked_at: None,
+            Job.run_after: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    return str(error) or type(error).__name__
+
+
+def _backoff(attempts: int) -> float:
+    """Exponential backoff with jitter: base, 2x base, 4x base, ... capped."""
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def _run(job: Job, worker_id: str):
+    func = _handlers.get(job.kind)
+    if func is None:
+        await asyncio.to_thread(_finish, job.id, worker_id, None,
+                                PermanentJobError(f"No handler registered for job kind '{job.kind}'"))
+        return
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            await asyncio.to_thread(_heartbeat, job.id, worker_id)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    db = SessionLocal()
+    token = _current_job.set(job)
+    try:
+        if inspect.iscoroutinefunction(func):
+            result = await func(db, job.payload)
+        else:
+            result = await asyncio.to_thread(func, db, job.payload)
+        error = None
+    except asyncio.CancelledError:
+        print(f"[Jobs] Job {job.id} ({job.kind}) interrupted by shutdown, re-queuing")
+        try:
+            await asyncio.shield(asyncio.to_thread(_release, job.id, worker_id))
+        except asyncio.CancelledError:
+            pass  # Cancelled again while releasing - the release still finishes in its thread
+        raise
+    except Exception as e:
+        db.rollback()
+        result, error = None, e
+        print(f"[Jobs] Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts} failed: {_error_message(e)}")
+    finally:
+        _current_job.reset(token)
+        heartbeat_task.cancel()
+        db.close()
+
+    await asyncio.to_thread(_finish, job.id, worker_id, result, error)
+    if error is None:
+        print(f"[Jobs] Job {job.id} ({job.kind}) succeeded")
+
+
+async def _worker(index: int):
+    worker_id = _worker_id(index)
+    while True:
+        try:
+            job = await asyncio.to_thread(_claim, worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Jobs] Worker {worker_id} could not claim a job: {e}")
+            job = None
+
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await _run(job, worker_id)
+
+
+async def start(workers: int):
+    """Start worker loops on the running event loop."""
+    global _wakeup, _worker_loop
+    if workers <= 0 or _worker_tasks:
+        return
+    _wakeup = asyncio.Event()
+    _worker_loop = asyncio.get_running_loop()
+    for index in range(workers):
+        _worker_tasks.append(asyncio.create_task(_worker(index)))
+    print(f"[Jobs] Started {workers} worker(s): {', '.join(sorted(_handlers))}")
+
+
+async def stop():
+    """Stop worker loops. Interrupted jobs are picked up again after their lease expires."""
+    global _wakeup, _worker_loop
+    for task in _worker_tasks:
+        task.cancel()
+    for task in _worker_tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _worker_tasks.clear()
+    _wakeup = None
+    _worker_loop = None
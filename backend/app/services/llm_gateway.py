@@ -0,0 +1,158 @@
+"""
+LLM Gateway
+Shared Anthropic clients for every AI service (coaching, solo, main room, reports, vision)
+
+One AsyncAnthropic client with a tuned HTTP connection pool is reused per event
+loop (httpx connections belong to the loop that opened them), so handlers await Claude instead of parking a threadpool worker
+for the full round-trip. Per-model semaphores cap in-flight requests so a burst
+on one model can't starve the others (the limits apply per event loop); timeouts
+and retries come from settings.
+"""
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
+from anthropic.lib.streaming import AsyncMessageStream
+
+from app.config import settings
+
+# Per event loop, like the semaphores below: the API loop, the job worker's asyncio.run
+# and tests each get their own client and connection pool
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncAnthropic]" = weakref.WeakKeyDictionary()
+_sync_client: Optional[Anthropic] = None
+_sync_client_lock = threading.Lock()
+# Per event loop: a semaphore is bound to the loop it's used on, and the API, the
+# job worker's asyncio.run and tests may each run their own loop
+_model_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Anthropic prompt-caching breakpoint (5 minute TTL, refreshed on every hit)
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+    )
+
+
+def get_async_client() -> AsyncAnthropic:
+    """Get the running event loop's AsyncAnthropic client (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            timeout=_timeout(),
+            http_client=DefaultAsyncHttpxClient(limits=_limits(), timeout=_timeout()),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def get_sync_client() -> Anthropic:
+    """
+    Get the process-wide blocking Anthropic client.
+    Only for code that already runs in a worker thread (e.g. PDF report generation).
+    """
+    global _sync_client
+    if _sync_client is None:
+        with _sync_client_lock:
+            if _sync_client is None:
+                _sync_client = Anthropic(
+                    api_key=settings.ANTHROPIC_API_KEY,
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    timeout=_timeout(),
+                    http_client=DefaultHttpxClient(limits=_limits(), timeout=_timeout()),
+                )
+    return _sync_client
+
+
+def cached_system(*texts: str) -> List[Dict]:
+    """
+    Build system prompt blocks with a cache breakpoint after each one.
+    Pass the most stable text first (static prompt), then per-session context.
+    """
+    return [{"type": "text", "text": text, "cache_control": CACHE_CONTROL} for text in texts if text]
+
+
+def cache_history(messages: List[Dict]) -> List[Dict]:
+    """
+    Mark the last message of an existing conversation as a cache breakpoint,
+    so the next turn only pays full price for the newly appended messages.
+    Returns a copy - the caller's list is left untouched.
+    """
+    if not messages:
+        return messages
+
+    last = dict(messages[-1])
+    content = last.get("content")
+    if isinstance(content, str):
+        if not content:
+            return list(messages)
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [dict(block) for block in content]
+    blocks[-1]["cache_control"] = CACHE_CONTROL
+    last["content"] = blocks
+
+    return list(messages[:-1]) + [last]
+
+
+def _model_semaphore(model: str) -> asyncio.Semaphore:
+    """The model's concurrency limit on the running event loop (only called from that loop)."""
+    loop = asyncio.get_running_loop()
+    semaphores = _model_semaphores.get(loop)
+    if semaphores is None:
+        semaphores = _model_semaphores.setdefault(loop, {})
+    semaphore = semaphores.get(model)
+    if semaphore is None:
+        limit = settings.llm_model_concurrency.get(model, settings.LLM_DEFAULT_CONCURRENCY)
+        semaphore = semaphores.setdefault(model, asyncio.Semaphore(limit))
+    return semaphore
+
+
+async def create_message(**kwargs):
+    """
+    Await a Claude messages.create call through the shared pool.
+    Accepts the same keyword arguments as client.messages.create (model is required).
+    """
+    async with _model_semaphore(kwargs["model"]):
+        return await get_async_client().messages.create(**kwargs)
+
+
+@asynccontextmanager
+async def stream_message(**kwargs) -> AsyncIterator[AsyncMessageStream]:
+    """
+    Open a streaming Claude call through the shared pool.
+    The model's concurrency slot is held until the stream is closed.
+    """
+    async with _model_semaphore(kwargs["model"]):
+        async with get_async_client().messages.stream(**kwargs) as stream:
+            yield stream
+
+
+async def close():
+    """
+    Close pooled HTTP connections (called on app/worker shutdown).
+    Closes the running loop's async client - each loop's connections can only be closed
+    from that loop; clients of loops that are gone are dropped with them.
+    """
+    global _sync_client
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
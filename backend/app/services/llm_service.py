@@ -1,16 +1,13 @@
-import os
 from typing import Dict, List
-from anthropic import Anthropic
+from app.services.llm_gateway import cached_system, create_message
 from app.services.mediation_prompts import (
     MEDIATOR_SYSTEM_PROMPT,
     INITIAL_QUESTIONS_PROMPT,
     NEXT_STEP_PROMPT
 )
 
-client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
 
-
-def build_initial_questions(participants: List[Dict], context: Dict = None) -> List[Dict]:
+async def build_initial_questions(participants: List[Dict], context: Dict = None) -> List[Dict]:
     """Generate evidence-based initial mediation questions."""
     
     if len(participants) < 2:
@@ -22,10 +19,10 @@ def build_initial_questions(participants: List[Dict], context: Dict = None) -> L
     ])
     
     try:
-        response = client.messages.create(
+        response = await create_message(
             model="claude-sonnet-4-20250514",
             max_tokens=800,
-            system=MEDIATOR_SYSTEM_PROMPT,
+            system=cached_system(MEDIATOR_SYSTEM_PROMPT),
             messages=[{
                 "role": "user",
                 "content": f"{perspectives}\n\n{INITIAL_QUESTIONS_PROMPT}"
@@ -68,7 +65,7 @@ def build_initial_questions(participants: List[Dict], context: Dict = None) -> L
         ]
 
 
-def generate_next_step(history: List[Dict]) -> Dict:
+async def generate_next_step(history: List[Dict]) -> Dict:
     """Generate next mediation step using evidence-based frameworks."""
     
     if len(history) < 2:
@@ -89,10 +86,10 @@ def generate_next_step(history: List[Dict]) -> Dict:
     messages.append({"role": "user", "content": NEXT_STEP_PROMPT})
     
     try:
-        response = client.messages.create(
+        response = await create_message(
             model="claude-sonnet-4-20250514",
             max_tokens=500,
-            system=MEDIATOR_SYSTEM_PROMPT,
+            system=cached_system(MEDIATOR_SYSTEM_PROMPT),
             messages=messages
         )
         
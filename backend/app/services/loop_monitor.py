@@ -0,0 +1,130 @@
+"""
+Event Loop Lag Monitor
+Detects blocking calls on the event loop and reports which endpoint made them.
+
+A watchdog thread pings the loop every LOOP_MONITOR_INTERVAL_MS. If the ping
+isn't answered within LOOP_BLOCKED_THRESHOLD_MS the loop is stuck running
+synchronous code, so the watchdog samples the loop thread's stack, picks the
+innermost frame in app/routes (falling back to app/services) and charges the
+whole stall to it once the loop answers. Sampling only happens while the loop
+is blocked, so a healthy loop costs one callback per interval.
+
+stats() returns per-endpoint stall counts and blocked time for
+GET /admin/event-loop.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ROUTES_DIR = os.path.join(_APP_DIR, "routes")
+
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+_stats: Dict[str, Dict[str, float]] = {}
+_lag_ms = 0.0  # Most recent ping round-trip
+_lock = threading.Lock()
+
+
+def _culprit(frame) -> str:
+    """Name the route handler (or app service) the loop thread is stuck in."""
+    service = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_ROUTES_DIR):
+            module = os.path.splitext(os.path.relpath(filename, _APP_DIR))[0].replace(os.sep, ".")
+            return f"{module}.{frame.f_code.co_name}"
+        if service is None and filename.startswith(_APP_DIR) and filename != os.path.abspath(__file__):
+            module = os.path.splitext(os.path.relpath(filename, _APP_DIR))[0].replace(os.sep, ".")
+            service = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return service or "unknown"
+
+
+def _record(culprit: str, blocked_ms: float) -> None:
+    with _lock:
+        entry = _stats.setdefault(culprit, {"stalls": 0, "blocked_ms": 0.0, "max_ms": 0.0})
+        entry["stalls"] += 1
+        entry["blocked_ms"] += blocked_ms
+        entry["max_ms"] = max(entry["max_ms"], blocked_ms)
+    print(f"[LoopMonitor] Event loop blocked {blocked_ms:.0f} ms in {culprit}")
+
+
+def _watch(loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+    global _lag_ms
+    interval = settings.LOOP_MONITOR_INTERVAL_MS / 1000
+    threshold = settings.LOOP_BLOCKED_THRESHOLD_MS / 1000
+    answered = threading.Event()
+
+    while not _stop.wait(interval):
+        answered.clear()
+        sent = time.monotonic()
+        try:
+            loop.call_soon_threadsafe(answered.set)
+        except RuntimeError:
+            return  # Loop closed
+
+        if answered.wait(threshold):
+            _lag_ms = (time.monotonic() - sent) * 1000
+            continue
+
+        # Blocked: find out where, then wait for the loop to come back
+        frame = sys._current_frames().get(loop_thread_id)
+        culprit = _culprit(frame)
+        del frame
+        while not answered.wait(interval):
+            if _stop.is_set() or loop.is_closed():
+                return
+        _lag_ms = (time.monotonic() - sent) * 1000
+        _record(culprit, _lag_ms)
+
+
+def start() -> None:
+    """Start watching the running event loop (call from app startup)."""
+    global _thread
+    if _thread is not None or settings.LOOP_BLOCKED_THRESHOLD_MS <= 0:
+        return
+    _stop.clear()
+    _thread = threading.Thread(
+        target=_watch,
+        args=(asyncio.get_running_loop(), threading.get_ident()),
+        name="loop-monitor",
+        daemon=True
+    )
+    _thread.start()
+    print(f"[LoopMonitor] Watching event loop (stalls over {settings.LOOP_BLOCKED_THRESHOLD_MS} ms are reported)")
+
+
+def stop() -> None:
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=1)
+    _thread = None
+
+
+def stats() -> Dict:
+    """Current lag and blocked time per endpoint, worst first."""
+    with _lock:
+        endpoints = [
+            {"endpoint": culprit, "stalls": int(s["stalls"]),
+             "blocked_ms": round(s["blocked_ms"]), "max_ms": round(s["max_ms"])}
+            for culprit, s in _stats.items()
+        ]
+    endpoints.sort(key=lambda e: e["blocked_ms"], reverse=True)
+    return {
+        "running": _thread is not None,
+        "threshold_ms": settings.LOOP_BLOCKED_THRESHOLD_MS,
+        "lag_ms": round(_lag_ms, 1),
+        "endpoints": endpoints
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
@@ -3,11 +3,19 @@ Main Room AI Mediator
 Guides turn-based conversation between both users after pre-mediation coaching
 """
 import os
-from typing import Dict, List, Optional
-from anthropic import Anthropic
-from app.config import settings
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.services.cost_tracker import extract_usage
+from app.services.context_window import summary_block
+from app.services.llm_gateway import cache_history, cached_system, create_message, stream_message
 
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+MAIN_ROOM_MODEL = "claude-sonnet-4-20250514"
+
+# Control prefixes Claude may open a reply with, mapped to the stream "mode" clients see
+CONTROL_PREFIXES = {
+    "BREATHING_BREAK:": "breathing_break",
+    "RESOLUTION:": "resolution",
+    "HALT:": "halt",
+}
 
 MAIN_ROOM_MEDIATOR_PROMPT = """You are a warm, skilled mediator helping two people resolve a conflict.
 
@@ -67,7 +75,7 @@ WHEN TO END THE SESSION:
 REMEMBER: You're here to help them find THEIR solution. Make suggestions when they're stuck. Keep it fun, friendly, and solution-focused.
 """
 
-def start_main_room(user1_summary: str, user2_summary: str, user1_name: str, user2_name: str, category: str = None) -> Dict:
+async def start_main_room(user1_summary: str, user2_summary: str, user1_name: str, user2_name: str, category: str = None) -> Dict:
     """
     Start main room with opening message that acknowledges both perspectives.
 
@@ -94,10 +102,10 @@ def start_main_room(user1_summary: str, user2_summary: str, user1_name: str, use
     context_note = category_guidance.get(category, "") if category else ""
 
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
+        response = await create_message(
+            model=MAIN_ROOM_MODEL,
             max_tokens=600,
-            system=MAIN_ROOM_MEDIATOR_PROMPT,
+            system=cached_system(MAIN_ROOM_MEDIATOR_PROMPT),
             messages=[
                 {
                     "role": "user",
@@ -140,33 +148,31 @@ Keep it natural and conversational."""
         }
 
 
-def process_main_room_response(
+def format_session_context(user1_name: str, user1_summary: str, user2_name: str, user2_summary: str) -> str:
+    """
+    Both prepared NVC summaries as a system block.
+    They are fixed for the life of a main room session, so they sit right after
+    the static prompt and are cached with it on every turn.
+    """
+    return f"""SESSION CONTEXT - each person's prepared perspective from individual coaching:
+
+**{user1_name}:** {user1_summary}
+
+**{user2_name}:** {user2_summary}"""
+
+
+def _build_response_messages(
     conversation_history: List[Dict],
     user_message: str,
     user_name: str,
     other_user_name: str,
     exchange_count: int,
-    consecutive_questions_to_same_user: int = 0,
     breathing_break_count: int = 0
-) -> Dict:
-    """
-    Process user response in main room and generate AI guidance.
+) -> List[Dict]:
+    """Build the Claude message list for a main room turn (history + new message + instruction)."""
 
-    Args:
-        conversation_history: Full conversation [{role, content}]
-        user_message: Current user's message
-        user_name: Name of current speaker
-        other_user_name: Name of other person
-        exchange_count: Number of exchanges so far
-        consecutive_questions_to_same_user: Not used (kept for API compatibility)
-        breathing_break_count: Number of breathing breaks taken so far
-
-    Returns:
-        Dict with ai_response, resolution (if reached), halt signal, or breathing_break
-    """
-
-    # Add current message to history
-    messages = conversation_history + [
+    # Add current message to history (prior turns are a cached prefix)
+    messages = cache_history(conversation_history) + [
         {"role": "user", "content": f"{user_name}: {user_message}"}
     ]
 
@@ -209,68 +215,237 @@ Your options:
 
 {mode_instruction}"""
     })
-    
+
+    return messages
+
+
+def _control_prefix(ai_message: str) -> Optional[str]:
+    """
+    The control prefix a complete reply is treated as (one of CONTROL_PREFIXES or None).
+
+    BREATHING_BREAK/RESOLUTION count anywhere in the reply, HALT only at the start.
+    This is the single rule for the final result; streaming only guesses it early.
+    """
+    if "BREATHING_BREAK:" in ai_message:
+        return "BREATHING_BREAK:"
+    if "RESOLUTION:" in ai_message:
+        return "RESOLUTION:"
+    if ai_message.startswith("HALT:"):
+        return "HALT:"
+    return None
+
+
+def _parse_ai_message(ai_message: str) -> Dict:
+    """Turn Claude's raw reply into the main room result dict (handles BREATHING_BREAK/RESOLUTION/HALT)."""
+
+    # Always switch to other person (strict turn-by-turn)
+    next_speaker = "OTHER"
+    prefix = _control_prefix(ai_message)
+
+    # Check for breathing break suggestion
+    if prefix == "BREATHING_BREAK:":
+        # Extract breathing break message
+        breathing_message = ai_message.split("BREATHING_BREAK:", 1)[1].strip()
+        return {
+            "breathing_break": True,
+            "ai_response": breathing_message,
+            "session_complete": False,
+            "next_speaker": "BOTH"  # Both users see the breathing modal
+        }
+
+    # Check for resolution (handle markdown bold)
+    if prefix == "RESOLUTION:":
+        # Strip markdown and extract resolution
+        resolution = ai_message.split("RESOLUTION:", 1)[1].strip()
+        # Remove any remaining markdown asterisks
+        resolution = resolution.replace("**", "")
+        return {
+            "resolution": resolution,
+            "session_complete": True,
+            "next_speaker": next_speaker
+        }
+
+    # Check for halt
+    if prefix == "HALT:":
+        reason = ai_message.replace("HALT:", "").strip()
+        return {
+            "ai_response": f"Let's pause here. {reason}",
+            "session_complete": True,
+            "next_speaker": next_speaker
+        }
+
+    # Continue conversation - always switch to other person
+    return {
+        "ai_response": ai_message,
+        "session_complete": False,
+        "next_speaker": next_speaker
+    }
+
+
+def _fallback_response(user_name: str, other_user_name: str) -> Dict:
+    """Fallback result used when Claude is unavailable - always switch to other speaker."""
+    return {
+        "ai_response": f"{other_user_name}, how do you respond to what {user_name} shared?",
+        "session_complete": False,
+        "next_speaker": "OTHER"
+    }
+
+
+async def process_main_room_response(
+    conversation_history: List[Dict],
+    user_message: str,
+    user_name: str,
+    other_user_name: str,
+    exchange_count: int,
+    consecutive_questions_to_same_user: int = 0,
+    breathing_break_count: int = 0,
+    session_context: Optional[str] = None,
+    earlier_summary: Optional[str] = None
+) -> Dict:
+    """
+    Process user response in main room and generate AI guidance.
+
+    Args:
+        conversation_history: Full conversation [{role, content}]
+        user_message: Current user's message
+        user_name: Name of current speaker
+        other_user_name: Name of other person
+        exchange_count: Number of exchanges so far
+        consecutive_questions_to_same_user: Not used (kept for API compatibility)
+        breathing_break_count: Number of breathing breaks taken so far
+        session_context: Both NVC summaries (see format_session_context), cached with the system prompt
+        earlier_summary: Rolling summary of turns folded out of conversation_history (see context_window)
+
+    Returns:
+        Dict with ai_response, resolution (if reached), halt signal, or breathing_break
+    """
+    messages = _build_response_messages(
+        conversation_history, user_message, user_name, other_user_name,
+        exchange_count, breathing_break_count
+    )
+
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
+        response = await create_message(
+            model=MAIN_ROOM_MODEL,
             max_tokens=500,
-            system=MAIN_ROOM_MEDIATOR_PROMPT,
+            system=cached_system(MAIN_ROOM_MEDIATOR_PROMPT, session_context, summary_block(earlier_summary)),
             messages=messages
         )
-        
+
         ai_message = response.content[0].text
+        usage = extract_usage(response)
 
-        # Always switch to other person (strict turn-by-turn)
-        next_speaker = "OTHER"
-
-        # Check for breathing break suggestion
-        if "BREATHING_BREAK:" in ai_message:
-            # Extract breathing break message
-            breathing_message = ai_message.split("BREATHING_BREAK:", 1)[1].strip()
-            return {
-                "breathing_break": True,
-                "ai_response": breathing_message,
-                "session_complete": False,
-                "next_speaker": "BOTH"  # Both users see the breathing modal
-            }
-
-        # Check for resolution (handle markdown bold)
-        if "RESOLUTION:" in ai_message:
-            # Strip markdown and extract resolution
-            resolution = ai_message.split("RESOLUTION:", 1)[1].strip()
-            # Remove any remaining markdown asterisks
-            resolution = resolution.replace("**", "")
-            return {
-                "resolution": resolution,
-                "session_complete": True,
-                "next_speaker": next_speaker
-            }
-
-        # Check for halt
-        if ai_message.startswith("HALT:"):
-            reason = ai_message.replace("HALT:", "").strip()
-            return {
-                "ai_response": f"Let's pause here. {reason}",
-                "session_complete": True,
-                "next_speaker": next_speaker
-            }
-
-        # Continue conversation - always switch to other person
-        return {
-            "ai_response": ai_message,
-            "session_complete": False,
-            "next_speaker": next_speaker
-        }
+        return {**_parse_ai_message(ai_message), **usage}
 
     except Exception as e:
         print(f"Main room response error: {e}")
+        return _fallback_response(user_name, other_user_name)
 
-        # Fallback - always switch to other speaker
-        fallback_next_speaker = "OTHER"
-        fallback_message = f"{other_user_name}, how do you respond to what {user_name} shared?"
 
-        return {
-            "ai_response": fallback_message,
-            "session_complete": False,
-            "next_speaker": fallback_next_speaker
-        }
+def _detect_control_prefix(text: str) -> Tuple[Optional[str], bool]:
+    """
+    Inspect the start of a streamed reply for a control prefix.
+
+    Returns:
+        (prefix, decided) - prefix is one of CONTROL_PREFIXES or None,
+        decided is False while the head could still turn into a prefix.
+    """
+    head = text.lstrip().lstrip("*").lstrip()
+    for prefix in CONTROL_PREFIXES:
+        if head.startswith(prefix):
+            return prefix, True
+    if any(prefix.startswith(head) for prefix in CONTROL_PREFIXES):
+        return None, False
+    return None, True
+
+
+async def stream_main_room_response(
+    conversation_history: List[Dict],
+    user_message: str,
+    user_name: str,
+    other_user_name: str,
+    exchange_count: int,
+    breathing_break_count: int = 0,
+    session_context: Optional[str] = None,
+    earlier_summary: Optional[str] = None
+) -> AsyncIterator[Dict]:
+    """
+    Streaming variant of process_main_room_response.
+
+    Yields events as Claude's reply arrives:
+        {"type": "mode", "mode": "message" | "breathing_break" | "resolution" | "halt"}
+        {"type": "delta", "text": "..."}  (text after any control prefix)
+        {"type": "done", "result": {...}}  (same dict process_main_room_response returns)
+
+    The mode is decided from the first chunk(s) so clients can route the text
+    (chat bubble vs breathing modal vs resolution card) before the reply finishes.
+    A marker can also appear after some lead-in text, which only the complete
+    reply reveals (see _control_prefix). In that case a second mode event with
+    "replace": True is sent before "done": clients drop the streamed text and
+    render the "done" result, which is always authoritative. The same happens
+    when the stream fails after it started and "done" carries the fallback reply.
+    """
+    messages = _build_response_messages(
+        conversation_history, user_message, user_name, other_user_name,
+        exchange_count, breathing_break_count
+    )
+
+    head = ""
+    decided = False
+    streamed_prefix = None
+
+    def _open(prefix: Optional[str]) -> List[Dict]:
+        mode = CONTROL_PREFIXES[prefix] if prefix else "message"
+        events = [{"type": "mode", "mode": mode}]
+        text = head
+        if prefix:
+            text = text.split(prefix, 1)[1].lstrip().lstrip("*").lstrip()
+        if text:
+            events.append({"type": "delta", "text": text})
+        return events
+
+    try:
+        async with stream_message(
+            model=MAIN_ROOM_MODEL,
+            max_tokens=500,
+            system=cached_system(MAIN_ROOM_MEDIATOR_PROMPT, session_context, summary_block(earlier_summary)),
+            messages=messages
+        ) as stream:
+            async for text in stream.text_stream:
+                if decided:
+                    yield {"type": "delta", "text": text}
+                    continue
+
+                head += text
+                streamed_prefix, decided = _detect_control_prefix(head)
+                if decided:
+                    for event in _open(streamed_prefix):
+                        yield event
+
+            final_message = await stream.get_final_message()
+
+        if not decided:
+            # Very short reply that never got past the prefix check
+            decided = True
+            for event in _open(None):
+                yield event
+
+        ai_message = "".join(block.text for block in final_message.content if block.type == "text")
+        result = {**_parse_ai_message(ai_message), **extract_usage(final_message)}
+
+        final_prefix = _control_prefix(ai_message)
+        if final_prefix != streamed_prefix:
+            # The streamed guess was wrong (e.g. "...text BREATHING_BREAK: ...")
+            mode = CONTROL_PREFIXES[final_prefix] if final_prefix else "message"
+            yield {"type": "mode", "mode": mode, "replace": True}
+
+    except Exception as e:
+        print(f"Main room stream error: {e}")
+        result = _fallback_response(user_name, other_user_name)
+        if decided:
+            # Part of the failed reply may already be on screen - the fallback replaces it
+            yield {"type": "mode", "mode": "message", "replace": True}
+        else:
+            yield {"type": "mode", "mode": "message"}
+
+    yield {"type": "done", "result": result}
@@ -0,0 +1,193 @@
+"""
+Password Hashing Service
+Runs argon2 hashing and verification in a pool of worker processes so a burst
+of logins never serializes on the event loop or competes with request threads
+for the GIL.
+
+- Parameters (ARGON2_TIME_COST / ARGON2_MEMORY_COST / ARGON2_PARALLELISM) are
+  tunable from settings. Hashes made with other parameters still verify, and
+  verify_password() returns a replacement hash so login can transparently
+  upgrade (or downgrade) the stored hash.
+- Async handlers await hash_password()/verify_password(); sync handlers (already
+  in a worker thread) use the *_sync variants, which block on the same pool.
+- Workers are spawned (not forked) and import only this module and settings.
+- The pool is PASSWORD_HASH_PROCESSES per API worker (default 2), not one per
+  CPU: every in-flight hash holds ARGON2_MEMORY_COST of memory. Raise it when
+  the benchmark below shows logins queueing and the host has memory to spare.
+
+Benchmark logins/second per core with the configured parameters:
+    python -m app.services.password_hashing [seconds]
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.config import settings
+
+Params = Tuple[int, int, int]  # (time_cost, memory_cost KiB, parallelism)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def current_params() -> Params:
+    return (settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM)
+
+
+def pool_size() -> int:
+    return max(settings.PASSWORD_HASH_PROCESSES, 1)
+
+
+# ----------------------------------------
+# Worker-side functions (run in the pool)
+# ----------------------------------------
+
+@functools.lru_cache(maxsize=4)
+def _context(params: Params) -> CryptContext:
+    time_cost, memory_cost, parallelism = params
+    return CryptContext(
+        schemes=["argon2"],
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism
+    )
+
+
+def _hash(password: str, params: Params) -> str:
+    return _context(params).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, params: Params) -> Tuple[bool, Optional[str]]:
+    try:
+        return _context(params).verify_and_update(password, hashed)
+    except Exception:
+        # Malformed or unknown hash - treat as a failed login, like the old verify_password
+        return False, None
+
+
+# ----------------------------------------
+# Pool
+# ----------------------------------------
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=pool_size(),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def _submit(func: Callable, *args) -> Future:
+    """Submit to the pool, replacing it once if a worker died and broke it."""
+    global _pool
+    try:
+        return _get_pool().submit(func, *args)
+    except BrokenProcessPool:
+        with _pool_lock:
+            broken, _pool = _pool, None
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+        print("[PasswordHashing] Worker pool broke, starting a new one")
+        return _get_pool().submit(func, *args)
+
+
+def shutdown() -> None:
+    """Stop the worker processes (app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ----------------------------------------
+# Public API
+# ----------------------------------------
+
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured argon2 parameters."""
+    return await asyncio.wrap_future(_submit(_hash, password, current_params()))
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password. Returns (valid, new_hash); new_hash is set when the stored
+    hash was made with different parameters and should replace it.
+    """
+    return await asyncio.wrap_future(_submit(_verify_and_update, password, hashed, current_params()))
+
+
+def hash_password_sync(password: str) -> str:
+    """hash_password for sync code (blocks the calling thread, not the GIL)."""
+    return _submit(_hash, password, current_params()).result()
+
+
+def verify_password_sync(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """verify_password for sync code (blocks the calling thread, not the GIL)."""
+    return _submit(_verify_and_update, password, hashed, current_params()).result()
+
+
+# ----------------------------------------
+# Benchmark
+# ----------------------------------------
+
+def benchmark(seconds: float = 5.0) -> dict:
+    """Measure logins/second with the configured parameters, in-process and across the pool."""
+    params = current_params()
+    hashed = _hash("benchmark-password", params)
+
+    # One core: back-to-back verifications in this process
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        _verify_and_update("benchmark-password", hashed, params)
+        count += 1
+    per_core = count / (time.perf_counter() - started)
+
+    # Whole pool: keep every worker busy for roughly the same time
+    processes = pool_size()
+    # Warm the workers up first so process start-up isn't counted
+    for future in [_submit(_hash, "warm-up", params) for _ in range(processes)]:
+        future.result()
+    total = max(processes, int(per_core * processes * seconds))
+    started = time.perf_counter()
+    futures = [_submit(_verify_and_update, "benchmark-password", hashed, params) for _ in range(total)]
+    for future in futures:
+        future.result()
+    pooled = total / (time.perf_counter() - started)
+    shutdown()
+
+    result = {
+        "time_cost": params[0],
+        "memory_cost_kib": params[1],
+        "parallelism": params[2],
+        "verify_ms": round(1000 / per_core, 1),
+        "logins_per_second_per_core": round(per_core, 1),
+        "processes": processes,
+        "logins_per_second_pool": round(pooled, 1),
+        "cpu_count": os.cpu_count()
+    }
+    print(
+        f"[PasswordHashing] argon2 t={params[0]} m={params[1]}KiB p={params[2]}: "
+        f"{result['verify_ms']} ms/verify, {result['logins_per_second_per_core']} logins/s per core, "
+        f"{result['logins_per_second_pool']} logins/s across {processes} process(es) "
+        f"on {result['cpu_count']} CPU(s)"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 5.0)
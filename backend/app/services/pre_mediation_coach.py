@@ -3,12 +3,12 @@ Pre-Mediation AI Coach
 Guides users through NVC framework before joint mediation
 """
 import os
-from typing import Dict, List
-from anthropic import Anthropic
+from typing import Dict, List, Optional
 from app.services.cost_tracker import extract_usage
-from app.config import settings
+from app.services.context_window import summary_block
+from app.services.llm_gateway import cache_history, cached_system, create_message
 
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+COACH_MODEL = "claude-sonnet-4-20250514"
 
 PRE_MEDIATION_COACH_PROMPT = """You are an AI pre-mediation coach preparing someone for a conflict resolution conversation.
 
@@ -108,7 +108,7 @@ def format_health_context(health_profile: dict) -> str:
     return ""
 
 
-def start_coaching_session(user_input: str, is_user1: bool, user1_summary: str = None, health_profile: dict = None) -> Dict:
+async def start_coaching_session(user_input: str, is_user1: bool, user1_summary: str = None, health_profile: dict = None) -> Dict:
     """
     Start a coaching session with optional health profile context.
 
@@ -134,10 +134,10 @@ Help them respond to these specific concerns, not create a new narrative."""
         context += health_context
 
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
+        response = await create_message(
+            model=COACH_MODEL,
             max_tokens=500,
-            system=PRE_MEDIATION_COACH_PROMPT,
+            system=cached_system(PRE_MEDIATION_COACH_PROMPT),
             messages=[
                 {
                     "role": "user",
@@ -165,7 +165,12 @@ Help them respond to these specific concerns, not create a new narrative."""
         }
 
 
-def process_coaching_response(conversation_history: List[Dict], user_response: str, exchange_count: int) -> Dict:
+async def process_coaching_response(
+    conversation_history: List[Dict],
+    user_response: str,
+    exchange_count: int,
+    earlier_summary: Optional[str] = None
+) -> Dict:
     # Determine coaching stage based on exchange count
     stage_guidance = {
         1: "They've shared their story. Next: Ask about SPECIFIC OBSERVATIONS with clear subjects (who does what).",
@@ -182,15 +187,15 @@ def process_coaching_response(conversation_history: List[Dict], user_response: s
     if user_response.lower().strip() in short_responses and exchange_count >= 2:
         guidance = "User seems done. If you have observation + feeling, FINALIZE with 'READY: [summary]'. Otherwise ask ONE specific question about what's missing."
 
-    messages = conversation_history + [
+    messages = cache_history(conversation_history) + [
         {"role": "user", "content": f"User responds: {user_response}\n\nExchange {exchange_count + 1}. {guidance}\n\nNEVER repeat the same question. NEVER ask 'What else would you like me to understand?'"}
     ]
     
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
+        response = await create_message(
+            model=COACH_MODEL,
             max_tokens=600,
-            system=PRE_MEDIATION_COACH_PROMPT,
+            system=cached_system(PRE_MEDIATION_COACH_PROMPT, summary_block(earlier_summary)),
             messages=messages
         )
         
@@ -13,11 +13,8 @@ from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, Table, TableStyle
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
-from anthropic import Anthropic
-from app.config import settings
-
-# Initialize Anthropic client
-anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+from app.services.cost_tracker import extract_usage
+from app.services.llm_gateway import cached_system, get_sync_client
 
 # Professional therapy report prompt for Claude
 THERAPY_REPORT_PROMPT = """Based on this mediation transcript, generate a professional therapy-style report suitable for case documentation or mediation review.
@@ -127,14 +124,16 @@ Please generate a comprehensive professional therapy report based on the above m
 
     try:
         # Call Claude API
-        response = anthropic_client.messages.create(
+        # Runs in a worker thread (sync endpoint), so use the shared blocking client
+        response = get_sync_client().messages.create(
             model="claude-sonnet-4-5-20250929",
             max_tokens=4000,
             temperature=0.7,
+            system=cached_system(THERAPY_REPORT_PROMPT),
             messages=[
                 {
                     "role": "user",
-                    "content": f"{THERAPY_REPORT_PROMPT}\n\n{user_prompt}"
+                    "content": user_prompt
                 }
             ]
         )
@@ -142,20 +141,16 @@ Please generate a comprehensive professional therapy report based on the above m
         # Extract content
         report_content = response.content[0].text
 
-        # Calculate cost
-        input_tokens = response.usage.input_tokens
-        output_tokens = response.usage.output_tokens
-
-        # Claude Sonnet 4.5 pricing: $0.003 per 1K input, $0.015 per 1K output
-        INPUT_COST = 0.003 / 1000
-        OUTPUT_COST = 0.015 / 1000
-        cost_usd = (input_tokens * INPUT_COST) + (output_tokens * OUTPUT_COST)
+        # Calculate cost (includes prompt-cache reads/writes of THERAPY_REPORT_PROMPT)
+        usage = extract_usage(response)
 
         return {
             "report_content": report_content,
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "cost_usd": round(cost_usd, 4),
+            "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"],
+            "cache_read_tokens": usage["cache_read_tokens"],
+            "cache_write_tokens": usage["cache_write_tokens"],
+            "cost_usd": round(usage["cost_usd"], 4),
             "model": "claude-sonnet-4-5-20250929"
         }
 
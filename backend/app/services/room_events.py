@@ -0,0 +1,160 @@
+"""
+Room Events
+Pub/sub for pushing main room updates (new turns, speaker changes, breaks,
+presence) to participants over the room WebSocket instead of polling.
+
+Subscribers are always local asyncio queues. Publishing goes straight to those
+queues when REDIS_URL is unset (single worker); otherwise events are published
+to Redis and every worker fans them out to its own subscribers, so both
+participants see each other's events whichever worker they're connected to.
+
+publish() is safe to call from sync route handlers running in the threadpool.
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+from app.config import settings
+
+CHANNEL_PREFIX = "meedi8:room:"
+
+# Events queued per subscriber before the slowest clients start dropping them
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_subscribers: Dict[int, Set[asyncio.Queue]] = {}
+# Open room sockets per (room_id, user_id) in this worker, so a user with several tabs stays present
+_connections: Dict[Tuple[int, int], int] = {}
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_redis = None
+_reader_task: Optional[asyncio.Task] = None
+
+
+def _deliver(room_id: int, event: dict) -> None:
+    """Hand an event to every local subscriber of a room (event loop thread only)."""
+    for queue in list(_subscribers.get(room_id, ())):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            print(f"⚠️ Room {room_id} subscriber queue full, dropping {event.get('type')} event")
+
+
+async def _publish(room_id: int, event: dict) -> None:
+    if _redis is not None:
+        try:
+            await _redis.publish(f"{CHANNEL_PREFIX}{room_id}", json.dumps(event, default=str))
+            return
+        except Exception as e:
+            print(f"⚠️ Redis publish failed, delivering locally only: {e}")
+    _deliver(room_id, event)
+
+
+def publish(room_id: int, event_type: str, **data) -> None:
+    """
+    Publish an event to everyone watching a room. Fire-and-forget.
+
+    Example: publish(room.id, "break", break_info=None)
+    """
+    if _loop is None:
+        # Not started (scripts, tests) - nobody can be subscribed
+        return
+
+    event = {"type": event_type, "room_id": room_id, **data}
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is _loop:
+        _loop.create_task(_publish(room_id, event))
+    else:
+        asyncio.run_coroutine_threadsafe(_publish(room_id, event), _loop)
+
+
+@asynccontextmanager
+async def subscribe(room_id: int) -> AsyncIterator[asyncio.Queue]:
+    """Subscribe to a room's events. Yields a queue of event dicts."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers.setdefault(room_id, set()).add(queue)
+    try:
+        yield queue
+    finally:
+        room_queues = _subscribers.get(room_id)
+        if room_queues is not None:
+            room_queues.discard(queue)
+            if not room_queues:
+                _subscribers.pop(room_id, None)
+
+
+def connected(room_id: int, user_id: int) -> None:
+    """Count a user's room socket as open (event loop thread only)."""
+    key = (room_id, user_id)
+    _connections[key] = _connections.get(key, 0) + 1
+
+
+def disconnected(room_id: int, user_id: int) -> bool:
+    """
+    Count a user's room socket as closed. Returns True if it was their last one
+    in this worker - only then should they be announced as absent.
+    """
+    key = (room_id, user_id)
+    remaining = _connections.get(key, 0) - 1
+    if remaining > 0:
+        _connections[key] = remaining
+        return False
+    _connections.pop(key, None)
+    return True
+
+
+async def _read_redis(pubsub) -> None:
+    """Fan events published by any worker out to this worker's subscribers."""
+    while True:
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                room_id = int(channel[len(CHANNEL_PREFIX):])
+                _deliver(room_id, json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Room events Redis reader error, reconnecting: {e}")
+            await asyncio.sleep(1)
+
+
+async def start() -> None:
+    """Bind to the running event loop and connect to Redis if configured."""
+    global _loop, _redis, _reader_task
+    _loop = asyncio.get_running_loop()
+
+    if not settings.REDIS_URL:
+        print("📡 Room events: in-process broker")
+        return
+
+    try:
+        import redis.asyncio as aioredis
+        _redis = aioredis.from_url(settings.REDIS_URL)
+        pubsub = _redis.pubsub()
+        await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+        _reader_task = asyncio.create_task(_read_redis(pubsub))
+        print("📡 Room events: Redis broker")
+    except Exception as e:
+        print(f"⚠️ Room events: Redis unavailable ({e}), using in-process broker")
+        _redis = None
+
+
+async def stop() -> None:
+    """Stop the Redis reader and close the connection."""
+    global _redis, _reader_task
+    if _reader_task is not None:
+        _reader_task.cancel()
+        try:
+            await _reader_task
+        except asyncio.CancelledError:
+            pass
+        _reader_task = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -1,86 +1,197 @@
 """
 S3 Service - Handles audio file uploads to AWS S3
+
+Browser uploads (attachments, evidence, profile pictures) go straight to the
+bucket with a presigned POST (create_presigned_upload) and are confirmed with
+get_uploaded_object; the policy caps the object size so limits hold even
+though the bytes never pass through the API.
+
+Set AWS_S3_ENDPOINT_URL (e.g. http://localhost:9000) to use MinIO or a moto
+server instead of AWS; object URLs then use path-style addressing.
+
+One client (and its connection pool, S3_MAX_POOL_CONNECTIONS) is shared by
+every call. Server-side uploads stream from file objects with multipart
+transfers (upload_fileobj_to_s3) and bulk deletes use delete_objects
+(delete_objects_from_s3).
 """
 import boto3
 import os
+import threading
+import uuid
 from datetime import datetime
+from urllib.parse import quote, unquote
 import hashlib
+from typing import BinaryIO, Iterable, List, Optional
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from app.config import settings
+
+# How long a presigned upload form stays valid
+PRESIGNED_UPLOAD_EXPIRES_SECONDS = 900
+
+_client = None
+_client_config = None
+_client_lock = threading.Lock()
+
+_transfer_config = TransferConfig(
+    multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+    multipart_chunksize=settings.S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+    max_concurrency=settings.S3_MULTIPART_CONCURRENCY
+)
+
 
 # AWS Configuration - Read at runtime, not import time
 def get_s3_client():
     """
-    Lazy-initialize S3 client to ensure environment variables are loaded.
-    Railway injects env vars after module import, so we need to read them at runtime.
+    Get the shared S3 client (thread-safe), creating it on first use.
+    Railway injects env vars after module import, so we read them at runtime;
+    the client is rebuilt only if they change.
     """
+    global _client, _client_config
     aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
     # Try both variable names - Railway sometimes has issues with AWS_SECRET_ACCESS_KEY
     aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY") or os.getenv("AWS_SECRET_KEY")
     aws_s3_bucket = os.getenv("AWS_S3_BUCKET", "clean-air-voice-recordings")
     aws_region = os.getenv("AWS_REGION", "us-east-1")
+    endpoint_url = os.getenv("AWS_S3_ENDPOINT_URL") or None
 
     if not aws_access_key_id or not aws_secret_access_key:
         raise Exception(f"AWS credentials missing. Access Key: {'present' if aws_access_key_id else 'missing'}, Secret Key: {'present' if aws_secret_access_key else 'missing'}")
 
-    return boto3.client(
-        's3',
-        aws_access_key_id=aws_access_key_id,
-        aws_secret_access_key=aws_secret_access_key,
-        region_name=aws_region
-    ), aws_s3_bucket, aws_region
+    config = (aws_access_key_id, aws_secret_access_key, aws_region, endpoint_url)
+    client = _client
+    if client is None or _client_config != config:
+        with _client_lock:
+            if _client is None or _client_config != config:
+                # Sessions aren't thread-safe but the clients they build are, so build under the lock
+                _client = boto3.session.Session().client(
+                    's3',
+                    aws_access_key_id=aws_access_key_id,
+                    aws_secret_access_key=aws_secret_access_key,
+                    region_name=aws_region,
+                    endpoint_url=endpoint_url,
+                    config=Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
+                )
+                _client_config = config
+            client = _client
 
+    return client, aws_s3_bucket, aws_region
 
-def upload_file_to_s3(file_bytes: bytes, room_id: int, user_id: int, filename: str, content_type: str = "application/octet-stream") -> str:
-    """
-    Upload any file to S3 and return the public URL.
 
-    Args:
-        file_bytes: The file content as bytes
-        room_id: The room ID
-        user_id: The user ID
-        filename: Original filename
-        content_type: MIME type of the file
+def object_url(aws_s3_bucket: str, aws_region: str, s3_key: str) -> str:
+    """Public URL of an object (path-style when a custom endpoint is configured)."""
+    endpoint_url = os.getenv("AWS_S3_ENDPOINT_URL")
+    if endpoint_url:
+        return f"{endpoint_url.rstrip('/')}/{aws_s3_bucket}/{s3_key}"
+    return f"https://{aws_s3_bucket}.s3.{aws_region}.amazonaws.com/{s3_key}"
 
-    Returns:
-        str: The public URL of the uploaded file
 
-    Raises:
-        Exception: If upload fails
+def key_from_url(url: str, aws_s3_bucket: str, aws_region: str) -> Optional[str]:
+    """The object key of a URL produced by object_url, or None for foreign URLs."""
+    for prefix in (object_url(aws_s3_bucket, aws_region, ""), f"https://{aws_s3_bucket}.s3.{aws_region}.amazonaws.com/"):
+        if url.startswith(prefix):
+            return url[len(prefix):]
+    return None
+
+
+def _safe_stem(filename: str) -> str:
+    stem = filename.rsplit('.', 1)[0][:50]  # Limit filename length
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in stem) or "file"
+
+
+def evidence_key(room_id: int, user_id: int, filename: str) -> str:
+    """Key for a room attachment/evidence file uploaded directly by the browser."""
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    file_extension = filename.split('.')[-1].lower() if '.' in filename else 'file'
+    return f"{evidence_prefix(room_id, user_id)}{timestamp}_{uuid.uuid4().hex[:8]}_{_safe_stem(filename)}.{file_extension}"
+
+
+def filename_from_key(s3_key: str) -> str:
+    """Sanitized original filename of an evidence_key/profile_picture_key object (timestamp + id stripped)."""
+    return s3_key.rsplit('/', 1)[-1].split('_', 3)[-1]
+
+
+def evidence_prefix(room_id: int, user_id: int) -> str:
+    return f"evidence/room_{room_id}/user_{user_id}/"
+
+
+def profile_picture_key(user_id: int, filename: str) -> str:
+    """Key for a profile picture uploaded directly by the browser."""
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    file_extension = filename.split('.')[-1].lower() if '.' in filename else 'jpg'
+    return f"{profile_picture_prefix(user_id)}{timestamp}_{uuid.uuid4().hex[:8]}.{file_extension}"
+
+
+def profile_picture_prefix(user_id: int) -> str:
+    return f"profile-pictures/user_{user_id}/"
+
+
+def create_presigned_upload(s3_key: str, content_type: str, max_bytes: int,
+                            expires_in: int = PRESIGNED_UPLOAD_EXPIRES_SECONDS,
+                            filename: Optional[str] = None) -> dict:
+    """
+    Presigned POST letting the browser upload one object straight to the bucket.
+    The policy pins the key and content type and rejects bodies over max_bytes.
+    A filename is pinned as object metadata, so confirming the upload doesn't
+    have to trust a name sent by the client.
+
+    Returns:
+        dict with 'url' and 'fields' (form fields to send before the file),
+        plus 'key', 'max_bytes' and 'expires_in'
     """
     try:
-        # Get S3 client at runtime
         s3_client, aws_s3_bucket, aws_region = get_s3_client()
-
-        # Generate unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_hash = hashlib.md5(file_bytes).hexdigest()[:8]
-        # Preserve file extension
-        file_extension = filename.split('.')[-1] if '.' in filename else 'file'
-        safe_filename = filename.rsplit('.', 1)[0][:50]  # Limit filename length
-        s3_key = f"evidence/room_{room_id}/user_{user_id}/{timestamp}_{file_hash}_{safe_filename}.{file_extension}"
-
-        # Upload to S3
-        s3_client.put_object(
+        fields = {"Content-Type": content_type}
+        if filename:
+            # Metadata travels as a header - percent-encode to keep it ASCII
+            fields["x-amz-meta-filename"] = quote(filename)
+        post = s3_client.generate_presigned_post(
             Bucket=aws_s3_bucket,
             Key=s3_key,
-            Body=file_bytes,
-            ContentType=content_type
+            Fields=fields,
+            Conditions=[{name: value} for name, value in fields.items()] + [
+                ["content-length-range", 1, max_bytes]
+            ],
+            ExpiresIn=expires_in
         )
+        return {
+            "url": post["url"],
+            "fields": post["fields"],
+            "key": s3_key,
+            "max_bytes": max_bytes,
+            "expires_in": expires_in
+        }
+    except ClientError as e:
+        error_message = f"S3 presign failed: {e}"
+        print(error_message)
+        raise Exception(error_message)
 
-        # Generate public URL
-        url = f"https://{aws_s3_bucket}.s3.{aws_region}.amazonaws.com/{s3_key}"
 
-        print(f"File uploaded successfully to S3: {url}")
-        return url
+def get_uploaded_object(s3_key: str) -> Optional[dict]:
+    """
+    Look up an object uploaded with a presigned POST.
 
+    Returns:
+        dict with 'size', 'content_type', 'url' and 'filename' (from the upload's
+        metadata, else from the key), or None if it doesn't exist
+    """
+    s3_client, aws_s3_bucket, aws_region = get_s3_client()
+    try:
+        head = s3_client.head_object(Bucket=aws_s3_bucket, Key=s3_key)
     except ClientError as e:
-        error_message = f"S3 upload failed: {e}"
-        print(error_message)
-        raise Exception(error_message)
-    except Exception as e:
-        error_message = f"Unexpected error uploading to S3: {e}"
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        error_message = f"S3 lookup failed: {e}"
         print(error_message)
         raise Exception(error_message)
+    filename = head.get("Metadata", {}).get("filename")
+    return {
+        "size": head["ContentLength"],
+        "content_type": head.get("ContentType"),
+        "url": object_url(aws_s3_bucket, aws_region, s3_key),
+        "filename": unquote(filename) if filename else filename_from_key(s3_key)
+    }
 
 
 def upload_audio_to_s3(audio_bytes: bytes, room_id: int, user_id: int, filename: str = "recording.webm") -> str:
@@ -118,7 +229,7 @@ def upload_audio_to_s3(audio_bytes: bytes, room_id: int, user_id: int, filename:
         )
 
         # Generate public URL
-        url = f"https://{aws_s3_bucket}.s3.{aws_region}.amazonaws.com/{s3_key}"
+        url = object_url(aws_s3_bucket, aws_region, s3_key)
 
         print(f"Audio uploaded successfully to S3: {url}")
         return url
@@ -165,7 +276,7 @@ def upload_report_to_s3(pdf_bytes: bytes, room_id: int) -> str:
         )
 
         # Generate public URL
-        url = f"https://{aws_s3_bucket}.s3.{aws_region}.amazonaws.com/{s3_key}"
+        url = object_url(aws_s3_bucket, aws_region, s3_key)
 
         print(f"Report PDF uploaded successfully to S3: {url}")
         return url
@@ -180,44 +291,36 @@ def upload_report_to_s3(pdf_bytes: bytes, room_id: int) -> str:
         raise Exception(error_message)
 
 
-def upload_profile_picture_to_s3(image_bytes: bytes, user_id: int, filename: str, content_type: str = "image/jpeg") -> str:
-    """
-    Upload profile picture to S3 and return the public URL.
+def fileobj_size(fileobj: BinaryIO) -> int:
+    """Size of a seekable file object (e.g. UploadFile.file) without reading it."""
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
 
-    Args:
-        image_bytes: The image file content as bytes
-        user_id: The user ID
-        filename: Original filename
-        content_type: MIME type of the image
 
-    Returns:
-        str: The public URL of the uploaded image
+def upload_fileobj_to_s3(fileobj: BinaryIO, s3_key: str, content_type: str = "application/octet-stream") -> str:
+    """
+    Stream a file object to S3 and return the public URL. Files over
+    S3_MULTIPART_THRESHOLD_MB go up as a parallel multipart upload; nothing is
+    read fully into memory.
 
     Raises:
         Exception: If upload fails
     """
     try:
-        # Get S3 client at runtime
         s3_client, aws_s3_bucket, aws_region = get_s3_client()
-
-        # Generate unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_hash = hashlib.md5(image_bytes).hexdigest()[:8]
-        file_extension = filename.split('.')[-1] if '.' in filename else 'jpg'
-        s3_key = f"profile-pictures/user_{user_id}/{timestamp}_{file_hash}.{file_extension}"
-
-        # Upload to S3
-        s3_client.put_object(
-            Bucket=aws_s3_bucket,
-            Key=s3_key,
-            Body=image_bytes,
-            ContentType=content_type
+        s3_client.upload_fileobj(
+            fileobj,
+            aws_s3_bucket,
+            s3_key,
+            ExtraArgs={"ContentType": content_type},
+            Config=_transfer_config
         )
 
-        # Generate public URL
-        url = f"https://{aws_s3_bucket}.s3.{aws_region}.amazonaws.com/{s3_key}"
-
-        print(f"Profile picture uploaded successfully to S3: {url}")
+        url = object_url(aws_s3_bucket, aws_region, s3_key)
+        print(f"File streamed successfully to S3: {url}")
         return url
 
     except ClientError as e:
@@ -225,42 +328,44 @@ def upload_profile_picture_to_s3(image_bytes: bytes, user_id: int, filename: str
         print(error_message)
         raise Exception(error_message)
     except Exception as e:
-        error_message = f"Unexpected error uploading profile picture to S3: {e}"
+        error_message = f"Unexpected error uploading to S3: {e}"
         print(error_message)
         raise Exception(error_message)
 
 
-def delete_audio_from_s3(audio_url: str) -> bool:
+def delete_objects_from_s3(urls: Iterable[str]) -> int:
     """
-    Delete audio file from S3.
-
-    Args:
-        audio_url: The full S3 URL of the file
+    Delete many files by URL with batched delete_objects calls (1000 keys each).
+    URLs outside our bucket are skipped. Never raises.
 
     Returns:
-        bool: True if deleted successfully, False otherwise
+        int: Number of objects deleted
     """
     try:
-        # Get S3 client at runtime
         s3_client, aws_s3_bucket, aws_region = get_s3_client()
-
-        # Extract S3 key from URL
-        # URL format: https://bucket-name.s3.region.amazonaws.com/key
-        if f"s3.{aws_region}.amazonaws.com" not in audio_url:
-            print(f"Invalid S3 URL: {audio_url}")
-            return False
-
-        s3_key = audio_url.split(f"s3.{aws_region}.amazonaws.com/")[1]
-
-        # Delete from S3
-        s3_client.delete_object(
-            Bucket=aws_s3_bucket,
-            Key=s3_key
-        )
-
-        print(f"Audio deleted successfully from S3: {s3_key}")
-        return True
-
     except Exception as e:
-        print(f"Error deleting audio from S3: {e}")
-        return False
+        print(f"Error deleting files from S3: {e}")
+        return 0
+
+    keys: List[str] = sorted({
+        key for key in (key_from_url(url, aws_s3_bucket, aws_region) for url in urls if url) if key
+    })
+    deleted = 0
+    for start in range(0, len(keys), 1000):
+        batch = keys[start:start + 1000]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=aws_s3_bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+            )
+        except Exception as e:
+            print(f"Error deleting {len(batch)} files from S3: {e}")
+            continue
+        errors = response.get("Errors", [])
+        for error in errors[:5]:
+            print(f"Error deleting S3 file {error.get('Key')}: {error.get('Message')}")
+        deleted += len(batch) - len(errors)
+
+    if keys:
+        print(f"Deleted {deleted}/{len(keys)} files from S3")
+    return deleted
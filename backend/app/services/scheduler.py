@@ -1,179 +1,271 @@
 """
-Background scheduler for daily gamification jobs.
+Background scheduler for daily gamification and maintenance jobs.
 Uses APScheduler to run tasks at specific times.
+
+Every API instance (uvicorn worker or replica) starts the scheduler. With
+SCHEDULER_MODE="lease" each run first takes the job's row in scheduler_locks:
+it only proceeds if no other instance holds the lease and the job hasn't
+started within its min gap, so each scheduled run happens exactly once however
+many instances are up. Set SCHEDULER_MODE="local" for a single instance
+without coordination, or "off" to not schedule anything in a process.
+
+Runs that execute are recorded in scheduler_job_runs (start/end, rows
+affected, duration, error) - see GET /admin/scheduler/runs. The daily
+prune_scheduler_runs job deletes runs older than SCHEDULER_RUN_RETENTION_DAYS.
 """
 
+import os
+import socket
+import time
+from typing import Callable, Optional
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from ..config import settings
 from ..db import SessionLocal
-from ..models.gamification import UserProgress, ScoreEvent
-
-# Import helper functions from gamification routes
-def get_or_create_progress(db: Session, user_id: int) -> UserProgress:
-    """Get existing progress or create new one for user."""
-    progress = db.query(UserProgress).filter(UserProgress.user_id == user_id).first()
-    if not progress:
-        progress = UserProgress(user_id=user_id)
-        db.add(progress)
-        db.commit()
-        db.refresh(progress)
-    return progress
-
-def update_score(db: Session, progress: UserProgress, event_type: str, score_change: int, description: str = "", metadata: dict = None):
-    """Update user's score and log the event."""
-    old_score = progress.current_score
-    new_score = max(0, min(100, old_score + score_change))
-    progress.current_score = new_score
-
-    # Create score event
-    event = ScoreEvent(
-        user_id=progress.user_id,
-        event_type=event_type,
-        score_change=score_change,
-        score_before=old_score,
-        score_after=new_score,
-        description=description,
-        metadata=metadata or {}
-    )
-    db.add(event)
-    db.commit()
-
-# Score penalties for inactivity
-INACTIVITY_PENALTIES = {
-    7: -5,   # 7 days inactive
-    14: -10, # 14 days inactive
-    30: -15  # 30 days inactive
-}
+from ..models.scheduler import SchedulerLock, SchedulerJobRun
+from .cost_rollups import refresh_cost_rollups
+from .analytics_snapshots import refresh_daily_metrics, refresh_today
+from . import gamification_jobs
 
 scheduler = BackgroundScheduler()
 
+# A daily job that already started within this long (on any instance) isn't run again
+DAILY_MIN_GAP = timedelta(hours=1)
+
+# Instances started together (a deploy) only backfill once
+STARTUP_MIN_GAP = timedelta(minutes=10)
+
+
+# ========================================
+# JOBS - each returns the number of rows affected
+# ========================================
+
 
-def break_expired_streaks():
+def break_expired_streaks(db: Session) -> int:
     """Break streaks for users who haven't been active in 24+ hours."""
+    return gamification_jobs.break_expired_streaks(db)["rows"]
+
+
+def apply_inactivity_penalties(db: Session) -> int:
+    """Apply score penalties for users who haven't been active."""
+    return gamification_jobs.apply_inactivity_penalties(db)["rows"]
+
+
+def rotate_daily_challenges(db: Session) -> int:
+    """Assign new daily challenges to all users at midnight."""
+    # This is handled by the GET /challenges endpoint which auto-assigns
+    # when user fetches challenges for a new day
+    print(f"[Scheduler] Daily challenge rotation triggered at {datetime.utcnow()}")
+    return 0
+
+
+def refresh_cost_rollups_job(db: Session) -> int:
+    """Roll new api_costs/turns rows into the hourly and daily cost rollups."""
+    written = refresh_cost_rollups(db)
+    print(f"[Scheduler] Refreshed cost rollups: {written}")
+    return sum(written.values())
+
+
+def refresh_daily_metrics_job(db: Session) -> int:
+    """Recompute yesterday's and today's admin analytics buckets."""
+    refreshed = refresh_daily_metrics(db)
+    print(f"[Scheduler] Refreshed daily metrics for {refreshed} day(s)")
+    return refreshed
+
+
+def refresh_today_metrics_job(db: Session) -> int:
+    """Recompute today's admin analytics bucket so GET /admin/analytics never writes."""
+    return refresh_today(db)
+
+
+def prune_scheduler_runs(db: Session) -> int:
+    """Delete run history older than SCHEDULER_RUN_RETENTION_DAYS (the minute jobs add ~1500 rows a day)."""
+    cutoff = datetime.utcnow() - timedelta(days=settings.SCHEDULER_RUN_RETENTION_DAYS)
+    deleted = db.query(SchedulerJobRun).filter(
+        SchedulerJobRun.started_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+# ========================================
+# LEASES + RUN HISTORY
+# ========================================
+
+
+def _instance_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _acquire_lease(job_id: str, instance: str, now: datetime, min_gap: timedelta) -> bool:
+    """Take the job's lease unless another instance holds it or already ran the job within min_gap."""
     db = SessionLocal()
     try:
-        now = datetime.utcnow()
-        threshold = now - timedelta(hours=24)
-
-        # Find users with active streaks who haven't been active
-        users_to_break = db.query(UserProgress).filter(
-            UserProgress.current_streak > 0,
-            UserProgress.streak_last_activity < threshold,
-            # Skip if protected
-            (UserProgress.streak_protected_until == None) |
-            (UserProgress.streak_protected_until < now)
-        ).all()
-
-        broken_count = 0
-        for progress in users_to_break:
-            # Store longest streak if current is higher
-            if progress.current_streak > progress.longest_streak:
-                progress.longest_streak = progress.current_streak
-
-            old_streak = progress.current_streak
-            progress.current_streak = 0
-            broken_count += 1
-
-            print(f"Broke streak for user {progress.user_id}: {old_streak} days -> 0")
-
+        if db.get(SchedulerLock, job_id) is None:
+            db.add(SchedulerLock(job_id=job_id))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another instance created it first
+                db.rollback()
+
+        # Conditional UPDATE: concurrent instances serialize on the row and only one matches
+        claimed = db.query(SchedulerLock).filter(
+            SchedulerLock.job_id == job_id,
+            or_(SchedulerLock.locked_until.is_(None), SchedulerLock.locked_until < now),
+            or_(SchedulerLock.last_started_at.is_(None), SchedulerLock.last_started_at <= now - min_gap)
+        ).update({
+            SchedulerLock.locked_by: instance,
+            SchedulerLock.locked_until: now + timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS),
+            SchedulerLock.last_started_at: now
+        }, synchronize_session=False)
         db.commit()
-        print(f"[Scheduler] Broke {broken_count} expired streaks at {now}")
-
-    except Exception as e:
-        print(f"[Scheduler] Error breaking streaks: {e}")
-        db.rollback()
+        return claimed == 1
     finally:
         db.close()
 
 
-def apply_inactivity_penalties():
-    """Apply score penalties for users who haven't been active."""
+def _release_lease(job_id: str, instance: str):
     db = SessionLocal()
     try:
-        now = datetime.utcnow()
-
-        penalties_applied = 0
+        db.query(SchedulerLock).filter(
+            SchedulerLock.job_id == job_id,
+            SchedulerLock.locked_by == instance
+        ).update({SchedulerLock.locked_until: None}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
 
-        for days, penalty in INACTIVITY_PENALTIES.items():
-            threshold = now - timedelta(days=days)
 
-            # Find users inactive for this many days
-            inactive_users = db.query(UserProgress).filter(
-                UserProgress.streak_last_activity < threshold,
-                UserProgress.current_score > 0  # Only penalize if they have score
-            ).all()
+def _record_start(job_id: str, instance: str, started_at: datetime) -> int:
+    db = SessionLocal()
+    try:
+        run = SchedulerJobRun(job_id=job_id, instance=instance, status="running", started_at=started_at)
+        db.add(run)
+        db.commit()
+        return run.id
+    finally:
+        db.close()
 
-            for progress in inactive_users:
-                # Check if we already applied this penalty level today
-                existing_penalty = db.query(ScoreEvent).filter(
-                    ScoreEvent.user_id == progress.user_id,
-                    ScoreEvent.event_type == f"inactivity_penalty_{days}d",
-                    ScoreEvent.created_at >= now.replace(hour=0, minute=0, second=0)
-                ).first()
 
-                if existing_penalty:
-                    continue
+def _record_finish(run_id: int, rows: Optional[int], duration_ms: int, error: Optional[Exception]):
+    db = SessionLocal()
+    try:
+        db.query(SchedulerJobRun).filter(SchedulerJobRun.id == run_id).update({
+            SchedulerJobRun.status: "failed" if error else "succeeded",
+            SchedulerJobRun.rows_affected: rows,
+            SchedulerJobRun.duration_ms: duration_ms,
+            SchedulerJobRun.error: str(error) if error else None,
+            SchedulerJobRun.finished_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
 
-                # Apply penalty
-                update_score(
-                    db, progress, f"inactivity_penalty_{days}d", penalty,
-                    description=f"{days}-day inactivity penalty"
-                )
-                penalties_applied += 1
 
-                print(f"Applied {days}-day penalty ({penalty} pts) to user {progress.user_id}")
+def _run_job(job_id: str, func: Callable[[Session], int], min_gap: timedelta):
+    """Run a job (if this instance wins its lease) and record the run."""
+    instance = _instance_id()
+    started_at = datetime.utcnow()
+    leased = settings.SCHEDULER_MODE == "lease"
 
-        db.commit()
-        print(f"[Scheduler] Applied {penalties_applied} inactivity penalties at {now}")
+    try:
+        if leased and not _acquire_lease(job_id, instance, started_at, min_gap):
+            return
+        run_id = _record_start(job_id, instance, started_at)
+    except Exception as e:
+        print(f"[Scheduler] Could not start {job_id}: {e}")
+        return
 
+    db = SessionLocal()
+    started = time.monotonic()
+    rows, error = None, None
+    try:
+        rows = func(db)
     except Exception as e:
-        print(f"[Scheduler] Error applying penalties: {e}")
+        print(f"[Scheduler] Error running {job_id}: {e}")
         db.rollback()
+        error = e
     finally:
         db.close()
 
+    try:
+        _record_finish(run_id, rows, round((time.monotonic() - started) * 1000), error)
+        if leased:
+            _release_lease(job_id, instance)
+    except Exception as e:
+        print(f"[Scheduler] Could not record {job_id} run: {e}")
 
-def rotate_daily_challenges():
-    """Assign new daily challenges to all users at midnight."""
-    # This is handled by the GET /challenges endpoint which auto-assigns
-    # when user fetches challenges for a new day
-    print(f"[Scheduler] Daily challenge rotation triggered at {datetime.utcnow()}")
+
+def _add_job(func: Callable[[Session], int], trigger, job_id: str, min_gap: timedelta, **kwargs):
+    scheduler.add_job(
+        _run_job,
+        trigger,
+        args=[job_id, func, min_gap],
+        id=job_id,
+        replace_existing=True,
+        **kwargs
+    )
 
 
 def start_scheduler():
     """Start the background scheduler with all jobs."""
+    if settings.SCHEDULER_MODE == "off":
+        print("[Scheduler] SCHEDULER_MODE=off - not scheduling jobs in this process")
+        return
 
     # Break expired streaks - run at midnight UTC
-    scheduler.add_job(
-        break_expired_streaks,
-        CronTrigger(hour=0, minute=0),
-        id="break_expired_streaks",
-        replace_existing=True
-    )
+    _add_job(break_expired_streaks, CronTrigger(hour=0, minute=0), "break_expired_streaks", DAILY_MIN_GAP)
 
     # Apply inactivity penalties - run at 1 AM UTC
-    scheduler.add_job(
-        apply_inactivity_penalties,
-        CronTrigger(hour=1, minute=0),
-        id="apply_inactivity_penalties",
-        replace_existing=True
-    )
+    _add_job(apply_inactivity_penalties, CronTrigger(hour=1, minute=0), "apply_inactivity_penalties", DAILY_MIN_GAP)
 
     # Rotate challenges - run at midnight UTC
-    scheduler.add_job(
-        rotate_daily_challenges,
-        CronTrigger(hour=0, minute=5),
-        id="rotate_daily_challenges",
-        replace_existing=True
+    _add_job(rotate_daily_challenges, CronTrigger(hour=0, minute=5), "rotate_daily_challenges", DAILY_MIN_GAP)
+
+    # Refresh admin cost rollups - every few minutes (first run backfills history)
+    # Instances' interval clocks aren't aligned, so allow one run per half interval across all of them
+    _add_job(
+        refresh_cost_rollups_job,
+        IntervalTrigger(minutes=settings.COST_ROLLUP_INTERVAL_MINUTES),
+        "refresh_cost_rollups",
+        timedelta(minutes=settings.COST_ROLLUP_INTERVAL_MINUTES) / 2,
+        next_run_time=datetime.now()
     )
 
+    # Refresh today's analytics bucket - every minute or so, once across all instances
+    _add_job(
+        refresh_today_metrics_job,
+        IntervalTrigger(minutes=settings.ANALYTICS_TODAY_INTERVAL_MINUTES),
+        "refresh_today_metrics",
+        timedelta(minutes=settings.ANALYTICS_TODAY_INTERVAL_MINUTES) / 2
+    )
+
+    # Finalize yesterday's analytics buckets - run at 00:15 UTC
+    _add_job(refresh_daily_metrics_job, CronTrigger(hour=0, minute=15), "refresh_daily_metrics", DAILY_MIN_GAP)
+
+    # Backfill analytics history on startup - under its own lease, so a restart shortly
+    # before 00:15 doesn't count as the daily run and make the cron skip it
+    _add_job(refresh_daily_metrics_job, DateTrigger(), "refresh_daily_metrics_backfill", STARTUP_MIN_GAP)
+
+    # Prune scheduler run history - run at 02:00 UTC
+    _add_job(prune_scheduler_runs, CronTrigger(hour=2, minute=0), "prune_scheduler_runs", DAILY_MIN_GAP)
+
     scheduler.start()
-    print("[Scheduler] Background scheduler started with jobs:")
+    print(f"[Scheduler] Background scheduler started ({settings.SCHEDULER_MODE} mode) with jobs:")
     print("  - break_expired_streaks: daily at 00:00 UTC")
     print("  - apply_inactivity_penalties: daily at 01:00 UTC")
     print("  - rotate_daily_challenges: daily at 00:05 UTC")
+    print(f"  - refresh_cost_rollups: every {settings.COST_ROLLUP_INTERVAL_MINUTES} min")
+    print(f"  - refresh_today_metrics: every {settings.ANALYTICS_TODAY_INTERVAL_MINUTES} min")
+    print("  - refresh_daily_metrics: daily at 00:15 UTC (and once on startup)")
+    print(f"  - prune_scheduler_runs: daily at 02:00 UTC (keeps {settings.SCHEDULER_RUN_RETENTION_DAYS} days)")
 
 
 def stop_scheduler():
@@ -5,6 +5,7 @@ Run with: python -m app.services.seed_achievements
 
 from app.db import SessionLocal
 from app.models.gamification import Achievement
+from app.services import achievement_catalog
 
 ACHIEVEMENTS = [
     # Communication Category
@@ -411,6 +412,7 @@ def seed_achievements():
                 created += 1
 
         db.commit()
+        achievement_catalog.invalidate_catalog()
         print(f"✅ Seeded achievements: {created} created, {updated} updated")
         print(f"   Total achievements: {len(ACHIEVEMENTS)}")
 
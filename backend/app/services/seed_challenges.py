@@ -5,6 +5,7 @@ Run with: python -m app.services.seed_challenges
 
 from app.db import SessionLocal
 from app.models.gamification import DailyChallenge
+from app.services import daily_challenges
 
 CHALLENGES = [
     # Breathing Challenges
@@ -185,6 +186,7 @@ def seed_challenges():
                 created += 1
 
         db.commit()
+        daily_challenges.invalidate_challenges()
         print(f"Seeded challenges: {created} created, {updated} updated")
         print(f"Total challenges: {len(CHALLENGES)}")
 
@@ -4,18 +4,15 @@ Guides individual users through self-reflection and conflict processing
 """
 import os
 from typing import Dict, List
-from anthropic import Anthropic
 from app.services.cost_tracker import extract_usage
-from app.config import settings
-
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+from app.services.llm_gateway import cache_history, cached_system, create_message
 
 # Load the comprehensive Solo Coach prompt from file
 with open(os.path.join(os.path.dirname(__file__), '../../solo_coach_prompt.md'), 'r') as f:
     SOLO_COACH_PROMPT = f.read()
 
 
-def start_solo_session(user_input: str, user_name: str) -> Dict:
+async def start_solo_session(user_input: str, user_name: str) -> Dict:
     """
     Start a new Solo coaching session with the user's initial situation
 
@@ -27,10 +24,10 @@ def start_solo_session(user_input: str, user_name: str) -> Dict:
         Dict with ai_response, ready_for_clarity, usage data
     """
     try:
-        response = client.messages.create(
+        response = await create_message(
             model="claude-sonnet-4-20250514",
             max_tokens=300,
-            system=SOLO_COACH_PROMPT,
+            system=cached_system(SOLO_COACH_PROMPT),
             messages=[
                 {
                     "role": "user",
@@ -59,7 +56,7 @@ def start_solo_session(user_input: str, user_name: str) -> Dict:
         }
 
 
-def process_solo_response(conversation_history: List[Dict], user_response: str, user_name: str) -> Dict:
+async def process_solo_response(conversation_history: List[Dict], user_response: str, user_name: str) -> Dict:
     """
     Process the user's response in an ongoing Solo coaching conversation
 
@@ -72,15 +69,15 @@ def process_solo_response(conversation_history: List[Dict], user_response: str,
         Dict with ai_response or clarity_summary, ready_for_clarity, usage data
     """
 
-    messages = conversation_history + [
+    messages = cache_history(conversation_history) + [
         {"role": "user", "content": user_response}
     ]
 
     try:
-        response = client.messages.create(
+        response = await create_message(
             model="claude-sonnet-4-20250514",
             max_tokens=800,  # Longer for potential clarity summary
-            system=SOLO_COACH_PROMPT,
+            system=cached_system(SOLO_COACH_PROMPT),
             messages=messages
         )
 
@@ -0,0 +1,64 @@
+"""
+Telegram History Chunks
+Splits a Telegram history into consecutive chunks that each fit an analysis
+token budget, and records chunked-analysis progress on the TelegramDownload
+(analysis_status, analysis_chunks_done / analysis_chunks_total), which
+GET /telegram/downloads/{id} returns.
+
+Used by the Claude import jobs (routes/rooms.py) and the Gemini history
+analysis (services/gemini_rag_service.py).
+"""
+from typing import Dict, List
+from app.db import SessionLocal
+from app.models.telegram import TelegramDownload
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def message_line(msg: Dict, user1_name: str = "", user2_name: str = "") -> str:
+    """One message as a transcript line: [timestamp] Sender: text"""
+    sender = msg.get('sender_name', user1_name if msg.get('from_me') else user2_name)
+    return f"[{msg.get('timestamp', '')}] {sender}: {msg.get('text', '')}"
+
+
+def chunk_messages(messages: List[Dict], budget: int, user1_name: str = "", user2_name: str = "") -> List[List[Dict]]:
+    """
+    Split messages (oldest first) into consecutive chunks of at most `budget`
+    estimated tokens. Small histories stay one chunk.
+    """
+    ordered = sorted(messages, key=lambda msg: str(msg.get('timestamp', '')))
+
+    chunks: List[List[Dict]] = []
+    current: List[Dict] = []
+    current_tokens = 0
+    for msg in ordered:
+        tokens = estimate_tokens(message_line(msg, user1_name, user2_name))
+        if current and current_tokens + tokens > budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(msg)
+        current_tokens += tokens
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+def update_analysis_progress(download_id: int, **values) -> None:
+    """
+    Record analysis progress on a TelegramDownload (blocking - call from a worker thread).
+    Values may be SQL expressions, e.g. analysis_chunks_done=TelegramDownload.analysis_chunks_done + 1
+    """
+    db = SessionLocal()
+    try:
+        db.query(TelegramDownload).filter(TelegramDownload.id == download_id).update(
+            values, synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        print(f"[Telegram] Could not update analysis progress for download {download_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,265 @@
+"""
+Telegram Client Pool
+Keeps authorized TelegramClients connected between requests, one per stored
+session, so contacts, previews and downloads reuse a warm MTProto connection
+instead of paying a full handshake + is_user_authorized() on every call.
+
+- Clients idle for TELEGRAM_CLIENT_IDLE_SECONDS are disconnected by a sweeper.
+- At most TELEGRAM_MAX_CLIENTS stay connected; the least recently used idle
+  client is evicted to make room.
+- Each client's entity cache (peer id -> access hash) is persisted to
+  TelegramSession.entity_cache and restored on reconnect, so chats can be
+  resolved without re-fetching dialogs after an eviction or restart.
+
+Usage:
+    async with telegram_clients.client(encrypted_session) as client:
+        await client.get_messages(...)
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+from telethon import TelegramClient, utils
+from telethon.errors import AuthKeyError, UnauthorizedError
+from telethon.sessions import StringSession
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser, PeerChannel, PeerChat, PeerUser
+from app.config import settings
+from app.db import SessionLocal
+from app.models.telegram import TelegramSession
+
+logger = logging.getLogger(__name__)
+
+# Seconds between idle sweeps
+SWEEP_INTERVAL = 30
+
+
+@dataclass
+class _PooledClient:
+    client: TelegramClient
+    last_used: float = field(default_factory=time.monotonic)
+    in_use: int = 0
+    persisted_entities: int = 0
+
+
+# encrypted session -> pooled client, least recently used first
+_clients: "OrderedDict[str, _PooledClient]" = OrderedDict()
+_connecting: Dict[str, asyncio.Task] = {}
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+class _PooledSession(StringSession):
+    """
+    StringSession that also remembers every peer id -> access hash it has seen in
+    `peers`, and falls back to it when resolving ids, so the cache can be saved and
+    restored without reaching into Telethon's private entity set.
+    """
+
+    def __init__(self, string: str, peers: List[List[int]]):
+        super().__init__(string)
+        self.peers: Dict[int, int] = {entity_id: access_hash for entity_id, access_hash in peers}
+
+    def process_entities(self, tlo):
+        super().process_entities(tlo)
+        if utils.is_list_like(tlo):
+            entities = list(tlo)
+        else:
+            entities = [getattr(tlo, attr, None) for attr in ("user", "chat")]
+            for attr in ("users", "chats"):
+                if utils.is_list_like(getattr(tlo, attr, None)):
+                    entities.extend(getattr(tlo, attr))
+
+        for entity in entities:
+            try:
+                peer = utils.get_input_peer(entity, allow_self=False)
+            except TypeError:
+                continue  # Not a peer, or a "min" entity without a usable access hash
+            if isinstance(peer, (InputPeerUser, InputPeerChannel)):
+                self.peers[utils.get_peer_id(peer)] = peer.access_hash
+            elif isinstance(peer, InputPeerChat):
+                self.peers[utils.get_peer_id(peer)] = 0
+
+    def get_entity_rows_by_id(self, id, exact=True):
+        row = super().get_entity_rows_by_id(id, exact)
+        if row:
+            return row
+        candidates = [id] if exact else [utils.get_peer_id(peer(id)) for peer in (PeerUser, PeerChat, PeerChannel)]
+        for entity_id in candidates:
+            if entity_id in self.peers:
+                return entity_id, self.peers[entity_id]
+        return None
+
+
+def _load_entity_cache(encrypted_session: str) -> List[List[int]]:
+    db = SessionLocal()
+    try:
+        row = db.query(TelegramSession.entity_cache).filter(
+            TelegramSession.encrypted_session == encrypted_session
+        ).first()
+        return (row[0] if row else None) or []
+    finally:
+        db.close()
+
+
+def _save_entity_cache(encrypted_session: str, cache: List[List[int]]) -> bool:
+    db = SessionLocal()
+    try:
+        db.query(TelegramSession).filter(
+            TelegramSession.encrypted_session == encrypted_session
+        ).update({TelegramSession.entity_cache: cache}, synchronize_session=False)
+        db.commit()
+        return True
+    except Exception as e:
+        logger.warning(f"Could not persist Telegram entity cache: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+async def _persist_entity_cache(encrypted_session: str, pooled: _PooledClient):
+    """Save the client's peer ids + access hashes if it learned new ones."""
+    peers = pooled.client.session.peers
+    if len(peers) <= pooled.persisted_entities:
+        return
+
+    # Only ids and access hashes - usernames, phones and names aren't needed to resolve peers
+    cache = [[entity_id, access_hash] for entity_id, access_hash in peers.items()]
+    if await asyncio.to_thread(_save_entity_cache, encrypted_session, cache):
+        pooled.persisted_entities = len(cache)
+
+
+async def _connect(encrypted_session: str) -> _PooledClient:
+    """Open and authorize a new client, restoring its persisted entity cache."""
+    from app.services.telegram_service import TelegramService, TELEGRAM_API_ID, TELEGRAM_API_HASH
+
+    if not TELEGRAM_API_ID or not TELEGRAM_API_HASH:
+        raise ValueError("Telegram API credentials not configured")
+
+    session_string = TelegramService.decrypt_session(encrypted_session)
+    cached = await asyncio.to_thread(_load_entity_cache, encrypted_session)
+    client = TelegramClient(_PooledSession(session_string, cached), int(TELEGRAM_API_ID), TELEGRAM_API_HASH)
+
+    await client.connect()
+
+    # Verify session is still valid
+    if not await client.is_user_authorized():
+        await client.disconnect()
+        raise ValueError("Session expired or invalid")
+
+    logger.info(f"Telegram client connected ({len(cached)} cached entities, {len(_clients) + 1} pooled)")
+    return _PooledClient(client=client, persisted_entities=len(cached))
+
+
+async def _close(encrypted_session: str, pooled: _PooledClient):
+    await _persist_entity_cache(encrypted_session, pooled)
+    try:
+        await pooled.client.disconnect()
+    except Exception as e:
+        logger.warning(f"Error disconnecting Telegram client: {e}")
+
+
+async def _evict_for_capacity():
+    """Disconnect least recently used idle clients while over TELEGRAM_MAX_CLIENTS."""
+    while len(_clients) > settings.TELEGRAM_MAX_CLIENTS:
+        victim = next((key for key, pooled in _clients.items() if pooled.in_use == 0), None)
+        if victim is None:
+            # Every client is mid-request - go over the cap rather than fail
+            logger.warning(f"Telegram client pool full ({len(_clients)} busy clients)")
+            return
+        await _close(victim, _clients.pop(victim))
+
+
+async def _acquire(encrypted_session: str) -> _PooledClient:
+    pooled = _clients.get(encrypted_session)
+    if pooled is not None and not pooled.client.is_connected():
+        # Dropped by Telegram or the network - reconnect the same client
+        try:
+            await pooled.client.connect()
+        except Exception:
+            _clients.pop(encrypted_session, None)
+            pooled = None
+
+    if pooled is None:
+        # One handshake per session even if several requests arrive at once
+        task = _connecting.get(encrypted_session)
+        if task is None:
+            task = asyncio.ensure_future(_connect(encrypted_session))
+            _connecting[encrypted_session] = task
+            try:
+                pooled = await task
+            finally:
+                _connecting.pop(encrypted_session, None)
+            _clients[encrypted_session] = pooled
+        else:
+            pooled = await task
+
+    if encrypted_session in _clients:
+        _clients.move_to_end(encrypted_session)
+    pooled.in_use += 1
+    pooled.last_used = time.monotonic()
+    await _evict_for_capacity()
+    return pooled
+
+
+@asynccontextmanager
+async def client(encrypted_session: str) -> AsyncIterator[TelegramClient]:
+    """
+    Borrow a connected, authorized client for a stored session.
+    Raises ValueError if the session is expired or invalid.
+    """
+    pooled = await _acquire(encrypted_session)
+    try:
+        yield pooled.client
+    except (AuthKeyError, UnauthorizedError):
+        # Session revoked on Telegram's side - don't hand this client out again
+        if _clients.get(encrypted_session) is pooled:
+            _clients.pop(encrypted_session)
+        await _close(encrypted_session, pooled)
+        raise
+    finally:
+        pooled.in_use -= 1
+        pooled.last_used = time.monotonic()
+        if pooled.in_use == 0:
+            await _persist_entity_cache(encrypted_session, pooled)
+
+
+async def discard(encrypted_session: str):
+    """Disconnect a session's pooled client (e.g. when the user disconnects Telegram)."""
+    pooled = _clients.pop(encrypted_session, None)
+    if pooled is not None:
+        await _close(encrypted_session, pooled)
+
+
+async def _sweep_idle():
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        cutoff = time.monotonic() - settings.TELEGRAM_CLIENT_IDLE_SECONDS
+        for key, pooled in list(_clients.items()):
+            if pooled.in_use == 0 and pooled.last_used < cutoff and _clients.get(key) is pooled:
+                _clients.pop(key)
+                await _close(key, pooled)
+
+
+async def start():
+    """Start the idle sweeper (called on app startup)."""
+    global _sweeper_task
+    if _sweeper_task is None:
+        _sweeper_task = asyncio.create_task(_sweep_idle())
+
+
+async def stop():
+    """Stop the sweeper and disconnect every pooled client."""
+    global _sweeper_task
+    if _sweeper_task is not None:
+        _sweeper_task.cancel()
+        try:
+            await _sweeper_task
+        except asyncio.CancelledError:
+            pass
+        _sweeper_task = None
+    while _clients:
+        key, pooled = _clients.popitem(last=False)
+        await _close(key, pooled)
@@ -25,10 +25,14 @@ import uuid
 import qrcode
 import io
 import base64
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
+from ..config import settings
+from ..db import SessionLocal
 from ..models.telegram import TelegramSession, TelegramDownload, TelegramMessage
 from ..models.user import User
+from . import job_queue, telegram_clients
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +48,9 @@ else:
     logger.warning("TELEGRAM_SESSION_ENCRYPTION_KEY not set - session encryption disabled")
     cipher = None
 
+# Downloads currently streaming in this worker (guards against resuming one twice)
+_running_downloads = set()
+
 
 class TelegramService:
     """Service for managing Telegram client connections and data downloads."""
@@ -148,6 +155,7 @@ class TelegramService:
             if existing_session:
                 # Update existing
                 existing_session.encrypted_session = encrypted_session
+                existing_session.entity_cache = None  # Access hashes belong to the previous login
                 existing_session.phone_number = phone_number
                 existing_session.is_active = True
                 existing_session.updated_at = datetime.utcnow()
@@ -168,39 +176,6 @@ class TelegramService:
         await client.disconnect()
         return encrypted_session
 
-    @staticmethod
-    async def get_client_from_session(encrypted_session: str) -> TelegramClient:
-        """
-        Create authenticated TelegramClient from encrypted session string.
-
-        Args:
-            encrypted_session: Encrypted session string from database
-
-        Returns:
-            Connected and authenticated TelegramClient instance
-        """
-        if not TELEGRAM_API_ID or not TELEGRAM_API_HASH:
-            raise ValueError("Telegram API credentials not configured")
-
-        # Decrypt session
-        session_string = TelegramService.decrypt_session(encrypted_session)
-
-        # Create client with session
-        client = TelegramClient(
-            StringSession(session_string),
-            int(TELEGRAM_API_ID),
-            TELEGRAM_API_HASH
-        )
-
-        await client.connect()
-
-        # Verify session is still valid
-        if not await client.is_user_authorized():
-            await client.disconnect()
-            raise ValueError("Session expired or invalid")
-
-        return client
-
     @staticmethod
     async def get_dialogs(encrypted_session: str, limit: int = 10, folder_id: Optional[int] = None) -> Tuple[List[Dict], Dict[int, str]]:
         """
@@ -216,362 +191,403 @@ class TelegramService:
             - dialogs: List of dialog dictionaries with id, name, type, unread_count, folder, archived, pinned
             - folder_names: Dict mapping folder IDs to folder names {3: 'Top G', 42: 'Safeguard', ...}
         """
-        client = await TelegramService.get_client_from_session(encrypted_session)
-
-        try:
-            dialogs = []
+        async with telegram_clients.client(encrypted_session) as client:
+            try:
+                dialogs = []
 
-            logger.info(f"Starting dialog fetch targeting {limit} users (will iterate until we find enough)")
+                logger.info(f"Starting dialog fetch targeting {limit} users (will iterate until we find enough)")
 
-            # Fetch custom folder names from Telegram
-            from telethon import functions
-            from telethon.tl.types import InputPeerUser, InputPeerChat, InputPeerChannel
+                # Fetch custom folder names from Telegram
+                from telethon import functions
+                from telethon.tl.types import InputPeerUser, InputPeerChat, InputPeerChannel
 
-            folder_names = {}
-            peer_to_folder = {}  # Map peer_id → folder_id
+                folder_names = {}
+                peer_to_folder = {}  # Map peer_id → folder_id
 
-            try:
-                # GetDialogFiltersRequest returns a DialogFilters object with a 'filters' attribute
-                dialog_filters_result = await client(functions.messages.GetDialogFiltersRequest())
-
-                # Access the 'filters' attribute from the DialogFilters object
-                filters_list = dialog_filters_result.filters if hasattr(dialog_filters_result, 'filters') else []
-                print(f"📊 Processing {len(filters_list)} filters")
-                logger.info(f"📊 Processing {len(filters_list)} filters")
-
-                # Build folder_names and peer_to_folder mapping
-                # Also track folder order for proper sorting
-                folder_order = {}  # folder_id → order/position
-
-                for idx, folder_filter in enumerate(filters_list):
-                    # Only include custom folders (DialogFilter) created by user
-                    if isinstance(folder_filter, DialogFilter):
-                        # Extract text from TextWithEntities object
-                        title_text = folder_filter.title.text if hasattr(folder_filter.title, 'text') else str(folder_filter.title)
-                        folder_names[folder_filter.id] = title_text
-
-                        # Store the order (use index from filters_list as fallback)
-                        order = getattr(folder_filter, 'order', idx)
-                        folder_order[folder_filter.id] = order
-                        print(f"📁 Folder '{title_text}' (id={folder_filter.id}) order={order}")
-                        logger.info(f"📁 Folder '{title_text}' (id={folder_filter.id}) order={order}")
-
-                        # Build peer → folder mapping from include_peers
-                        if hasattr(folder_filter, 'include_peers') and folder_filter.include_peers:
-                            print(f"📁 Folder '{title_text}' (id={folder_filter.id}) has {len(folder_filter.include_peers)} include_peers")
-                            logger.info(f"📁 Folder '{title_text}' (id={folder_filter.id}) has {len(folder_filter.include_peers)} include_peers")
-
-                            for peer in folder_filter.include_peers:
-                                # Extract the actual peer ID from InputPeer objects
-                                peer_id = None
-                                if isinstance(peer, InputPeerUser):
-                                    peer_id = peer.user_id
-                                elif isinstance(peer, InputPeerChat):
-                                    peer_id = peer.chat_id
-                                elif isinstance(peer, InputPeerChannel):
-                                    peer_id = peer.channel_id
-
-                                if peer_id:
-                                    # A peer can be in multiple folders, store as list
-                                    if peer_id not in peer_to_folder:
-                                        peer_to_folder[peer_id] = []
-                                    peer_to_folder[peer_id].append(folder_filter.id)
-                                    print(f"  📌 Peer {peer_id} → folder {folder_filter.id}")
-                                    logger.info(f"  📌 Peer {peer_id} → folder {folder_filter.id}")
+                try:
+                    # GetDialogFiltersRequest returns a DialogFilters object with a 'filters' attribute
+                    dialog_filters_result = await client(functions.messages.GetDialogFiltersRequest())
+
+                    # Access the 'filters' attribute from the DialogFilters object
+                    filters_list = dialog_filters_result.filters if hasattr(dialog_filters_result, 'filters') else []
+                    print(f"📊 Processing {len(filters_list)} filters")
+                    logger.info(f"📊 Processing {len(filters_list)} filters")
+
+                    # Build folder_names and peer_to_folder mapping
+                    # Also track folder order for proper sorting
+                    folder_order = {}  # folder_id → order/position
+
+                    for idx, folder_filter in enumerate(filters_list):
+                        # Only include custom folders (DialogFilter) created by user
+                        if isinstance(folder_filter, DialogFilter):
+                            # Extract text from TextWithEntities object
+                            title_text = folder_filter.title.text if hasattr(folder_filter.title, 'text') else str(folder_filter.title)
+                            folder_names[folder_filter.id] = title_text
+
+                            # Store the order (use index from filters_list as fallback)
+                            order = getattr(folder_filter, 'order', idx)
+                            folder_order[folder_filter.id] = order
+                            print(f"📁 Folder '{title_text}' (id={folder_filter.id}) order={order}")
+                            logger.info(f"📁 Folder '{title_text}' (id={folder_filter.id}) order={order}")
+
+                            # Build peer → folder mapping from include_peers
+                            if hasattr(folder_filter, 'include_peers') and folder_filter.include_peers:
+                                print(f"📁 Folder '{title_text}' (id={folder_filter.id}) has {len(folder_filter.include_peers)} include_peers")
+                                logger.info(f"📁 Folder '{title_text}' (id={folder_filter.id}) has {len(folder_filter.include_peers)} include_peers")
+
+                                for peer in folder_filter.include_peers:
+                                    # Extract the actual peer ID from InputPeer objects
+                                    peer_id = None
+                                    if isinstance(peer, InputPeerUser):
+                                        peer_id = peer.user_id
+                                    elif isinstance(peer, InputPeerChat):
+                                        peer_id = peer.chat_id
+                                    elif isinstance(peer, InputPeerChannel):
+                                        peer_id = peer.channel_id
+
+                                    if peer_id:
+                                        # A peer can be in multiple folders, store as list
+                                        if peer_id not in peer_to_folder:
+                                            peer_to_folder[peer_id] = []
+                                        peer_to_folder[peer_id].append(folder_filter.id)
+                                        print(f"  📌 Peer {peer_id} → folder {folder_filter.id}")
+                                        logger.info(f"  📌 Peer {peer_id} → folder {folder_filter.id}")
+                            else:
+                                print(f"📁 Folder '{title_text}' (id={folder_filter.id}) uses generic filters (no specific peers)")
+                                logger.info(f"📁 Folder '{title_text}' (id={folder_filter.id}) uses generic filters")
+
+                    print(f"📁 FINAL: {len(folder_names)} folders, {len(peer_to_folder)} peers mapped")
+                    logger.info(f"📁 FINAL: {len(folder_names)} folders, {len(peer_to_folder)} peers mapped")
+                except Exception as e:
+                    logger.warning(f"❌ Could not fetch folder names: {e}")
+                    logger.exception("Full traceback:")
+                    # Continue without custom folder names
+
+                # Fetch dialogs - include users, groups, and channels
+                dialog_count = 0
+                item_count = 0
+                async for dialog in client.iter_dialogs():
+                    dialog_count += 1
+                    entity = dialog.entity
+
+                    # Determine chat type and name
+                    if isinstance(entity, TelegramUser):
+                        chat_type = "user"
+                        chat_name = entity.first_name or ""
+                        if entity.last_name:
+                            chat_name += f" {entity.last_name}"
+                        # Add username if available
+                        if hasattr(entity, 'username') and entity.username:
+                            chat_name += f" (@{entity.username})"
+                    elif isinstance(entity, Chat):
+                        chat_type = "group"
+                        chat_name = entity.title or "Unnamed Group"
+                    elif isinstance(entity, Channel):
+                        # Channels can be broadcast channels or supergroups
+                        if entity.megagroup:
+                            chat_type = "supergroup"
                         else:
-                            print(f"📁 Folder '{title_text}' (id={folder_filter.id}) uses generic filters (no specific peers)")
-                            logger.info(f"📁 Folder '{title_text}' (id={folder_filter.id}) uses generic filters")
-
-                print(f"📁 FINAL: {len(folder_names)} folders, {len(peer_to_folder)} peers mapped")
-                logger.info(f"📁 FINAL: {len(folder_names)} folders, {len(peer_to_folder)} peers mapped")
-            except Exception as e:
-                logger.warning(f"❌ Could not fetch folder names: {e}")
-                logger.exception("Full traceback:")
-                # Continue without custom folder names
-
-            # Fetch dialogs - include users, groups, and channels
-            dialog_count = 0
-            item_count = 0
-            async for dialog in client.iter_dialogs():
-                dialog_count += 1
-                entity = dialog.entity
-
-                # Determine chat type and name
-                if isinstance(entity, TelegramUser):
-                    chat_type = "user"
-                    chat_name = entity.first_name or ""
-                    if entity.last_name:
-                        chat_name += f" {entity.last_name}"
-                    # Add username if available
-                    if hasattr(entity, 'username') and entity.username:
-                        chat_name += f" (@{entity.username})"
-                elif isinstance(entity, Chat):
-                    chat_type = "group"
-                    chat_name = entity.title or "Unnamed Group"
-                elif isinstance(entity, Channel):
-                    # Channels can be broadcast channels or supergroups
-                    if entity.megagroup:
-                        chat_type = "supergroup"
+                            chat_type = "channel"
+                        chat_name = entity.title or "Unnamed Channel"
                     else:
-                        chat_type = "channel"
-                    chat_name = entity.title or "Unnamed Channel"
-                else:
-                    # Unknown type - skip
-                    continue
-
-                # Get folder information from peer_to_folder mapping
-                peer_id = entity.id
-                dialog_folder_ids = peer_to_folder.get(peer_id, [])  # List of folder IDs this peer belongs to
-
-                # Use the first folder for display purposes (peers can be in multiple folders)
-                dialog_folder_id = dialog_folder_ids[0] if dialog_folder_ids else None
-                folder_name = None
-                if dialog_folder_id:
-                    folder_name = folder_names.get(dialog_folder_id, f"Folder {dialog_folder_id}")
-
-                print(f"🔍 Dialog '{chat_name}' (peer_id={peer_id}): folders={dialog_folder_ids}, using folder_id={dialog_folder_id}")
-                logger.info(f"🔍 Dialog '{chat_name}' (peer_id={peer_id}): folders={dialog_folder_ids}")
-
-                # Skip this dialog if filtering by folder and it doesn't match
-                if folder_id is not None:  # None means no filter, show all
-                    if folder_id == -1:  # -1 means "no folder"
-                        if dialog_folder_id is not None:
-                            print(f"⏭️  SKIPPING '{chat_name}' - has folder, but we want no folder")
-                            continue  # Skip this dialog, it has a folder
+                        # Unknown type - skip
+                        continue
+
+                    # Get folder information from peer_to_folder mapping
+                    peer_id = entity.id
+                    dialog_folder_ids = peer_to_folder.get(peer_id, [])  # List of folder IDs this peer belongs to
+
+                    # Use the first folder for display purposes (peers can be in multiple folders)
+                    dialog_folder_id = dialog_folder_ids[0] if dialog_folder_ids else None
+                    folder_name = None
+                    if dialog_folder_id:
+                        folder_name = folder_names.get(dialog_folder_id, f"Folder {dialog_folder_id}")
+
+                    print(f"🔍 Dialog '{chat_name}' (peer_id={peer_id}): folders={dialog_folder_ids}, using folder_id={dialog_folder_id}")
+                    logger.info(f"🔍 Dialog '{chat_name}' (peer_id={peer_id}): folders={dialog_folder_ids}")
+
+                    # Skip this dialog if filtering by folder and it doesn't match
+                    if folder_id is not None:  # None means no filter, show all
+                        if folder_id == -1:  # -1 means "no folder"
+                            if dialog_folder_id is not None:
+                                print(f"⏭️  SKIPPING '{chat_name}' - has folder, but we want no folder")
+                                continue  # Skip this dialog, it has a folder
+                            else:
+                                print(f"✅ KEEPING '{chat_name}' - has no folder (matches filter)")
+                        elif folder_id not in dialog_folder_ids:
+                            print(f"⏭️  SKIPPING '{chat_name}' - not in folder {folder_id}")
+                            continue  # Skip this dialog, not in requested folder
                         else:
-                            print(f"✅ KEEPING '{chat_name}' - has no folder (matches filter)")
-                    elif folder_id not in dialog_folder_ids:
-                        print(f"⏭️  SKIPPING '{chat_name}' - not in folder {folder_id}")
-                        continue  # Skip this dialog, not in requested folder
+                            print(f"✅ KEEPING '{chat_name}' - in folder {folder_id}")
                     else:
-                        print(f"✅ KEEPING '{chat_name}' - in folder {folder_id}")
-                else:
-                    print(f"✅ KEEPING '{chat_name}' - no filter (showing all)")
-
-                # Check if archived
-                is_archived = dialog.archived if hasattr(dialog, 'archived') else False
-
-                # Check if pinned (favorite)
-                is_pinned = dialog.pinned if hasattr(dialog, 'pinned') else False
-
-                dialogs.append({
-                    "id": entity.id,
-                    "name": chat_name,
-                    "type": chat_type,
-                    "unread_count": dialog.unread_count,
-                    "last_message_date": dialog.date.isoformat() if dialog.date else None,
-                    "folder_id": dialog_folder_id,
-                    "folder_name": folder_name,
-                    "archived": is_archived,
-                    "pinned": is_pinned,
-                    "profile_picture_url": None  # Lazy-loaded when chat is downloaded
-                })
-
-                item_count += 1
-
-                # Stop once we have enough items
-                if item_count >= limit:
-                    logger.info(f"Reached target of {limit} items, stopping iteration")
-                    break
-
-                # Log progress every 10 dialogs for debugging
-                if dialog_count % 10 == 0:
-                    logger.info(f"Processed {dialog_count} dialogs, found {item_count} items so far...")
-
-            logger.info(f"Successfully fetched {len(dialogs)} dialogs from Telegram (iterated through {dialog_count} total)")
-
-            # Log detailed dialog info to debug folder display
-            logger.info(f"📤 RETURNING {len(dialogs)} dialogs to API")
-            for idx, dialog in enumerate(dialogs):
-                logger.info(f"📤 Dialog #{idx}: name='{dialog['name']}', folder_id={dialog.get('folder_id')}, folder_name='{dialog.get('folder_name')}'")
-
-            if len(dialogs) == 0:
-                logger.warning("No dialogs found! This could indicate:")
-                logger.warning("  1. Account has no chats (unlikely)")
-                logger.warning("  2. Session permissions issue")
-                logger.warning("  3. Telegram API rate limiting")
-                logger.warning("  4. iter_dialogs filtering issue")
-
-            print(f"📤 RETURNING: {len(dialogs)} dialogs + {len(folder_names)} folders")
-            return dialogs, folder_names
+                        print(f"✅ KEEPING '{chat_name}' - no filter (showing all)")
+
+                    # Check if archived
+                    is_archived = dialog.archived if hasattr(dialog, 'archived') else False
+
+                    # Check if pinned (favorite)
+                    is_pinned = dialog.pinned if hasattr(dialog, 'pinned') else False
+
+                    dialogs.append({
+                        "id": entity.id,
+                        "name": chat_name,
+                        "type": chat_type,
+                        "unread_count": dialog.unread_count,
+                        "last_message_date": dialog.date.isoformat() if dialog.date else None,
+                        "folder_id": dialog_folder_id,
+                        "folder_name": folder_name,
+                        "archived": is_archived,
+                        "pinned": is_pinned,
+                        "profile_picture_url": None  # Lazy-loaded when chat is downloaded
+                    })
 
-        except Exception as e:
-            logger.error(f"Error fetching dialogs: {e}", exc_info=True)
-            raise
+                    item_count += 1
+
+                    # Stop once we have enough items
+                    if item_count >= limit:
+                        logger.info(f"Reached target of {limit} items, stopping iteration")
+                        break
+
+                    # Log progress every 10 dialogs for debugging
+                    if dialog_count % 10 == 0:
+                        logger.info(f"Processed {dialog_count} dialogs, found {item_count} items so far...")
+
+                logger.info(f"Successfully fetched {len(dialogs)} dialogs from Telegram (iterated through {dialog_count} total)")
+
+                # Log detailed dialog info to debug folder display
+                logger.info(f"📤 RETURNING {len(dialogs)} dialogs to API")
+                for idx, dialog in enumerate(dialogs):
+                    logger.info(f"📤 Dialog #{idx}: name='{dialog['name']}', folder_id={dialog.get('folder_id')}, folder_name='{dialog.get('folder_name')}'")
+
+                if len(dialogs) == 0:
+                    logger.warning("No dialogs found! This could indicate:")
+                    logger.warning("  1. Account has no chats (unlikely)")
+                    logger.warning("  2. Session permissions issue")
+                    logger.warning("  3. Telegram API rate limiting")
+                    logger.warning("  4. iter_dialogs filtering issue")
+
+                print(f"📤 RETURNING: {len(dialogs)} dialogs + {len(folder_names)} folders")
+                return dialogs, folder_names
+
+            except Exception as e:
+                logger.error(f"Error fetching dialogs: {e}", exc_info=True)
+                raise
+
+    @staticmethod
+    def _update_download(download_id: int, **values):
+        """Update a download record in its own short-lived session."""
+        db = SessionLocal()
+        try:
+            db.query(TelegramDownload).filter(TelegramDownload.id == download_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
         finally:
-            await client.disconnect()
+            db.close()
 
     @staticmethod
-    async def download_chat_history(
-        encrypted_session: str,
-        chat_id: int,
-        start_date: datetime,
-        end_date: datetime,
-        db: Session,
-        user_id: int,
-        session_id: int,
-        download_id: int = None
-    ) -> int:
+    def _begin_download(download_id: int) -> Dict:
+        """
+        Mark a download as processing and work out where to (re)start it.
+        Messages are stored newest-first, so the lowest stored message_id is
+        where an interrupted download left off.
+        """
+        db = SessionLocal()
+        try:
+            download = db.query(TelegramDownload).filter(TelegramDownload.id == download_id).first()
+            if not download:
+                raise ValueError(f"Download record {download_id} not found")
+
+            resume_from_id = db.query(func.min(TelegramMessage.message_id)).filter(
+                TelegramMessage.download_id == download_id
+            ).scalar()
+
+            download.status = "processing"
+            download.error_message = None
+            db.commit()
+
+            return {
+                "chat_id": download.chat_id,
+                "start_date": download.start_date,
+                "end_date": download.end_date,
+                "resume_from_id": resume_from_id,
+                "message_count": (download.message_count or 0) if resume_from_id else 0,
+                "media_count": (download.media_count or 0) if resume_from_id else 0,
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def _store_message_batch(download_id: int, rows: List[Dict], message_count: int, media_count: int):
+        """Bulk insert a batch of messages and its progress counters in one transaction."""
+        db = SessionLocal()
+        try:
+            db.execute(insert(TelegramMessage), rows)
+            db.query(TelegramDownload).filter(TelegramDownload.id == download_id).update({
+                TelegramDownload.message_count: message_count,
+                TelegramDownload.media_count: media_count
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    async def download_chat_history(encrypted_session: str, download_id: int) -> int:
         """
-        Download chat history for specified date range.
+        Download chat history for an existing TelegramDownload record.
+
+        Messages are streamed from Telegram in batches of TELEGRAM_DOWNLOAD_BATCH_SIZE,
+        each bulk-inserted in its own short transaction (one batch is written while
+        the next is fetched), so no DB connection is held while waiting on Telegram.
+        Progress is visible via TelegramDownload.message_count. Calling this again
+        for a failed or interrupted download resumes after the last stored message.
 
         Args:
             encrypted_session: Encrypted session string
-            chat_id: Telegram chat ID to download from
-            start_date: Start of date range (inclusive)
-            end_date: End of date range (inclusive)
-            db: Database session
-            user_id: User ID for tracking
-            session_id: TelegramSession ID
-            download_id: Existing TelegramDownload ID (optional, for updating existing record)
+            download_id: TelegramDownload ID (chat and date range are read from it)
 
         Returns:
             TelegramDownload ID
         """
-        client = await TelegramService.get_client_from_session(encrypted_session)
+        if download_id in _running_downloads:
+            raise ValueError(f"Download {download_id} is already running")
+        _running_downloads.add(download_id)
+        try:
+            return await TelegramService._run_download(encrypted_session, download_id)
+        finally:
+            _running_downloads.discard(download_id)
 
-        # Get existing download record or create new one
-        if download_id:
-            download = db.query(TelegramDownload).filter(TelegramDownload.id == download_id).first()
-            if not download:
-                raise ValueError(f"Download record {download_id} not found")
-            download.status = "processing"
-            db.commit()
-        else:
-            # Create download record (only if not provided)
-            download = TelegramDownload(
-                user_id=user_id,
-                session_id=session_id,
-                chat_id=chat_id,
-                start_date=start_date,
-                end_date=end_date,
-                status="processing"
-            )
-            db.add(download)
-            db.commit()
-            db.refresh(download)
+    @staticmethod
+    async def _run_download(encrypted_session: str, download_id: int) -> int:
+        job = await asyncio.to_thread(TelegramService._begin_download, download_id)
+        chat_id = job["chat_id"]
+        message_count = job["message_count"]
+        media_count = job["media_count"]
+        batch_size = settings.TELEGRAM_DOWNLOAD_BATCH_SIZE
+        pending_write = None
 
         try:
-            # Populate entity cache by calling get_dialogs() once
-            try:
-                logger.info("Populating entity cache with get_dialogs() for download")
-                await client.get_dialogs(limit=1)
-                logger.info("Entity cache populated successfully")
-            except Exception as e:
-                logger.warning(f"Could not populate entity cache: {e}")
-                # Continue anyway - get_entity will try to fetch
-
-            # Get chat entity
-            entity = await client.get_entity(chat_id)
-
-            # Update chat info
-            if isinstance(entity, TelegramUser):
-                chat_name = entity.first_name or ""
-                if entity.last_name:
-                    chat_name += f" {entity.last_name}"
-                download.chat_type = "user"
-            elif isinstance(entity, Chat):
-                chat_name = entity.title
-                download.chat_type = "group"
-            elif isinstance(entity, Channel):
-                chat_name = entity.title
-                download.chat_type = "channel" if entity.broadcast else "supergroup"
-            else:
-                chat_name = str(chat_id)
-                download.chat_type = "unknown"
+            async with telegram_clients.client(encrypted_session) as client:
+                # Get chat entity - usually already in the pooled client's (persisted) entity cache
+                try:
+                    entity = await client.get_entity(chat_id)
+                except ValueError:
+                    logger.info(f"Entity {chat_id} not in cache, populating with get_dialogs()")
+                    await client.get_dialogs(limit=100)
+                    entity = await client.get_entity(chat_id)
 
-            download.chat_name = chat_name
-            db.commit()
+                # Update chat info
+                if isinstance(entity, TelegramUser):
+                    chat_name = entity.first_name or ""
+                    if entity.last_name:
+                        chat_name += f" {entity.last_name}"
+                    chat_type = "user"
+                elif isinstance(entity, Chat):
+                    chat_name = entity.title
+                    chat_type = "group"
+                elif isinstance(entity, Channel):
+                    chat_name = entity.title
+                    chat_type = "channel" if entity.broadcast else "supergroup"
+                else:
+                    chat_name = str(chat_id)
+                    chat_type = "unknown"
+
+                await asyncio.to_thread(
+                    TelegramService._update_download, download_id, chat_name=chat_name, chat_type=chat_type
+                )
 
-            # Download messages
-            message_count = 0
-            media_count = 0
-
-            # Ensure dates are timezone-aware for comparison with Telegram's timezone-aware message dates
-            from datetime import timezone
-            if start_date.tzinfo is None:
-                start_date = start_date.replace(tzinfo=timezone.utc)
-            if end_date.tzinfo is None:
-                end_date = end_date.replace(tzinfo=timezone.utc)
-
-            async for message in client.iter_messages(
-                entity,
-                offset_date=end_date,
-                reverse=False
-            ):
-                # Stop if before start date
-                if message.date < start_date:
-                    break
-
-                # Skip service messages
-                if not message.text and not message.media:
-                    continue
-
-                # Get sender info
-                sender_id = message.sender_id or 0
-                sender_name = "Unknown"
-
-                if message.sender:
-                    if isinstance(message.sender, TelegramUser):
+                # Ensure dates are timezone-aware for comparison with Telegram's timezone-aware message dates
+                from datetime import timezone
+                start_date, end_date = job["start_date"], job["end_date"]
+                if start_date.tzinfo is None:
+                    start_date = start_date.replace(tzinfo=timezone.utc)
+                if end_date.tzinfo is None:
+                    end_date = end_date.replace(tzinfo=timezone.utc)
+
+                # Newest first; a resumed download continues below the oldest message already stored
+                iter_kwargs = {"reverse": False}
+                if job["resume_from_id"]:
+                    iter_kwargs["offset_id"] = job["resume_from_id"]
+                    logger.info(f"Resuming download {download_id} below message {job['resume_from_id']} ({message_count} stored)")
+                else:
+                    iter_kwargs["offset_date"] = end_date
+
+                batch = []
+                async for message in client.iter_messages(entity, **iter_kwargs):
+                    # Stop if before start date
+                    if message.date < start_date:
+                        break
+
+                    # Skip service messages
+                    if not message.text and not message.media:
+                        continue
+
+                    # Get sender info
+                    sender_name = "Unknown"
+                    if message.sender and isinstance(message.sender, TelegramUser):
                         sender_name = message.sender.first_name or "Unknown"
                         if message.sender.last_name:
                             sender_name += f" {message.sender.last_name}"
 
-                # Check for media
-                has_media = message.media is not None
-                media_type = None
-
-                if has_media:
-                    media_count += 1
-                    media_type = type(message.media).__name__
-
-                # Create message record
-                telegram_message = TelegramMessage(
-                    download_id=download.id,
-                    message_id=message.id,
-                    sender_id=sender_id,
-                    sender_name=sender_name,
-                    date=message.date,
-                    text=message.text or "",
-                    reply_to_message_id=message.reply_to_msg_id,
-                    has_media=has_media,
-                    media_type=media_type
-                )
-                db.add(telegram_message)
-                message_count += 1
-
-                # Commit in batches and update progress
-                if message_count % 100 == 0:
-                    # Update progress in download record
-                    download.message_count = message_count
-                    download.media_count = media_count
-                    db.commit()
-                    logger.info(f"Downloaded {message_count} messages from chat {chat_id}")
-
-            # Final commit
-            db.commit()
+                    # Check for media
+                    has_media = message.media is not None
+                    if has_media:
+                        media_count += 1
 
-            # Update download record
-            download.message_count = message_count
-            download.media_count = media_count
-            download.status = "completed"
-            download.completed_at = datetime.utcnow()
-            db.commit()
+                    batch.append({
+                        "download_id": download_id,
+                        "message_id": message.id,
+                        "sender_id": message.sender_id or 0,
+                        "sender_name": sender_name,
+                        "date": message.date,
+                        "text": message.text or "",
+                        "reply_to_message_id": message.reply_to_msg_id,
+                        "has_media": has_media,
+                        "media_type": type(message.media).__name__ if has_media else None
+                    })
+                    message_count += 1
 
+                    if len(batch) >= batch_size:
+                        # Batches are written in order, one at a time, so the resume point stays consistent
+                        if pending_write is not None:
+                            await pending_write
+                        pending_write = asyncio.ensure_future(asyncio.to_thread(
+                            TelegramService._store_message_batch, download_id, batch, message_count, media_count
+                        ))
+                        batch = []
+                        logger.info(f"Downloaded {message_count} messages from chat {chat_id}")
+
+                if pending_write is not None:
+                    await pending_write
+                    pending_write = None
+                if batch:
+                    await asyncio.to_thread(
+                        TelegramService._store_message_batch, download_id, batch, message_count, media_count
+                    )
+
+            await asyncio.to_thread(
+                TelegramService._update_download, download_id,
+                status="completed", completed_at=datetime.utcnow()
+            )
             logger.info(f"Completed download: {message_count} messages, {media_count} media from chat {chat_id}")
 
-            return download.id
+            return download_id
 
         except Exception as e:
-            download.status = "failed"
-            download.error_message = str(e)
-            db.commit()
+            if pending_write is not None:
+                # Let an in-flight batch land so the resume point includes it
+                try:
+                    await pending_write
+                except Exception:
+                    pass
+            # Non-terminal while the job queue will retry, so clients keep polling
+            await asyncio.to_thread(
+                TelegramService._update_download, download_id,
+                status="failed" if job_queue.final_attempt() else "retrying", error_message=str(e)
+            )
             logger.error(f"Error downloading chat {chat_id}: {e}")
             raise
 
-        finally:
-            await client.disconnect()
-
     @staticmethod
     async def disconnect_session(db: Session, user_id: int):
         """
@@ -588,6 +604,7 @@ class TelegramService:
         if telegram_session:
             telegram_session.is_active = False
             db.commit()
+            await telegram_clients.discard(telegram_session.encrypted_session)
             logger.info(f"Disconnected Telegram session for user {user_id}")
 
     @staticmethod
@@ -613,148 +630,145 @@ class TelegramService:
             - messages: List of dicts with id, date, sender_name, text_preview, is_outgoing
             - has_more: True if there are older messages available
         """
-        client = await TelegramService.get_client_from_session(encrypted_session)
-
-        try:
-            logger.info(f"Fetching {limit} message previews from chat {chat_id}, offset_id={offset_id}")
-
-            # Try to get entity directly first (may be cached from recent get_dialogs call)
-            entity = None
+        async with telegram_clients.client(encrypted_session) as client:
             try:
-                entity = await client.get_input_entity(chat_id)
-                logger.info(f"✓ Entity {chat_id} found in cache")
-            except ValueError as e:
-                # Not in cache, populate with more dialogs and retry
-                logger.info(f"✗ Entity {chat_id} not in cache, populating with get_dialogs()")
+                logger.info(f"Fetching {limit} message previews from chat {chat_id}, offset_id={offset_id}")
+
+                # Try to get entity directly first (may be cached from recent get_dialogs call)
+                entity = None
                 try:
-                    # Fetch more dialogs to increase chance of caching the specific chat
-                    await client.get_dialogs(limit=100)
                     entity = await client.get_input_entity(chat_id)
-                    logger.info(f"✓ Entity {chat_id} resolved after cache population")
-                except PeerIdInvalidError:
-                    logger.error(f"Invalid peer ID: {chat_id}")
-                    raise ValueError(f"Invalid chat ID: {chat_id}")
-                except ChannelPrivateError:
-                    logger.error(f"Chat {chat_id} is private or inaccessible")
-                    raise ValueError("This chat is private or you don't have access to it")
-                except ChannelInvalidError:
-                    logger.error(f"Chat {chat_id} no longer exists")
-                    raise ValueError("This chat no longer exists or was deleted")
-                except FloodWaitError as e:
-                    logger.warning(f"FloodWaitError when populating cache: {e.seconds}s")
-                    raise ValueError(f"Telegram rate limit. Please wait {e.seconds} seconds and try again.")
+                    logger.info(f"✓ Entity {chat_id} found in cache")
                 except ValueError as e:
-                    if "Could not find" in str(e):
-                        logger.error(f"Entity not found even after cache population for chat {chat_id}")
-                        raise ValueError("Chat not found. Please refresh your contact list and try again.")
-                    raise ValueError(f"Could not access chat: {str(e)}")
-
-            # FIX v3: Ensure all variables are initialized before use
-            messages = []
-            message_count = 0
-            has_more = False  # CRITICAL: Must initialize to prevent NoneType comparison error
-
-            # Defensive: Ensure limit is valid
-            if limit is None or limit <= 0:
-                logger.warning(f"Invalid limit value: {limit}, defaulting to 50")
-                limit = 50
-
-            logger.info(f"🔧 FIX v4 ACTIVE: Starting message fetch with limit={limit}, offset_id={offset_id}, has_more={has_more}")
-
-            # Fetch messages in reverse chronological order (newest first)
-            # Use limit+1 to check if there are more messages
-            # Use the resolved entity instead of raw chat_id
-            # CRITICAL: Only pass offset_id if not None (Telethon bug with None comparison)
-            try:
-                # Build kwargs dynamically to avoid NoneType comparison error in Telethon
-                iter_kwargs = {
-                    "entity": entity,
-                    "limit": limit + 1
-                }
-                if offset_id is not None:
-                    iter_kwargs["offset_id"] = offset_id
-                    logger.info(f"📄 Pagination: offset_id={offset_id}")
-
-                async for message in client.iter_messages(**iter_kwargs):
-                    message_count += 1
-
-                    # If we got one more than limit, there are more messages
-                    if message_count > limit:
-                        has_more = True
-                        logger.info(f"📊 Got {message_count} messages (limit was {limit}), has_more={has_more}")
-                        break
-
-                    # Get sender name
-                    if message.out:
-                        # Message sent by the user
-                        sender_name = "You"
-                    elif message.sender:
-                        # Try to get sender's name
-                        if hasattr(message.sender, 'first_name'):
-                            sender_name = message.sender.first_name or "Unknown"
-                            if hasattr(message.sender, 'last_name') and message.sender.last_name:
-                                sender_name += f" {message.sender.last_name}"
-                        elif hasattr(message.sender, 'title'):
-                            sender_name = message.sender.title or "Unknown"
+                    # Not in cache, populate with more dialogs and retry
+                    logger.info(f"✗ Entity {chat_id} not in cache, populating with get_dialogs()")
+                    try:
+                        # Fetch more dialogs to increase chance of caching the specific chat
+                        await client.get_dialogs(limit=100)
+                        entity = await client.get_input_entity(chat_id)
+                        logger.info(f"✓ Entity {chat_id} resolved after cache population")
+                    except PeerIdInvalidError:
+                        logger.error(f"Invalid peer ID: {chat_id}")
+                        raise ValueError(f"Invalid chat ID: {chat_id}")
+                    except ChannelPrivateError:
+                        logger.error(f"Chat {chat_id} is private or inaccessible")
+                        raise ValueError("This chat is private or you don't have access to it")
+                    except ChannelInvalidError:
+                        logger.error(f"Chat {chat_id} no longer exists")
+                        raise ValueError("This chat no longer exists or was deleted")
+                    except FloodWaitError as e:
+                        logger.warning(f"FloodWaitError when populating cache: {e.seconds}s")
+                        raise ValueError(f"Telegram rate limit. Please wait {e.seconds} seconds and try again.")
+                    except ValueError as e:
+                        if "Could not find" in str(e):
+                            logger.error(f"Entity not found even after cache population for chat {chat_id}")
+                            raise ValueError("Chat not found. Please refresh your contact list and try again.")
+                        raise ValueError(f"Could not access chat: {str(e)}")
+
+                # FIX v3: Ensure all variables are initialized before use
+                messages = []
+                message_count = 0
+                has_more = False  # CRITICAL: Must initialize to prevent NoneType comparison error
+
+                # Defensive: Ensure limit is valid
+                if limit is None or limit <= 0:
+                    logger.warning(f"Invalid limit value: {limit}, defaulting to 50")
+                    limit = 50
+
+                logger.info(f"🔧 FIX v4 ACTIVE: Starting message fetch with limit={limit}, offset_id={offset_id}, has_more={has_more}")
+
+                # Fetch messages in reverse chronological order (newest first)
+                # Use limit+1 to check if there are more messages
+                # Use the resolved entity instead of raw chat_id
+                # CRITICAL: Only pass offset_id if not None (Telethon bug with None comparison)
+                try:
+                    # Build kwargs dynamically to avoid NoneType comparison error in Telethon
+                    iter_kwargs = {
+                        "entity": entity,
+                        "limit": limit + 1
+                    }
+                    if offset_id is not None:
+                        iter_kwargs["offset_id"] = offset_id
+                        logger.info(f"📄 Pagination: offset_id={offset_id}")
+
+                    async for message in client.iter_messages(**iter_kwargs):
+                        message_count += 1
+
+                        # If we got one more than limit, there are more messages
+                        if message_count > limit:
+                            has_more = True
+                            logger.info(f"📊 Got {message_count} messages (limit was {limit}), has_more={has_more}")
+                            break
+
+                        # Get sender name
+                        if message.out:
+                            # Message sent by the user
+                            sender_name = "You"
+                        elif message.sender:
+                            # Try to get sender's name
+                            if hasattr(message.sender, 'first_name'):
+                                sender_name = message.sender.first_name or "Unknown"
+                                if hasattr(message.sender, 'last_name') and message.sender.last_name:
+                                    sender_name += f" {message.sender.last_name}"
+                            elif hasattr(message.sender, 'title'):
+                                sender_name = message.sender.title or "Unknown"
+                            else:
+                                sender_name = "Unknown"
                         else:
                             sender_name = "Unknown"
-                    else:
-                        sender_name = "Unknown"
-
-                    # Get text preview (first 100 chars)
-                    text_preview = ""
-                    if message.text:
-                        text_preview = message.text[:100]
-                    elif message.media:
-                        # For media messages, show media type
-                        if hasattr(message.media, '__class__'):
-                            media_type = message.media.__class__.__name__.replace('MessageMedia', '')
-                            text_preview = f"[{media_type}]"
+
+                        # Get text preview (first 100 chars)
+                        text_preview = ""
+                        if message.text:
+                            text_preview = message.text[:100]
+                        elif message.media:
+                            # For media messages, show media type
+                            if hasattr(message.media, '__class__'):
+                                media_type = message.media.__class__.__name__.replace('MessageMedia', '')
+                                text_preview = f"[{media_type}]"
+                            else:
+                                text_preview = "[Media]"
                         else:
-                            text_preview = "[Media]"
+                            text_preview = "[No content]"
+
+                        messages.append({
+                            "id": message.id,
+                            "date": message.date.isoformat(),
+                            "sender_name": sender_name,
+                            "text_preview": text_preview,
+                            "is_outgoing": message.out
+                        })
+
                     else:
-                        text_preview = "[No content]"
+                        # Loop completed without break - no more messages
+                        has_more = False
+
+                except ChatAdminRequiredError:
+                    logger.error(f"Admin permissions required for chat {chat_id}")
+                    raise ValueError("You don't have permission to read messages from this chat")
+                except ChatWriteForbiddenError:
+                    logger.error(f"Write permissions forbidden for chat {chat_id}")
+                    raise ValueError("You don't have permission to access this chat")
+                except UserNotParticipantError:
+                    logger.error(f"User is not a participant in chat {chat_id}")
+                    raise ValueError("You are not a member of this chat")
+                except FloodWaitError as e:
+                    logger.warning(f"FloodWaitError when fetching messages: {e.seconds}s")
+                    raise ValueError(f"Telegram rate limit. Please wait {e.seconds} seconds and try again.")
 
-                    messages.append({
-                        "id": message.id,
-                        "date": message.date.isoformat(),
-                        "sender_name": sender_name,
-                        "text_preview": text_preview,
-                        "is_outgoing": message.out
-                    })
+                logger.info(f"✓ Fetched {len(messages)} message previews, has_more={has_more}")
+                return messages, has_more
 
-                else:
-                    # Loop completed without break - no more messages
-                    has_more = False
-
-            except ChatAdminRequiredError:
-                logger.error(f"Admin permissions required for chat {chat_id}")
-                raise ValueError("You don't have permission to read messages from this chat")
-            except ChatWriteForbiddenError:
-                logger.error(f"Write permissions forbidden for chat {chat_id}")
-                raise ValueError("You don't have permission to access this chat")
-            except UserNotParticipantError:
-                logger.error(f"User is not a participant in chat {chat_id}")
-                raise ValueError("You are not a member of this chat")
-            except FloodWaitError as e:
-                logger.warning(f"FloodWaitError when fetching messages: {e.seconds}s")
-                raise ValueError(f"Telegram rate limit. Please wait {e.seconds} seconds and try again.")
-
-            logger.info(f"✓ Fetched {len(messages)} message previews, has_more={has_more}")
-            return messages, has_more
-
-        except ValueError:
-            # Re-raise ValueError with user-friendly messages
-            raise
-        except RPCError as e:
-            # Catch any other Telegram RPC errors
-            logger.error(f"Telegram RPC error for chat {chat_id}: {e}", exc_info=True)
-            raise ValueError(f"Telegram API error: {str(e)}")
-        except Exception as e:
-            logger.error(f"Unexpected error fetching message preview from chat {chat_id}: {e}", exc_info=True)
-            raise
-        finally:
-            await client.disconnect()
+            except ValueError:
+                # Re-raise ValueError with user-friendly messages
+                raise
+            except RPCError as e:
+                # Catch any other Telegram RPC errors
+                logger.error(f"Telegram RPC error for chat {chat_id}: {e}", exc_info=True)
+                raise ValueError(f"Telegram API error: {str(e)}")
+            except Exception as e:
+                logger.error(f"Unexpected error fetching message preview from chat {chat_id}: {e}", exc_info=True)
+                raise
 
     @staticmethod
     async def initiate_qr_login() -> Tuple[str, str, TelegramClient]:
@@ -914,6 +928,7 @@ class TelegramService:
 
             if existing_session:
                 existing_session.encrypted_session = encrypted_session
+                existing_session.entity_cache = None  # Access hashes belong to the previous login
                 existing_session.phone_number = phone_number
                 existing_session.is_active = True
                 existing_session.updated_at = datetime.utcnow()
@@ -972,6 +987,7 @@ class TelegramService:
 
             if existing_session:
                 existing_session.encrypted_session = encrypted_session
+                existing_session.entity_cache = None  # Access hashes belong to the previous login
                 existing_session.phone_number = phone_number
                 existing_session.is_active = True
                 existing_session.updated_at = datetime.utcnow()
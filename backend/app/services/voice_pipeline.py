@@ -0,0 +1,257 @@
+"""
+Voice Turn Pipeline
+Runs the independent parts of a voice turn concurrently instead of one after
+another:
+
+    upload  ───────────────────────────────►  (S3 pool)
+    transcribe ───────►                        (LLM pool)
+    context ──────►                            (event loop: history + summary)
+                      llm ──────────►          (needs transcript + context)
+                                     persist   (endpoint: turns, costs)
+
+The audio upload only needs the raw bytes, so it overlaps transcription and
+the Claude call; conversation context is built while Whisper runs. A failed
+upload no longer fails the turn (the turn is saved without audio_url), and a
+turn that fails after the upload succeeded removes the orphaned recording -
+endpoints call discard_audio() if saving the turn fails.
+
+The Whisper cost is recorded as soon as the transcription comes back, so it
+is kept even when the Claude call or the save fails.
+
+Every turn records per-stage timings (VoiceTurnTimings). They are logged as
+one JSON line and kept in memory for GET /admin/voice-timings.
+"""
+import asyncio
+import io
+import json
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from app.services import blocking
+
+# Recent voice turns kept for the admin timings endpoint (per worker)
+MAX_RECORDED_TURNS = 500
+
+_recent: Deque[Dict] = deque(maxlen=MAX_RECORDED_TURNS)
+_recent_lock = threading.Lock()
+
+# Fire-and-forget work still running - Whisper cost writes, orphaned recording
+# deletes (the loop only holds tasks weakly)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(coro: Awaitable) -> asyncio.Task:
+    """Run a coroutine in the background, keeping it referenced until it completes."""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+class VoiceTurnTimings:
+    """Wall-clock milliseconds per pipeline stage for one voice turn."""
+
+    def __init__(self, endpoint: str, **labels):
+        self.endpoint = endpoint
+        self.labels = labels
+        self.stages: Dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._open: Dict[str, float] = {}
+        self._finished = False
+
+    def _record(self, name: str, started: float) -> None:
+        self.stages[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, started)
+
+    def begin(self, name: str) -> None:
+        """Start a stage that finish() closes (for code that isn't one block)."""
+        self._open[name] = time.perf_counter()
+
+    async def timed(self, name: str, awaitable: Awaitable) -> Any:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._record(name, started)
+
+    def finish(self, **extra) -> Dict:
+        """Close any open stage, record the turn (once) and return its timings."""
+        if not self._finished:
+            for name, started in self._open.items():
+                self._record(name, started)
+            self._open.clear()
+        entry = {
+            "endpoint": self.endpoint,
+            **self.labels,
+            **extra,
+            "stages_ms": dict(self.stages),
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 1)
+        }
+        if not self._finished:
+            self._finished = True
+            with _recent_lock:
+                _recent.append(entry)
+            print(f"[VoiceTurn] {json.dumps(entry)}")
+        return entry
+
+
+@dataclass
+class VoiceTurn:
+    transcription: Dict  # transcribe_audio result: text, duration, language
+    result: Dict  # The responder's result (mediator/coach output)
+    audio_url: Optional[str]
+    timings: VoiceTurnTimings
+
+    @property
+    def text(self) -> str:
+        return self.transcription["text"]
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    # Abandoned tasks must not log "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+async def _upload(audio_bytes: bytes, room_id: int, user_id: int, filename: str) -> Optional[str]:
+    from app.services.s3_service import upload_audio_to_s3
+    try:
+        return await blocking.run(blocking.S3, upload_audio_to_s3, audio_bytes, room_id, user_id, filename)
+    except Exception as e:
+        # The transcript is what the conversation needs; keep the turn without playback
+        print(f"[VoiceTurn] Audio upload failed, saving turn without audio: {e}")
+        return None
+
+
+def _track_whisper_cost(room_id: int, user_id: int, audio_seconds: float) -> None:
+    from app.db import SessionLocal
+    from app.services.cost_tracker import calculate_whisper_cost, track_api_cost
+    db = SessionLocal()
+    try:
+        track_api_cost(
+            db=db,
+            user_id=user_id,
+            service_type="openai_whisper",
+            cost_usd=calculate_whisper_cost(audio_seconds),
+            room_id=room_id,
+            audio_seconds=audio_seconds,
+            model="whisper-1"
+        )
+    except Exception as e:
+        print(f"[VoiceTurn] Could not record Whisper cost: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+async def _transcribe(audio_bytes: bytes, filename: str, room_id: int, user_id: int) -> Dict:
+    from app.services.whisper_service import transcribe_audio
+    transcription = await blocking.run(blocking.LLM, transcribe_audio, io.BytesIO(audio_bytes), filename)
+    # Whisper has been paid for - record it now (off the critical path) whatever happens to the turn
+    audio_seconds = transcription.get("duration", len(audio_bytes) / 16000)  # Estimate if not available
+    # (on the LLM pool: it's bookkeeping for the Whisper call that just used it)
+    _spawn(blocking.run(blocking.LLM, _track_whisper_cost, room_id, user_id, audio_seconds))
+    return transcription
+
+
+async def discard_audio(audio_url: Optional[str]) -> None:
+    """Delete an uploaded recording that no saved turn references."""
+    from app.services.s3_service import delete_objects_from_s3
+    if not audio_url:
+        return
+    try:
+        await blocking.run(blocking.S3, delete_objects_from_s3, [audio_url])
+    except Exception as e:
+        print(f"[VoiceTurn] Could not delete orphaned recording {audio_url}: {e}")
+
+
+async def _discard_upload(upload: asyncio.Future) -> None:
+    """Delete a recording whose turn failed after (or while) it was uploaded."""
+    try:
+        audio_url = await upload
+    except BaseException:
+        return
+    await discard_audio(audio_url)
+
+
+async def run_voice_turn(
+    audio_bytes: bytes,
+    filename: str,
+    room_id: int,
+    user_id: int,
+    build_context: Callable[[], Awaitable[Any]],
+    respond: Callable[[str, Any], Awaitable[Dict]],
+    timings: VoiceTurnTimings
+) -> VoiceTurn:
+    """
+    Upload, transcribe and respond to one voice recording.
+
+    build_context() runs on the event loop while Whisper transcribes; its result
+    is passed to respond(transcript, context), which makes the Claude call.
+    The Whisper cost is already recorded. On return the "persist" stage is open:
+    the caller saves the turn (calling discard_audio(audio_url) if that fails)
+    and then calls timings.finish(), which closes it.
+    """
+    upload = asyncio.ensure_future(timings.timed("upload", _upload(audio_bytes, room_id, user_id, filename)))
+    transcription = asyncio.ensure_future(timings.timed(
+        "transcribe", _transcribe(audio_bytes, filename, room_id, user_id)
+    ))
+
+    try:
+        context = await timings.timed("context", build_context())
+        transcribed = await transcription
+        result = await timings.timed("llm", respond(transcribed["text"], context))
+        # Usually already finished; this is only the part of the upload not hidden behind the LLM
+        audio_url = await timings.timed("upload_wait", upload)
+    except BaseException:
+        transcription.add_done_callback(_consume_exception)
+        _spawn(_discard_upload(upload))
+        timings.finish(status="failed")
+        raise
+
+    timings.begin("persist")
+    return VoiceTurn(transcription=transcribed, result=result, audio_url=audio_url, timings=timings)
+
+
+def stats() -> Dict:
+    """p50/p95 per stage over the recent voice turns, per endpoint."""
+    with _recent_lock:
+        entries = list(_recent)
+
+    by_endpoint: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        by_endpoint.setdefault(entry["endpoint"], []).append(entry)
+
+    def percentiles(values: List[float]) -> Dict:
+        values = sorted(values)
+        return {
+            "p50": round(statistics.median(values), 1),
+            "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+            "max": values[-1]
+        }
+
+    report = {}
+    for endpoint, turns in by_endpoint.items():
+        stage_names = sorted({name for turn in turns for name in turn["stages_ms"]})
+        report[endpoint] = {
+            "turns": len(turns),
+            "failed": sum(1 for turn in turns if turn.get("status") == "failed"),
+            "total_ms": percentiles([turn["total_ms"] for turn in turns]),
+            "stages_ms": {
+                name: percentiles([turn["stages_ms"][name] for turn in turns if name in turn["stages_ms"]])
+                for name in stage_names
+            }
+        }
+    return {"recorded_turns": len(entries), "endpoints": report}
@@ -0,0 +1,38 @@
+"""
+Background job worker: python -m app.worker
+
+Runs JOB_WORKER_CONCURRENCY job loops (see app/services/job_queue.py) until
+interrupted. Importing app.main registers every job handler and the same
+startup services (Telegram client pool, LLM gateway, room events) the API uses.
+Room events reach participants connected to the API only when REDIS_URL is set.
+"""
+import asyncio
+import signal
+
+from app.config import settings
+from app.main import app  # noqa: F401 - registers job handlers
+from app.services import job_queue, llm_gateway, room_events, telegram_clients
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await room_events.start()
+    await telegram_clients.start()
+    await job_queue.start(settings.JOB_WORKER_CONCURRENCY)
+    print(f"[Jobs] Worker running with {settings.JOB_WORKER_CONCURRENCY} loop(s)")
+
+    await stop.wait()
+
+    print("[Jobs] Worker shutting down")
+    await job_queue.stop()
+    await telegram_clients.stop()
+    await room_events.stop()
+    await llm_gateway.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
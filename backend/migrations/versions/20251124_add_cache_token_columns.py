@@ -0,0 +1,27 @@
+"""add prompt cache token columns to api_costs
+
+Revision ID: add_cache_tokens
+Revises: 3ed667894635
+Create Date: 2025-11-24
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_cache_tokens'
+down_revision = '3ed667894635'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Anthropic prompt caching bills cache reads/writes separately from input tokens
+    op.add_column('api_costs', sa.Column('cache_read_tokens', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('api_costs', sa.Column('cache_write_tokens', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('api_costs', 'cache_write_tokens')
+    op.drop_column('api_costs', 'cache_read_tokens')
@@ -0,0 +1,25 @@
+"""add context_summaries to rooms
+
+Revision ID: add_context_summaries
+Revises: add_cache_tokens
+Create Date: 2025-11-25
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_context_summaries'
+down_revision = 'add_cache_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rolling summaries of older turns, keyed by conversation ("main", "coaching:<user_id>")
+    op.add_column('rooms', sa.Column('context_summaries', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('rooms', 'context_summaries')
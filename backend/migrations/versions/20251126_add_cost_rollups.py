@@ -0,0 +1,55 @@
+"""add cost_rollups table
+
+Revision ID: add_cost_rollups
+Revises: add_context_summaries
+Create Date: 2025-11-26
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_cost_rollups'
+down_revision = 'add_context_summaries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Hourly/daily pre-aggregated costs for the admin dashboards
+    op.create_table('cost_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('granularity', sa.String(length=10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('service_type', sa.String(length=50), nullable=True),
+        sa.Column('context', sa.String(length=50), nullable=True),
+        sa.Column('model', sa.String(length=100), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('room_id', sa.Integer(), nullable=True),
+        sa.Column('call_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('input_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('output_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cache_read_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cache_write_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('audio_seconds', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('cost_usd', sa.Numeric(14, 6), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_cost_rollups_id', 'cost_rollups', ['id'], unique=False)
+    op.create_index('ix_cost_rollups_user_id', 'cost_rollups', ['user_id'], unique=False)
+    op.create_index('ix_cost_rollups_room_id', 'cost_rollups', ['room_id'], unique=False)
+    op.create_index('ix_cost_rollups_bucket', 'cost_rollups', ['source', 'granularity', 'bucket_start'], unique=False)
+
+    # The incremental refresh scans turns by created_at
+    op.create_index('ix_turns_created_at', 'turns', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_turns_created_at', table_name='turns')
+    op.drop_index('ix_cost_rollups_bucket', table_name='cost_rollups')
+    op.drop_index('ix_cost_rollups_room_id', table_name='cost_rollups')
+    op.drop_index('ix_cost_rollups_user_id', table_name='cost_rollups')
+    op.drop_index('ix_cost_rollups_id', table_name='cost_rollups')
+    op.drop_table('cost_rollups')
@@ -0,0 +1,38 @@
+"""add daily_metrics table
+
+Revision ID: add_daily_metrics
+Revises: add_cost_rollups
+Create Date: 2025-11-27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_daily_metrics'
+down_revision = 'add_cost_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Precomputed daily buckets for /admin/analytics
+    op.create_table('daily_metrics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('dimension', sa.String(length=100), nullable=False, server_default=''),
+        sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('date', 'metric', 'dimension', name='uq_daily_metrics_date_metric_dimension')
+    )
+    op.create_index('ix_daily_metrics_id', 'daily_metrics', ['id'], unique=False)
+    op.create_index('ix_daily_metrics_date', 'daily_metrics', ['date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_daily_metrics_date', table_name='daily_metrics')
+    op.drop_index('ix_daily_metrics_id', table_name='daily_metrics')
+    op.drop_table('daily_metrics')
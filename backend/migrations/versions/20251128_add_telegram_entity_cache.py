@@ -0,0 +1,25 @@
+"""add entity_cache to telegram_sessions
+
+Revision ID: add_telegram_entity_cache
+Revises: add_daily_metrics
+Create Date: 2025-11-28
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_telegram_entity_cache'
+down_revision = 'add_daily_metrics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Peer ids + access hashes restored into pooled Telegram clients on reconnect
+    op.add_column('telegram_sessions', sa.Column('entity_cache', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('telegram_sessions', 'entity_cache')
@@ -0,0 +1,52 @@
+"""add jobs table
+
+Revision ID: add_jobs
+Revises: add_telegram_entity_cache
+Create Date: 2025-11-29
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_jobs'
+down_revision = 'add_telegram_entity_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Durable background job queue (downloads, Telegram imports, reports)
+    op.create_table('jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('priority', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('run_after', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=255), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    op.create_index('ix_jobs_id', 'jobs', ['id'], unique=False)
+    op.create_index('ix_jobs_user_id', 'jobs', ['user_id'], unique=False)
+    op.create_index('ix_jobs_status_priority_run_after', 'jobs', ['status', 'priority', 'run_after'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_status_priority_run_after', table_name='jobs')
+    op.drop_index('ix_jobs_user_id', table_name='jobs')
+    op.drop_index('ix_jobs_id', table_name='jobs')
+    op.drop_table('jobs')
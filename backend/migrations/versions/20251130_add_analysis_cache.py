@@ -0,0 +1,40 @@
+"""add analysis_cache table
+
+Revision ID: add_analysis_cache
+Revises: add_jobs
+Create Date: 2025-11-30
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_analysis_cache'
+down_revision = 'add_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Content-addressed cache of Gemini analysis results
+    op.create_table('analysis_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cache_key')
+    )
+    op.create_index('ix_analysis_cache_id', 'analysis_cache', ['id'], unique=False)
+    op.create_index('ix_analysis_cache_expires_at', 'analysis_cache', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_analysis_cache_expires_at', table_name='analysis_cache')
+    op.drop_index('ix_analysis_cache_id', table_name='analysis_cache')
+    op.drop_table('analysis_cache')
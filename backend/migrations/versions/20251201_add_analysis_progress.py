@@ -0,0 +1,29 @@
+"""add analysis progress columns to telegram_downloads
+
+Revision ID: add_analysis_progress
+Revises: add_analysis_cache
+Create Date: 2025-12-01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_analysis_progress'
+down_revision = 'add_analysis_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Progress of (chunked) Gemini analysis of a downloaded history
+    op.add_column('telegram_downloads', sa.Column('analysis_status', sa.String(length=50), nullable=True))
+    op.add_column('telegram_downloads', sa.Column('analysis_chunks_total', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('telegram_downloads', sa.Column('analysis_chunks_done', sa.Integer(), server_default='0', nullable=True))
+
+
+def downgrade():
+    op.drop_column('telegram_downloads', 'analysis_chunks_done')
+    op.drop_column('telegram_downloads', 'analysis_chunks_total')
+    op.drop_column('telegram_downloads', 'analysis_status')
@@ -0,0 +1,50 @@
+"""add scheduler_locks and scheduler_job_runs tables
+
+Revision ID: add_scheduler_runs
+Revises: add_analysis_progress
+Create Date: 2025-12-02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_scheduler_runs'
+down_revision = 'add_analysis_progress'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One lease row per scheduled job - only the instance holding it runs the job
+    op.create_table('scheduler_locks',
+        sa.Column('job_id', sa.String(length=100), nullable=False),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_started_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+
+    # Run history: start/end, rows affected, duration
+    op.create_table('scheduler_job_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.String(length=100), nullable=False),
+        sa.Column('instance', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rows_affected', sa.Integer(), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_scheduler_job_runs_id', 'scheduler_job_runs', ['id'], unique=False)
+    op.create_index('ix_scheduler_job_runs_job_id_started_at', 'scheduler_job_runs', ['job_id', 'started_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_scheduler_job_runs_job_id_started_at', table_name='scheduler_job_runs')
+    op.drop_index('ix_scheduler_job_runs_id', table_name='scheduler_job_runs')
+    op.drop_table('scheduler_job_runs')
+    op.drop_table('scheduler_locks')
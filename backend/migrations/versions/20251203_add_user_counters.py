@@ -0,0 +1,32 @@
+"""add user_counters table
+
+Revision ID: add_user_counters
+Revises: add_scheduler_runs
+Create Date: 2025-12-03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_counters'
+down_revision = 'add_scheduler_runs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-user totals for count achievements (seeded lazily from history)
+    op.create_table('user_counters',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('counter', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'counter')
+    )
+
+
+def downgrade():
+    op.drop_table('user_counters')
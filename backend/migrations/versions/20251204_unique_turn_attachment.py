@@ -0,0 +1,48 @@
+"""unique attachment per room on turns
+
+Revision ID: unique_turn_attachment
+Revises: add_user_counters
+Create Date: 2025-12-04
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'unique_turn_attachment'
+down_revision = 'add_user_counters'
+branch_labels = None
+depends_on = None
+
+
+# Turns posting a file that an earlier turn (lower id) in the same room already posted
+_DUPLICATE_TURNS = """
+    SELECT t.id FROM turns t
+    WHERE t.attachment_url IS NOT NULL
+      AND EXISTS (
+          SELECT 1 FROM turns k
+          WHERE k.room_id = t.room_id AND k.attachment_url = t.attachment_url AND k.id < t.id
+      )
+"""
+
+
+def upgrade():
+    # Older upload keys (timestamp to the second + content hash) could repeat when the same file
+    # was re-uploaded within a second. Keep the first turn per file: move the duplicates' cost
+    # records onto it (they'd cascade away otherwise), then delete the duplicates
+    op.execute(f"""
+        UPDATE api_costs SET turn_id = (
+            SELECT MIN(k.id) FROM turns k JOIN turns d
+              ON k.room_id = d.room_id AND k.attachment_url = d.attachment_url
+            WHERE d.id = api_costs.turn_id
+        )
+        WHERE turn_id IN ({_DUPLICATE_TURNS})
+    """)
+    op.execute(f"DELETE FROM turns WHERE id IN ({_DUPLICATE_TURNS})")
+
+    # One turn per uploaded file (NULL attachment_url rows never conflict)
+    op.create_index('uq_turns_room_attachment_url', 'turns', ['room_id', 'attachment_url'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_turns_room_attachment_url', table_name='turns')
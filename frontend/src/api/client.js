@@ -78,3 +78,48 @@ export async function apiRequest(path, method = "GET", body, token) {
     throw error;
   }
 }
+
+// Endpoints that queue background work respond with { job_id, status_url }.
+// Poll the job until it finishes and return its result (the endpoint's usual response).
+// Responses without a job_id (e.g. a report that already exists) are returned as-is.
+export async function waitForJob(response, token, { intervalMs = 1500, timeoutMs = 600000 } = {}) {
+  if (!response || !response.job_id) return response;
+
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    const job = await apiRequest(`/jobs/${response.job_id}`, "GET", null, token);
+    if (job.status === "succeeded") return job.result;
+    if (job.status === "failed") throw new Error(job.error || "Background job failed");
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+  throw new Error("This is taking longer than expected. Please check back in a moment.");
+}
+
+// Upload a file straight to S3: ask `${basePath}/upload-url` for a presigned form,
+// POST the file to the bucket, then confirm with `${basePath}/complete`.
+// Returns the complete endpoint's response. Paywall errors (402/413) surface from
+// the first call like any other apiRequest; S3 rejects files over the plan's size limit.
+export async function uploadDirect(basePath, file, token) {
+  const contentType = file.type || "application/octet-stream";
+  const target = await apiRequest(
+    `${basePath}/upload-url`,
+    "POST",
+    { filename: file.name, content_type: contentType, size: file.size },
+    token
+  );
+
+  const form = new FormData();
+  Object.entries(target.fields).forEach(([name, value]) => form.append(name, value));
+  form.append("file", file); // S3 requires the file to be the last field
+
+  const res = await fetch(target.url, { method: "POST", body: form });
+  if (!res.ok) {
+    const xml = await res.text().catch(() => "");
+    if (xml.includes("EntityTooLarge")) {
+      throw new Error(`File is too large. Maximum size is ${Math.round(target.max_bytes / (1024 * 1024))}MB`);
+    }
+    throw new Error(`Upload failed (${res.status})`);
+  }
+
+  return apiRequest(`${basePath}/complete`, "POST", { key: target.key, filename: file.name }, token);
+}
@@ -40,6 +40,7 @@ export default function TelegramDownloadHistory({ onClose }) {
       case "completed":
         return "#10b981"; // green
       case "processing":
+      case "retrying":
         return "#f59e0b"; // amber
       case "failed":
         return "#ef4444"; // red
@@ -54,6 +55,8 @@ export default function TelegramDownloadHistory({ onClose }) {
         return "Completed";
       case "processing":
         return "Processing...";
+      case "retrying":
+        return "Retrying...";
       case "failed":
         return "Failed";
       case "pending":
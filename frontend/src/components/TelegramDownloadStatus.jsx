@@ -125,6 +125,13 @@ export default function TelegramDownloadStatus({ downloadId, onClose }) {
           title: "Processing...",
           showProgress: true
         };
+      case "retrying":
+        return {
+          color: "#f59e0b",
+          icon: "🔁",
+          title: "Retrying...",
+          showProgress: true
+        };
       case "completed":
         return {
           color: "#10b981",
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { useParams, useNavigate, useSearchParams } from "react-router-dom";
 import { useAuth } from "../context/AuthContext";
-import { apiRequest } from "../api/client";
+import { apiRequest, waitForJob } from "../api/client";
 import { Logo } from "../components/ui";
 import CategoryIcon from "../components/ui/CategoryIcon";
 import { loadStripe } from "@stripe/stripe-js";
@@ -85,7 +85,7 @@ export default function ChatSummary() {
   const handleGenerateReport = async () => {
     setReportLoading(true);
     try {
-      const result = await apiRequest(`/rooms/${roomId}/generate-comprehensive-report`, "POST", null, token);
+      const result = await waitForJob(await apiRequest(`/rooms/${roomId}/generate-comprehensive-report`, "POST", null, token), token);
       setComprehensiveReport(result.report);
     } catch (error) {
       console.error("Generate report error:", error);
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useAuth } from "../context/AuthContext";
-import { apiRequest, API_URL } from "../api/client";
+import { apiRequest, API_URL, waitForJob, uploadDirect } from "../api/client";
 import VoiceRecorder from "../components/VoiceRecorder";
 import FileUpload from "../components/FileUpload";
 import SimpleBreathing from "../components/SimpleBreathing";
@@ -318,37 +318,23 @@ export default function CoachingChat() {
   const handleFileSelect = async (files) => {
     setUploadingFiles(true);
     try {
-      const formData = new FormData();
-      files.forEach((file, index) => {
-        formData.append(`files`, file);
-      });
-
-      const response = await fetch(`${API_URL}/rooms/${roomId}/upload-evidence`, {
-        method: "POST",
-        headers: {
-          "Authorization": `Bearer ${token}`
-        },
-        body: formData
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({}));
-
-        if (response.status === 402) {
-          // Payment required - show upgrade message
-          const message = typeof errorData.detail === 'object'
-            ? errorData.detail.message
-            : errorData.detail;
-          alert(message || "File uploads are available with Plus or Pro subscription. Upgrade to express yourself better with images and documents!");
-          setUploadingFiles(false);
-          return;
+      // Each file goes straight to S3, then is confirmed
+      const uploaded = [];
+      for (const file of files) {
+        try {
+          const result = await uploadDirect(`/rooms/${roomId}/evidence`, file, token);
+          uploaded.push(...result.files);
+        } catch (error) {
+          if (error.statusCode === 402) {
+            // Payment required - show upgrade message
+            alert(error.message || "File uploads are available with Plus or Pro subscription. Upgrade to express yourself better with images and documents!");
+            setUploadingFiles(false);
+            return;
+          }
+          throw error;
         }
-
-        throw new Error(errorData.detail || "Failed to upload files");
       }
-
-      const result = await response.json();
-      setEvidenceFiles(prev => [...prev, ...result.files]);
+      setEvidenceFiles(prev => [...prev, ...uploaded]);
       alert(`${files.length} file(s) uploaded successfully!`);
     } catch (error) {
       console.error("File upload error:", error);
@@ -1436,7 +1422,7 @@ export default function CoachingChat() {
               }
             }, 1500);
 
-            const response = await apiRequest(
+            const response = await waitForJob(await apiRequest(
               `/rooms/${roomId}/coach/telegram-import`,
               "POST",
               {
@@ -1445,7 +1431,7 @@ export default function CoachingChat() {
                 message_count: telegramData.message_count
               },
               token
-            );
+            ), token);
 
             // Clear thinking interval
             clearInterval(thinkingInterval);
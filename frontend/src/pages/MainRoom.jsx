@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useAuth } from "../context/AuthContext";
-import { apiRequest, API_URL } from "../api/client";
+import { apiRequest, API_URL, waitForJob, uploadDirect } from "../api/client";
 import VoiceRecorder from "../components/VoiceRecorder";
 import FloatingMenu from "../components/FloatingMenu";
 import SimpleBreathing from "../components/SimpleBreathing";
@@ -28,6 +28,7 @@ export default function MainRoom() {
   const [showTelegramImport, setShowTelegramImport] = useState(false);  // Telegram import modal
   const [showMessageViewer, setShowMessageViewer] = useState(false);  // Message viewer modal
   const [viewingTelegramImport, setViewingTelegramImport] = useState(null);  // Current import being viewed
+  const [socketConnected, setSocketConnected] = useState(false);  // Room WebSocket is live (polling is the fallback)
   const messagesEndRef = useRef(null);
   
   useEffect(() => {
@@ -133,8 +134,148 @@ export default function MainRoom() {
     loadRoom();
   }, [roomId, token, user]);
   
+  // Push updates over the room WebSocket; polling below only runs while it's disconnected
   useEffect(() => {
-    if (loading || !summaries) return;
+    if (loading || !summaries || !user || !token) return;
+
+    const isUser1 = user.id === summaries.user1_id;
+    const otherUserSummary = isUser1 ? summaries.user2_summary : summaries.user1_summary;
+    const otherUserName = isUser1 ? summaries.user2_name : summaries.user1_name;
+    const wsUrl = `${API_URL.replace(/^http/, "ws")}/rooms/${roomId}/main-room/ws?token=${encodeURIComponent(token)}`;
+
+    let socket = null;
+    let closed = false;
+    let retryDelay = 1000;
+    let reconnectTimer = null;
+    let keepaliveTimer = null;
+    let refreshTimer = null;
+
+    // Full refetch, debounced - used to catch up after (re)connecting
+    const refreshMessages = () => {
+      clearTimeout(refreshTimer);
+      refreshTimer = setTimeout(async () => {
+        try {
+          const history = await apiRequest(`/rooms/${roomId}/main-room/messages`, "GET", null, token);
+          const messagesWithSummary = history.messages.length > 0 ? [
+            {
+              role: "summary",
+              content: otherUserSummary,
+              fromUser: otherUserName
+            },
+            ...history.messages
+          ] : [];
+          setMessages(prev => (
+            JSON.stringify(prev.filter(m => m.role !== "summary")) === JSON.stringify(history.messages)
+              ? prev
+              : messagesWithSummary
+          ));
+          setCurrentSpeakerId(history.current_speaker_id);
+          setSessionComplete(history.session_complete);
+          if (history.break_info) {
+            setBreakInfo(history.break_info);
+            setShowBreathing(true);
+          }
+        } catch (err) {
+          console.error("Message refresh error:", err);
+        }
+      }, 150);
+    };
+
+    // Turn events carry the message itself - slot it in by turn id instead of refetching the list
+    const addMessage = (message) => {
+      setMessages(prev => {
+        if (prev.some(m => m.id === message.id)) return prev;
+        const base = prev.length > 0 ? prev : [
+          {
+            role: "summary",
+            content: otherUserSummary,
+            fromUser: otherUserName
+          }
+        ];
+        let insertAt = 0;
+        base.forEach((m, idx) => {
+          if (m.id != null ? m.id < message.id : !m.isThinking) insertAt = idx + 1;
+        });
+        return [...base.slice(0, insertAt), message, ...base.slice(insertAt)];
+      });
+    };
+
+    const handleEvent = (event) => {
+      switch (event.type) {
+        case "turn":
+          if (event.message && event.message.id != null) {
+            addMessage(event.message);
+          } else {
+            refreshMessages();
+          }
+          break;
+        case "speaker":
+          setCurrentSpeakerId(event.current_speaker_id);
+          break;
+        case "resolved":
+          setSessionComplete(true);
+          break;
+        case "breathing_break":
+          setShowBreathing(true);
+          break;
+        case "break":
+          setBreakInfo(event.break_info);
+          if (event.break_info) setShowBreathing(true);
+          break;
+        case "presence":
+          if (event.user_id !== user.id) setOtherUserPresent(event.present);
+          break;
+        default:
+          break;
+      }
+    };
+
+    const connect = () => {
+      socket = new WebSocket(wsUrl);
+
+      socket.onopen = () => {
+        retryDelay = 1000;
+        setSocketConnected(true);
+        // Catch up on anything missed while disconnected
+        refreshMessages();
+        // Keepalive also refreshes our presence on the server
+        keepaliveTimer = setInterval(() => {
+          if (socket.readyState === WebSocket.OPEN) socket.send("ping");
+        }, 20000);
+      };
+
+      socket.onmessage = (message) => {
+        try {
+          handleEvent(JSON.parse(message.data));
+        } catch (err) {
+          console.error("Room event error:", err);
+        }
+      };
+
+      socket.onclose = () => {
+        clearInterval(keepaliveTimer);
+        setSocketConnected(false);
+        if (closed) return;
+        // Fall back to polling and retry with backoff
+        reconnectTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      clearTimeout(refreshTimer);
+      clearInterval(keepaliveTimer);
+      if (socket) socket.close();
+      setSocketConnected(false);
+    };
+  }, [roomId, token, loading, summaries, user]);
+
+  useEffect(() => {
+    if (loading || !summaries || socketConnected) return;
 
     const pollMessages = async () => {
       if (!user) return; // Wait for user to load
@@ -184,7 +325,7 @@ export default function MainRoom() {
 
     const interval = setInterval(pollMessages, 3000);
     return () => clearInterval(interval);
-  }, [roomId, token, messages, loading, summaries, user]);
+  }, [roomId, token, messages, loading, summaries, user, socketConnected]);
   
   // Redirect to celebration when session completes
   useEffect(() => {
@@ -366,25 +507,8 @@ export default function MainRoom() {
     setUploadingFile(true);
 
     try {
-      const formData = new FormData();
-      formData.append("file", file);
-
-      const endpoint = `${API_URL}/rooms/${roomId}/main-room/upload-file`;
-
-      const response = await fetch(endpoint, {
-        method: "POST",
-        headers: {
-          "Authorization": `Bearer ${token}`
-        },
-        body: formData
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({}));
-        throw new Error(errorData.detail || "File upload failed");
-      }
-
-      const result = await response.json();
+      // Upload straight to S3, then post it to the chat
+      const result = await uploadDirect(`/rooms/${roomId}/main-room/file`, file, token);
       console.log("File uploaded successfully:", result);
 
       // Force immediate refresh to show uploaded file
@@ -458,7 +582,7 @@ export default function MainRoom() {
         }
       }, 1500);
 
-      const response = await apiRequest(
+      const response = await waitForJob(await apiRequest(
         `/rooms/${roomId}/main-room/telegram-import`,
         "POST",
         {
@@ -467,7 +591,7 @@ export default function MainRoom() {
           message_count: telegramData.message_count
         },
         token
-      );
+      ), token);
 
       // Clear thinking interval
       clearInterval(thinkingInterval);
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { useNavigate } from 'react-router-dom';
-import { apiRequest } from '../api/client';
+import { apiRequest, uploadDirect } from '../api/client';
 import { useGamification } from '../context/GamificationContext';
 import { HealthScore, StreakCounter } from '../components/gamification';
 
@@ -64,26 +64,8 @@ export default function Profile() {
     setUploadingPicture(true);
 
     try {
-      const formData = new FormData();
-      formData.append('file', file);
-
-      const response = await fetch(
-        `${import.meta.env.VITE_API_URL}/auth/me/profile-picture`,
-        {
-          method: 'POST',
-          headers: {
-            'Authorization': `Bearer ${token}`,
-          },
-          body: formData,
-        }
-      );
-
-      if (!response.ok) {
-        const error = await response.json();
-        throw new Error(error.detail || 'Failed to upload profile picture');
-      }
-
-      const updatedUser = await response.json();
+      // Upload straight to S3, then set it on the profile
+      const updatedUser = await uploadDirect('/auth/me/profile-picture', file, token);
       setProfilePictureUrl(updatedUser.profile_picture_url);
 
       // Refresh user in context if available
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useAuth } from "../context/AuthContext";
-import { apiRequest } from "../api/client";
+import { apiRequest, waitForJob } from "../api/client";
 
 export default function ResolutionComplete() {
   const { roomId } = useParams();
@@ -55,7 +55,7 @@ export default function ResolutionComplete() {
   const generateReport = async () => {
     setGeneratingReport(true);
     try {
-      const response = await apiRequest(`/rooms/${roomId}/generate-report`, "POST", null, token);
+      const response = await waitForJob(await apiRequest(`/rooms/${roomId}/generate-report`, "POST", null, token), token);
       if (response.success && response.report_url) {
         setReportUrl(response.report_url);
       }
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { useAuth } from "../context/AuthContext";
-import { apiRequest, API_URL } from "../api/client";
+import { apiRequest, API_URL, uploadDirect } from "../api/client";
 import VoiceRecorder from "../components/VoiceRecorder";
 import AttachmentMenu from "../components/AttachmentMenu";
 import TelegramImportModal from "../components/TelegramImportModal";
@@ -194,22 +194,7 @@ export default function SoloCoaching() {
   const handleFileSelect = async (file) => {
     setUploadingFiles(true);
     try {
-      const formData = new FormData();
-      formData.append('files', file);
-
-      const response = await fetch(`${API_URL}/rooms/${roomId}/upload-evidence`, {
-        method: "POST",
-        headers: {
-          "Authorization": `Bearer ${token}`
-        },
-        body: formData
-      });
-
-      if (!response.ok) {
-        throw new Error("Failed to upload file");
-      }
-
-      const result = await response.json();
+      const result = await uploadDirect(`/rooms/${roomId}/evidence`, file, token);
       setEvidenceFiles(prev => [...prev, ...result.files]);
       alert("File uploaded successfully!");
     } catch (error) {